@@ -0,0 +1,374 @@
+"""
+Generador de datos sintéticos a escala para benchmarks y pruebas de carga.
+
+A diferencia de poblar_db.py (un puñado de registros creados uno a uno), aquí todo
+se inserta con bulk_create por lotes, sin señales ni save() por fila:
+
+    from benchmarks.datos_sinteticos import generar
+    resumen = generar(num_usuarios=50_000, num_registros=1_000_000)
+
+También disponible como comando: python manage.py generar_datos_sinteticos --escala grande
+"""
+
+import logging
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Escalas predefinidas: (usuarios, registros de acceso)
+ESCALAS = {
+    "pequena": (1_000, 20_000),
+    "media": (10_000, 200_000),
+    "grande": (50_000, 1_000_000),
+}
+
+# Centro Minero SENA (Sogamoso)
+CENTRO_LAT = 5.7303596
+CENTRO_LNG = -72.8943613
+
+# Distribución de roles de los usuarios generados (el resto son aprendices)
+PROPORCION_ROLES = [
+    ("INSTRUCTOR", 0.05),
+    ("VIGILANCIA", 0.02),
+    ("ADMINISTRATIVO", 0.02),
+    ("BRIGADA", 0.03),
+    ("VISITANTE", 0.03),
+]
+
+PREFIJO = "bench"
+
+
+@contextmanager
+def _sin_auto_now(modelo, *campos):
+    """Desactiva auto_now_add en los campos dados para poder fijar fechas históricas en bulk_create."""
+    fields = [modelo._meta.get_field(c) for c in campos]
+    originales = [(f.auto_now_add, f.auto_now) for f in fields]
+    for f in fields:
+        f.auto_now_add = f.auto_now = False
+    try:
+        yield
+    finally:
+        for f, (add, now) in zip(fields, originales):
+            f.auto_now_add, f.auto_now = add, now
+
+
+def _en_lotes(modelo, objetos, tamano_lote):
+    """bulk_create de un generador de objetos, en lotes, sin materializar toda la lista."""
+    lote = []
+    total = 0
+    for obj in objetos:
+        lote.append(obj)
+        if len(lote) >= tamano_lote:
+            modelo.objects.bulk_create(lote, batch_size=tamano_lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        modelo.objects.bulk_create(lote, batch_size=tamano_lote)
+        total += len(lote)
+    return total
+
+
+def _generar_usuarios(num_usuarios, num_fichas, tamano_lote, rnd):
+    from usuarios.models import Usuario
+
+    clave = make_password("benchmark123")  # un único hash para todos: PBKDF2 por fila sería el cuello de botella
+    fichas = [str(2_900_000 + i) for i in range(num_fichas)]
+
+    cupos = []
+    for rol, proporcion in PROPORCION_ROLES:
+        cupos += [rol] * max(1, int(num_usuarios * proporcion))
+    cupos += ["COORDINADOR_SST"]
+    cupos += ["APRENDIZ"] * max(0, num_usuarios - len(cupos))
+    rnd.shuffle(cupos)
+
+    def objetos():
+        for i, rol in enumerate(cupos[:num_usuarios]):
+            yield Usuario(
+                username=f"{PREFIJO}_{i}",
+                password=clave,
+                first_name=f"Nombre{i}",
+                last_name=f"Apellido{i}",
+                email=f"{PREFIJO}_{i}@soy.sena.edu.co",
+                rol=rol,
+                tipo_documento="CC",
+                numero_documento=f"B{i:09d}",
+                ficha=fichas[i % num_fichas] if rol == "APRENDIZ" else None,
+                fichas_asignadas=",".join(rnd.sample(fichas, min(3, num_fichas))) if rol == "INSTRUCTOR" else "",
+                es_brigada=rol == "BRIGADA",
+                activo=True,
+                estado_cuenta="ACTIVO",
+            )
+
+    _en_lotes(Usuario, objetos(), tamano_lote)
+    return list(Usuario.objects.filter(username__startswith=f"{PREFIJO}_").values_list("id", "rol"))
+
+
+def _generar_registros(usuarios, num_registros, dias, abiertos_hoy, tamano_lote, rnd):
+    from control_acceso.models import RegistroAcceso
+
+    ids = [uid for uid, rol in usuarios]
+    ahora = timezone.now()
+    hoy = timezone.localtime(ahora).replace(hour=6, minute=0, second=0, microsecond=0)
+    metodos = ["QR", "MANUAL", "AUTOMATICO"]
+
+    def objetos():
+        # Personas dentro del centro ahora mismo (ingreso hoy, sin egreso)
+        for uid in rnd.sample(ids, min(abiertos_hoy, len(ids), num_registros)):
+            yield RegistroAcceso(
+                usuario_id=uid,
+                tipo="INGRESO",
+                fecha_hora_ingreso=min(hoy + timedelta(minutes=rnd.randint(0, 240)), ahora),
+                metodo_ingreso=rnd.choice(metodos),
+            )
+        # Histórico cerrado repartido en los últimos `dias` días
+        for _ in range(max(0, num_registros - abiertos_hoy)):
+            ingreso = hoy - timedelta(days=rnd.randint(1, dias), minutes=rnd.randint(0, 600))
+            yield RegistroAcceso(
+                usuario_id=rnd.choice(ids),
+                tipo="INGRESO",
+                fecha_hora_ingreso=ingreso,
+                metodo_ingreso=rnd.choice(metodos),
+                fecha_hora_egreso=ingreso + timedelta(minutes=rnd.randint(60, 600)),
+                metodo_egreso=rnd.choice(metodos),
+            )
+
+    with _sin_auto_now(RegistroAcceso, "fecha_hora_ingreso"):
+        return _en_lotes(RegistroAcceso, objetos(), tamano_lote)
+
+
+def _generar_campus(num_edificios, lado_grafo, rnd):
+    """Edificios con polígono y estado, puntos de encuentro, equipamiento y un grafo de caminos en rejilla."""
+    from mapas.models import (
+        EdificioBloque,
+        EquipamientoSeguridad,
+        EstadoEdificio,
+        NodoCamino,
+        PuntoEncuentro,
+        TramoCamino,
+    )
+    from mapas.routing import haversine
+
+    paso = 0.00015  # ~16 m entre nodos de la rejilla
+    origen_lat = CENTRO_LAT - paso * lado_grafo / 2
+    origen_lng = CENTRO_LNG - paso * lado_grafo / 2
+
+    def coord(fila, col):
+        return origen_lat + fila * paso, origen_lng + col * paso
+
+    tipos = ["AULAS", "TALLER", "LABORATORIO", "ADMINISTRATIVO", "CAFETERIA", "BIBLIOTECA"]
+    edificios = []
+    for i in range(num_edificios):
+        lat, lng = coord(rnd.randrange(1, lado_grafo - 1), rnd.randrange(1, lado_grafo - 1))
+        d = paso / 3
+        edificios.append(
+            EdificioBloque(
+                nombre=f"Bloque {PREFIJO} {i}",
+                latitud=lat,
+                longitud=lng,
+                tipo=tipos[i % len(tipos)],
+                capacidad=rnd.randint(50, 400),
+                poligono=[[lat - d, lng - d], [lat - d, lng + d], [lat + d, lng + d], [lat + d, lng - d]],
+            )
+        )
+    EdificioBloque.objects.bulk_create(edificios)
+    edificios = list(EdificioBloque.objects.filter(nombre__startswith=f"Bloque {PREFIJO} "))
+    EstadoEdificio.objects.bulk_create([EstadoEdificio(edificio=e, estado="NORMAL") for e in edificios])
+
+    esquinas = [(0, 0), (0, lado_grafo - 1), (lado_grafo - 1, 0), (lado_grafo - 1, lado_grafo - 1)]
+    puntos = PuntoEncuentro.objects.bulk_create(
+        [
+            PuntoEncuentro(
+                nombre=f"Punto {PREFIJO} {i}",
+                latitud=coord(*esquina)[0],
+                longitud=coord(*esquina)[1],
+                capacidad=rnd.randint(200, 1500),
+            )
+            for i, esquina in enumerate(esquinas)
+        ]
+    )
+    puntos = list(PuntoEncuentro.objects.filter(nombre__startswith=f"Punto {PREFIJO} ").order_by("id"))
+
+    EquipamientoSeguridad.objects.bulk_create(
+        [
+            EquipamientoSeguridad(
+                nombre=f"Equipo {i}",
+                codigo=f"{PREFIJO.upper()}-EQ-{i:05d}",
+                tipo=rnd.choice(["EXTINTOR", "BOTIQUIN", "CAMILLA", "ALARMA"]),
+                estado=rnd.choice(["OPERATIVO"] * 8 + ["MANTENIMIENTO", "FUERA_SERVICIO"]),
+                edificio=rnd.choice(edificios),
+                latitud=edificios[i % len(edificios)].latitud,
+                longitud=edificios[i % len(edificios)].longitud,
+            )
+            for i in range(num_edificios * 10)
+        ]
+    )
+
+    # Grafo en rejilla: nodo (fila, col) conectado a derecha y abajo
+    nodos = []
+    for fila in range(lado_grafo):
+        for col in range(lado_grafo):
+            lat, lng = coord(fila, col)
+            nodos.append(NodoCamino(nombre=f"{PREFIJO}-{fila}-{col}", latitud=lat, longitud=lng))
+    for punto, esquina in zip(puntos, esquinas):
+        nodo = nodos[esquina[0] * lado_grafo + esquina[1]]
+        nodo.tipo, nodo.punto_encuentro = "PUNTO_ENCUENTRO", punto
+    for edificio in edificios:
+        fila = round((edificio.latitud - origen_lat) / paso)
+        col = round((edificio.longitud - origen_lng) / paso)
+        nodo = nodos[fila * lado_grafo + col]
+        if nodo.tipo == "INTERSECCION":
+            nodo.tipo, nodo.edificio = "ENTRADA", edificio
+    NodoCamino.objects.bulk_create(nodos)
+    ids = dict(NodoCamino.objects.filter(nombre__startswith=f"{PREFIJO}-").values_list("nombre", "id"))
+
+    tramos = []
+    for fila in range(lado_grafo):
+        for col in range(lado_grafo):
+            for df, dc in ((0, 1), (1, 0)):
+                f2, c2 = fila + df, col + dc
+                if f2 >= lado_grafo or c2 >= lado_grafo:
+                    continue
+                (lat1, lng1), (lat2, lng2) = coord(fila, col), coord(f2, c2)
+                tramos.append(
+                    TramoCamino(
+                        nodo_origen_id=ids[f"{PREFIJO}-{fila}-{col}"],
+                        nodo_destino_id=ids[f"{PREFIJO}-{f2}-{c2}"],
+                        distancia_metros=round(haversine(lat1, lng1, lat2, lng2), 2),
+                    )
+                )
+    TramoCamino.objects.bulk_create(tramos, batch_size=2000)
+    return edificios, puntos, len(nodos), len(tramos)
+
+
+def _generar_emergencias(usuarios, edificios, num_emergencias, dias, tamano_lote, rnd):
+    from emergencias.models import Emergencia, RegistroEvacuacion, TipoEmergencia
+
+    tipo_masivo, _ = TipoEmergencia.objects.get_or_create(
+        nombre=f"Sismo {PREFIJO}",
+        defaults={"descripcion": "Sintético", "prioridad": 1, "protocolo": "Evacuar", "alerta_masiva": True},
+    )
+    tipo_local, _ = TipoEmergencia.objects.get_or_create(
+        nombre=f"Incendio {PREFIJO}",
+        defaults={"descripcion": "Sintético", "prioridad": 2, "protocolo": "Extintor"},
+    )
+    ids = [uid for uid, rol in usuarios]
+    ahora = timezone.now()
+    estados = ["RESUELTA"] * 6 + ["FALSA_ALARMA", "CONTROLADA"]
+
+    def objetos():
+        for i in range(num_emergencias):
+            reporte = ahora - timedelta(days=rnd.randint(1, dias), minutes=rnd.randint(0, 1440))
+            estado = rnd.choice(estados)
+            edificio = rnd.choice(edificios)
+            yield Emergencia(
+                tipo=tipo_local if i % 10 else tipo_masivo,
+                reportada_por_id=rnd.choice(ids),
+                latitud=edificio.latitud,
+                longitud=edificio.longitud,
+                edificio=edificio,
+                descripcion=f"Emergencia sintética {i}",
+                estado=estado,
+                fecha_hora_reporte=reporte,
+                fecha_hora_atencion=reporte + timedelta(minutes=rnd.randint(1, 15)),
+                fecha_hora_resolucion=reporte + timedelta(minutes=rnd.randint(20, 240))
+                if estado == "RESUELTA"
+                else None,
+                fecha_hora_falsa_alarma=reporte + timedelta(minutes=5) if estado == "FALSA_ALARMA" else None,
+            )
+
+    with _sin_auto_now(Emergencia, "fecha_hora_reporte"):
+        _en_lotes(Emergencia, objetos(), tamano_lote)
+
+    # Una evacuación masiva en curso con parte de las confirmaciones hechas
+    activa = Emergencia.objects.create(
+        tipo=tipo_masivo,
+        reportada_por_id=ids[0],
+        latitud=CENTRO_LAT,
+        longitud=CENTRO_LNG,
+        descripcion="Evacuación sintética en curso",
+        estado="EN_ATENCION",
+    )
+    confirmados = rnd.sample(ids, len(ids) // 4)
+    _en_lotes(
+        RegistroEvacuacion,
+        (
+            RegistroEvacuacion(emergencia=activa, usuario_id=uid, confirmado=True, fecha_confirmacion=ahora)
+            for uid in confirmados
+        ),
+        tamano_lote,
+    )
+    return activa
+
+
+def generar(
+    num_usuarios=1_000,
+    num_registros=20_000,
+    dias=90,
+    num_fichas=40,
+    num_edificios=12,
+    lado_grafo=20,
+    num_emergencias=None,
+    abiertos_hoy=None,
+    tamano_lote=5_000,
+    semilla=1,
+):
+    """
+    Puebla la BD con un campus sintético completo y retorna un resumen con los ids útiles
+    para los benchmarks. Es determinista para una misma semilla.
+    """
+    from control_acceso.models import ConfiguracionAforo
+    from usuarios.models import Visitante
+
+    rnd = random.Random(semilla)
+    num_emergencias = num_emergencias if num_emergencias is not None else max(50, num_usuarios // 20)
+    abiertos_hoy = abiertos_hoy if abiertos_hoy is not None else max(1, num_usuarios // 5)
+
+    with transaction.atomic():
+        usuarios = _generar_usuarios(num_usuarios, num_fichas, tamano_lote, rnd)
+        total_registros = _generar_registros(usuarios, num_registros, dias, abiertos_hoy, tamano_lote, rnd)
+        ConfiguracionAforo.objects.get_or_create(
+            activo=True, defaults={"aforo_maximo": num_usuarios, "aforo_minimo": int(num_usuarios * 0.9)}
+        )
+        edificios, puntos, num_nodos, num_tramos = _generar_campus(num_edificios, lado_grafo, rnd)
+        emergencia_activa = _generar_emergencias(usuarios, edificios, num_emergencias, dias, tamano_lote, rnd)
+
+        vigilantes = [uid for uid, rol in usuarios if rol == "VIGILANCIA"]
+        _en_lotes(
+            Visitante,
+            (
+                Visitante(
+                    nombre_completo=f"Visitante {i}",
+                    tipo_documento="CC",
+                    numero_documento=f"V{i:09d}",
+                    motivo_visita="Visita sintética",
+                    registrado_por_id=rnd.choice(vigilantes),
+                )
+                for i in range(max(10, num_usuarios // 10))
+            ),
+            tamano_lote,
+        )
+
+    por_rol = {}
+    for uid, rol in usuarios:
+        por_rol.setdefault(rol, uid)
+
+    resumen = {
+        "usuarios": len(usuarios),
+        "registros": total_registros,
+        "edificios": len(edificios),
+        "puntos_encuentro": len(puntos),
+        "nodos": num_nodos,
+        "tramos": num_tramos,
+        "emergencias": num_emergencias + 1,
+        "emergencia_activa_id": emergencia_activa.id,
+        "usuario_por_rol": por_rol,
+        "ficha": str(2_900_000),
+    }
+    logger.info("Datos sintéticos generados: %s", resumen)
+    return resumen
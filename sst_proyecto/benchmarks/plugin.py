@@ -0,0 +1,168 @@
+"""
+Plugin de pytest para la suite de benchmarks (cargado desde el conftest raíz).
+
+Los tests marcados con @pytest.mark.benchmark se omiten salvo que se pase --benchmark:
+
+    pytest benchmarks --benchmark                              # escala pequeña (1k usuarios)
+    pytest benchmarks --benchmark --bench-escala grande        # 50k usuarios, 1M accesos
+    pytest benchmarks --benchmark --bench-guardar base.json    # guardar línea base
+    pytest benchmarks --benchmark --bench-comparar base.json   # modo regresión
+
+En modo regresión un benchmark falla si su mediana supera la de la línea base en más
+de --bench-tolerancia (25 % por defecto) o si ejecuta más consultas SQL que entonces.
+"""
+
+import json
+import statistics
+import time
+
+import pytest
+
+from benchmarks.datos_sinteticos import ESCALAS
+
+
+def pytest_addoption(parser):
+    grupo = parser.getgroup("benchmarks", "Benchmarks de rendimiento del sistema SST")
+    grupo.addoption("--benchmark", action="store_true", help="Ejecuta los tests marcados como benchmark")
+    grupo.addoption("--bench-escala", choices=sorted(ESCALAS), default="pequena", help="Volumen de datos sintéticos")
+    grupo.addoption("--bench-usuarios", type=int, help="Número de usuarios (sobrescribe la escala)")
+    grupo.addoption("--bench-registros", type=int, help="Número de RegistroAcceso (sobrescribe la escala)")
+    grupo.addoption("--bench-rondas", type=int, default=5, help="Rondas medidas por benchmark (default: 5)")
+    grupo.addoption("--bench-guardar", metavar="RUTA", help="Guarda los resultados en un JSON (línea base)")
+    grupo.addoption("--bench-comparar", metavar="RUTA", help="Compara contra una línea base JSON y falla si empeora")
+    grupo.addoption(
+        "--bench-tolerancia", type=float, default=0.25, help="Margen de tiempo permitido en modo regresión (0.25)"
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: benchmark de rendimiento (requiere --benchmark)")
+    config._resultados_benchmark = {}
+    config._linea_base_benchmark = {}
+    ruta = config.getoption("--bench-comparar")
+    if ruta:
+        with open(ruta, encoding="utf-8") as f:
+            config._linea_base_benchmark = json.load(f)
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    omitir = pytest.mark.skip(reason="benchmark: use --benchmark para ejecutarlo")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(omitir)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    ruta = session.config.getoption("--bench-guardar")
+    resultados = getattr(session.config, "_resultados_benchmark", {})
+    if ruta and resultados:
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, sort_keys=True)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    resultados = getattr(config, "_resultados_benchmark", {})
+    if not resultados:
+        return
+    base = getattr(config, "_linea_base_benchmark", {})
+    tr = terminalreporter
+    tr.section("benchmarks")
+    tr.write_line(f"{'Benchmark':<58} {'min ms':>9} {'med ms':>9} {'max ms':>9} {'SQL':>6} {'Δ base':>8}")
+    for nombre, r in sorted(resultados.items()):
+        delta = ""
+        if nombre in base and base[nombre]["mediana"]:
+            delta = f"{(r['mediana'] / base[nombre]['mediana'] - 1) * 100:+.0f}%"
+        tr.write_line(
+            f"{nombre[:58]:<58} {r['min'] * 1000:>9.1f} {r['mediana'] * 1000:>9.1f} "
+            f"{r['max'] * 1000:>9.1f} {r['consultas']:>6} {delta:>8}"
+        )
+
+
+# ─── Fixtures ────────────────────────────────────────────────────────────────
+
+
+@pytest.fixture(scope="session")
+def datos_benchmark(request, django_db_setup, django_db_blocker):
+    """
+    Puebla la BD de tests una sola vez por sesión con el generador sintético.
+    Los datos quedan confirmados: cada benchmark corre en su propia transacción
+    y sus escrituras se revierten, pero el volumen base se comparte.
+    """
+    from benchmarks.datos_sinteticos import generar
+
+    usuarios, registros = ESCALAS[request.config.getoption("--bench-escala")]
+    usuarios = request.config.getoption("--bench-usuarios") or usuarios
+    registros = request.config.getoption("--bench-registros") or registros
+
+    with django_db_blocker.unblock():
+        inicio = time.perf_counter()
+        resumen = generar(num_usuarios=usuarios, num_registros=registros)
+        resumen["segundos_generacion"] = round(time.perf_counter() - inicio, 1)
+    return resumen
+
+
+class Benchmark:
+    """Ejecuta una función varias rondas y registra tiempos y número de consultas SQL."""
+
+    def __init__(self, config, nombre):
+        self.config = config
+        self.nombre = nombre
+
+    def __call__(self, funcion, *args, rondas=None, antes=None, **kwargs):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        rondas = rondas or self.config.getoption("--bench-rondas")
+
+        # Ronda de calentamiento (imports, planes de consulta, plantillas compiladas)
+        if antes:
+            antes()
+        funcion(*args, **kwargs)
+
+        tiempos, consultas = [], []
+        resultado = None
+        for _ in range(rondas):
+            if antes:
+                antes()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                resultado = funcion(*args, **kwargs)
+                tiempos.append(time.perf_counter() - inicio)
+            consultas.append(len(capturadas.captured_queries))
+
+        medida = {
+            "rondas": rondas,
+            "min": min(tiempos),
+            "mediana": statistics.median(tiempos),
+            "max": max(tiempos),
+            "consultas": max(consultas),
+        }
+        self.config._resultados_benchmark[self.nombre] = medida
+        self._verificar_regresion(medida)
+        return resultado
+
+    def _verificar_regresion(self, medida):
+        base = self.config._linea_base_benchmark.get(self.nombre)
+        if not base:
+            return
+        tolerancia = self.config.getoption("--bench-tolerancia")
+        errores = []
+        if medida["mediana"] > base["mediana"] * (1 + tolerancia):
+            errores.append(
+                f"mediana {medida['mediana'] * 1000:.1f} ms > base {base['mediana'] * 1000:.1f} ms "
+                f"(+{tolerancia:.0%} permitido)"
+            )
+        if medida["consultas"] > base["consultas"]:
+            errores.append(f"{medida['consultas']} consultas SQL > base {base['consultas']}")
+        if errores:
+            pytest.fail(f"Regresión en {self.nombre}: " + "; ".join(errores))
+
+
+@pytest.fixture
+def benchmark(request, settings):
+    """Mide una función: benchmark(func, *args, rondas=None, antes=None, **kwargs)."""
+    # Los presupuestos de consultas se reportan en la tabla; no deben abortar la medición
+    settings.METRICAS_PRESUPUESTO_ESTRICTO = False
+    return Benchmark(request.config, request.node.nodeid.split("::", 1)[-1])
@@ -0,0 +1,150 @@
+"""
+Benchmarks de los endpoints más usados, sobre el volumen de datos sintéticos.
+
+    pytest benchmarks --benchmark [--bench-escala media|grande]
+"""
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from rest_framework.test import APIClient
+
+from benchmarks.datos_sinteticos import CENTRO_LAT, CENTRO_LNG
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+ROLES = ["APRENDIZ", "INSTRUCTOR", "ADMINISTRATIVO", "VIGILANCIA", "BRIGADA", "VISITANTE", "COORDINADOR_SST"]
+
+
+def _usuario(datos, rol):
+    from usuarios.models import Usuario
+
+    return Usuario.objects.get(pk=datos["usuario_por_rol"][rol])
+
+
+def _api_client(usuario):
+    client = APIClient()
+    client.force_authenticate(usuario)
+    return client
+
+
+def test_escanear_qr(datos_benchmark, benchmark):
+    from control_acceso.utils import generar_token_qr
+
+    vigilante = _usuario(datos_benchmark, "VIGILANCIA")
+    token = generar_token_qr(datos_benchmark["usuario_por_rol"]["APRENDIZ"])
+    client = _api_client(vigilante)
+
+    # Sin modo explícito alterna ingreso / egreso en cada ronda
+    response = benchmark(client.post, "/api/acceso/registros/escanear-qr/", {"token": token}, format="json")
+    assert response.status_code in (200, 201)
+
+
+def test_verificar_aforo_actual_sin_cache(datos_benchmark, benchmark):
+    from control_acceso.utils import verificar_aforo_actual
+
+    resultado = benchmark(verificar_aforo_actual, antes=cache.clear)
+    assert resultado["personas_dentro"] > 0
+
+
+@pytest.mark.parametrize("rol", ROLES)
+def test_dashboard_view(datos_benchmark, benchmark, rol):
+    client = Client()
+    client.force_login(_usuario(datos_benchmark, rol))
+
+    response = benchmark(client.get, "/", antes=cache.clear)
+    assert response.status_code == 200
+
+
+def test_evacuacion_stats(datos_benchmark, benchmark):
+    client = _api_client(_usuario(datos_benchmark, "BRIGADA"))
+
+    response = benchmark(client.get, "/api/emergencias/emergencias/evacuacion-stats/")
+    assert response.status_code == 200
+    assert response.json()["activa"]
+
+
+@pytest.mark.parametrize("con_punto", [False, True], ids=["punto_mas_cercano", "punto_fijo"])
+def test_calcular_ruta_evacuacion(datos_benchmark, benchmark, con_punto):
+    from mapas.models import PuntoEncuentro
+
+    client = _api_client(_usuario(datos_benchmark, "APRENDIZ"))
+    url = f"/api/mapas/api/ruta/?lat={CENTRO_LAT}&lng={CENTRO_LNG}"
+    if con_punto:
+        url += f"&punto_id={PuntoEncuentro.objects.filter(nombre__startswith='Punto bench').first().pk}"
+
+    response = benchmark(client.get, url)
+    assert response.status_code == 200
+
+
+def test_rutas_lote_entradas(datos_benchmark, benchmark):
+    from mapas.models import NodoCamino
+
+    client = _api_client(_usuario(datos_benchmark, "BRIGADA"))
+
+    response = benchmark(client.get, "/api/mapas/api/ruta/lote/")
+    assert response.status_code == 200
+    assert response.json()["total"] == NodoCamino.objects.filter(activo=True, edificio__isnull=False).count()
+
+
+def test_asignacion_puntos(datos_benchmark, benchmark):
+    client = _api_client(_usuario(datos_benchmark, "BRIGADA"))
+
+    response = benchmark(client.get, "/api/mapas/api/asignacion/")
+    assert response.status_code == 200
+    assert response.json()["personas"] > 0
+
+
+def test_boton_panico(datos_benchmark, benchmark):
+    import itertools
+
+    from emergencias.models import TipoEmergencia
+    from usuarios.models import Usuario
+
+    tipo = TipoEmergencia.objects.filter(nombre__startswith="Incendio", activo=True).first()
+    # Un usuario distinto en cada ronda para no chocar con el rate limit (3/h por usuario)
+    usuarios = itertools.cycle(Usuario.objects.filter(rol="APRENDIZ", is_active=True)[:200])
+    client = APIClient()
+    payload = {"tipo": tipo.pk, "latitud": CENTRO_LAT, "longitud": CENTRO_LNG, "descripcion": "Benchmark"}
+
+    response = benchmark(
+        client.post,
+        "/api/emergencias/emergencias/boton_panico/",
+        payload,
+        format="json",
+        antes=lambda: client.force_authenticate(next(usuarios)),
+    )
+    # 403 si el usuario sintético quedó penalizado por una falsa alarma: también es la ruta rápida
+    assert response.status_code in (201, 403)
+
+
+# Objetivo de latencia del botón de pánico (p95, caché local)
+SLO_BOTON_PANICO_MS = 250
+
+
+def test_boton_panico_cumple_slo_de_latencia(tipo_emergencia, brigada):
+    import time
+
+    from rest_framework.authtoken.models import Token
+
+    from usuarios.tests.factories import UsuarioFactory
+
+    url = "/api/emergencias/emergencias/boton_panico/"
+    payload = {"tipo": tipo_emergencia.pk, "latitud": CENTRO_LAT, "longitud": CENTRO_LNG, "descripcion": "Benchmark"}
+    # El rate limit admite 3 activaciones por hora y usuario: se reparten entre varios
+    clientes = []
+    for _ in range(10):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=UsuarioFactory()).key}")
+        clientes.append(client)
+    for client in clientes:
+        client.post(url, payload, format="json")
+
+    tiempos = []
+    for client in clientes * 2:
+        inicio = time.perf_counter()
+        response = client.post(url, payload, format="json")
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        assert response.status_code == 201
+    p95 = sorted(tiempos)[int(len(tiempos) * 0.95) - 1]
+    assert p95 <= SLO_BOTON_PANICO_MS, f"p95 {p95:.1f} ms > SLO {SLO_BOTON_PANICO_MS} ms"
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark de la verificación de permisos por rol (no consulta la BD).
+
+    pytest benchmarks/test_bench_permisos.py --benchmark
+
+Mide 10 000 verificaciones por ronda: has_perm contra la tabla compilada,
+get_permissions (antes copiaba el dict del rol) y las clases de permisos de DRF
+más los decoradores sobre un mismo request (perfil memorizado).
+"""
+
+import pytest
+from django.test import RequestFactory
+
+from usuarios.models import Usuario
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+N = 10_000
+
+PERMISOS = ["can_view_dashboard", "can_manage_all_users", "can_view_map", "can_export_data", "no_existe"]
+
+
+@pytest.fixture
+def usuario():
+    return Usuario(username="bench", rol="INSTRUCTOR")
+
+
+def test_has_perm(benchmark, usuario):
+    def verificar():
+        return sum(usuario.has_perm(PERMISOS[i % len(PERMISOS)]) for i in range(N))
+
+    assert benchmark(verificar) > 0
+
+
+def test_get_permissions(benchmark, usuario):
+    def obtener():
+        for _ in range(N):
+            usuario.get_permissions()
+
+    benchmark(obtener)
+
+
+def test_clases_drf_y_decoradores_mismo_request(benchmark, usuario):
+    from usuarios.permissions import (
+        EsAdministrativoOInstructor,
+        EsBrigadaOAdministrativo,
+        EsVigilanciaOAdministrativo,
+        NoEsVisitante,
+        excluir_visitantes,
+        rol_requerido,
+    )
+
+    request = RequestFactory().get("/")
+    request.user = usuario
+    clases = [NoEsVisitante(), EsAdministrativoOInstructor(), EsVigilanciaOAdministrativo(), EsBrigadaOAdministrativo()]
+    vista = excluir_visitantes(rol_requerido("INSTRUCTOR", "ADMINISTRATIVO")(lambda request: True))
+
+    def verificar():
+        total = 0
+        for _ in range(N // len(clases)):
+            total += sum(clase.has_permission(request, None) for clase in clases)
+            total += vista(request)
+        return total
+
+    assert benchmark(verificar) > 0
@@ -0,0 +1,54 @@
+"""
+Benchmarks de los servicios de reportes (solo cálculo de datos, sin render).
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def _periodo():
+    fin = timezone.now()
+    return fin - timedelta(days=30), fin
+
+
+def _servicios(datos):
+    from reportes.services import (
+        ReporteAforoService,
+        ReporteAsistenciaService,
+        ReporteIncidentesService,
+        ReporteSeguridadService,
+    )
+    from usuarios.models import Usuario
+
+    instructor = Usuario.objects.get(pk=datos["usuario_por_rol"]["INSTRUCTOR"])
+    return {
+        "aforo": ReporteAforoService.generar_reporte,
+        "incidentes": ReporteIncidentesService.generar_reporte,
+        "incidentes_instruccion": lambda i, f: ReporteIncidentesService.generar_reporte_instruccion(i, f, instructor),
+        "asistencia": lambda i, f: ReporteAsistenciaService.generar_reporte(datos["ficha"], i, f),
+        "seguridad": ReporteSeguridadService.generar_reporte,
+        "seguridad_vigilancia": ReporteSeguridadService.generar_reporte_vigilancia,
+        "seguridad_emergencias": ReporteSeguridadService.generar_reporte_emergencias,
+    }
+
+
+@pytest.mark.parametrize(
+    "servicio",
+    [
+        "aforo",
+        "incidentes",
+        "incidentes_instruccion",
+        "asistencia",
+        "seguridad",
+        "seguridad_vigilancia",
+        "seguridad_emergencias",
+    ],
+)
+def test_servicio_reporte(datos_benchmark, benchmark, servicio):
+    inicio, fin = _periodo()
+    datos = benchmark(_servicios(datos_benchmark)[servicio], inicio, fin, rondas=3)
+    assert datos
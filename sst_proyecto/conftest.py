@@ -7,6 +7,8 @@ from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from django.test import override_settings
 
+# Opciones y fixtures de la suite de benchmarks (pytest benchmarks --benchmark)
+pytest_plugins = ["benchmarks.plugin"]
 
 # Desactiva rate-limiting y axes durante toda la suite de tests
 pytestmark = [
@@ -22,15 +24,27 @@ def disable_rate_limiting(settings):
     settings.ALLOWED_HOSTS = ["*"]
     settings.CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "BACKEND": "sst_proyecto.metricas.LocMemCacheMedido",
         }
     }
+    # Los presupuestos de consultas por vista hacen fallar el test si se superan
+    settings.METRICAS_PRESUPUESTO_ESTRICTO = True
     # Usar InMemoryChannelLayer en tests (sin Redis real)
     settings.CHANNEL_LAYERS = {
         "default": {
             "BACKEND": "channels.layers.InMemoryChannelLayer",
         }
     }
+    # LocMemCache comparte almacenamiento entre instancias: vaciarlo para aislar cada test
+    from django.core.cache import cache
+
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reportes_cache_temporal(settings, tmp_path):
+    """Aísla la caché de reportes renderizados en un directorio temporal por test."""
+    settings.REPORTES_CACHE_DIR = str(tmp_path / "reportes_cache")
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,227 @@
+"""
+Render de carnets QR (imagen PNG con el QR y los datos del usuario).
+
+El carnet solo depende de los campos que muestra (token, nombre, rol, ficha,
+documento, programa), así que el PNG se guarda en la caché bajo
+"carnet:<user_id>:<huella>", donde la huella es un hash de esos campos: si el
+usuario cambia de ficha o de nombre la clave cambia y el carnet viejo
+simplemente deja de usarse (expira por TTL). La huella también es el ETag de
+la descarga.
+
+renderizar_carnet() es una función pura (sin ORM ni caché) para poder
+ejecutarse en un pool de procesos al generar los carnets de una ficha completa
+(comando generar_carnets).
+"""
+
+import hashlib
+import io
+import json
+import logging
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+from .utils import generar_token_qr
+
+logger = logging.getLogger(__name__)
+
+# Subirla invalida todos los carnets cacheados (p. ej. al cambiar el diseño)
+VERSION_CARNET = 1
+
+BANDA_ALTO = 90
+
+# Primera fuente TrueType disponible; en el último caso se usa la fuente bitmap de PIL
+RUTAS_FUENTES = [
+    "C:/Windows/Fonts/arial.ttf",
+    "C:/Windows/Fonts/calibri.ttf",
+    "C:/Windows/Fonts/segoeui.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial.ttf",
+]
+
+
+def _cargar_fuentes():
+    for ruta in RUTAS_FUENTES:
+        try:
+            return ImageFont.truetype(ruta, 17), ImageFont.truetype(ruta, 13)
+        except OSError:
+            continue
+    fuente = ImageFont.load_default()
+    return fuente, fuente
+
+
+# Se cargan una sola vez por proceso (antes se probaban las rutas en cada descarga)
+FUENTE_NOMBRE, FUENTE_DATOS = _cargar_fuentes()
+
+
+# ─── Campos y huella ─────────────────────────────────────────────────────────
+
+
+def campos_carnet(usuario):
+    """Textos que se dibujan en el carnet de `usuario`."""
+    linea2 = []
+    if usuario.rol:
+        linea2.append(usuario.get_rol_display())
+    if usuario.ficha:
+        linea2.append(f"Ficha: {usuario.ficha}")
+
+    linea3 = []
+    if usuario.numero_documento:
+        linea3.append(f"Doc: {usuario.numero_documento}")
+    if usuario.programa_formacion:
+        linea3.append(usuario.programa_formacion[:30])
+
+    return {
+        "token": generar_token_qr(usuario.id),
+        "nombre": usuario.get_full_name() or usuario.username,
+        "linea2": " · ".join(linea2),
+        "linea3": " · ".join(linea3),
+    }
+
+
+def huella_carnet(campos):
+    crudo = json.dumps([VERSION_CARNET, campos], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(crudo.encode()).hexdigest()
+
+
+def _clave(user_id, huella):
+    return f"carnet:{user_id}:{huella}"
+
+
+# ─── Render ──────────────────────────────────────────────────────────────────
+
+
+def _texto_centrado(draw, ancho, y, texto, fuente, color):
+    try:
+        bbox = draw.textbbox((0, 0), texto, font=fuente)
+        tw = bbox[2] - bbox[0]
+    except AttributeError:
+        tw = len(texto) * 7  # estimación para fuente bitmap
+    draw.text((max(0, (ancho - tw) // 2), y), texto, font=fuente, fill=color)
+
+
+def renderizar_carnet(campos):
+    """PNG (bytes) del carnet a partir de campos_carnet()."""
+    qr = qrcode.QRCode(
+        version=3,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(campos["token"])
+    qr.make(fit=True)
+    qr_img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
+
+    qr_w, qr_h = qr_img.size
+    imagen = Image.new("RGB", (qr_w, qr_h + BANDA_ALTO), "#ffffff")
+    imagen.paste(qr_img, (0, 0))
+
+    draw = ImageDraw.Draw(imagen)
+    _texto_centrado(draw, qr_w, qr_h + 10, campos["nombre"], FUENTE_NOMBRE, "#1a1a1a")
+    if campos["linea2"]:
+        _texto_centrado(draw, qr_w, qr_h + 34, campos["linea2"], FUENTE_DATOS, "#555555")
+    if campos["linea3"]:
+        _texto_centrado(draw, qr_w, qr_h + 56, campos["linea3"], FUENTE_DATOS, "#888888")
+
+    # Sin optimize=True: multiplica el tiempo de codificación y el PNG ya queda en caché
+    buffer = io.BytesIO()
+    imagen.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def carnet_png(usuario):
+    """(png, huella) del carnet de `usuario`, desde la caché si ya se había generado."""
+    from django.conf import settings
+    from django.core.cache import cache
+
+    campos = campos_carnet(usuario)
+    huella = huella_carnet(campos)
+    png = cache.get(_clave(usuario.id, huella))
+    if png is None:
+        png = renderizar_carnet(campos)
+        cache.set(_clave(usuario.id, huella), png, getattr(settings, "CACHE_TTL_CARNETS", 30 * 86400))
+    return png, huella
+
+
+def renderizar_lote(usuarios, procesos=None):
+    """
+    [(usuario, png)] de todos los `usuarios`, renderizando en paralelo los que no
+    estén en caché y guardándolos en ella. procesos=1 renderiza en este proceso.
+    """
+    from django.conf import settings
+    from django.core.cache import cache
+
+    usuarios = list(usuarios)
+    campos = [campos_carnet(u) for u in usuarios]
+    claves = [_clave(u.id, huella_carnet(c)) for u, c in zip(usuarios, campos)]
+    cacheados = cache.get_many(claves)
+
+    pendientes = [i for i, clave in enumerate(claves) if clave not in cacheados]
+    if pendientes:
+        lote = [campos[i] for i in pendientes]
+        if procesos == 1 or len(lote) == 1:
+            renderizados = [renderizar_carnet(c) for c in lote]
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                renderizados = list(pool.map(renderizar_carnet, lote, chunksize=8))
+        nuevos = {claves[i]: png for i, png in zip(pendientes, renderizados)}
+        cache.set_many(nuevos, getattr(settings, "CACHE_TTL_CARNETS", 30 * 86400))
+        cacheados.update(nuevos)
+        logger.info("Carnets: %s renderizados, %s desde caché", len(nuevos), len(usuarios) - len(nuevos))
+
+    return [(u, cacheados[clave]) for u, clave in zip(usuarios, claves)]
+
+
+# ─── Documentos de impresión ─────────────────────────────────────────────────
+
+
+def nombre_archivo(usuario):
+    return f"QR_{usuario.username}_SST.png"
+
+
+def carnets_zip(carnets):
+    """ZIP con un PNG por usuario (los PNG ya están comprimidos: se guardan sin deflate)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archivo:
+        for usuario, png in carnets:
+            archivo.writestr(nombre_archivo(usuario), png)
+    return buffer.getvalue()
+
+
+def carnets_pdf(carnets, titulo="", columnas=3, filas=3):
+    """PDF A4 imprimible con `columnas` x `filas` carnets por página."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle(titulo or "Carnets SST")
+    ancho, alto = A4
+    margen = 1 * cm
+    celda_w = (ancho - 2 * margen) / columnas
+    celda_h = (alto - 2 * margen) / filas
+    por_pagina = columnas * filas
+
+    for i, (_usuario, png) in enumerate(carnets):
+        if i and i % por_pagina == 0:
+            pdf.showPage()
+        posicion = i % por_pagina
+        col, fila = posicion % columnas, posicion // columnas
+        imagen = ImageReader(io.BytesIO(png))
+        img_w, img_h = imagen.getSize()
+        escala = min((celda_w - 0.4 * cm) / img_w, (celda_h - 0.4 * cm) / img_h)
+        w, h = img_w * escala, img_h * escala
+        x = margen + col * celda_w + (celda_w - w) / 2
+        y = alto - margen - (fila + 1) * celda_h + (celda_h - h) / 2
+        pdf.drawImage(imagen, x, y, w, h)
+        pdf.setDash(2, 3)
+        pdf.rect(margen + col * celda_w, alto - margen - (fila + 1) * celda_h, celda_w, celda_h)
+        pdf.setDash()
+
+    pdf.save()
+    return buffer.getvalue()
@@ -0,0 +1,47 @@
+"""
+Genera los carnets QR de todos los usuarios activos de una ficha en un solo
+archivo imprimible (PDF con varios carnets por hoja) o un ZIP con un PNG por
+usuario. Los carnets se renderizan en un pool de procesos y quedan en caché,
+así que las descargas individuales posteriores (mi-qr-imagen) no los regeneran.
+
+Uso:
+    python manage.py generar_carnets --ficha 2758391                     # PDF en el directorio actual
+    python manage.py generar_carnets --ficha 2758391 --formato zip --salida /tmp/carnets.zip
+    python manage.py generar_carnets --ficha 2758391 --procesos 4
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Genera los carnets QR de una ficha en un PDF imprimible o un ZIP"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ficha", required=True, help="Número de ficha")
+        parser.add_argument("--formato", choices=["pdf", "zip"], default="pdf")
+        parser.add_argument("--salida", help="Ruta del archivo (default: carnets_ficha_<ficha>.<formato>)")
+        parser.add_argument("--procesos", type=int, default=None, help="Procesos de render (default: CPUs)")
+
+    def handle(self, *args, **options):
+        from control_acceso.carnets import carnets_pdf, carnets_zip, renderizar_lote
+        from usuarios.models import Usuario
+
+        ficha = options["ficha"]
+        usuarios = Usuario.objects.filter(ficha=ficha, activo=True).order_by("last_name", "first_name", "id")
+        if not usuarios.exists():
+            raise CommandError(f"No hay usuarios activos en la ficha {ficha}.")
+
+        carnets = renderizar_lote(usuarios, procesos=options["procesos"])
+        if options["formato"] == "zip":
+            contenido = carnets_zip(carnets)
+        else:
+            contenido = carnets_pdf(carnets, titulo=f"Carnets ficha {ficha}")
+
+        salida = options["salida"] or f"carnets_ficha_{ficha}.{options['formato']}"
+        os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+        with open(salida, "wb") as archivo:
+            archivo.write(contenido)
+
+        self.stdout.write(self.style.SUCCESS(f"{len(carnets)} carnets de la ficha {ficha} → {salida}"))
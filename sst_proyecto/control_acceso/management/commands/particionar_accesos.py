@@ -0,0 +1,56 @@
+"""
+Particionado nativo por mes de RegistroAcceso (solo PostgreSQL, opcional).
+
+Las consultas del día y de los reportes filtran por fecha_hora_ingreso, así que
+PostgreSQL solo recorre las particiones de los meses consultados, y archivar_datos
+puede soltar particiones completas ya vaciadas.
+
+Uso:
+    python manage.py particionar_accesos --convertir --sql   # muestra el DDL sin ejecutarlo
+    python manage.py particionar_accesos --convertir         # conversión única (en ventana de mantenimiento)
+    python manage.py particionar_accesos                     # crea las particiones de los próximos meses
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+CAMPO_PARTICION = "fecha_hora_ingreso"
+
+
+class Command(BaseCommand):
+    help = "Particiona RegistroAcceso por mes (PostgreSQL) y mantiene las particiones futuras"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--convertir", action="store_true", help="Convierte la tabla actual en particionada")
+        parser.add_argument("--sql", action="store_true", help="Con --convertir: solo imprime las sentencias")
+        parser.add_argument("--meses", type=int, default=3, help="Meses futuros con partición creada (default: 3)")
+
+    def handle(self, *args, **options):
+        from control_acceso.models import RegistroAcceso
+        from sst_proyecto import retencion
+
+        if connection.vendor != "postgresql":
+            raise CommandError("El particionado nativo solo está disponible en PostgreSQL.")
+
+        tabla = RegistroAcceso._meta.db_table
+        if options["convertir"]:
+            if retencion.es_particionada(tabla):
+                self.stdout.write(f"{tabla} ya está particionada.")
+                return
+            try:
+                if options["sql"]:
+                    for sql in retencion.sql_convertir_a_particionada(
+                        RegistroAcceso, CAMPO_PARTICION, options["meses"]
+                    ):
+                        self.stdout.write(f"{sql};")
+                    return
+                retencion.convertir_a_particionada(RegistroAcceso, CAMPO_PARTICION, options["meses"])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"{tabla} convertida a tabla particionada por mes."))
+            return
+
+        if not retencion.es_particionada(tabla):
+            raise CommandError(f"{tabla} no está particionada; ejecute primero con --convertir.")
+        creadas = retencion.crear_particiones_futuras(RegistroAcceso, options["meses"])
+        self.stdout.write(self.style.SUCCESS(f"Particiones aseguradas: {', '.join(creadas)}"))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("control_acceso", "0010_remove_gps"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventoOcupacion",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("tipo", models.CharField(choices=[("INGRESO", "Ingreso"), ("EGRESO", "Egreso")], max_length=10)),
+                ("fecha", models.DateTimeField(auto_now_add=True, db_index=True)),
+                (
+                    "registro",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="eventos_ocupacion",
+                        to="control_acceso.registroacceso",
+                    ),
+                ),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Evento de ocupación",
+                "verbose_name_plural": "Eventos de ocupación",
+                "ordering": ["id"],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0011_evento_ocupacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventoocupacion',
+            name='registro',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='eventos_ocupacion', to='control_acceso.registroacceso'),
+        ),
+    ]
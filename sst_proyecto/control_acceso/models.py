@@ -34,6 +34,39 @@ class RegistroAcceso(models.Model):
         return f"{self.usuario} - {self.tipo} - {self.fecha_hora_ingreso}"
 
 
+class EventoOcupacion(models.Model):
+    """
+    Bitácora append-only de entradas y salidas del centro. Su id es el número de
+    secuencia del feed de ocupación (personas_en_centro?since=<seq>): el cliente
+    toma una foto completa una vez y después solo pide los eventos posteriores.
+    Se escribe desde las señales de RegistroAcceso y se depura a diario.
+
+    `registro` no lleva restricción de clave foránea en la BD: RegistroAcceso
+    puede convertirse en tabla particionada (particionar_accesos --convertir),
+    cuya PK (id, fecha_hora_ingreso) no admite FKs que apunten solo al id.
+    """
+
+    TIPOS = [
+        ("INGRESO", "Ingreso"),
+        ("EGRESO", "Egreso"),
+    ]
+
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    registro = models.ForeignKey(
+        RegistroAcceso, on_delete=models.CASCADE, db_constraint=False, related_name="eventos_ocupacion"
+    )
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name="+")
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Evento de ocupación"
+        verbose_name_plural = "Eventos de ocupación"
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"#{self.id} {self.tipo} {self.usuario_id}"
+
+
 class ConfiguracionAforo(models.Model):
     aforo_maximo = models.IntegerField(default=2000)
     aforo_minimo = models.IntegerField(default=1800)
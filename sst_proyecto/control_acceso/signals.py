@@ -1,9 +1,34 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .utils import invalidar_cache_acceso
+from .utils import invalidar_cache_acceso, marcar_cambio_accesos, registrar_evento_ocupacion
 
 
 @receiver(post_save, sender="control_acceso.RegistroAcceso")
 def invalidar_cache_al_registrar_acceso(sender, instance, **kwargs):
-    """Cuando se registra un ingreso o egreso, invalida el caché de aforo y estadísticas."""
+    """
+    Cuando se registra un ingreso o egreso, invalida el caché de aforo y estadísticas
+    y publica el nuevo aforo a las páginas suscritas al canal en tiempo real.
+    """
+    from usuarios.tiempo_real import publicar_aforo
+
     invalidar_cache_acceso()
+    transaction.on_commit(marcar_cambio_accesos)
+    transaction.on_commit(publicar_aforo)
+
+
+@receiver(post_save, sender="control_acceso.RegistroAcceso")
+def registrar_evento_ocupacion_al_guardar(sender, instance, created, **kwargs):
+    """
+    Alimenta el log de ocupación (EventoOcupacion) desde todos los caminos de
+    ingreso y egreso. Se escribe al confirmar la transacción, así un acceso
+    revertido no deja evento. El orden de los ids lo garantiza
+    registrar_evento_ocupacion().
+    """
+    if created and instance.tipo == "INGRESO" and instance.fecha_hora_egreso is None:
+        tipo = "INGRESO"
+    elif not created and instance.fecha_hora_egreso is not None:
+        tipo = "EGRESO"
+    else:
+        return
+    transaction.on_commit(lambda: registrar_evento_ocupacion(instance.pk, instance.usuario_id, tipo))
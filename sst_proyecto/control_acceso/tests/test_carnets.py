@@ -0,0 +1,76 @@
+"""
+Tests del render y la caché de carnets QR (control_acceso/carnets.py, comando generar_carnets).
+"""
+
+import io
+import zipfile
+
+import pytest
+from django.core.management import call_command
+from PIL import Image
+
+from control_acceso import carnets
+from usuarios.models import Usuario
+from usuarios.tests.factories import UsuarioFactory
+
+URL = "/api/acceso/registros/mi-qr-imagen/"
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Cuenta las llamadas a renderizar_carnet."""
+    llamadas = []
+    original = carnets.renderizar_carnet
+
+    def contar(campos):
+        llamadas.append(campos["nombre"])
+        return original(campos)
+
+    monkeypatch.setattr(carnets, "renderizar_carnet", contar)
+    return llamadas
+
+
+@pytest.mark.django_db
+def test_mi_qr_imagen_se_renderiza_una_vez_y_responde_etag(client_aprendiz, aprendiz, renders):
+    response = client_aprendiz.get(URL)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/png"
+    assert Image.open(io.BytesIO(response.content)).size[1] > 90
+
+    assert client_aprendiz.get(URL).content == response.content
+    assert client_aprendiz.get(URL, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+    assert len(renders) == 1
+
+    Usuario.objects.filter(pk=aprendiz.pk).update(ficha="9999999")
+    nuevo = client_aprendiz.get(URL)
+    assert nuevo["ETag"] != response["ETag"]
+    assert len(renders) == 2
+
+
+@pytest.mark.django_db
+def test_generar_carnets_de_una_ficha(tmp_path, renders):
+    usuarios = UsuarioFactory.create_batch(4, ficha="2758391")
+    UsuarioFactory(ficha="2758391", activo=False)
+    UsuarioFactory(ficha="1111111")
+    carnets.carnet_png(usuarios[0])  # ya en caché: no se vuelve a renderizar
+
+    salida_zip = tmp_path / "carnets.zip"
+    call_command(
+        "generar_carnets", "--ficha", "2758391", "--formato", "zip", "--salida", str(salida_zip), "--procesos", "1"
+    )
+    with zipfile.ZipFile(salida_zip) as archivo:
+        assert sorted(archivo.namelist()) == sorted(carnets.nombre_archivo(u) for u in usuarios)
+    assert len(renders) == 4
+
+    salida_pdf = tmp_path / "carnets.pdf"
+    call_command("generar_carnets", "--ficha", "2758391", "--salida", str(salida_pdf), "--procesos", "1")
+    assert salida_pdf.read_bytes().startswith(b"%PDF")
+    assert len(renders) == 4  # el PDF reutiliza los PNG cacheados
+
+
+@pytest.mark.django_db
+def test_renderizar_lote_en_pool_de_procesos():
+    usuarios = UsuarioFactory.create_batch(3, ficha="2758391")
+    resultado = carnets.renderizar_lote(usuarios, procesos=2)
+    assert [u for u, _ in resultado] == usuarios
+    assert all(png == carnets.carnet_png(u)[0] for u, png in resultado)
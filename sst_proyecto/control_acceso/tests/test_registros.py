@@ -190,3 +190,147 @@ def test_vigilancia_ve_todos_los_registros(client_vigilancia, aprendiz, instruct
     response = client_vigilancia.get("/api/acceso/registros/")
     assert response.status_code == 200
     assert response.json()["count"] == 2
+
+
+# ---------------------------------------------------------------------------
+# registros_recientes
+# ---------------------------------------------------------------------------
+
+RECIENTES_URL = "/api/acceso/registros/registros_recientes/"
+
+
+def _registro(usuario, minutos_atras, egreso=False):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    registro = RegistroAcceso.objects.create(usuario=usuario, tipo="INGRESO")
+    cambios = {"fecha_hora_ingreso": timezone.now() - timedelta(minutes=minutos_atras)}
+    if egreso:
+        cambios.update(fecha_hora_egreso=timezone.now(), metodo_egreso="QR")
+    RegistroAcceso.objects.filter(pk=registro.pk).update(**cambios)
+    return registro
+
+
+@pytest.mark.django_db
+def test_registros_recientes_ultimo_por_usuario_en_bd(client_vigilancia, aprendiz, instructor):
+    _registro(aprendiz, 120, egreso=True)
+    ultimo_aprendiz = _registro(aprendiz, 5)
+    ultimo_instructor = _registro(instructor, 30, egreso=True)
+
+    response = client_vigilancia.get(RECIENTES_URL)
+    assert response.status_code == 200
+    assert [r["id"] for r in response.data] == [ultimo_aprendiz.id, ultimo_instructor.id]
+    assert response.data[0]["estado"] == "DENTRO"
+    assert response.data[1]["metodo_egreso"] == "Código QR"
+    assert response.data[0]["usuario"]["documento"] == aprendiz.numero_documento
+
+
+@pytest.mark.django_db
+def test_registros_recientes_pagina_por_cursor(client_vigilancia):
+    from usuarios.tests.factories import UsuarioFactory
+
+    registros = [_registro(UsuarioFactory(), minutos) for minutos in range(5)]
+
+    primera = client_vigilancia.get(RECIENTES_URL, {"limite": 3})
+    assert [r["id"] for r in primera.data] == [r.id for r in registros[:3]]
+    cursor = primera["X-Cursor-Siguiente"]
+
+    segunda = client_vigilancia.get(RECIENTES_URL, {"limite": 3, "despues": cursor})
+    assert [r["id"] for r in segunda.data] == [r.id for r in registros[3:]]
+    assert "X-Cursor-Siguiente" not in segunda
+
+
+@pytest.mark.django_db
+def test_registros_recientes_etag_304_hasta_nuevo_registro(
+    client_vigilancia, aprendiz, instructor, django_capture_on_commit_callbacks
+):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    _registro(aprendiz, 10)
+    primera = client_vigilancia.get(RECIENTES_URL)
+    etag = primera["ETag"]
+
+    with CaptureQueriesContext(connection) as consultas:
+        repetida = client_vigilancia.get(RECIENTES_URL, HTTP_IF_NONE_MATCH=etag)
+    assert repetida.status_code == 304
+    assert not any("control_acceso_registroacceso" in q["sql"] for q in consultas)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        _registro(instructor, 1)
+    cambiada = client_vigilancia.get(RECIENTES_URL, HTTP_IF_NONE_MATCH=etag)
+    assert cambiada.status_code == 200
+    assert len(cambiada.data) == 2
+
+
+# ---------------------------------------------------------------------------
+# personas_en_centro — foto + delta
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_personas_en_centro_foto_y_delta(client_vigilancia, aprendiz, instructor, django_capture_on_commit_callbacks):
+    from django.utils import timezone
+
+    with django_capture_on_commit_callbacks(execute=True):
+        registro_aprendiz = RegistroAcceso.objects.create(usuario=aprendiz, tipo="INGRESO")
+
+    foto = client_vigilancia.get(PERSONAS_URL).data
+    assert foto["total"] == 1
+    assert [p["id"] for p in foto["personas"]] == [aprendiz.id]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        RegistroAcceso.objects.create(usuario=instructor, tipo="INGRESO")
+        registro_aprendiz.fecha_hora_egreso = timezone.now()
+        registro_aprendiz.save()
+        registro_aprendiz.save()  # guardar de nuevo no duplica el egreso
+
+    delta = client_vigilancia.get(PERSONAS_URL, {"since": foto["seq"], "fecha": foto["fecha"]}).data
+    assert delta["resync"] is False
+    assert [(e["tipo"], e["usuario_id"]) for e in delta["eventos"]] == [
+        ("INGRESO", instructor.id),
+        ("EGRESO", aprendiz.id),
+    ]
+    assert delta["eventos"][0]["persona"]["rol_code"] == instructor.rol
+
+    vacio = client_vigilancia.get(PERSONAS_URL, {"since": delta["seq"], "fecha": delta["fecha"]}).data
+    assert (vacio["seq"], vacio["eventos"]) == (delta["seq"], [])
+
+
+@pytest.mark.django_db
+def test_personas_en_centro_pide_resync_si_el_cliente_quedo_atras(
+    client_vigilancia, settings, django_capture_on_commit_callbacks
+):
+    from usuarios.tests.factories import UsuarioFactory
+
+    settings.OCUPACION_DELTA_MAX_EVENTOS = 2
+    foto = client_vigilancia.get(PERSONAS_URL).data
+    with django_capture_on_commit_callbacks(execute=True):
+        for usuario in UsuarioFactory.create_batch(3):
+            RegistroAcceso.objects.create(usuario=usuario, tipo="INGRESO")
+
+    atrasado = client_vigilancia.get(PERSONAS_URL, {"since": foto["seq"], "fecha": foto["fecha"]}).data
+    assert atrasado["resync"] is True
+    assert atrasado["total"] == 3
+
+    otro_dia = client_vigilancia.get(PERSONAS_URL, {"since": atrasado["seq"], "fecha": "2000-01-01"}).data
+    assert otro_dia["resync"] is True
+
+    assert client_vigilancia.get(PERSONAS_URL, {"since": "x"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_registros_recientes_sin_fecha_solo_busca_en_los_ultimos_dias(
+    client_vigilancia, aprendiz, instructor, settings
+):
+    from django.utils import timezone
+
+    settings.ACCESOS_RECIENTES_DIAS = 2
+    _registro(aprendiz, 60)
+    antiguo = _registro(instructor, 60 * 24 * 10)
+
+    assert [r["usuario"]["id"] for r in client_vigilancia.get(RECIENTES_URL).data] == [aprendiz.id]
+    fecha = timezone.localtime(RegistroAcceso.objects.get(pk=antiguo.pk).fecha_hora_ingreso).date()
+    por_fecha = client_vigilancia.get(RECIENTES_URL, {"fecha": fecha.isoformat()}).data
+    assert [r["id"] for r in por_fecha] == [antiguo.id]
@@ -149,3 +149,201 @@ def obtener_estadisticas_hoy():
 def invalidar_cache_acceso():
     """Limpia las claves de caché relacionadas con acceso. Llamar tras registrar ingreso/egreso."""
     cache.delete_many(["aforo_actual", "estadisticas_hoy"])
+
+
+# ─── Versión de los registros de acceso (ETag de listados) ───────────────────
+
+_CLAVE_VERSION_ACCESOS = "accesos:version"
+
+
+def version_accesos():
+    """Marca opaca que cambia con cada ingreso/egreso; base de los ETag de listados de acceso."""
+    import uuid
+
+    version = cache.get(_CLAVE_VERSION_ACCESOS)
+    if version is None:
+        cache.add(_CLAVE_VERSION_ACCESOS, uuid.uuid4().hex, None)
+        version = cache.get(_CLAVE_VERSION_ACCESOS)
+    return version
+
+
+def marcar_cambio_accesos():
+    """Invalida los ETag emitidos (llamar al confirmarse el cambio de un RegistroAcceso)."""
+    import uuid
+
+    cache.set(_CLAVE_VERSION_ACCESOS, uuid.uuid4().hex, None)
+
+
+def ultimos_por_usuario(registros):
+    """
+    Restringe `registros` al más reciente de cada usuario, en la BD:
+    DISTINCT ON (usuario_id) en PostgreSQL, ROW_NUMBER() OVER (PARTITION BY usuario_id)
+    en los demás motores. Los filtros ya aplicados a `registros` se respetan (el
+    más reciente se elige entre las filas filtradas). Retorna un queryset del modelo
+    sin orden, listo para ordenar/paginar.
+    """
+    from django.db import connections
+    from django.db.models import F, Window
+    from django.db.models.functions import RowNumber
+
+    from .models import RegistroAcceso
+
+    if connections[registros.db].vendor == "postgresql":
+        ids = registros.order_by("usuario_id", "-fecha_hora_ingreso", "-id").distinct("usuario_id").values("id")
+    else:
+        ids = (
+            registros.order_by()
+            .annotate(
+                posicion=Window(
+                    RowNumber(),
+                    partition_by=[F("usuario_id")],
+                    order_by=[F("fecha_hora_ingreso").desc(), F("id").desc()],
+                )
+            )
+            .filter(posicion=1)
+            .values("id")
+        )
+    return RegistroAcceso.objects.filter(id__in=ids)
+
+
+# ─── Feed de ocupación (foto + eventos) ──────────────────────────────────────
+#
+# personas_en_centro entrega una foto de quién está dentro junto con el número
+# de secuencia (id del último EventoOcupacion). Después el cliente pide
+# ?since=<seq> y recibe solo los ingresos/egresos posteriores. Si quedó muy
+# atrás (más de OCUPACION_DELTA_MAX_EVENTOS, log depurado o cambio de día) la
+# respuesta trae "resync": true y una foto nueva en lugar del delta.
+
+_CANDADO_OCUPACION = "control_acceso:eventos_ocupacion"
+
+_CAMPOS_PERSONA = (
+    "usuario_id",
+    "usuario__first_name",
+    "usuario__last_name",
+    "usuario__username",
+    "usuario__rol",
+    "usuario__ficha",
+    "usuario__programa_formacion",
+)
+
+
+def registrar_evento_ocupacion(registro_id, usuario_id, tipo):
+    """
+    Agrega un evento al log (idempotente para EGRESO: uno por registro).
+
+    PostgreSQL asigna el id de la secuencia antes de confirmar: sin más, un id
+    menor podría confirmarse después de que un cliente leyera uno mayor como
+    "seq" y ese evento no le llegaría nunca. Por eso la inserción se hace con
+    un candado de transacción: los ids quedan visibles en orden.
+    """
+    from django.db import connection, transaction
+
+    from .models import EventoOcupacion
+
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [_CANDADO_OCUPACION])
+        if tipo == "EGRESO" and EventoOcupacion.objects.filter(registro_id=registro_id, tipo="EGRESO").exists():
+            return None
+        return EventoOcupacion.objects.create(registro_id=registro_id, usuario_id=usuario_id, tipo=tipo)
+
+
+def _persona(fila, hora, metodo):
+    from usuarios.models import Usuario
+
+    from .models import RegistroAcceso
+
+    nombre = f"{fila['usuario__first_name']} {fila['usuario__last_name']}".strip()
+    return {
+        "id": fila["usuario_id"],
+        "nombre": nombre or fila["usuario__username"],
+        "rol": dict(Usuario.ROLES).get(fila["usuario__rol"], fila["usuario__rol"]),
+        "rol_code": fila["usuario__rol"],
+        "ficha": fila["usuario__ficha"] or "",
+        "programa_formacion": fila["usuario__programa_formacion"] or "",
+        "hora_ingreso": hora.strftime("%H:%M"),
+        "metodo": dict(RegistroAcceso.METODO_DETECCION).get(metodo, metodo),
+    }
+
+
+def _filtrar_personas(qs, ficha="", programa=""):
+    from sst_proyecto import busqueda
+
+    if ficha:
+        qs = busqueda.filtrar(qs, "usuarios", ficha, ruta="usuario", campos=["ficha"])
+    if programa:
+        qs = busqueda.filtrar(qs, "usuarios", programa, ruta="usuario", campos=["programa_formacion"])
+    return qs
+
+
+def foto_ocupacion(ficha="", programa=""):
+    """Personas dentro del centro hoy, con el número de secuencia del log."""
+    from django.db.models import Max
+    from django.utils import timezone
+
+    from .models import EventoOcupacion, RegistroAcceso
+
+    # La secuencia se lee antes que la foto: un evento concurrente llega
+    # repetido en el siguiente delta (aplicarlo es idempotente), nunca se pierde.
+    seq = EventoOcupacion.objects.aggregate(seq=Max("id"))["seq"] or 0
+    hoy = timezone.localdate()
+    filas = _filtrar_personas(
+        RegistroAcceso.objects.filter(tipo="INGRESO", fecha_hora_egreso__isnull=True, fecha_hora_ingreso__date=hoy),
+        ficha,
+        programa,
+    ).values("fecha_hora_ingreso", "metodo_ingreso", *_CAMPOS_PERSONA)
+    personas = [_persona(f, f["fecha_hora_ingreso"], f["metodo_ingreso"]) for f in filas]
+    return {"seq": seq, "fecha": hoy.isoformat(), "total": len(personas), "personas": personas}
+
+
+def delta_ocupacion(since, fecha=None, ficha="", programa=""):
+    """
+    Eventos posteriores a `since`, o una foto nueva con "resync": true si el
+    cliente no puede ponerse al día con el log (ver comentario de la sección).
+    """
+    from django.conf import settings
+    from django.db.models import Max, Min
+    from django.utils import timezone
+
+    from .models import EventoOcupacion
+
+    hoy = timezone.localdate()
+    limites = EventoOcupacion.objects.aggregate(primero=Min("id"), ultimo=Max("id"))
+    primero, ultimo = limites["primero"] or 0, limites["ultimo"] or 0
+    maximo = getattr(settings, "OCUPACION_DELTA_MAX_EVENTOS", 500)
+
+    atrasado = (
+        since > ultimo
+        or ultimo - since > maximo
+        or (primero and since < primero - 1)
+        or (fecha is not None and fecha != hoy.isoformat())
+    )
+    if atrasado:
+        return {"resync": True, **foto_ocupacion(ficha, programa)}
+
+    eventos = _filtrar_personas(
+        EventoOcupacion.objects.filter(id__gt=since, id__lte=ultimo).order_by("id"), ficha, programa
+    ).values("id", "tipo", "registro__fecha_hora_ingreso", "registro__metodo_ingreso", *_CAMPOS_PERSONA)
+
+    resultado = []
+    for ev in eventos:
+        item = {"seq": ev["id"], "tipo": ev["tipo"], "usuario_id": ev["usuario_id"]}
+        if ev["tipo"] == "INGRESO":
+            item["persona"] = _persona(ev, ev["registro__fecha_hora_ingreso"], ev["registro__metodo_ingreso"])
+        resultado.append(item)
+    return {"resync": False, "seq": ultimo, "fecha": hoy.isoformat(), "eventos": resultado}
+
+
+def depurar_eventos_ocupacion(dias=None):
+    """Elimina eventos del log más antiguos que OCUPACION_EVENTOS_DIAS. Retorna cuántos."""
+    from datetime import timedelta
+
+    from django.conf import settings
+    from django.utils import timezone
+
+    from .models import EventoOcupacion
+
+    dias = dias if dias is not None else getattr(settings, "OCUPACION_EVENTOS_DIAS", 2)
+    borrados, _ = EventoOcupacion.objects.filter(fecha__lt=timezone.now() - timedelta(days=dias)).delete()
+    return borrados
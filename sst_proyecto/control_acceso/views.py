@@ -1,7 +1,4 @@
-import io
-
-import qrcode
-from PIL import Image, ImageDraw, ImageFont
+import hashlib
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -25,6 +22,7 @@ from .utils import (
     validar_token_qr,
 )
 from usuarios.models import Usuario
+from sst_proyecto import busqueda
 from usuarios.permissions import EsVigilanciaOAdministrativo
 
 # Servicio centralizado de notificaciones
@@ -212,10 +210,21 @@ class RegistroAccesoViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def registros_recientes(self, request):
         """
-        Obtiene los registros más recientes.
+        Obtiene el registro más reciente de cada usuario, del más nuevo al más antiguo.
         Solo accesible por roles privilegiados (VIGILANCIA, ADMINISTRATIVO, INSTRUCTOR).
-        Soporta filtros: ?limite=, ?ficha=, ?programa=, ?rol=, ?estado=dentro|fuera
+        Soporta filtros: ?limite=, ?fecha=YYYY-MM-DD, ?ficha=, ?programa=
+        Sin ?fecha= solo considera los últimos ACCESOS_RECIENTES_DIAS días (hoy incluido).
+        Paginación por cursor: ?despues=<cursor>; el cursor de la página siguiente
+        llega en la cabecera X-Cursor-Siguiente (y en Link rel="next").
+        Responde con ETag: si nada cambió desde la última consulta (If-None-Match),
+        retorna 304 sin consultar los registros.
         """
+        from django.utils.cache import get_conditional_response, patch_cache_control
+
+        from sst_proyecto.paginacion import PaginadorKeyset
+
+        from .utils import ultimos_por_usuario, version_accesos
+
         ROLES_PRIVILEGIADOS = {"VIGILANCIA", "ADMINISTRATIVO", "COORDINADOR_SST", "INSTRUCTOR"}
         if not request.user.is_superuser and request.user.rol not in ROLES_PRIVILEGIADOS:
             return Response(
@@ -223,53 +232,95 @@ class RegistroAccesoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        limite = int(request.query_params.get("limite", 200))
-        ficha = request.query_params.get("ficha", "").strip()
-        programa = request.query_params.get("programa", "").strip()
         fecha = request.query_params.get("fecha", "").strip()  # YYYY-MM-DD
+        desde = None
+        if not fecha:
+            from datetime import datetime, timedelta
 
-        qs = RegistroAcceso.objects.select_related("usuario").all().order_by("-fecha_hora_ingreso")
+            from django.conf import settings
+
+            dias = getattr(settings, "ACCESOS_RECIENTES_DIAS", 7)
+            inicio = timezone.localdate() - timedelta(days=dias - 1)
+            desde = timezone.make_aware(datetime.combine(inicio, datetime.min.time()))
+
+        # La ventana entra en el ETag: al cambiar de día cambia el resultado aunque no haya accesos nuevos
+        clave = f"{version_accesos()}|{desde}|{request.get_full_path()}"
+        etag = '"rr-%s"' % hashlib.sha1(clave.encode()).hexdigest()[:20]
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            patch_cache_control(no_modificado, private=True, no_cache=True)
+            return no_modificado
+
+        try:
+            limite = min(max(int(request.query_params.get("limite", 200)), 1), 500)
+        except ValueError:
+            limite = 200
+        ficha = request.query_params.get("ficha", "").strip()
+        programa = request.query_params.get("programa", "").strip()
 
+        qs = RegistroAcceso.objects.all()
         if fecha:
             qs = qs.filter(fecha_hora_ingreso__date=fecha)
+        else:
+            # Acota la deduplicación por usuario: sin ventana recorrería todo el historial
+            qs = qs.filter(fecha_hora_ingreso__gte=desde)
         if ficha:
-            qs = qs.filter(usuario__ficha__icontains=ficha)
+            qs = busqueda.filtrar(qs, "usuarios", ficha, ruta="usuario", campos=["ficha"])
         if programa:
-            qs = qs.filter(usuario__programa_formacion__icontains=programa)
-
-        # Mostrar solo el registro más reciente por usuario (el más reciente es el primero por el order_by)
-        vistos = set()
-        registros_unicos = []
-        for reg in qs[: limite * 5]:  # margen extra para cubrir duplicados
-            if reg.usuario_id not in vistos:
-                vistos.add(reg.usuario_id)
-                registros_unicos.append(reg)
-            if len(registros_unicos) >= limite:
-                break
-        registros = registros_unicos
-
-        data = []
-        for registro in registros:
-            data.append(
-                {
-                    "id": registro.id,
-                    "usuario": {
-                        "id": registro.usuario.id,
-                        "nombre": registro.usuario.get_full_name(),
-                        "documento": registro.usuario.numero_documento,
-                        "rol": registro.usuario.get_rol_display(),
-                        "ficha": registro.usuario.ficha or "",
-                        "programa_formacion": registro.usuario.programa_formacion or "",
-                    },
-                    "fecha_hora_ingreso": registro.fecha_hora_ingreso,
-                    "fecha_hora_egreso": registro.fecha_hora_egreso,
-                    "metodo_ingreso": registro.get_metodo_ingreso_display(),
-                    "metodo_egreso": registro.get_metodo_egreso_display() if registro.metodo_egreso else None,
-                    "estado": "DENTRO" if not registro.fecha_hora_egreso else "SALIO",
-                }
-            )
+            qs = busqueda.filtrar(qs, "usuarios", programa, ruta="usuario", campos=["programa_formacion"])
+
+        # Último registro por usuario resuelto en la BD; proyección con values() (sin instancias)
+        filas = ultimos_por_usuario(qs).values(
+            "id",
+            "fecha_hora_ingreso",
+            "fecha_hora_egreso",
+            "metodo_ingreso",
+            "metodo_egreso",
+            "usuario_id",
+            "usuario__first_name",
+            "usuario__last_name",
+            "usuario__numero_documento",
+            "usuario__rol",
+            "usuario__ficha",
+            "usuario__programa_formacion",
+        )
+        pagina = PaginadorKeyset(filas, limite, campos=("fecha_hora_ingreso", "id")).pagina(
+            despues=request.query_params.get("despues")
+        )
 
-        return Response(data)
+        roles = dict(Usuario.ROLES)
+        metodos = dict(RegistroAcceso.METODO_DETECCION)
+        data = [
+            {
+                "id": fila["id"],
+                "usuario": {
+                    "id": fila["usuario_id"],
+                    "nombre": f"{fila['usuario__first_name']} {fila['usuario__last_name']}".strip(),
+                    "documento": fila["usuario__numero_documento"],
+                    "rol": roles.get(fila["usuario__rol"], fila["usuario__rol"]),
+                    "ficha": fila["usuario__ficha"] or "",
+                    "programa_formacion": fila["usuario__programa_formacion"] or "",
+                },
+                "fecha_hora_ingreso": fila["fecha_hora_ingreso"],
+                "fecha_hora_egreso": fila["fecha_hora_egreso"],
+                "metodo_ingreso": metodos.get(fila["metodo_ingreso"], fila["metodo_ingreso"]),
+                "metodo_egreso": metodos.get(fila["metodo_egreso"], fila["metodo_egreso"])
+                if fila["metodo_egreso"]
+                else None,
+                "estado": "DENTRO" if not fila["fecha_hora_egreso"] else "SALIO",
+            }
+            for fila in pagina
+        ]
+
+        response = Response(data)
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        if pagina.has_next():
+            params = request.query_params.copy()
+            params["despues"] = pagina.cursor_siguiente
+            response["X-Cursor-Siguiente"] = pagina.cursor_siguiente
+            response["Link"] = f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+        return response
 
     @action(detail=False, methods=["get"])
     def personas_en_centro(self, request):
@@ -278,36 +329,25 @@ class RegistroAccesoViewSet(viewsets.ModelViewSet):
         Usado para el monitoreo en tiempo real.
         Accesible por VIGILANCIA y ADMINISTRATIVO.
         Soporta filtros: ?ficha=, ?programa=
+
+        Feed versionado: la respuesta completa trae "seq" y "fecha"; después basta
+        pedir ?since=<seq>&fecha=<fecha> para recibir solo los eventos de ingreso/egreso
+        posteriores ({"resync": false, "seq", "eventos": [...]}). Si el cliente quedó
+        demasiado atrás la respuesta trae "resync": true y la foto completa.
         """
-        hoy = timezone.now().date()
+        from .utils import delta_ocupacion, foto_ocupacion
+
         ficha = request.query_params.get("ficha", "").strip()
         programa = request.query_params.get("programa", "").strip()
+        since = request.query_params.get("since")
 
-        registros_activos = RegistroAcceso.objects.filter(
-            tipo="INGRESO", fecha_hora_egreso__isnull=True, fecha_hora_ingreso__date=hoy
-        ).select_related("usuario")
-
-        if ficha:
-            registros_activos = registros_activos.filter(usuario__ficha__icontains=ficha)
-        if programa:
-            registros_activos = registros_activos.filter(usuario__programa_formacion__icontains=programa)
-
-        personas = []
-        for registro in registros_activos:
-            personas.append(
-                {
-                    "id": registro.usuario.id,
-                    "nombre": registro.usuario.get_full_name() or registro.usuario.username,
-                    "rol": registro.usuario.get_rol_display(),
-                    "rol_code": registro.usuario.rol,
-                    "ficha": registro.usuario.ficha or "",
-                    "programa_formacion": registro.usuario.programa_formacion or "",
-                    "hora_ingreso": registro.fecha_hora_ingreso.strftime("%H:%M"),
-                    "metodo": registro.get_metodo_ingreso_display(),
-                }
-            )
-
-        return Response({"total": len(personas), "personas": personas})
+        if since is None:
+            return Response(foto_ocupacion(ficha, programa))
+        try:
+            since = int(since)
+        except ValueError:
+            return Response({"error": "since debe ser un entero"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(delta_ocupacion(since, request.query_params.get("fecha"), ficha, programa))
 
     @action(detail=False, methods=["post"], url_path="registrar_asistencia_manual")
     def registrar_asistencia_manual(self, request):
@@ -455,25 +495,58 @@ class RegistroAccesoViewSet(viewsets.ModelViewSet):
         """
         Busca un usuario por número de documento.
         GET /api/acceso/registros/buscar_usuario/?documento=<numero>
+        GET /api/acceso/registros/buscar_usuario/?q=<documento, nombre o ficha>
+        Con ?documento= busca la coincidencia exacta; si no existe, el 404 incluye
+        "sugerencias": usuarios cuyo documento contiene lo digitado, primero los que
+        empiezan por ello.
+        Con ?q= devuelve una lista ordenada por relevancia: nombres y programa por
+        prefijo, documento y ficha por subcadena (un prefijo del documento puntúa más).
         Accesible por VIGILANCIA, ADMINISTRATIVO e INSTRUCTOR.
         """
+        activos = Usuario.objects.filter(activo=True)
+        q = request.query_params.get("q", "").strip()
+        if q:
+            return Response(
+                {"resultados": [self._datos_usuario(u) for u in busqueda.buscar("usuarios", q, activos, 10)]}
+            )
+
         documento = request.query_params.get("documento", "").strip()
         if not documento:
             return Response({"error": "Se requiere el parámetro documento"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            usuario = Usuario.objects.get(numero_documento=documento, activo=True)
+            usuario = activos.get(numero_documento=documento)
         except Usuario.DoesNotExist:
-            return Response({"error": "No se encontró un usuario con ese documento"}, status=status.HTTP_404_NOT_FOUND)
-        return Response(
-            {
-                "id": usuario.id,
-                "nombre": usuario.get_full_name() or usuario.username,
-                "rol": usuario.get_rol_display(),
-                "rol_code": usuario.rol,
-                "ficha": usuario.ficha or "",
-                "programa": usuario.programa_formacion or "",
-            }
-        )
+            sugerencias = []
+            if len(documento) >= 3:
+                from django.db.models import Case, IntegerField, Value, When
+
+                candidatos = busqueda.filtrar(activos, "usuarios", documento, campos=["numero_documento"]).annotate(
+                    es_prefijo=Case(
+                        When(numero_documento__startswith=documento, then=Value(1)),
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    )
+                )
+                sugerencias = [
+                    self._datos_usuario(u) for u in candidatos.order_by("-es_prefijo", "numero_documento")[:5]
+                ]
+            return Response(
+                {"error": "No se encontró un usuario con ese documento", "sugerencias": sugerencias},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(self._datos_usuario(usuario))
+
+    @staticmethod
+    def _datos_usuario(usuario):
+        return {
+            "id": usuario.id,
+            "nombre": usuario.get_full_name() or usuario.username,
+            "documento": usuario.numero_documento,
+            "rol": usuario.get_rol_display(),
+            "rol_code": usuario.rol,
+            "ficha": usuario.ficha or "",
+            "programa": usuario.programa_formacion or "",
+        }
 
     @extend_schema(
         summary="Token QR del usuario autenticado",
@@ -503,84 +576,24 @@ class RegistroAccesoViewSet(viewsets.ModelViewSet):
         """
         Devuelve el QR del usuario como imagen PNG descargable.
         GET /api/acceso/registros/mi-qr-imagen/
+        El PNG se genera una vez por versión de los datos del carnet (control_acceso/carnets.py).
         """
-        user = request.user
-        token = generar_token_qr(user.id)
-
-        # Generar QR
-        qr = qrcode.QRCode(
-            version=3,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(token)
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
-
-        # Agregar banda inferior con nombre y datos
-        qr_w, qr_h = qr_img.size
-        banda_h = 90
-        final_img = Image.new("RGB", (qr_w, qr_h + banda_h), "#ffffff")
-        final_img.paste(qr_img, (0, 0))
-
-        draw = ImageDraw.Draw(final_img)
-
-        # Buscar fuente disponible en Windows; caer en la fuente bitmap si no hay ninguna
-        font_name = None
-        font_data = None
-        for ruta in [
-            "C:/Windows/Fonts/arial.ttf",
-            "C:/Windows/Fonts/calibri.ttf",
-            "C:/Windows/Fonts/segoeui.ttf",
-        ]:
-            try:
-                font_name = ImageFont.truetype(ruta, 17)
-                font_data = ImageFont.truetype(ruta, 13)
-                break
-            except OSError:
-                continue
-        if font_name is None:
-            font_name = ImageFont.load_default()
-            font_data = font_name
-
-        def texto_centrado(draw, y, texto, font, fill):
-            """Dibuja texto centrado horizontalmente sin usar anchor."""
-            try:
-                bbox = draw.textbbox((0, 0), texto, font=font)
-                tw = bbox[2] - bbox[0]
-            except AttributeError:
-                tw = len(texto) * 7  # estimación para fuente bitmap
-            x = max(0, (qr_w - tw) // 2)
-            draw.text((x, y), texto, font=font, fill=fill)
-
-        nombre = user.get_full_name() or user.username
-        texto_centrado(draw, qr_h + 10, nombre, font_name, "#1a1a1a")
-
-        linea2_parts = []
-        if user.rol:
-            linea2_parts.append(user.get_rol_display())
-        if user.ficha:
-            linea2_parts.append(f"Ficha: {user.ficha}")
-        if linea2_parts:
-            texto_centrado(draw, qr_h + 34, " · ".join(linea2_parts), font_data, "#555555")
-
-        linea3_parts = []
-        if user.numero_documento:
-            linea3_parts.append(f"Doc: {user.numero_documento}")
-        if user.programa_formacion:
-            linea3_parts.append(user.programa_formacion[:30])
-        if linea3_parts:
-            texto_centrado(draw, qr_h + 56, " · ".join(linea3_parts), font_data, "#888888")
-
-        # Serializar a PNG
-        buffer = io.BytesIO()
-        final_img.save(buffer, format="PNG", optimize=True)
-        buffer.seek(0)
-
-        nombre_archivo = f"QR_{user.username}_SST.png"
-        response = HttpResponse(buffer, content_type="image/png")
-        response["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+        from django.utils.cache import get_conditional_response, patch_cache_control
+
+        from .carnets import carnet_png, nombre_archivo
+
+        # request.user puede venir de la caché de autenticación: el carnet se arma con los datos vigentes
+        request.user.refresh_from_db()
+        png, huella = carnet_png(request.user)
+        etag = f'"{huella}"'
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            return no_modificado
+
+        response = HttpResponse(png, content_type="image/png")
+        response["Content-Disposition"] = f'attachment; filename="{nombre_archivo(request.user)}"'
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
         return response
 
     @action(detail=False, methods=["post"], url_path="escanear-qr")
@@ -11,3 +11,5 @@ class EmergenciasConfig(AppConfig):
 
         auditlog.register(Emergencia)
         auditlog.register(BrigadaEmergencia)
+
+        import emergencias.signals  # noqa: F401
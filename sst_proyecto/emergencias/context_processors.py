@@ -1,17 +1,15 @@
-from .models import Emergencia
+from .utils import hay_emergencia_masiva_activa
 
 
 def emergencia_masiva_activa(request):
     """
     Indica si hay una emergencia masiva activa en este momento.
     Disponible en todos los templates como {{ hay_emergencia_masiva }}.
+
+    La bandera vive en caché y la mantienen las señales de Emergencia
+    (ver emergencias/signals.py), así que renderizar una página no consulta la BD.
     """
     if not request.user.is_authenticated:
         return {"hay_emergencia_masiva": False}
 
-    activa = Emergencia.objects.filter(
-        tipo__alerta_masiva=True,
-        estado__in=["REPORTADA", "EN_ATENCION"],
-    ).exists()
-
-    return {"hay_emergencia_masiva": activa}
+    return {"hay_emergencia_masiva": hay_emergencia_masiva_activa()}
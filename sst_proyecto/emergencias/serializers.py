@@ -33,8 +33,22 @@ class EmergenciaSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class TipoEmergenciaActivoField(serializers.PrimaryKeyRelatedField):
+    # Resuelve el tipo desde el catálogo en memoria (emergencias/utils.py), sin consultar la BD
+    def to_internal_value(self, data):
+        from .utils import tipo_emergencia_activo
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        tipo = tipo_emergencia_activo(data)
+        if tipo is None:
+            self.fail("does_not_exist", pk_value=data)
+        return tipo
+
+
 class EmergenciaCreateSerializer(serializers.ModelSerializer):
     # Serializer para crear emergencias (desde app móvil y botón de pánico)
+    tipo = TipoEmergenciaActivoField(queryset=TipoEmergencia.objects.filter(activo=True))
     foto = serializers.ImageField(required=False, allow_null=True)
     latitud = serializers.FloatField(required=False, allow_null=True)
     longitud = serializers.FloatField(required=False, allow_null=True)
@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from usuarios.tiempo_real import publicar_cambio_emergencia
+
+from .utils import actualizar_emergencia_masiva_activa, marcar_cambio_tipos
+
+
+@receiver(post_save, sender="emergencias.Emergencia")
+@receiver(post_delete, sender="emergencias.Emergencia")
+@receiver(post_save, sender="emergencias.TipoEmergencia")
+def actualizar_bandera_emergencia_masiva(sender, instance, **kwargs):
+    """
+    Al crear, resolver o marcar como falsa alarma una emergencia (o cambiar el
+    flag alerta_masiva de un tipo) recalcula la bandera cacheada de emergencia masiva.
+    """
+    transaction.on_commit(actualizar_emergencia_masiva_activa)
+
+
+@receiver(post_save, sender="emergencias.TipoEmergencia")
+@receiver(post_delete, sender="emergencias.TipoEmergencia")
+def recargar_catalogo_tipos(sender, instance, **kwargs):
+    """Los procesos recargan su catálogo en memoria de tipos activos."""
+    transaction.on_commit(marcar_cambio_tipos)
+
+
+def _publicar_al_confirmar(emergencia, accion):
+    emergencia_id, estado = emergencia.pk, emergencia.estado
+    transaction.on_commit(lambda: publicar_cambio_emergencia(emergencia_id, estado, accion))
+
+
+@receiver(post_save, sender="emergencias.Emergencia")
+def publicar_emergencia_guardada(sender, instance, created, **kwargs):
+    """Avisa por el canal en tiempo real que la lista de emergencias cambió."""
+    _publicar_al_confirmar(instance, "creada" if created else "actualizada")
+
+
+@receiver(post_delete, sender="emergencias.Emergencia")
+def publicar_emergencia_eliminada(sender, instance, **kwargs):
+    _publicar_al_confirmar(instance, "eliminada")
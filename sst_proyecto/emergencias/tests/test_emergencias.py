@@ -125,3 +125,47 @@ def test_listar_tipos_emergencia(client_aprendiz, tipo_emergencia):
     response = client_aprendiz.get("/api/emergencias/tipos/")
     assert response.status_code == 200
     assert len(response.json()) >= 1
+
+
+# ---------------------------------------------------------------------------
+# Bandera cacheada de emergencia masiva (context processor)
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_context_processor_emergencia_masiva_sin_consultas(rf, aprendiz, django_assert_num_queries):
+    from emergencias.context_processors import emergencia_masiva_activa
+
+    request = rf.get("/")
+    request.user = aprendiz
+    assert emergencia_masiva_activa(request) == {"hay_emergencia_masiva": False}
+    with django_assert_num_queries(0):
+        assert emergencia_masiva_activa(request) == {"hay_emergencia_masiva": False}
+
+
+@pytest.mark.django_db
+def test_bandera_emergencia_masiva_sigue_transiciones(rf, aprendiz, django_capture_on_commit_callbacks):
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+    from emergencias.context_processors import emergencia_masiva_activa
+    from emergencias.tests.factories import TipoEmergenciaFactory
+    from emergencias.utils import GRUPO_EMERGENCIA_MASIVA
+
+    request = rf.get("/")
+    request.user = aprendiz
+    assert emergencia_masiva_activa(request)["hay_emergencia_masiva"] is False
+
+    layer = get_channel_layer()
+    canal = async_to_sync(layer.new_channel)()
+    async_to_sync(layer.group_add)(GRUPO_EMERGENCIA_MASIVA, canal)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        em = EmergenciaFactory(tipo=TipoEmergenciaFactory(alerta_masiva=True))
+    assert emergencia_masiva_activa(request)["hay_emergencia_masiva"] is True
+    assert async_to_sync(layer.receive)(canal)["data"] == {"tipo": "EMERGENCIA_MASIVA", "activa": True}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        em.estado = "FALSA_ALARMA"
+        em.save()
+    assert emergencia_masiva_activa(request)["hay_emergencia_masiva"] is False
+    assert async_to_sync(layer.receive)(canal)["data"]["activa"] is False
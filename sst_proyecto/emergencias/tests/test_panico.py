@@ -54,3 +54,88 @@ def test_emergencia_reportada_tiene_estado_inicial_correcto(client_aprendiz, tip
     emergencia = Emergencia.objects.latest("fecha_hora_reporte")
     assert emergencia.estado == "REPORTADA"
     assert emergencia.reportada_por is not None
+
+
+# ---------------------------------------------------------------------------
+# Ruta rápida: restricción cacheada y catálogo de tipos en memoria
+# ---------------------------------------------------------------------------
+
+RESTRICCIONES_URL = "/api/emergencias/emergencias/mis-restricciones/"
+
+
+def _consultas_a(tablas, client, url, payload=None):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.post(url, payload, format="json") if payload else client.get(url)
+    sql = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+    return response, [s for s in sql if any(f'FROM "{tabla}"' in s for tabla in tablas)]
+
+
+@pytest.mark.django_db
+def test_boton_panico_no_consulta_penalizaciones_ni_tipos(client_aprendiz, tipo_emergencia):
+    tablas = ("emergencias_emergencia", "reportes_incidente", "emergencias_tipoemergencia")
+    # La primera activación carga la restricción y el catálogo; las siguientes los leen de memoria
+    assert client_aprendiz.post(PANICO_URL, _payload(tipo_emergencia.id), format="json").status_code == 201
+
+    response, consultas = _consultas_a(tablas, client_aprendiz, PANICO_URL, _payload(tipo_emergencia.id))
+    assert response.status_code == 201
+    assert consultas == []
+
+    response, consultas = _consultas_a(tablas, client_aprendiz, RESTRICCIONES_URL)
+    assert response.json()["penalizado"] is False and consultas == []
+
+
+@pytest.mark.django_db
+def test_falsa_alarma_restringe_el_boton_desde_la_cache(
+    client_aprendiz, client_brigada, aprendiz, tipo_emergencia, django_capture_on_commit_callbacks
+):
+    from reportes.models import Incidente
+
+    response = client_aprendiz.post(PANICO_URL, _payload(tipo_emergencia.id), format="json")
+    emergencia_id = response.json()["emergencia"]["id"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client_brigada.post(
+            f"/api/emergencias/emergencias/{emergencia_id}/marcar-falsa-alarma/", {"motivo": "Prueba"}, format="json"
+        )
+    assert response.status_code == 200
+
+    response, consultas = _consultas_a(
+        ("emergencias_emergencia", "reportes_incidente"), client_aprendiz, RESTRICCIONES_URL
+    )
+    assert response.json()["penalizado"] is True and response.json()["tipo_falsa"] == "emergencia"
+    assert consultas == []
+    response = client_aprendiz.post(PANICO_URL, _payload(tipo_emergencia.id), format="json")
+    assert response.status_code == 403 and response.json()["penalizado"] is True
+
+    # Un incidente falso posterior extiende la restricción
+    incidente = Incidente.objects.create(
+        titulo="Incidente de prueba",
+        descripcion="desc",
+        tipo="OTRO",
+        gravedad="MEDIA",
+        estado="REPORTADO",
+        area_incidente="OTRO",
+        reportado_por=aprendiz,
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        client_brigada.post(
+            "/api/emergencias/emergencias/marcar-falsa-incidente/",
+            {"incidente_id": incidente.id, "motivo": "Prueba"},
+            format="json",
+        )
+    assert client_aprendiz.get(RESTRICCIONES_URL).json()["tipo_falsa"] == "incidente"
+
+
+@pytest.mark.django_db
+def test_tipo_inactivo_o_nuevo_se_refleja_en_el_catalogo(client_aprendiz, tipo_emergencia):
+    from emergencias.tests.factories import TipoEmergenciaFactory
+
+    assert client_aprendiz.post(PANICO_URL, _payload(tipo_emergencia.id), format="json").status_code == 201
+    nuevo = TipoEmergenciaFactory()
+    assert client_aprendiz.post(PANICO_URL, _payload(nuevo.id), format="json").status_code == 201
+
+    inactivo = TipoEmergenciaFactory(activo=False)
+    assert client_aprendiz.post(PANICO_URL, _payload(inactivo.id), format="json").status_code == 400
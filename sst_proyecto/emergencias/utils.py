@@ -5,11 +5,19 @@ from datetime import timedelta
 PENALIZACION_HORAS = 24
 
 
-def usuario_en_penalizacion(user):
-    """
-    Retorna (bloqueado: bool, tipo: str, hasta: datetime | None)
-    tipo puede ser 'emergencia' o 'incidente'
-    """
+# ── Restricción por falsa alarma (penalización de 24 h) ──────────────────────
+#
+# El botón de pánico y mis-restricciones leen el estado de restricción del
+# usuario desde el caché: (tipo, hasta) si está penalizado, (None, None) si no.
+# marcar_falsa_alarma y marcar_falsa_incidente lo escriben al confirmarse con
+# registrar_falsa_alarma(); si falta la clave se calcula desde la BD. El estado
+# "sin restricción" dura CACHE_TTL_RESTRICCIONES, por si una falsa alarma se
+# marca por otra vía (admin); el de penalización vence junto con ella.
+
+CACHE_KEY_RESTRICCION = "emergencias:restriccion:{}"
+
+
+def _consultar_penalizacion(user):
     desde = timezone.now() - timedelta(hours=PENALIZACION_HORAS)
 
     # Importaciones locales para evitar importación circular
@@ -27,7 +35,7 @@ def usuario_en_penalizacion(user):
     )
     if emg:
         hasta = emg.fecha_hora_falsa_alarma + timedelta(hours=PENALIZACION_HORAS)
-        return True, "emergencia", hasta
+        return "emergencia", hasta
 
     inc = (
         Incidente.objects.filter(
@@ -40,6 +48,203 @@ def usuario_en_penalizacion(user):
     )
     if inc:
         hasta = inc.fecha_falsa_alarma + timedelta(hours=PENALIZACION_HORAS)
-        return True, "incidente", hasta
+        return "incidente", hasta
+
+    return None, None
+
+
+def _guardar_restriccion(usuario_id, tipo, hasta):
+    from django.conf import settings
+    from django.core.cache import cache
+
+    if hasta is None:
+        ttl = settings.CACHE_TTL_RESTRICCIONES
+    else:
+        ttl = max(int((hasta - timezone.now()).total_seconds()) + 1, 1)
+    cache.set(CACHE_KEY_RESTRICCION.format(usuario_id), (tipo, hasta), ttl)
+
+
+def usuario_en_penalizacion(user):
+    """
+    Retorna (bloqueado: bool, tipo: str, hasta: datetime | None)
+    tipo puede ser 'emergencia' o 'incidente'
+    """
+    from django.core.cache import cache
+
+    estado = cache.get(CACHE_KEY_RESTRICCION.format(user.pk))
+    if estado is None:
+        estado = _consultar_penalizacion(user)
+        _guardar_restriccion(user.pk, *estado)
+    tipo, hasta = estado
+    if hasta is None or hasta <= timezone.now():
+        return False, None, None
+    return True, tipo, hasta
+
+
+def registrar_falsa_alarma(usuario_id, tipo, fecha):
+    """
+    Escribe la penalización del usuario tras marcar como falsa alarma su
+    emergencia o incidente (tipo 'emergencia' o 'incidente') en `fecha`.
+    Llamar al confirmarse la transacción.
+    """
+    from django.core.cache import cache
+
+    hasta = fecha + timedelta(hours=PENALIZACION_HORAS)
+    actual = cache.get(CACHE_KEY_RESTRICCION.format(usuario_id))
+    if actual is not None and actual[1] is not None and actual[1] >= hasta:
+        return
+    _guardar_restriccion(usuario_id, tipo, hasta)
+
+
+# ── Catálogo de tipos de emergencia activos (en memoria) ─────────────────────
+#
+# Cada proceso guarda los tipos activos y los recarga cuando cambia la versión
+# del caché (marcar_cambio_tipos, llamada por las señales de TipoEmergencia).
+# Son instancias compartidas entre peticiones: no modificarlas.
+
+_CLAVE_VERSION_TIPOS = "emergencias:tipos:version"
+_CATALOGO = {"version": None, "tipos": {}}
+
+
+def version_tipos():
+    import uuid
+
+    from django.core.cache import cache
+
+    version = cache.get(_CLAVE_VERSION_TIPOS)
+    if version is None:
+        cache.add(_CLAVE_VERSION_TIPOS, uuid.uuid4().hex, None)
+        version = cache.get(_CLAVE_VERSION_TIPOS)
+    return version
+
+
+def marcar_cambio_tipos():
+    import uuid
+
+    from django.core.cache import cache
+
+    cache.set(_CLAVE_VERSION_TIPOS, uuid.uuid4().hex, None)
+
+
+def tipos_emergencia_activos():
+    """{id: TipoEmergencia} de los tipos activos (tipo_emergencia_activo() para buscar uno)."""
+    from .models import TipoEmergencia
 
-    return False, None, None
+    version = version_tipos()
+    if _CATALOGO["version"] != version:
+        tipos = {tipo.pk: tipo for tipo in TipoEmergencia.objects.filter(activo=True)}
+        _CATALOGO.update(tipos=tipos, version=version)
+    return _CATALOGO["tipos"]
+
+
+def tipo_emergencia_activo(pk):
+    """TipoEmergencia activo con ese id, o None. Si no está en el catálogo lo busca en la BD (tipo recién creado)."""
+    from .models import TipoEmergencia
+
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    tipo = tipos_emergencia_activos().get(pk)
+    if tipo is None:
+        tipo = TipoEmergencia.objects.filter(pk=pk, activo=True).first()
+    return tipo
+
+
+# ── Bandera cacheada de emergencia masiva activa ──────────────────────────────
+
+CACHE_KEY_EMERGENCIA_MASIVA = "emergencias:masiva_activa"
+
+# Grupo del channel layer al que se une cada WebSocket de notificaciones
+GRUPO_EMERGENCIA_MASIVA = "emergencia_masiva"
+
+
+def _consultar_emergencia_masiva_activa():
+    from .models import Emergencia
+
+    return Emergencia.objects.filter(
+        tipo__alerta_masiva=True,
+        estado__in=["REPORTADA", "EN_ATENCION"],
+    ).exists()
+
+
+def hay_emergencia_masiva_activa():
+    """
+    Retorna si hay una emergencia de alerta masiva activa.
+    Lee la bandera del caché; solo consulta la BD si la clave no existe.
+    """
+    from django.conf import settings
+    from django.core.cache import cache
+
+    activa = cache.get(CACHE_KEY_EMERGENCIA_MASIVA)
+    if activa is None:
+        activa = _consultar_emergencia_masiva_activa()
+        cache.set(CACHE_KEY_EMERGENCIA_MASIVA, activa, settings.CACHE_TTL_ESTADISTICAS)
+    return activa
+
+
+def actualizar_emergencia_masiva_activa():
+    """
+    Recalcula la bandera tras una transición de emergencia (creación, resolución,
+    falsa alarma) y, si cambió, la publica por el channel layer para que las
+    páginas abiertas se enteren sin recargar.
+    """
+    from django.conf import settings
+    from django.core.cache import cache
+
+    anterior = cache.get(CACHE_KEY_EMERGENCIA_MASIVA)
+    activa = _consultar_emergencia_masiva_activa()
+    cache.set(CACHE_KEY_EMERGENCIA_MASIVA, activa, settings.CACHE_TTL_ESTADISTICAS)
+    if anterior != activa:
+        publicar_emergencia_masiva(activa)
+    return activa
+
+
+def publicar_emergencia_masiva(activa):
+    """Envía el estado de la bandera a todos los WebSockets conectados."""
+    from usuarios.tiempo_real import TOPICO_EMERGENCIA_MASIVA, publicar
+
+    publicar(GRUPO_EMERGENCIA_MASIVA, TOPICO_EMERGENCIA_MASIVA, {"tipo": "EMERGENCIA_MASIVA", "activa": activa})
+
+
+# ── Resumen de evacuación (canal en tiempo real) ─────────────────────────────
+
+ROLES_EVACUACION = ["APRENDIZ", "INSTRUCTOR", "ADMINISTRATIVO", "VIGILANCIA", "BRIGADA", "COORDINADOR_SST"]
+
+
+def resumen_evacuacion():
+    """
+    Totales de la evacuación de la emergencia masiva activa (mismo criterio que
+    la acción evacuacion-stats, sin el desglose por rol/ficha ni los datos del
+    usuario). Retorna {"activa": False} si no hay evacuación en curso.
+    """
+    from django.db.models import Exists, OuterRef
+
+    from control_acceso.models import RegistroAcceso
+    from usuarios.models import Usuario
+
+    from .models import Emergencia, RegistroEvacuacion
+
+    emergencia = (
+        Emergencia.objects.filter(tipo__alerta_masiva=True, estado__in=["REPORTADA", "EN_ATENCION"])
+        .select_related("tipo")
+        .order_by("-fecha_hora_reporte")
+        .first()
+    )
+    if not emergencia:
+        return {"activa": False}
+
+    con_asistencia_hoy = Exists(
+        RegistroAcceso.objects.filter(usuario=OuterRef("pk"), fecha_hora_ingreso__date=timezone.now().date())
+    )
+    total = Usuario.objects.filter(rol__in=ROLES_EVACUACION, activo=True).filter(con_asistencia_hoy).count()
+    confirmados = RegistroEvacuacion.objects.filter(emergencia=emergencia, confirmado=True).count()
+    return {
+        "activa": True,
+        "emergencia_id": emergencia.id,
+        "emergencia_tipo": emergencia.tipo.nombre,
+        "total": total,
+        "confirmados": confirmados,
+        "faltantes": total - confirmados,
+        "porcentaje": round(confirmados / total * 100) if total else 0,
+    }
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from django.conf import settings
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
 from django_ratelimit.core import is_ratelimited
 from .models import (
@@ -26,7 +27,7 @@ from .serializers import (
 
 # Servicio centralizado de notificaciones
 from usuarios.services import NotificacionService
-from .utils import usuario_en_penalizacion
+from .utils import registrar_falsa_alarma, tipo_emergencia_activo, usuario_en_penalizacion
 
 
 # Solo brigadistas pueden activar emergencias naturales (sismo, deslizamiento)
@@ -93,17 +94,14 @@ class EmergenciaViewSet(viewsets.ModelViewSet):
         # Validar que el usuario puede reportar este tipo de emergencia
         tipo_id = request.data.get("tipo")
         if tipo_id:
-            try:
-                tipo = TipoEmergencia.objects.get(pk=tipo_id)
-                if tipo.solo_autorizado and request.user.rol not in ROLES_EMERGENCIA_NATURAL:
-                    return Response(
-                        {
-                            "error": "Este tipo de emergencia (causa natural) solo puede ser activado por la Brigada de Emergencia."
-                        },
-                        status=status.HTTP_403_FORBIDDEN,
-                    )
-            except TipoEmergencia.DoesNotExist:
-                pass
+            tipo = tipo_emergencia_activo(tipo_id)
+            if tipo and tipo.solo_autorizado and request.user.rol not in ROLES_EMERGENCIA_NATURAL:
+                return Response(
+                    {
+                        "error": "Este tipo de emergencia (causa natural) solo puede ser activado por la Brigada de Emergencia."
+                    },
+                    status=status.HTTP_403_FORBIDDEN,
+                )
         return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
@@ -245,6 +243,11 @@ class EmergenciaViewSet(viewsets.ModelViewSet):
         emergencia.fecha_hora_falsa_alarma = timezone.now()
         emergencia.save()
 
+        # Deja escrita la penalización que consulta el botón de pánico
+        if emergencia.reportada_por_id:
+            usuario_id, fecha = emergencia.reportada_por_id, emergencia.fecha_hora_falsa_alarma
+            transaction.on_commit(lambda: registrar_falsa_alarma(usuario_id, "emergencia", fecha))
+
         # Notificar al reportante y a administrativos
         NotificacionService.notificar_falsa_alarma(emergencia, request.user)
 
@@ -303,13 +306,17 @@ class EmergenciaViewSet(viewsets.ModelViewSet):
         incidente.estado = "CERRADO"
         incidente.save()
 
+        if incidente.reportado_por_id:
+            usuario_id, fecha = incidente.reportado_por_id, incidente.fecha_falsa_alarma
+            transaction.on_commit(lambda: registrar_falsa_alarma(usuario_id, "incidente", fecha))
+
         # Notificar al reportante
         if incidente.reportado_por:
             from usuarios.models import Notificacion
 
             Notificacion.objects.create(
-                usuario=incidente.reportado_por,
-                tipo="ALERTA",
+                destinatario=incidente.reportado_por,
+                tipo="INCIDENTE",
                 titulo="Tu incidente fue marcado como falsa alarma",
                 mensaje=f'El incidente "{incidente.titulo}" fue marcado como falsa alarma. Motivo: {motivo}. No podrás reportar emergencias ni incidentes durante 24 horas.',
             )
@@ -617,6 +624,11 @@ class EmergenciaViewSet(viewsets.ModelViewSet):
                 obj.save(update_fields=["confirmado", "confirmado_por", "fecha_confirmacion"])
             confirmados += 1
 
+        # Resumen de evacuación a todos los conectados + confirmación personal
+        from usuarios.tiempo_real import publicar_estado_evacuacion
+
+        publicar_estado_evacuacion(usuarios_confirmados=usuario_ids)
+
         # Notificar en tiempo real a brigada via WebSocket
         from usuarios.services import _ws_dispatch_roles
 
@@ -668,10 +680,13 @@ class EmergenciaViewSet(viewsets.ModelViewSet):
         )
 
         if deshacer:
+            from usuarios.tiempo_real import publicar_estado_evacuacion
+
             # Revertir a estado sin confirmar
             obj.ausente = False
             obj.confirmado = False
             obj.save(update_fields=["ausente", "confirmado"])
+            publicar_estado_evacuacion()
             return Response({"estado": "sin_confirmar", "ok": True})
 
         # No se puede marcar ausente si ya está confirmado presente
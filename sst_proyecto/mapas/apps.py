@@ -6,10 +6,20 @@ class MapasConfig(AppConfig):
     name = "mapas"
 
     def ready(self):
+        import os
         import sys
 
-        # No iniciar el scheduler en comandos de management ni en tests
-        if "runserver" not in sys.argv and "daphne" not in sys.argv[0]:
+        from django.conf import settings
+
+        import mapas.signals  # noqa: F401
+
+        # Las tareas programadas corren en su propio proceso (manage.py ejecutar_scheduler).
+        # Solo en desarrollo runserver puede arrancarlas en su proceso, y aun así pasa por
+        # el candado de liderazgo: nunca se ejecutan dos schedulers a la vez.
+        if not getattr(settings, "SCHEDULER_EN_PROCESO", False) or "runserver" not in sys.argv:
+            return
+        # Con autorecarga, solo el proceso hijo (el que sirve peticiones)
+        if os.environ.get("RUN_MAIN") != "true" and "--noreload" not in sys.argv:
             return
         from mapas.scheduler import iniciar_scheduler
 
@@ -0,0 +1,316 @@
+"""
+Asignación de edificios a puntos de encuentro según su capacidad.
+
+calcular_ruta_mas_corta() manda a todos al punto más cercano, y en una
+evacuación real eso satura una sola zona. Aquí se reparte la gente de cada
+edificio entre los puntos de encuentro con un flujo de costo mínimo:
+
+    edificio (personas) ──distancia por el grafo──▶ punto (capacidad) ──▶ sumidero
+
+El costo de cada arco es la distancia a pie en metros más una penalización por
+prioridad del punto (los principales se prefieren a igual distancia). Si no hay
+cupo para todos, lo que sobra sale por un arco de costo muy alto y se reporta
+como "sin_cupo".
+
+Ocupación por edificio: los registros de acceso solo dicen cuántas personas hay
+en el centro, no en qué edificio; se reparte ese total en proporción a la
+capacidad de cada edificio abierto (CERRADO = 0). La vista acepta una ocupación
+explícita para planear simulacros.
+
+Edificios bloqueados (ESTADOS_BLOQUEO): sus nodos del grafo dejan de servir de
+paso para los demás; sus ocupantes salen por sus propias entradas. Las
+distancias salen de un árbol de caminos mínimos por punto de encuentro sobre el
+grafo cacheado (routing.grafo_cacheado), por peso (mapas/pesos.py). Cuando un
+edificio pasa a bloqueado, o unos tramos se encarecen (routing.cambios_de_pesos),
+solo se recalculan los árboles que pasaban por ellos. El flujo, que es pequeño
+(edificios × puntos), se resuelve de nuevo en cada consulta. El costo es el peso;
+las distancias informadas son metros reales.
+"""
+
+import logging
+import threading
+
+from .pesos import peso_tramo
+from .routing import VELOCIDAD_METROS_POR_MINUTO, cambios_de_pesos, grafo_cacheado, haversine, nodo_mas_cercano
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_BLOQUEO = frozenset({"DANADO", "EN_EMERGENCIA", "CERRADO"})
+
+# Metros extra por cada nivel de prioridad por debajo del principal
+PENALIZACION_PRIORIDAD_M = 50
+
+# Costo por persona que no cabe en ningún punto (mayor que cualquier ruta del campus)
+COSTO_SIN_CUPO = 10**7
+
+_FUENTE = "fuente"
+_SUMIDERO = "sumidero"
+
+_lock = threading.Lock()
+_ARBOLES = {"capas": None, "revision": 0, "bloqueados": frozenset(), "puntos": {}}
+
+
+# ─── Ocupación ───────────────────────────────────────────────────────────────
+
+
+def repartir(total, pesos):
+    """Reparte `total` entero en proporción a {clave: peso} (resto mayor: suma exacta)."""
+    suma = sum(pesos.values())
+    if total <= 0 or not pesos:
+        return {clave: 0 for clave in pesos}
+    if suma <= 0:
+        pesos = {clave: 1 for clave in pesos}
+        suma = len(pesos)
+    cuotas = {clave: total * peso / suma for clave, peso in pesos.items()}
+    reparto = {clave: int(cuota) for clave, cuota in cuotas.items()}
+    faltan = total - sum(reparto.values())
+    for clave in sorted(cuotas, key=lambda c: cuotas[c] - reparto[c], reverse=True)[:faltan]:
+        reparto[clave] += 1
+    return reparto
+
+
+def ocupacion_estimada(edificios):
+    """{edificio_id: personas} a partir de las personas dentro del centro hoy."""
+    from control_acceso.utils import verificar_aforo_actual
+
+    abiertos = {e["id"]: e["capacidad"] or 0 for e in edificios if e["estado"] != "CERRADO"}
+    reparto = repartir(verificar_aforo_actual()["personas_dentro"], abiertos)
+    return {e["id"]: reparto.get(e["id"], 0) for e in edificios}
+
+
+# ─── Distancias ──────────────────────────────────────────────────────────────
+
+
+def _datos():
+    """Edificios activos (con estado y nodos de entrada) y puntos de encuentro activos."""
+    from .models import EdificioBloque, NodoCamino, PuntoEncuentro
+
+    entradas = {}
+    for nodo_id, edificio_id in NodoCamino.objects.filter(activo=True, edificio__isnull=False).values_list(
+        "id", "edificio_id"
+    ):
+        entradas.setdefault(edificio_id, []).append(nodo_id)
+
+    edificios = [
+        {
+            "id": e["id"],
+            "nombre": e["nombre"],
+            "latitud": e["latitud"],
+            "longitud": e["longitud"],
+            "capacidad": e["capacidad"],
+            "estado": e["estado_actual__estado"] or "NORMAL",
+            "entradas": entradas.get(e["id"], []),
+        }
+        for e in EdificioBloque.objects.filter(activo=True)
+        .order_by("id")
+        .values("id", "nombre", "latitud", "longitud", "capacidad", "estado_actual__estado")
+    ]
+    puntos = list(
+        PuntoEncuentro.objects.filter(activo=True)
+        .order_by("prioridad", "id")
+        .values("id", "nombre", "latitud", "longitud", "capacidad", "prioridad")
+    )
+    return edificios, puntos
+
+
+def _arbol(G, bloqueados, punto):
+    """
+    ({nodo: (costo, metros)}, nodos interiores) desde el nodo más cercano al punto,
+    sin pasar por `bloqueados`.
+    """
+    import networkx as nx
+
+    fuente, acceso = nodo_mas_cercano(G, punto["latitud"], punto["longitud"])
+    if fuente is None or fuente in bloqueados:
+        return {}, frozenset()
+    vista = nx.subgraph_view(G, filter_node=lambda n: n not in bloqueados) if bloqueados else G
+    predecesores, costos = nx.dijkstra_predecessor_and_distance(vista, fuente, weight=peso_tramo)
+    # costos está en el orden en que Dijkstra fijó cada nodo: el predecesor ya tiene sus metros
+    metros = {}
+    for n in costos:
+        anterior = predecesores[n][0] if predecesores[n] else None
+        metros[n] = acceso if anterior is None else metros[anterior] + G[anterior][n]["metros"]
+    interiores = frozenset(p for lista in predecesores.values() for p in lista)
+    return {n: (c + acceso, metros[n]) for n, c in costos.items()}, interiores
+
+
+def arboles(G, bloqueados, puntos):
+    """
+    {punto_id: (distancias, interiores)} con los nodos `bloqueados` fuera del grafo.
+    Si respecto a la consulta anterior solo se bloquearon nodos o se encarecieron
+    tramos, se recalculan únicamente los árboles que pasaban por alguno de ellos.
+    """
+    with _lock:
+        previo = _ARBOLES
+        # Cada cambio de pesos reemplaza el grafo: se reutiliza si es la misma topología
+        capas = G.graph.get("capas")
+        revision = G.graph.get("revision", 0)
+        _, encarecidos = cambios_de_pesos(previo["revision"], revision)
+        reutilizable = (
+            capas is not None
+            and previo["capas"] == capas
+            and previo["revision"] <= revision
+            and previo["bloqueados"] <= bloqueados
+            and encarecidos is not None
+        )
+        nuevos = bloqueados - previo["bloqueados"] if reutilizable else None
+        afectados = nuevos | encarecidos if reutilizable else None
+        resultado = {}
+        recalculados = 0
+        for punto in puntos:
+            actual = previo["puntos"].get(punto["id"]) if reutilizable else None
+            if actual is not None and not (afectados & actual[1]):
+                distancias, interiores = actual
+                if nuevos & distancias.keys():
+                    # Los nodos bloqueados eran hojas del árbol: basta con quitarlos
+                    distancias = {n: d for n, d in distancias.items() if n not in nuevos}
+                resultado[punto["id"]] = (distancias, interiores)
+            else:
+                resultado[punto["id"]] = _arbol(G, bloqueados, punto)
+                recalculados += 1
+        _ARBOLES.update(capas=capas, revision=revision, bloqueados=bloqueados, puntos=resultado)
+    if recalculados:
+        logger.debug("Asignación: %s de %s árboles recalculados", recalculados, len(puntos))
+    return resultado
+
+
+def _origenes(G, edificio, bloqueados):
+    """[(nodo, metros extra)] por los que salen los ocupantes del edificio."""
+    if edificio["entradas"]:
+        propias = [n for n in edificio["entradas"] if n in G]
+        if edificio["id"] not in bloqueados:
+            return [(n, 0.0) for n in propias]
+        # Edificio bloqueado: sus nodos no están en los árboles, se sale al vecino abierto
+        return [
+            (vecino, G[n][vecino]["metros"])
+            for n in propias
+            for vecino in G.neighbors(n)
+            if vecino not in bloqueados[edificio["id"]]
+        ]
+    nodo, distancia = nodo_mas_cercano(G, edificio["latitud"], edificio["longitud"])
+    return [(nodo, distancia)] if nodo is not None else []
+
+
+def matriz_costos(edificios, puntos):
+    """{edificio_id: {punto_id: (costo, metros)}} por el grafo cacheado (sin pasar por edificios bloqueados)."""
+    G, _ = grafo_cacheado()
+    bloqueados = {
+        e["id"]: frozenset(n for n in e["entradas"] if n in G) for e in edificios if e["estado"] in ESTADOS_BLOQUEO
+    }
+    nodos_bloqueados = frozenset().union(*bloqueados.values())
+    por_punto = arboles(G, nodos_bloqueados, puntos)
+
+    matriz = {}
+    for edificio in edificios:
+        origenes = _origenes(G, edificio, bloqueados)
+        fila = {}
+        for punto in puntos:
+            distancias = por_punto[punto["id"]][0]
+            candidatos = [
+                (extra + distancias[n][0], extra + distancias[n][1]) for n, extra in origenes if n in distancias
+            ]
+            if candidatos:
+                fila[punto["id"]] = min(candidatos)
+            elif not G.number_of_nodes():
+                # Sin grafo: línea recta, como calcular_ruta()
+                recta = haversine(edificio["latitud"], edificio["longitud"], punto["latitud"], punto["longitud"])
+                fila[punto["id"]] = (recta, recta)
+        matriz[edificio["id"]] = fila
+    return matriz
+
+
+# ─── Flujo de costo mínimo ───────────────────────────────────────────────────
+
+
+def resolver(personas, capacidades, costos):
+    """
+    Flujo de costo mínimo. personas {edificio: n}, capacidades {punto: n},
+    costos {edificio: {punto: costo}}. Retorna ({edificio: {punto: n}}, {edificio: sin_cupo}).
+    """
+    import networkx as nx
+
+    total = sum(personas.values())
+    if total == 0:
+        return {e: {} for e in personas}, {e: 0 for e in personas}
+
+    red = nx.DiGraph()
+    red.add_node(_FUENTE, demand=-total)
+    red.add_node(_SUMIDERO, demand=total)
+    for punto, capacidad in capacidades.items():
+        red.add_edge(("p", punto), _SUMIDERO, capacity=max(capacidad, 0), weight=0)
+    for edificio, n in personas.items():
+        if not n:
+            continue
+        red.add_edge(_FUENTE, ("e", edificio), capacity=n, weight=0)
+        red.add_edge(("e", edificio), _SUMIDERO, capacity=n, weight=COSTO_SIN_CUPO)
+        for punto, costo in costos.get(edificio, {}).items():
+            red.add_edge(("e", edificio), ("p", punto), weight=int(round(costo)))
+
+    flujo = nx.min_cost_flow(red)
+    asignado, sin_cupo = {}, {}
+    for edificio in personas:
+        salidas = flujo.get(("e", edificio), {})
+        asignado[edificio] = {destino[1]: n for destino, n in salidas.items() if destino != _SUMIDERO and n}
+        sin_cupo[edificio] = salidas.get(_SUMIDERO, 0)
+    return asignado, sin_cupo
+
+
+def calcular_asignacion(ocupacion=None):
+    """
+    Asignación vigente. ocupacion {edificio_id: personas} reemplaza la estimada
+    (los edificios que no aparezcan quedan con 0).
+    """
+    from django.utils import timezone
+
+    edificios, puntos = _datos()
+    if ocupacion is None:
+        personas = ocupacion_estimada(edificios)
+    else:
+        personas = {e["id"]: max(int(ocupacion.get(e["id"], 0)), 0) for e in edificios}
+
+    distancias = matriz_costos(edificios, puntos)
+    penalizacion = {p["id"]: (max(p["prioridad"], 1) - 1) * PENALIZACION_PRIORIDAD_M for p in puntos}
+    costos = {e: {p: d[0] + penalizacion[p] for p, d in fila.items()} for e, fila in distancias.items()}
+    asignado, sin_cupo = resolver(personas, {p["id"]: p["capacidad"] for p in puntos}, costos)
+
+    nombres = {p["id"]: p["nombre"] for p in puntos}
+    recibidas = {p["id"]: 0 for p in puntos}
+    filas = []
+    for e in edificios:
+        asignaciones = []
+        for punto_id, n in sorted(asignado[e["id"]].items(), key=lambda par: -par[1]):
+            recibidas[punto_id] += n
+            metros = distancias[e["id"]][punto_id][1]
+            asignaciones.append(
+                {
+                    "punto_id": punto_id,
+                    "punto": nombres[punto_id],
+                    "personas": n,
+                    "distancia_metros": round(metros, 1),
+                    "tiempo_minutos": round(metros / VELOCIDAD_METROS_POR_MINUTO, 1),
+                }
+            )
+        filas.append(
+            {
+                "id": e["id"],
+                "nombre": e["nombre"],
+                "estado": e["estado"],
+                "bloqueado": e["estado"] in ESTADOS_BLOQUEO,
+                "personas": personas[e["id"]],
+                "sin_cupo": sin_cupo[e["id"]],
+                "asignaciones": asignaciones,
+            }
+        )
+
+    return {
+        "generado": timezone.now().isoformat(),
+        "ocupacion": "estimada" if ocupacion is None else "indicada",
+        "personas": sum(personas.values()),
+        "capacidad_total": sum(p["capacidad"] for p in puntos),
+        "sin_cupo": sum(sin_cupo.values()),
+        "edificios": filas,
+        "puntos": [
+            {"id": p["id"], "nombre": p["nombre"], "capacidad": p["capacidad"], "asignadas": recibidas[p["id"]]}
+            for p in puntos
+        ],
+    }
@@ -0,0 +1,392 @@
+"""
+Paquete de capas del mapa del campus (GeoJSON pre-serializado).
+
+mapa_interactivo solo entrega la página; los datos llegan en un único JSON con
+una FeatureCollection por capa:
+
+    edificios         Polygon (si tiene poligono) o Point
+    puntos_encuentro  Point
+    equipamiento      Point (solo equipos operativos)
+    grafo             Point por nodo y LineString por tramo del grafo de caminos
+
+Los bytes serializados se guardan en la caché bajo su hash de contenido
+("mapas:capas:<hash>"); el hash es a la vez el ETag y parte de la URL
+versionada, que se sirve con Cache-Control de larga duración. Cualquier
+guardado o borrado de los modelos del mapa cambia version_capas() (ver
+mapas/signals.py) y el siguiente pedido reconstruye el paquete.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CAPAS = ("edificios", "puntos_encuentro", "equipamiento", "grafo")
+
+# Decimales de las coordenadas (~0.1 m): suficiente para el mapa y reduce el tamaño
+PRECISION = 6
+
+_CLAVE_VERSION = "mapas:capas:version"
+
+# Datos de ejemplo cuando aún no hay edificios / puntos registrados
+# (coordenadas reales del Centro Nacional Minero SENA - Sogamoso, Vereda Morcá)
+EDIFICIOS_EJEMPLO = [
+    {
+        "id": 1,
+        "nombre": "Edificio Administrativo Principal",
+        "tipo": "ADMINISTRATIVO",
+        "latitud": 5.73036,
+        "longitud": -72.89436,
+        "descripcion": "Dirección y administración del Centro Nacional Minero",
+        "pisos": "1 - 2",
+        "capacidad": 100,
+    },
+    {
+        "id": 2,
+        "nombre": "Bloque de Aulas Teóricas",
+        "tipo": "AULAS",
+        "latitud": 5.73070,
+        "longitud": -72.89460,
+        "descripcion": "Aulas para formación teórica en minería",
+        "pisos": "1 - 2",
+        "capacidad": 300,
+    },
+    {
+        "id": 3,
+        "nombre": "Talleres de Minería",
+        "tipo": "TALLER",
+        "latitud": 5.73000,
+        "longitud": -72.89410,
+        "descripcion": "Talleres prácticos de maquinaria y equipos mineros",
+        "pisos": "1",
+        "capacidad": 150,
+    },
+    {
+        "id": 4,
+        "nombre": "Mina Didáctica Subterránea",
+        "tipo": "TALLER",
+        "latitud": 5.72970,
+        "longitud": -72.89430,
+        "descripcion": "Entrada a la mina didáctica para formación práctica",
+        "pisos": "1",
+        "capacidad": 50,
+    },
+    {
+        "id": 5,
+        "nombre": "Laboratorios de Geología y Topografía",
+        "tipo": "LABORATORIO",
+        "latitud": 5.73090,
+        "longitud": -72.89420,
+        "descripcion": "Laboratorios especializados en ciencias de la tierra",
+        "pisos": "1",
+        "capacidad": 80,
+    },
+    {
+        "id": 6,
+        "nombre": "Cafetería y Bienestar",
+        "tipo": "CAFETERIA",
+        "latitud": 5.73050,
+        "longitud": -72.89480,
+        "descripcion": "Zona de alimentación y descanso para aprendices",
+        "pisos": "1",
+        "capacidad": 200,
+    },
+    {
+        "id": 7,
+        "nombre": "Parqueadero Principal",
+        "tipo": "PARQUEADERO",
+        "latitud": 5.73120,
+        "longitud": -72.89510,
+        "descripcion": "Parqueadero de vehículos y motos",
+        "pisos": "1",
+        "capacidad": 100,
+    },
+]
+
+PUNTOS_EJEMPLO = [
+    {
+        "id": 1,
+        "nombre": "Punto Principal - Cancha Deportiva",
+        "latitud": 5.730056,
+        "longitud": -72.894250,
+        "descripcion": "PRIORIDAD 1: Cancha deportiva central - Espacio abierto amplio para evacuación masiva",
+    },
+    {
+        "id": 2,
+        "nombre": "Punto Secundario - Zona Verde",
+        "latitud": 5.731083,
+        "longitud": -72.895028,
+        "descripcion": "PRIORIDAD 2: Zona verde del centro - Área despejada para evacuación",
+    },
+]
+
+
+# ─── Versión ─────────────────────────────────────────────────────────────────
+
+
+def version_capas():
+    """Marca opaca que cambia con cada modificación de los modelos del mapa."""
+    import uuid
+
+    version = cache.get(_CLAVE_VERSION)
+    if version is None:
+        cache.add(_CLAVE_VERSION, uuid.uuid4().hex, None)
+        version = cache.get(_CLAVE_VERSION)
+    return version
+
+
+def marcar_cambio_capas():
+    """Invalida el paquete vigente (llamar al confirmarse el cambio de un modelo del mapa)."""
+    import uuid
+
+    cache.set(_CLAVE_VERSION, uuid.uuid4().hex, None)
+
+
+# ─── GeoJSON ─────────────────────────────────────────────────────────────────
+
+
+def _punto(lat, lng):
+    return {"type": "Point", "coordinates": [round(float(lng), PRECISION), round(float(lat), PRECISION)]}
+
+
+def _feature(id_, geometria, propiedades):
+    return {"type": "Feature", "id": id_, "geometry": geometria, "properties": propiedades}
+
+
+def _coleccion(features):
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _poligono(puntos):
+    """[[lat, lng], ...] → Polygon GeoJSON ([lng, lat], anillo cerrado). None si no es válido."""
+    try:
+        anillo = [[round(float(lng), PRECISION), round(float(lat), PRECISION)] for lat, lng in puntos]
+    except (TypeError, ValueError):
+        return None
+    if len(anillo) < 3:
+        return None
+    if anillo[0] != anillo[-1]:
+        anillo.append(anillo[0])
+    return {"type": "Polygon", "coordinates": [anillo]}
+
+
+def capa_edificios():
+    from .models import EdificioBloque
+
+    filas = EdificioBloque.objects.filter(activo=True).values(
+        "id",
+        "nombre",
+        "tipo",
+        "latitud",
+        "longitud",
+        "descripcion",
+        "piso_minimo",
+        "piso_maximo",
+        "capacidad",
+        "poligono",
+    )
+    features = []
+    for e in filas:
+        geometria = _poligono(e["poligono"]) if e["poligono"] else None
+        features.append(
+            _feature(
+                e["id"],
+                geometria or _punto(e["latitud"], e["longitud"]),
+                {
+                    "nombre": e["nombre"],
+                    "tipo": e["tipo"],
+                    "descripcion": e["descripcion"] or f"Edificio {e['tipo']}",
+                    "pisos": f"{e['piso_minimo']} - {e['piso_maximo']}"
+                    if e["piso_maximo"]
+                    else str(e["piso_minimo"] or 1),
+                    "capacidad": e["capacidad"] or 0,
+                    "centro": _punto(e["latitud"], e["longitud"])["coordinates"],
+                },
+            )
+        )
+    if not features:
+        features = [
+            _feature(
+                e["id"],
+                _punto(e["latitud"], e["longitud"]),
+                {k: v for k, v in e.items() if k not in ("id", "latitud", "longitud")},
+            )
+            for e in EDIFICIOS_EJEMPLO
+        ]
+    return _coleccion(features)
+
+
+def capa_puntos_encuentro():
+    from .models import PuntoEncuentro
+
+    filas = PuntoEncuentro.objects.filter(activo=True).values(
+        "id", "nombre", "latitud", "longitud", "descripcion", "tipo_terreno", "prioridad", "capacidad"
+    )
+    features = [
+        _feature(
+            p["id"],
+            _punto(p["latitud"], p["longitud"]),
+            {
+                "nombre": p["nombre"],
+                "descripcion": p["descripcion"]
+                or f"Punto de encuentro {p['tipo_terreno']} - Prioridad {p['prioridad']}",
+                "prioridad": p["prioridad"],
+                "capacidad": p["capacidad"],
+            },
+        )
+        for p in filas
+    ]
+    if not features:
+        features = [
+            _feature(
+                p["id"], _punto(p["latitud"], p["longitud"]), {"nombre": p["nombre"], "descripcion": p["descripcion"]}
+            )
+            for p in PUNTOS_EJEMPLO
+        ]
+    return _coleccion(features)
+
+
+def capa_equipamiento():
+    from .models import EquipamientoSeguridad
+
+    filas = EquipamientoSeguridad.objects.filter(estado="OPERATIVO").values(
+        "id",
+        "tipo",
+        "codigo",
+        "latitud",
+        "longitud",
+        "descripcion",
+        "ultima_revision",
+        "proxima_revision",
+        "edificio__nombre",
+    )
+    features = []
+    for e in filas:
+        descripcion = e["descripcion"] or ""
+        if e["edificio__nombre"]:
+            descripcion += f" | Ubicado en: {e['edificio__nombre']}"
+        features.append(
+            _feature(
+                e["id"],
+                _punto(e["latitud"], e["longitud"]),
+                {
+                    "tipo": e["tipo"],
+                    "codigo": e["codigo"],
+                    "ultima_revision": e["ultima_revision"].strftime("%Y-%m-%d") if e["ultima_revision"] else "",
+                    "proxima_revision": e["proxima_revision"].isoformat() if e["proxima_revision"] else None,
+                    "descripcion": descripcion or f"Equipo {e['tipo']} - {e['codigo']}",
+                },
+            )
+        )
+    return _coleccion(features)
+
+
+def capa_grafo():
+    from .models import NodoCamino, TramoCamino
+
+    features = [
+        _feature(
+            f"n{n['id']}",
+            _punto(n["latitud"], n["longitud"]),
+            {
+                "clase": "nodo",
+                "nodo_id": n["id"],
+                "nombre": n["nombre"],
+                "tipo": n["tipo"],
+                "edificio_id": n["edificio_id"],
+                "punto_encuentro_id": n["punto_encuentro_id"],
+            },
+        )
+        for n in NodoCamino.objects.filter(activo=True).values(
+            "id", "nombre", "latitud", "longitud", "tipo", "edificio_id", "punto_encuentro_id"
+        )
+    ]
+    tramos = TramoCamino.objects.filter(activo=True, nodo_origen__activo=True, nodo_destino__activo=True).values(
+        "id",
+        "tipo",
+        "distancia_metros",
+        "bidireccional",
+        "nodo_origen_id",
+        "nodo_destino_id",
+        "nodo_origen__latitud",
+        "nodo_origen__longitud",
+        "nodo_destino__latitud",
+        "nodo_destino__longitud",
+    )
+    for t in tramos:
+        origen = _punto(t["nodo_origen__latitud"], t["nodo_origen__longitud"])["coordinates"]
+        destino = _punto(t["nodo_destino__latitud"], t["nodo_destino__longitud"])["coordinates"]
+        features.append(
+            _feature(
+                f"t{t['id']}",
+                {"type": "LineString", "coordinates": [origen, destino]},
+                {
+                    "clase": "tramo",
+                    "tramo_id": t["id"],
+                    "tipo": t["tipo"],
+                    "distancia_metros": t["distancia_metros"],
+                    "bidireccional": t["bidireccional"],
+                    "origen": t["nodo_origen_id"],
+                    "destino": t["nodo_destino_id"],
+                },
+            )
+        )
+    return _coleccion(features)
+
+
+CONSTRUCTORES = {
+    "edificios": capa_edificios,
+    "puntos_encuentro": capa_puntos_encuentro,
+    "equipamiento": capa_equipamiento,
+    "grafo": capa_grafo,
+}
+
+
+def serializar_paquete():
+    """(hash, bytes) del paquete completo, construido desde la BD."""
+    paquete = {nombre: CONSTRUCTORES[nombre]() for nombre in CAPAS}
+    contenido = json.dumps(paquete, ensure_ascii=False, separators=(",", ":")).encode()
+    return hashlib.sha256(contenido).hexdigest()[:20], contenido
+
+
+# ─── Caché ───────────────────────────────────────────────────────────────────
+
+
+def paquete_versionado(prefijo, serializar, version=None):
+    """
+    (hash, bytes) del paquete vigente guardado bajo `prefijo`; serializar() → (hash, bytes)
+    solo se llama si `version` (por defecto version_capas()) cambió desde la última vez.
+    Si no, son dos lecturas de caché.
+    """
+    if version is None:
+        version = version_capas()
+    clave_actual = f"{prefijo}:actual:{version}"
+    huella = cache.get(clave_actual)
+    if huella:
+        contenido = cache.get(f"{prefijo}:{huella}")
+        if contenido is not None:
+            return huella, contenido
+
+    from django.conf import settings
+
+    huella, contenido = serializar()
+    # Se guarda bajo la versión leída antes de consultar: si hubo un cambio mientras
+    # tanto, la versión ya es otra y este paquete nunca se ofrece como vigente.
+    ttl = getattr(settings, "CACHE_TTL_CAPAS_MAPA", 7 * 86400)
+    cache.set(f"{prefijo}:{huella}", contenido, ttl)
+    cache.set(clave_actual, huella, ttl)
+    logger.info("Paquete %s reconstruido (%s, %s bytes)", prefijo, huella, len(contenido))
+    return huella, contenido
+
+
+def paquete_actual():
+    """(hash, bytes) del paquete de capas vigente."""
+    return paquete_versionado("mapas:capas", serializar_paquete)
+
+
+def paquete_por_huella(huella):
+    """Bytes de un paquete ya emitido (None si expiró o no existe)."""
+    return cache.get(f"mapas:capas:{huella}")
@@ -0,0 +1,88 @@
+"""
+Estado operativo de los edificios para el mapa del campus.
+
+  estados_completos()   lista de todos los edificios activos con su estado;
+                        cacheada hasta el próximo cambio (invalidar_estados()).
+  estados_desde(desde)  solo los edificios cuyo estado cambió desde `desde`
+                        según HistorialEstadoEdificio (modo delta de estados_edificios).
+
+Cada cambio confirmado de EstadoEdificio se publica además al tópico
+"mapa_estados" del canal en tiempo real (usuarios/tiempo_real.py), así que las
+páginas con el mapa abierto lo reciben sin volver a consultar.
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+_CLAVE_ESTADOS = "mapas:estados_edificios"
+
+# Los cambios se buscan desde un poco antes del cursor del cliente: una transacción
+# que confirma después con una fecha anterior no se pierde (reenviar un estado es inocuo).
+MARGEN_DELTA = timedelta(seconds=5)
+
+
+def fila_estado(edificio):
+    """Representación de un edificio y su estado actual (mismo formato en lista, delta y push)."""
+    from .models import EstadoEdificio
+
+    try:
+        estado = edificio.estado_actual
+    except EstadoEdificio.DoesNotExist:
+        estado = None
+
+    return {
+        "id": edificio.id,
+        "nombre": edificio.nombre,
+        "tipo": edificio.tipo,
+        "svg_x": edificio.svg_x,
+        "svg_y": edificio.svg_y,
+        "svg_ancho": edificio.svg_ancho,
+        "svg_alto": edificio.svg_alto,
+        "estado": estado.estado if estado else "NORMAL",
+        "color": estado.color if estado else "#4CAF50",
+        "motivo": estado.motivo if estado else "",
+        "actualizado_por": str(estado.actualizado_por) if estado and estado.actualizado_por else "",
+        "fecha_actualizacion": estado.fecha_actualizacion.isoformat() if estado else None,
+    }
+
+
+def _edificios():
+    from .models import EdificioBloque
+
+    return EdificioBloque.objects.filter(activo=True).select_related("estado_actual", "estado_actual__actualizado_por")
+
+
+def estados_completos():
+    """Estado de todos los edificios activos; se reconstruye solo tras un cambio."""
+    datos = cache.get(_CLAVE_ESTADOS)
+    if datos is None:
+        datos = [fila_estado(e) for e in _edificios()]
+        cache.set(_CLAVE_ESTADOS, datos, None)
+    return datos
+
+
+def invalidar_estados():
+    cache.delete(_CLAVE_ESTADOS)
+
+
+def estados_desde(desde):
+    """
+    {"desde", "hasta", "edificios"} con los edificios que cambiaron de estado a
+    partir de `desde`. "hasta" es el cursor que el cliente envía en la siguiente consulta.
+    """
+    from .models import HistorialEstadoEdificio
+
+    hasta = timezone.now()
+    ids = (
+        HistorialEstadoEdificio.objects.filter(fecha__gte=desde - MARGEN_DELTA, fecha__lte=hasta)
+        .values_list("edificio_id", flat=True)
+        .distinct()
+    )
+    edificios = _edificios().filter(id__in=ids)
+    return {
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "edificios": [fila_estado(e) for e in edificios],
+    }
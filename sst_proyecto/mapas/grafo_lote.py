@@ -0,0 +1,437 @@
+"""
+Edición del grafo de caminos en lote (editor visual e importación GeoJSON).
+
+guardar_nodo y guardar_tramo guardan un elemento por petición. Cada
+TramoCamino.save consulta sus dos nodos, y cada guardado invalida el paquete de
+capas y el grafo cacheado. aplicar_cambios() recibe en cambio un diff completo
+y lo aplica en una sola transacción:
+
+    {
+      "nodos":  {"guardar": [{"id" | "ref", "latitud", "longitud", "nombre", "tipo",
+                              "edificio_id", "punto_encuentro_id", "activo"}, ...],
+                 "eliminar": [id, ...]},
+      "tramos": {"guardar": [{"id"?, "origen", "destino", "tipo", "bidireccional",
+                              "distancia_metros"?, "activo"}, ...],
+                 "eliminar": [id, ...]}
+    }
+
+Reglas del diff:
+
+- Un nodo con "id" se actualiza, y solo cambian los campos que vienen.
+- Un nodo sin "id" se crea. Su "ref" es un nombre temporal con el que lo citan
+  los tramos del mismo diff; origen y destino aceptan un id o una ref.
+- Un tramo sin "id" entre dos nodos que ya están unidos actualiza ese tramo.
+
+Las altas van con bulk_create, los cambios con bulk_update y las bajas con un
+delete por modelo. Las distancias se calculan todas juntas con numpy: las de
+los tramos guardados sin distancia_metros y las de los tramos que tocan un nodo
+movido. Antes de confirmar se comprueba una sola vez que el cambio no parte el
+grafo en más componentes conexas de las que tenía. version_capas() cambia una
+sola vez, al confirmar (signals.invalidacion_en_lote).
+
+exportar_geojson() y geojson_a_cambios() pasan el grafo completo a GeoJSON y
+de vuelta. Es el mismo formato de capa_grafo(), así que un archivo exportado y
+editado en un SIG se importa como un diff.
+"""
+
+import logging
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Elementos (altas + cambios + bajas) por lote
+MAX_ELEMENTOS_LOTE = 5000
+
+CAMPOS_NODO = ("nombre", "latitud", "longitud", "tipo", "edificio_id", "punto_encuentro_id", "activo")
+CAMPOS_TRAMO = ("nodo_origen_id", "nodo_destino_id", "tipo", "distancia_metros", "bidireccional", "activo")
+
+
+def distancias_metros(pares):
+    """Distancia haversine en metros (redondeada como TramoCamino.save) de cada ((lat1, lng1), (lat2, lng2))."""
+    import numpy as np
+
+    if not pares:
+        return []
+    extremos = np.radians(np.array(pares, dtype=float).reshape(len(pares), 4))
+    lat1, lng1, lat2, lng2 = extremos.T
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return np.round(6371000 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)), 2).tolist()
+
+
+def componentes(G):
+    import networkx as nx
+
+    return nx.number_connected_components(G) if G.number_of_nodes() else 0
+
+
+# ─── Validación ──────────────────────────────────────────────────────────────
+
+
+def _lista(diff, modelo, accion):
+    grupo = diff.get(modelo) or {}
+    if not isinstance(grupo, dict):
+        raise ValueError(f"{modelo} debe ser un objeto con guardar y eliminar.")
+    valor = grupo.get(accion) or []
+    if not isinstance(valor, list):
+        raise ValueError(f"{modelo}.{accion} debe ser una lista.")
+    return valor
+
+
+def _entero(valor, descripcion):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{descripcion}: id inválido ({valor!r}).") from None
+
+
+def _coordenada(valor, limite, descripcion):
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{descripcion}: coordenada inválida ({valor!r}).") from None
+    if not -limite <= numero <= limite:
+        raise ValueError(f"{descripcion}: coordenada fuera de rango ({numero}).")
+    return numero
+
+
+def _asignar_nodo(nodo, dato, nuevo, descripcion):
+    from .models import NodoCamino
+
+    if nuevo and ("latitud" not in dato or "longitud" not in dato):
+        raise ValueError(f"{descripcion}: se requieren latitud y longitud.")
+    if "latitud" in dato:
+        nodo.latitud = _coordenada(dato["latitud"], 90, descripcion)
+    if "longitud" in dato:
+        nodo.longitud = _coordenada(dato["longitud"], 180, descripcion)
+    if "nombre" in dato:
+        nodo.nombre = str(dato["nombre"] or "")[:100]
+    if "tipo" in dato:
+        if dato["tipo"] not in dict(NodoCamino.TIPO_CHOICES):
+            raise ValueError(f"{descripcion}: tipo de nodo inválido ({dato['tipo']!r}).")
+        nodo.tipo = dato["tipo"]
+    for campo in ("edificio_id", "punto_encuentro_id"):
+        if campo in dato:
+            setattr(nodo, campo, _entero(dato[campo], descripcion) if dato[campo] else None)
+    if "activo" in dato:
+        nodo.activo = bool(dato["activo"])
+
+
+def _asignar_tramo(tramo, dato, descripcion):
+    from .models import TramoCamino
+
+    if "tipo" in dato:
+        if dato["tipo"] not in dict(TramoCamino.TIPO_CHOICES):
+            raise ValueError(f"{descripcion}: tipo de tramo inválido ({dato['tipo']!r}).")
+        tramo.tipo = dato["tipo"]
+    if "bidireccional" in dato:
+        tramo.bidireccional = bool(dato["bidireccional"])
+    if "activo" in dato:
+        tramo.activo = bool(dato["activo"])
+
+
+def _validar_relaciones(nodos):
+    """Un edificio o punto de encuentro inexistente fallaría recién al confirmar: se revisa antes."""
+    from .models import EdificioBloque, PuntoEncuentro
+
+    for modelo, campo, nombre in (
+        (EdificioBloque, "edificio_id", "Edificio"),
+        (PuntoEncuentro, "punto_encuentro_id", "Punto de encuentro"),
+    ):
+        ids = {getattr(n, campo) for n in nodos} - {None}
+        faltan = ids - set(modelo.objects.filter(id__in=ids).values_list("id", flat=True))
+        if faltan:
+            raise ValueError(f"{nombre} {min(faltan)} no existe.")
+
+
+# ─── Diff ────────────────────────────────────────────────────────────────────
+
+
+def aplicar_cambios(diff):
+    """
+    Aplica el diff en una transacción. Retorna {"nodos": {...}, "tramos": {...},
+    "refs": {ref: id}, "componentes": n}. ValueError (sin cambios en la BD) si algo no es válido.
+    """
+    from django.db.models import Q
+
+    from .models import NodoCamino, TramoCamino
+    from .routing import construir_grafo, grafo_cacheado
+    from .signals import invalidacion_en_lote
+
+    if not isinstance(diff, dict):
+        raise ValueError("El lote debe ser un objeto con nodos y tramos.")
+    nodos_guardar = _lista(diff, "nodos", "guardar")
+    tramos_guardar = _lista(diff, "tramos", "guardar")
+    nodos_eliminar = {_entero(i, "nodos.eliminar") for i in _lista(diff, "nodos", "eliminar")}
+    tramos_eliminar = {_entero(i, "tramos.eliminar") for i in _lista(diff, "tramos", "eliminar")}
+    total = len(nodos_guardar) + len(tramos_guardar) + len(nodos_eliminar) + len(tramos_eliminar)
+    if total > MAX_ELEMENTOS_LOTE:
+        raise ValueError(f"Máximo {MAX_ELEMENTOS_LOTE} elementos por lote.")
+    if any(not isinstance(d, dict) for d in nodos_guardar + tramos_guardar):
+        raise ValueError("Cada nodo y tramo a guardar debe ser un objeto.")
+    for modelo, guardar, eliminar in (
+        ("Nodo", nodos_guardar, nodos_eliminar),
+        ("Tramo", tramos_guardar, tramos_eliminar),
+    ):
+        repetidos = {_entero(d["id"], modelo) for d in guardar if d.get("id")} & eliminar
+        if repetidos:
+            raise ValueError(f"{modelo} {min(repetidos)} está para guardar y para eliminar.")
+
+    componentes_antes = componentes(grafo_cacheado()[0])
+
+    with transaction.atomic(), invalidacion_en_lote():
+        # ─ Nodos
+        existentes = NodoCamino.objects.in_bulk(
+            {_entero(d["id"], f"Nodo {d['id']}") for d in nodos_guardar if d.get("id")}
+        )
+        nuevos, cambiados, refs, movidos = [], [], {}, set()
+        for i, dato in enumerate(nodos_guardar, 1):
+            descripcion = f"Nodo {dato.get('id') or dato.get('ref') or f'#{i}'}"
+            if dato.get("id"):
+                nodo = existentes.get(int(dato["id"]))
+                if nodo is None:
+                    raise ValueError(f"{descripcion} no existe.")
+                posicion = (nodo.latitud, nodo.longitud)
+                _asignar_nodo(nodo, dato, False, descripcion)
+                cambiados.append(nodo)
+                if (nodo.latitud, nodo.longitud) != posicion:
+                    movidos.add(nodo.id)
+            else:
+                nodo = NodoCamino()
+                _asignar_nodo(nodo, dato, True, descripcion)
+                nuevos.append(nodo)
+                if dato.get("ref") not in (None, ""):
+                    refs[str(dato["ref"])] = nodo
+        _validar_relaciones(nuevos + cambiados)
+        NodoCamino.objects.bulk_create(nuevos)
+        NodoCamino.objects.bulk_update(cambiados, CAMPOS_NODO)
+
+        # ─ Tramos
+        def nodo_de(valor, descripcion):
+            if isinstance(valor, str) and valor in refs:
+                return refs[valor].id
+            nodo_id = _entero(valor, descripcion)
+            if nodo_id in nodos_eliminar:
+                raise ValueError(f"{descripcion}: el nodo {nodo_id} se elimina en este lote.")
+            return nodo_id
+
+        extremos = []
+        for i, dato in enumerate(tramos_guardar, 1):
+            descripcion = f"Tramo {dato.get('id') or f'#{i}'}"
+            if "origen" not in dato or "destino" not in dato:
+                if not dato.get("id"):
+                    raise ValueError(f"{descripcion}: se requieren origen y destino.")
+                extremos.append(None)
+                continue
+            origen, destino = nodo_de(dato["origen"], descripcion), nodo_de(dato["destino"], descripcion)
+            if origen == destino:
+                raise ValueError(f"{descripcion}: origen y destino son el mismo nodo.")
+            extremos.append((origen, destino))
+
+        ids_tramos = {_entero(d["id"], "Tramo") for d in tramos_guardar if d.get("id")}
+        ids_nodos = {n for par in extremos if par for n in par}
+        consulta = Q(id__in=ids_tramos) | Q(nodo_origen_id__in=ids_nodos, nodo_destino_id__in=ids_nodos)
+        if movidos:
+            consulta |= Q(nodo_origen_id__in=movidos) | Q(nodo_destino_id__in=movidos)
+        afectados = {t.id: t for t in TramoCamino.objects.filter(consulta)}
+        por_par = {frozenset((t.nodo_origen_id, t.nodo_destino_id)): t for t in afectados.values()}
+
+        faltan = ids_nodos - set(NodoCamino.objects.filter(id__in=ids_nodos).values_list("id", flat=True))
+        if faltan:
+            raise ValueError(f"Nodo {min(faltan)} no existe.")
+
+        tramos_nuevos, tramos_cambiados, recalcular, con_distancia = [], {}, [], []
+        for i, (dato, par) in enumerate(zip(tramos_guardar, extremos), 1):
+            descripcion = f"Tramo {dato.get('id') or f'#{i}'}"
+            if dato.get("id"):
+                tramo = afectados.get(int(dato["id"]))
+                if tramo is None:
+                    raise ValueError(f"{descripcion} no existe.")
+            else:
+                tramo = por_par.get(frozenset(par)) or TramoCamino(distancia_metros=0)
+            if par and por_par.get(frozenset(par)) not in (None, tramo):
+                raise ValueError(f"{descripcion}: ya existe otro tramo entre los nodos {par[0]} y {par[1]}.")
+            if par and (tramo.nodo_origen_id, tramo.nodo_destino_id) != par:
+                tramo.nodo_origen_id, tramo.nodo_destino_id = par
+                por_par[frozenset(par)] = tramo
+                tramo.distancia_metros = 0
+            _asignar_tramo(tramo, dato, descripcion)
+            if dato.get("distancia_metros"):
+                try:
+                    tramo.distancia_metros = float(dato["distancia_metros"])
+                except (TypeError, ValueError):
+                    raise ValueError(f"{descripcion}: distancia_metros inválida.") from None
+                con_distancia.append(tramo)
+            if tramo.pk is None:
+                if tramo not in tramos_nuevos:
+                    tramos_nuevos.append(tramo)
+            else:
+                tramos_cambiados[tramo.pk] = tramo
+            if not tramo.distancia_metros:
+                recalcular.append(tramo)
+        for tramo in afectados.values():
+            if tramo.nodo_origen_id in movidos or tramo.nodo_destino_id in movidos:
+                tramos_cambiados[tramo.pk] = tramo
+                if tramo not in recalcular and tramo not in con_distancia:
+                    recalcular.append(tramo)
+
+        if recalcular:
+            posiciones = {
+                n: (lat, lng)
+                for n, lat, lng in NodoCamino.objects.filter(
+                    id__in={t.nodo_origen_id for t in recalcular} | {t.nodo_destino_id for t in recalcular}
+                ).values_list("id", "latitud", "longitud")
+            }
+            metros = distancias_metros(
+                [(posiciones[t.nodo_origen_id], posiciones[t.nodo_destino_id]) for t in recalcular]
+            )
+            for tramo, distancia in zip(recalcular, metros):
+                tramo.distancia_metros = distancia
+        TramoCamino.objects.bulk_create(tramos_nuevos)
+        TramoCamino.objects.bulk_update(tramos_cambiados.values(), CAMPOS_TRAMO)
+
+        # ─ Bajas (los tramos de un nodo eliminado se van con él)
+        tramos_borrados = TramoCamino.objects.filter(id__in=tramos_eliminar).delete()[0] if tramos_eliminar else 0
+        borrados = NodoCamino.objects.filter(id__in=nodos_eliminar).delete()[1] if nodos_eliminar else {}
+
+        componentes_despues = componentes(construir_grafo()[0])
+        if componentes_despues > max(componentes_antes, 1):
+            raise ValueError(
+                f"El cambio parte el grafo en {componentes_despues} partes sin conexión "
+                f"(antes {max(componentes_antes, 1)}). Revisa los tramos eliminados o desactivados."
+            )
+
+    resumen = {
+        "nodos": {
+            "creados": len(nuevos),
+            "actualizados": len(cambiados),
+            "eliminados": borrados.get(NodoCamino._meta.label, 0),
+        },
+        "tramos": {
+            "creados": len(tramos_nuevos),
+            "actualizados": len(tramos_cambiados),
+            "eliminados": tramos_borrados + borrados.get(TramoCamino._meta.label, 0),
+        },
+        "refs": {ref: nodo.id for ref, nodo in refs.items()},
+        "componentes": componentes_despues,
+    }
+    logger.info("Grafo editado en lote: %s", {k: resumen[k] for k in ("nodos", "tramos")})
+    return resumen
+
+
+# ─── GeoJSON ─────────────────────────────────────────────────────────────────
+
+
+def exportar_geojson():
+    """FeatureCollection con todos los nodos y tramos activos (formato de capa_grafo)."""
+    from .capas import capa_grafo
+
+    return capa_grafo()
+
+
+def _clave_posicion(lng, lat):
+    return round(float(lat), 7), round(float(lng), 7)
+
+
+def geojson_a_cambios(coleccion, reemplazar=False):
+    """
+    Diff de aplicar_cambios() desde una FeatureCollection de puntos (nodos) y
+    LineString (tramos). Un punto con properties.nodo_id de un nodo existente lo
+    actualiza; los demás son nodos nuevos. Los tramos citan sus extremos con
+    properties.origen / destino (nodo_id del archivo) o, si no los traen, por la
+    posición de sus extremos. Con reemplazar=True se eliminan los nodos y tramos
+    que no estén en el archivo.
+    """
+    from .models import NodoCamino, TramoCamino
+
+    if not isinstance(coleccion, dict) or coleccion.get("type") != "FeatureCollection":
+        raise ValueError("Se espera un GeoJSON FeatureCollection.")
+    features = coleccion.get("features")
+    if not isinstance(features, list):
+        raise ValueError("El GeoJSON no tiene features.")
+
+    puntos, lineas = [], []
+    for i, feature in enumerate(features, 1):
+        geometria = (feature or {}).get("geometry") or {}
+        tipo = geometria.get("type")
+        if tipo == "Point":
+            puntos.append((i, feature))
+        elif tipo == "LineString":
+            lineas.append((i, feature))
+        else:
+            raise ValueError(f"Elemento {i}: geometría {tipo!r} no soportada (Point o LineString).")
+
+    def propiedades(feature):
+        return feature.get("properties") or {}
+
+    ids_archivo = {propiedades(f).get("nodo_id") for _, f in puntos} - {None, ""}
+    nodos_existentes = set(
+        NodoCamino.objects.filter(id__in={_entero(i, "nodo_id") for i in ids_archivo}).values_list("id", flat=True)
+    )
+
+    nodos, referencia, por_posicion = [], {}, {}
+    for i, feature in puntos:
+        props = propiedades(feature)
+        try:
+            lng, lat = feature["geometry"]["coordinates"][:2]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Elemento {i}: coordenadas inválidas.") from None
+        dato = {"latitud": lat, "longitud": lng}
+        for campo in ("nombre", "tipo", "edificio_id", "punto_encuentro_id", "activo"):
+            if campo in props:
+                dato[campo] = props[campo]
+        clave = str(props.get("nodo_id") or feature.get("id") or f"elemento-{i}")
+        if props.get("nodo_id") and int(props["nodo_id"]) in nodos_existentes:
+            dato["id"] = int(props["nodo_id"])
+            referencia[clave] = dato["id"]
+        else:
+            dato["ref"] = clave
+            referencia[clave] = clave
+        nodos.append(dato)
+        por_posicion[_clave_posicion(lng, lat)] = referencia[clave]
+
+    ids_tramos = {propiedades(f).get("tramo_id") for _, f in lineas} - {None, ""}
+    tramos_existentes = set(
+        TramoCamino.objects.filter(id__in={_entero(i, "tramo_id") for i in ids_tramos}).values_list("id", flat=True)
+    )
+
+    tramos = []
+    for i, feature in lineas:
+        props = propiedades(feature)
+        coordenadas = feature["geometry"].get("coordinates") or []
+        extremos = []
+        for campo, posicion in (("origen", 0), ("destino", -1)):
+            if props.get(campo) not in (None, ""):
+                extremo = referencia.get(str(props[campo]))
+            else:
+                try:
+                    extremo = por_posicion.get(_clave_posicion(*coordenadas[posicion][:2]))
+                except (IndexError, TypeError, ValueError):
+                    extremo = None
+            if extremo is None:
+                raise ValueError(f"Elemento {i}: el tramo no empieza o termina en un nodo del archivo.")
+            extremos.append(extremo)
+        dato = {"origen": extremos[0], "destino": extremos[1]}
+        for campo in ("tipo", "bidireccional", "activo"):
+            if campo in props:
+                dato[campo] = props[campo]
+        if props.get("tramo_id") and int(props["tramo_id"]) in tramos_existentes:
+            dato["id"] = int(props["tramo_id"])
+        tramos.append(dato)
+
+    diff = {"nodos": {"guardar": nodos, "eliminar": []}, "tramos": {"guardar": tramos, "eliminar": []}}
+    if reemplazar:
+        conservados = {d["id"] for d in nodos if "id" in d}
+        eliminados = set(NodoCamino.objects.exclude(id__in=conservados).values_list("id", flat=True))
+        # Un tramo del archivo entre nodos existentes actualiza el que ya los une: ese se conserva
+        conservados = {d["id"] for d in tramos if "id" in d}
+        pares = {frozenset((d["origen"], d["destino"])) for d in tramos if "id" not in d}
+        diff["nodos"]["eliminar"] = sorted(eliminados)
+        diff["tramos"]["eliminar"] = [
+            tramo_id
+            for tramo_id, origen, destino in TramoCamino.objects.exclude(id__in=conservados).values_list(
+                "id", "nodo_origen_id", "nodo_destino_id"
+            )
+            if origen not in eliminados and destino not in eliminados and frozenset((origen, destino)) not in pares
+        ]
+    return diff
@@ -0,0 +1,192 @@
+"""
+Elección de líder para el scheduler (un único proceso ejecuta las tareas).
+
+Cada candado expone la misma interfaz:
+
+    adquirir()  → True si este proceso pasa a ser líder
+    renovar()   → True mientras siga siéndolo (False = liderazgo perdido)
+    liberar()   → cede el liderazgo
+
+Implementaciones, elegidas por candado_lider() según SCHEDULER_CANDADO:
+
+  postgres  pg_try_advisory_lock en una conexión dedicada: el candado vive
+            mientras viva la sesión, y si el proceso muere PostgreSQL lo libera.
+  redis     SET NX PX con TTL, renovado periódicamente por el líder; si deja de
+            renovarlo (caída), expira y otro proceso lo toma.
+  archivo   flock sobre un archivo local (desarrollo / SQLite, un solo host).
+"""
+
+import logging
+import os
+import socket
+import tempfile
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+NOMBRE_CANDADO = "sst:scheduler:lider"
+
+
+def _identidad():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class CandadoPostgres:
+    """Advisory lock de sesión en una conexión propia (no la del hilo de las tareas)."""
+
+    def __init__(self, clave=NOMBRE_CANDADO, alias="default"):
+        self.clave = clave
+        self.alias = alias
+        self._conexion = None
+
+    def _cursor(self):
+        from django.db import connections
+
+        if self._conexion is None:
+            self._conexion = connections.create_connection(self.alias)
+            self._conexion.set_autocommit(True)
+        return self._conexion.cursor()
+
+    def adquirir(self):
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [self.clave])
+                return bool(cursor.fetchone()[0])
+        except Exception as e:
+            logger.warning("Candado PostgreSQL no disponible: %s", e)
+            self._cerrar()
+            return False
+
+    def renovar(self):
+        # El candado es de sesión: sigue siendo nuestro mientras la conexión viva.
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid() AND granted"
+                )
+                return cursor.fetchone() is not None
+        except Exception as e:
+            logger.warning("Conexión del candado PostgreSQL perdida: %s", e)
+            self._cerrar()
+            return False
+
+    def liberar(self):
+        try:
+            if self._conexion is not None:
+                with self._cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [self.clave])
+        except Exception:
+            pass
+        finally:
+            self._cerrar()
+
+    def _cerrar(self):
+        if self._conexion is not None:
+            try:
+                self._conexion.close()
+            except Exception:
+                pass
+            self._conexion = None
+
+
+class CandadoRedis:
+    """SET NX PX con TTL; solo el dueño (por identidad) puede renovarlo o liberarlo."""
+
+    _RENOVAR = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    )
+    _LIBERAR = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+    def __init__(self, url=None, clave=NOMBRE_CANDADO, ttl=None):
+        import redis
+
+        self.cliente = redis.Redis.from_url(url or settings.REDIS_URL)
+        self.clave = clave
+        self.ttl_ms = int((ttl or getattr(settings, "SCHEDULER_CANDADO_TTL", 60)) * 1000)
+        self.identidad = _identidad()
+
+    def adquirir(self):
+        try:
+            return bool(self.cliente.set(self.clave, self.identidad, nx=True, px=self.ttl_ms))
+        except Exception as e:
+            logger.warning("Candado Redis no disponible: %s", e)
+            return False
+
+    def renovar(self):
+        try:
+            return bool(self.cliente.eval(self._RENOVAR, 1, self.clave, self.identidad, self.ttl_ms))
+        except Exception as e:
+            logger.warning("No se pudo renovar el candado Redis: %s", e)
+            return False
+
+    def liberar(self):
+        try:
+            self.cliente.eval(self._LIBERAR, 1, self.clave, self.identidad)
+        except Exception:
+            pass
+
+
+class CandadoArchivo:
+    """flock exclusivo y no bloqueante sobre un archivo; el SO lo libera si el proceso muere."""
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta or getattr(
+            settings, "SCHEDULER_CANDADO_ARCHIVO", os.path.join(tempfile.gettempdir(), "sst_scheduler.lock")
+        )
+        self._archivo = None
+
+    def adquirir(self):
+        import fcntl
+
+        if self._archivo is not None:
+            return True
+        archivo = open(self.ruta, "a+")
+        try:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.close()
+            return False
+        archivo.seek(0)
+        archivo.truncate()
+        archivo.write(_identidad())
+        archivo.flush()
+        self._archivo = archivo
+        return True
+
+    def renovar(self):
+        return self._archivo is not None
+
+    def liberar(self):
+        import fcntl
+
+        if self._archivo is not None:
+            fcntl.flock(self._archivo.fileno(), fcntl.LOCK_UN)
+            self._archivo.close()
+            self._archivo = None
+
+
+def candado_lider(tipo=None):
+    """
+    Candado según SCHEDULER_CANDADO ("auto", "postgres", "redis" o "archivo").
+    En "auto": PostgreSQL si es la BD, si no Redis si es el backend de caché, si no archivo.
+    """
+    from django.db import connection
+
+    tipo = tipo or getattr(settings, "SCHEDULER_CANDADO", "auto")
+    if tipo == "auto":
+        if connection.vendor == "postgresql":
+            tipo = "postgres"
+        elif "Redis" in settings.CACHES["default"]["BACKEND"]:
+            tipo = "redis"
+        else:
+            tipo = "archivo"
+
+    if tipo == "postgres":
+        return CandadoPostgres()
+    if tipo == "redis":
+        return CandadoRedis()
+    if tipo == "archivo":
+        return CandadoArchivo()
+    raise ValueError(f"SCHEDULER_CANDADO desconocido: {tipo}")
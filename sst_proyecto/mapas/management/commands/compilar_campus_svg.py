@@ -0,0 +1,30 @@
+"""
+Compila el plano SVG del campus (capa base de /mapas/campus/).
+
+Uso:
+    python manage.py compilar_campus_svg
+    python manage.py compilar_campus_svg --proyectar     (calcula svg_x/svg_y de los edificios que no los tienen)
+    python manage.py compilar_campus_svg --recalcular    (reproyecta todos los edificios desde su GPS)
+
+No es obligatorio: la vista compila el plano la primera vez que lo necesita
+tras un cambio del mapa. Sirve para dejarlo listo en un despliegue.
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Compila el plano SVG estático del campus"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--proyectar", action="store_true", help="Proyecta los edificios sin svg_x/svg_y")
+        parser.add_argument("--recalcular", action="store_true", help="Reproyecta todos los edificios")
+
+    def handle(self, *args, **options):
+        from mapas.plano_svg import proyectar_edificios, url_plano
+
+        if options["proyectar"] or options["recalcular"]:
+            total = proyectar_edificios(recalcular=options["recalcular"])
+            self.stdout.write(f"{total} edificio(s) proyectados.")
+
+        self.stdout.write(self.style.SUCCESS(f"Plano del campus: {url_plano()}"))
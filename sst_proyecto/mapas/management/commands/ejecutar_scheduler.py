@@ -0,0 +1,57 @@
+"""
+Proceso del scheduler de tareas programadas (mapas/scheduler.py).
+
+Uso:
+    cd sst_proyecto
+    python manage.py ejecutar_scheduler
+    python manage.py ejecutar_scheduler --candado redis
+    python manage.py ejecutar_scheduler --listar
+
+Puede lanzarse en varios hosts para tener respaldo: solo el proceso que obtiene
+el candado de liderazgo ejecuta las tareas; los demás quedan en reserva y toman
+el relevo si el líder cae. Termina limpiamente con SIGTERM/SIGINT liberando el
+candado. Las duraciones de cada ejecución quedan en DjangoJobExecution.
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las tareas programadas en un único proceso líder (elección por candado)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--candado",
+            choices=["auto", "postgres", "redis", "archivo"],
+            help="Tipo de candado de liderazgo (default: settings.SCHEDULER_CANDADO)",
+        )
+        parser.add_argument("--intervalo", type=float, help="Segundos entre intentos/renovaciones del candado")
+        parser.add_argument("--listar", action="store_true", help="Muestra las tareas registradas y termina")
+
+    def handle(self, *args, **options):
+        from mapas.liderazgo import candado_lider
+        from mapas.scheduler import TAREAS, LiderScheduler
+
+        if options["listar"]:
+            for id_tarea, (_, trigger, nombre) in TAREAS.items():
+                self.stdout.write(f"{id_tarea:40} {trigger}  {nombre}")
+            return
+
+        lider = LiderScheduler(candado=candado_lider(options["candado"]), intervalo=options["intervalo"])
+
+        def terminar(signum, frame):
+            self.stdout.write("Deteniendo scheduler...")
+            lider.detener.set()
+
+        signal.signal(signal.SIGTERM, terminar)
+        signal.signal(signal.SIGINT, terminar)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scheduler en espera de liderazgo ({type(lider.candado).__name__}, {len(TAREAS)} tareas)"
+            )
+        )
+        lider.ejecutar()
+        self.stdout.write("Scheduler detenido.")
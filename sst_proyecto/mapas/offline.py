@@ -0,0 +1,67 @@
+"""
+Paquete offline del mapa de evacuación.
+
+Durante una emergencia la red celular se satura justo cuando más se necesita
+la ruta al punto de encuentro. El service worker (static/sw.js) guarda este
+paquete y, si /api/mapas/api/ruta/ no responde, el navegador calcula la ruta
+localmente (static/js/ruta_offline.js) sin volver al servidor.
+
+Contenido (JSON compacto):
+
+    formato           versión del formato del paquete
+    edificios         FeatureCollection (mismas capas que mapas/capas.py)
+    puntos_encuentro  FeatureCollection
+    grafo             FeatureCollection de nodos y tramos
+    siguiente_salto   {nodo_id: [siguiente_nodo_id | null, metros, punto_encuentro_id]}
+    velocidad_m_min   velocidad de evacuación para estimar el tiempo
+
+La tabla de siguiente salto es routing.tabla_evacuacion() (un único Dijkstra
+sobre el grafo cacheado): para cualquier nodo da la distancia al punto de
+encuentro más cercano y el vecino por el que seguir, así que en el cliente la
+ruta es recorrer la tabla. Coincide con calcular_ruta_mas_corta(), también en
+los pesos dinámicos (mapas/pesos.py). Se versiona y cachea igual que el paquete
+de capas, pero cambia con version_capas() y con version_pesos(): un cambio de
+estado de un edificio cambia la tabla y el service worker descarga el paquete nuevo.
+"""
+
+import hashlib
+import json
+
+FORMATO = 1
+
+_PREFIJO = "mapas:offline"
+
+
+def construir_paquete():
+    """Diccionario del paquete offline, construido desde la BD."""
+    from .capas import capa_edificios, capa_grafo, capa_puntos_encuentro
+    from .routing import VELOCIDAD_METROS_POR_MINUTO, tabla_evacuacion
+
+    _, tabla, _ = tabla_evacuacion()
+    return {
+        "formato": FORMATO,
+        "edificios": capa_edificios(),
+        "puntos_encuentro": capa_puntos_encuentro(),
+        "grafo": capa_grafo(),
+        "siguiente_salto": tabla,
+        "velocidad_m_min": VELOCIDAD_METROS_POR_MINUTO,
+    }
+
+
+def serializar_paquete():
+    contenido = json.dumps(construir_paquete(), ensure_ascii=False, separators=(",", ":")).encode()
+    return hashlib.sha256(contenido).hexdigest()[:20], contenido
+
+
+def paquete_actual():
+    """(hash, bytes) del paquete offline vigente."""
+    from .capas import paquete_versionado, version_capas
+    from .pesos import version_pesos
+
+    return paquete_versionado(_PREFIJO, serializar_paquete, version=f"{version_capas()}:{version_pesos()}")
+
+
+def paquete_por_huella(huella):
+    from django.core.cache import cache
+
+    return cache.get(f"{_PREFIJO}:{huella}")
@@ -0,0 +1,190 @@
+"""
+Pesos dinámicos del grafo de rutas de evacuación.
+
+construir_grafo() deja en cada tramo su longitud ("metros"). Dijkstra usa
+"weight": esa longitud multiplicada por un factor según el tipo del tramo
+(escaleras y rampas son más lentas con gente evacuando) y según el estado de
+los edificios cercanos. Así las rutas evitan pasar junto a un edificio dañado
+o en emergencia mientras exista otra opción.
+
+Un tramo está cerca de un edificio si uno de sus nodos pertenece al edificio
+(NodoCamino.edificio) o si pasa a menos de RADIO_PELIGRO_M de su posición.
+Cuando lo afectan varios edificios se toma el factor mayor. Un factor None
+retira el tramo: su peso queda en None y peso_tramo() hace que NetworkX lo
+ignore. Los factores por defecto son finitos para que quien ya está junto al
+edificio conserve una salida. Se pueden reemplazar con RUTAS_FACTOR_ESTADO y
+RUTAS_FACTOR_TIPO_TRAMO en settings.
+
+Los pesos se recalculan sin reconstruir el grafo cacheado
+(routing.grafo_cacheado). Un cambio de EstadoEdificio cambia version_pesos(),
+y cada proceso recalcula solo los pesos, sin leer nodos ni tramos. El grafo
+vigente no se modifica (puede haber un Dijkstra recorriéndolo): aplicar_pesos()
+devuelve una copia con los pesos nuevos, que reemplaza al anterior en la caché.
+También informa qué nodos tocan tramos que se encarecieron y si alguno se abarató. Con eso las cachés derivadas saben qué recalcular: la
+tabla de evacuación y los árboles de asignacion.py.
+"""
+
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+
+FACTOR_TIPO_TRAMO = {"ESCALERA": 1.5, "RAMPA": 1.2}
+
+# Factor de los tramos cercanos a un edificio en cada estado (NORMAL = 1)
+FACTOR_ESTADO = {"EVACUANDO": 2.0, "CERRADO": 2.0, "DANADO": 5.0, "EN_EMERGENCIA": 10.0}
+
+RADIO_PELIGRO_M = 25
+
+_CLAVE_VERSION = "mapas:pesos:version"
+_RADIO_TIERRA = 6371000
+
+
+def peso_tramo(u, v, datos):
+    """Función de peso para NetworkX: un tramo con peso None queda fuera de la búsqueda."""
+    return datos["weight"]
+
+
+# ─── Versión ─────────────────────────────────────────────────────────────────
+
+
+def version_pesos():
+    """Marca opaca que cambia con cada cambio de estado de un edificio."""
+    import uuid
+
+    version = cache.get(_CLAVE_VERSION)
+    if version is None:
+        cache.add(_CLAVE_VERSION, uuid.uuid4().hex, None)
+        version = cache.get(_CLAVE_VERSION)
+    return version
+
+
+def marcar_cambio_pesos():
+    import uuid
+
+    cache.set(_CLAVE_VERSION, uuid.uuid4().hex, None)
+
+
+# ─── Cálculo ─────────────────────────────────────────────────────────────────
+
+
+def estados_activos():
+    """[(edificio_id, lat, lng, estado)] de los edificios activos que no están en NORMAL."""
+    from .models import EdificioBloque
+
+    return list(
+        EdificioBloque.objects.filter(activo=True, estado_actual__isnull=False)
+        .exclude(estado_actual__estado="NORMAL")
+        .values_list("id", "latitud", "longitud", "estado_actual__estado")
+    )
+
+
+def _factor(valor):
+    return math.inf if valor is None else float(valor)
+
+
+def _proyeccion(lat0):
+    """(metros por grado de longitud, metros por grado de latitud) alrededor de lat0."""
+    por_grado = math.radians(1) * _RADIO_TIERRA
+    return por_grado * math.cos(math.radians(lat0)), por_grado
+
+
+def _tramos(G):
+    """Geometría de los tramos de G en metros (arreglos numpy); se guarda en G.graph."""
+    import numpy as np
+
+    tramos = G.graph.get("tramos")
+    if tramos is not None:
+        return tramos
+    aristas = list(G.edges)
+    lat0 = float(np.mean([d["lat"] for _, d in G.nodes(data=True)])) if aristas else 0.0
+    kx, ky = _proyeccion(lat0)
+
+    def columna(extremo, clave, k):
+        return np.array([G.nodes[arista[extremo]][clave] * k for arista in aristas], dtype=float)
+
+    def edificio(extremo):
+        return np.array([G.nodes[arista[extremo]].get("edificio") or -1 for arista in aristas], dtype=np.int64)
+
+    tramos = {
+        "aristas": aristas,
+        "lat0": lat0,
+        "x1": columna(0, "lng", kx),
+        "y1": columna(0, "lat", ky),
+        "x2": columna(1, "lng", kx),
+        "y2": columna(1, "lat", ky),
+        "edificio1": edificio(0),
+        "edificio2": edificio(1),
+        "metros": np.array([G.edges[arista]["metros"] for arista in aristas], dtype=float),
+        "tipos": [G.edges[arista].get("tipo") for arista in aristas],
+    }
+    G.graph["tramos"] = tramos
+    return tramos
+
+
+def _distancia_a_tramos(tramos, x, y):
+    """Distancia en metros del punto (x, y) a cada tramo (segmento)."""
+    import numpy as np
+
+    x1, y1 = tramos["x1"], tramos["y1"]
+    dx, dy = tramos["x2"] - x1, tramos["y2"] - y1
+    largo2 = dx * dx + dy * dy
+    t = np.clip(((x - x1) * dx + (y - y1) * dy) / np.where(largo2 > 0, largo2, 1), 0, 1)
+    return np.hypot(x1 + t * dx - x, y1 + t * dy - y)
+
+
+def calcular_pesos(G, estados):
+    """Peso de cada tramo de G (en el orden de G.edges; inf = retirado) para `estados`."""
+    import numpy as np
+
+    tramos = _tramos(G)
+    if not tramos["aristas"]:
+        return tramos, np.array([])
+    factores_tipo = getattr(settings, "RUTAS_FACTOR_TIPO_TRAMO", FACTOR_TIPO_TRAMO)
+    factores_estado = getattr(settings, "RUTAS_FACTOR_ESTADO", FACTOR_ESTADO)
+
+    factor = np.array([_factor(factores_tipo.get(tipo, 1)) for tipo in tramos["tipos"]])
+    cercania = np.ones(len(tramos["aristas"]))
+    kx, ky = _proyeccion(tramos["lat0"])
+    for edificio_id, lat, lng, estado in estados:
+        factor_estado = _factor(factores_estado.get(estado, 1))
+        if factor_estado == 1:
+            continue
+        cerca = (
+            (_distancia_a_tramos(tramos, lng * kx, lat * ky) <= RADIO_PELIGRO_M)
+            | (tramos["edificio1"] == edificio_id)
+            | (tramos["edificio2"] == edificio_id)
+        )
+        cercania = np.where(cerca, np.maximum(cercania, factor_estado), cercania)
+    total = factor * cercania
+    with np.errstate(invalid="ignore"):
+        return tramos, np.where(np.isinf(total), np.inf, tramos["metros"] * total)
+
+
+def aplicar_pesos(G, estados):
+    """
+    Pesos para `estados` [(edificio_id, lat, lng, estado)] sin modificar G.
+    Retorna (grafo, nodos de los tramos que se encarecieron o retiraron, True si
+    alguno se abarató o volvió); grafo es G si ningún peso cambia y, si no, una copia.
+    """
+    tramos, pesos = calcular_pesos(G, estados)
+    nuevos = {}
+    encarecidos = set()
+    abaratado = False
+    for (u, v), peso in zip(tramos["aristas"], pesos.tolist()):
+        weight = G[u][v]["weight"]
+        actual = math.inf if weight is None else weight
+        if peso == actual:
+            continue
+        if peso > actual:
+            encarecidos.update((u, v))
+        else:
+            abaratado = True
+        nuevos[u, v] = None if math.isinf(peso) else peso
+    if not nuevos:
+        return G, frozenset(), False
+    # copy() duplica los atributos de nodos y tramos; G.graph (geometría de _tramos) se comparte
+    copia = G.copy()
+    for (u, v), peso in nuevos.items():
+        copia[u][v]["weight"] = peso
+    return copia, frozenset(encarecidos), abaratado
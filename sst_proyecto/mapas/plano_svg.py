@@ -0,0 +1,224 @@
+"""
+Compilador del plano SVG del campus (capa base estática de campus_svg).
+
+La geometría (edificios, puntos de encuentro y tramos del grafo) solo cambia
+cuando se edita el mapa, así que se compila una vez en un documento SVG
+minificado y se guarda en MEDIA_ROOT/mapas/campus/campus.<hash>.svg: el nombre
+cambia con el contenido y el archivo se sirve como estático cacheable. Sobre
+ese plano el navegador solo colorea cada edificio (#edificio-<id>) según
+estados_edificios y el tópico "mapa_estados".
+
+Proyección GPS → SVG: equirectangular local, fija, centrada en la geocerca
+del centro y a ESCALA unidades por metro, así que las coordenadas de un
+edificio no dependen de los demás. proyectar_edificios() la persiste en
+svg_x / svg_y (comando compilar_campus_svg --proyectar).
+"""
+
+import hashlib
+import logging
+import math
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Centro de la proyección (el de la geocerca) y unidades SVG por metro
+CENTRO_LAT = 5.7303596
+CENTRO_LNG = -72.8943613
+ESCALA = 4
+RADIO_TIERRA = 6371000
+MARGEN = 40
+
+# Archivos compilados que se conservan (los anteriores pueden seguir en cachés de navegador)
+ARCHIVOS_CONSERVADOS = 5
+
+
+def gps_a_svg(lat, lng):
+    """(x, y) en unidades SVG; y crece hacia el sur."""
+    metros_x = math.radians(lng - CENTRO_LNG) * RADIO_TIERRA * math.cos(math.radians(CENTRO_LAT))
+    metros_y = math.radians(lat - CENTRO_LAT) * RADIO_TIERRA
+    return round(metros_x * ESCALA, 1), round(-metros_y * ESCALA, 1)
+
+
+def svg_a_gps(x, y):
+    lat = CENTRO_LAT + math.degrees(-y / ESCALA / RADIO_TIERRA)
+    lng = CENTRO_LNG + math.degrees(x / ESCALA / (RADIO_TIERRA * math.cos(math.radians(CENTRO_LAT))))
+    return lat, lng
+
+
+def proyectar_edificios(recalcular=False):
+    """
+    Calcula svg_x / svg_y (esquina superior izquierda del rectángulo, centrado en
+    la posición GPS) de los edificios que no los tienen, o de todos con recalcular=True.
+    Retorna el número de edificios actualizados.
+    """
+    from .models import EdificioBloque
+
+    edificios = EdificioBloque.objects.all()
+    if not recalcular:
+        edificios = edificios.filter(svg_x__isnull=True) | edificios.filter(svg_y__isnull=True)
+    cambiados = []
+    for edificio in edificios:
+        x, y = gps_a_svg(edificio.latitud, edificio.longitud)
+        edificio.svg_x = round(x - edificio.svg_ancho / 2, 1)
+        edificio.svg_y = round(y - edificio.svg_alto / 2, 1)
+        cambiados.append(edificio)
+    EdificioBloque.objects.bulk_update(cambiados, ["svg_x", "svg_y"])
+    if cambiados:
+        # bulk_update no emite post_save: invalidar a mano capas y estados (llevan svg_x / svg_y)
+        from .capas import marcar_cambio_capas
+        from .estados import invalidar_estados
+
+        marcar_cambio_capas()
+        invalidar_estados()
+    return len(cambiados)
+
+
+# ─── Compilación ─────────────────────────────────────────────────────────────
+
+
+def _num(valor):
+    """Número compacto: sin decimales sobrantes."""
+    return f"{valor:.1f}".rstrip("0").rstrip(".")
+
+
+def _forma_edificio(edificio):
+    """(etiqueta, atributos, [(x, y), ...] para el viewBox, (cx, cy) del texto)."""
+    puntos = []
+    for par in edificio.poligono or []:
+        try:
+            puntos.append(gps_a_svg(float(par[0]), float(par[1])))
+        except (TypeError, ValueError, IndexError):
+            puntos = []
+            break
+    if len(puntos) >= 3:
+        cx = sum(p[0] for p in puntos) / len(puntos)
+        cy = sum(p[1] for p in puntos) / len(puntos)
+        return "polygon", f'points="{" ".join(f"{_num(x)},{_num(y)}" for x, y in puntos)}"', puntos, (cx, cy)
+
+    if edificio.svg_x is not None and edificio.svg_y is not None:
+        x, y = edificio.svg_x, edificio.svg_y
+    else:
+        cx, cy = gps_a_svg(edificio.latitud, edificio.longitud)
+        x, y = cx - edificio.svg_ancho / 2, cy - edificio.svg_alto / 2
+    w, h = edificio.svg_ancho, edificio.svg_alto
+    atributos = f'x="{_num(x)}" y="{_num(y)}" width="{_num(w)}" height="{_num(h)}"'
+    return "rect", atributos, [(x, y), (x + w, y + h)], (x + w / 2, y + h / 2)
+
+
+def compilar_svg():
+    """Documento SVG minificado (bytes) con la capa base del campus."""
+    from .models import EdificioBloque, PuntoEncuentro, TramoCamino
+
+    extremos = []
+    tramos = []
+    for t in TramoCamino.objects.filter(activo=True, nodo_origen__activo=True, nodo_destino__activo=True).values(
+        "nodo_origen__latitud", "nodo_origen__longitud", "nodo_destino__latitud", "nodo_destino__longitud", "tipo"
+    ):
+        a = gps_a_svg(t["nodo_origen__latitud"], t["nodo_origen__longitud"])
+        b = gps_a_svg(t["nodo_destino__latitud"], t["nodo_destino__longitud"])
+        extremos += [a, b]
+        tramos.append(f"M{_num(a[0])} {_num(a[1])}L{_num(b[0])} {_num(b[1])}")
+
+    edificios = []
+    for e in EdificioBloque.objects.filter(activo=True).order_by("id"):
+        etiqueta, atributos, puntos, (cx, cy) = _forma_edificio(e)
+        extremos += puntos
+        edificios.append(
+            f'<g class="edificio" id="edificio-{e.id}" data-id="{e.id}" data-tipo="{e.tipo}">'
+            f"<{etiqueta} {atributos}><title>{escape(e.nombre)}</title></{etiqueta}>"
+            f'<text x="{_num(cx)}" y="{_num(cy)}">{escape(e.nombre)}</text></g>'
+        )
+
+    puntos = []
+    for p in PuntoEncuentro.objects.filter(activo=True).order_by("prioridad", "id"):
+        x, y = gps_a_svg(p.latitud, p.longitud)
+        extremos.append((x, y))
+        puntos.append(
+            f'<circle class="punto-encuentro" id="punto-{p.id}" data-id="{p.id}" cx="{_num(x)}" cy="{_num(y)}" r="10">'
+            f"<title>{escape(p.nombre)}</title></circle>"
+        )
+
+    if extremos:
+        min_x = min(x for x, _ in extremos) - MARGEN
+        min_y = min(y for _, y in extremos) - MARGEN
+        ancho = max(x for x, _ in extremos) + MARGEN - min_x
+        alto = max(y for _, y in extremos) + MARGEN - min_y
+    else:
+        min_x, min_y, ancho, alto = -500, -500, 1000, 1000
+    caja = f"{_num(min_x)} {_num(min_y)} {_num(ancho)} {_num(alto)}"
+
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{caja}" data-escala="{ESCALA}">',
+        "<style>.edificio rect,.edificio polygon{fill:#4CAF50;stroke:#fff;stroke-width:2}"
+        ".edificio text{font:10px sans-serif;text-anchor:middle;dominant-baseline:middle;pointer-events:none}"
+        ".tramos{fill:none;stroke:#90A4AE;stroke-width:3;stroke-linecap:round}"
+        ".punto-encuentro{fill:#1565C0;stroke:#fff;stroke-width:3}</style>",
+    ]
+    if tramos:
+        partes.append(f'<path class="tramos" d="{"".join(tramos)}"/>')
+    partes.append(f'<g id="edificios">{"".join(edificios)}</g>')
+    partes.append(f'<g id="puntos-encuentro">{"".join(puntos)}</g>')
+    partes.append("</svg>")
+    return "".join(partes).encode()
+
+
+# ─── Almacenamiento ──────────────────────────────────────────────────────────
+
+
+RUTA_RELATIVA = "mapas/campus"
+
+
+def _directorio():
+    return os.path.join(settings.MEDIA_ROOT, *RUTA_RELATIVA.split("/"))
+
+
+def _guardar(contenido):
+    """Escribe campus.<hash>.svg (si no existía) y retorna el nombre del archivo."""
+    huella = hashlib.sha256(contenido).hexdigest()[:16]
+    nombre = f"campus.{huella}.svg"
+    directorio = _directorio()
+    ruta = os.path.join(directorio, nombre)
+    if not os.path.exists(ruta):
+        os.makedirs(directorio, exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+        _depurar(directorio)
+        logger.info("Plano SVG del campus compilado: %s (%s bytes)", nombre, len(contenido))
+    else:
+        os.utime(ruta)
+    return nombre
+
+
+def _depurar(directorio):
+    archivos = sorted(
+        (os.path.join(directorio, n) for n in os.listdir(directorio) if n.startswith("campus.") and n.endswith(".svg")),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    for ruta in archivos[ARCHIVOS_CONSERVADOS:]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def url_plano():
+    """
+    URL del plano compilado vigente. Se recompila solo si la geometría cambió
+    (version_capas(), que cambia con cada edición de los modelos del mapa) o si
+    el archivo ya no está en disco.
+    """
+    from .capas import version_capas
+
+    clave = f"mapas:svg:actual:{version_capas()}"
+    nombre = cache.get(clave)
+    if not nombre or not os.path.exists(os.path.join(_directorio(), nombre)):
+        nombre = _guardar(compilar_svg())
+        cache.set(clave, nombre, getattr(settings, "CACHE_TTL_CAPAS_MAPA", 7 * 86400))
+    return f"{settings.MEDIA_URL}{RUTA_RELATIVA}/{nombre}"
@@ -1,13 +1,20 @@
 """
 Servicio de cálculo de rutas peatonales para evacuación.
 Usa el grafo NodoCamino/TramoCamino y el algoritmo de Dijkstra (NetworkX).
+El grafo se cachea por proceso (grafo_cacheado), con los pesos dinámicos de
+mapas/pesos.py (estado de los edificios, tipo de tramo) aplicados en una copia,
+y las rutas en lote salen de una única tabla de evacuación (rutas_en_lote).
+Las rutas se eligen por peso y se informan en metros reales.
 """
 
 import math
 import logging
+import threading
 
 import networkx as nx
 
+from .pesos import aplicar_pesos, estados_activos, marcar_cambio_pesos, peso_tramo, version_pesos
+
 logger = logging.getLogger(__name__)
 
 # Velocidad promedio peatonal en emergencia: 5 km/h = 83.3 m/min
@@ -27,7 +34,8 @@ def haversine(lat1, lng1, lat2, lng2):
 def construir_grafo():
     """
     Lee NodoCamino y TramoCamino de la BD y construye un grafo NetworkX.
-    Retorna (grafo, dict_nodos) donde dict_nodos = {id: {lat, lng, nombre, tipo}}
+    Retorna (grafo, dict_nodos) donde dict_nodos = {id: {lat, lng, nombre, tipo}}.
+    Cada tramo lleva metros (distancia) y weight (igual a metros hasta aplicar_pesos()).
     """
     from .models import NodoCamino, TramoCamino
 
@@ -36,14 +44,18 @@ def construir_grafo():
     nodos = NodoCamino.objects.filter(activo=True)
     nodos_data = {}
     for nodo in nodos:
-        G.add_node(nodo.id, lat=nodo.latitud, lng=nodo.longitud, nombre=nodo.nombre, tipo=nodo.tipo)
+        G.add_node(
+            nodo.id, lat=nodo.latitud, lng=nodo.longitud, nombre=nodo.nombre, tipo=nodo.tipo, edificio=nodo.edificio_id
+        )
         nodos_data[nodo.id] = {"lat": nodo.latitud, "lng": nodo.longitud, "nombre": nodo.nombre, "tipo": nodo.tipo}
 
-    tramos = TramoCamino.objects.filter(activo=True).select_related("nodo_origen", "nodo_destino")
+    # Tramos con un extremo inactivo no entran: add_edge crearía el nodo sin coordenadas
+    tramos = TramoCamino.objects.filter(activo=True, nodo_origen__activo=True, nodo_destino__activo=True)
     for tramo in tramos:
         G.add_edge(
             tramo.nodo_origen_id,
             tramo.nodo_destino_id,
+            metros=tramo.distancia_metros,
             weight=tramo.distancia_metros,
             tipo=tramo.tipo,
         )
@@ -71,6 +83,246 @@ def nodo_mas_cercano(G, lat, lng, max_distancia_m=500):
     return closest_id, min_dist
 
 
+# ─── Grafo cacheado y tabla de evacuación ───────────────────────────────────
+#
+# El grafo se construye una vez por proceso y versión de las capas del mapa
+# (version_capas() cambia con cualquier edición de nodos, tramos o puntos). Los
+# cambios de estado de los edificios (version_pesos()) no lo reconstruyen: se
+# reemplaza por una copia con los pesos nuevos (quien tenga el anterior lo sigue
+# usando intacto) y se anota la revisión con los nodos afectados
+# (cambios_de_pesos). G.graph lleva la versión de capas y la revisión de pesos
+# del grafo. Sobre el grafo se calcula una sola vez por
+# revisión la tabla de evacuación: un Dijkstra desde un nodo virtual unido al
+# nodo más cercano de cada punto de encuentro, que da para cada nodo el punto de
+# encuentro más cercano por peso, los metros hasta él y el vecino por el que seguir.
+
+_SUMIDERO = "destino"
+_CACHE = {
+    "version": None,
+    "grafo": None,
+    "nodos": None,
+    "coordenadas": None,
+    "evacuacion": None,
+    "pesos": None,
+    "revision": 0,
+    "cambios": {},
+}
+_lock = threading.Lock()
+
+# Revisiones de pesos que se recuerdan para los recálculos incrementales
+MAX_CAMBIOS_PESOS = 50
+
+
+def grafo_cacheado():
+    """(G, dict_nodos) del grafo vigente con los pesos dinámicos aplicados; compartido entre peticiones, no modificarlo."""
+    from .capas import version_capas
+
+    version = version_capas()
+    pesos = version_pesos()
+    if _CACHE["version"] != version or _CACHE["pesos"] != pesos:
+        with _lock:
+            if _CACHE["version"] != version:
+                G, nodos = construir_grafo()
+                G.graph.update(capas=version, revision=_CACHE["revision"])
+                _CACHE.update(
+                    version=version, grafo=G, nodos=nodos, coordenadas=None, evacuacion=None, pesos=None, cambios={}
+                )
+            if _CACHE["pesos"] != pesos:
+                _actualizar_pesos(pesos)
+    return _CACHE["grafo"], _CACHE["nodos"]
+
+
+def _actualizar_pesos(pesos):
+    G, encarecidos, abaratado = aplicar_pesos(_CACHE["grafo"], estados_activos())
+    if encarecidos or abaratado:
+        revision = _CACHE["revision"] + 1
+        G.graph["revision"] = revision
+        cambios = _CACHE["cambios"]
+        cambios[revision] = (encarecidos, abaratado)
+        cambios.pop(revision - MAX_CAMBIOS_PESOS, None)
+        # Un solo update: los lectores ven el grafo anterior o el nuevo, nunca pesos mezclados
+        _CACHE.update(grafo=G, revision=revision, evacuacion=None)
+        logger.info("Pesos del grafo actualizados (revisión %s, %s nodos afectados)", revision, len(encarecidos))
+    _CACHE["pesos"] = pesos
+
+
+def actualizar_pesos():
+    """Tras un cambio de EstadoEdificio: nueva version_pesos() y, si el grafo ya está en memoria, pesos aplicados ya."""
+    marcar_cambio_pesos()
+    if _CACHE["grafo"] is not None:
+        grafo_cacheado()
+
+
+def cambios_de_pesos(desde, hasta=None):
+    """
+    (revisión, nodos) de los cambios de pesos del grafo cacheado posteriores a la
+    revisión `desde` y hasta `hasta` (por defecto la actual). nodos son los extremos de
+    los tramos que se encarecieron o retiraron; None si alguno se abarató o ya no hay
+    registro (lo derivado se recalcula completo).
+    """
+    revision = _CACHE["revision"] if hasta is None else hasta
+    nodos = set()
+    for numero in range(desde + 1, revision + 1):
+        cambio = _CACHE["cambios"].get(numero)
+        if cambio is None or cambio[1]:
+            return revision, None
+        nodos |= cambio[0]
+    return revision, frozenset(nodos)
+
+
+def _coordenadas(G):
+    """(ids, lat, lng) de los nodos de G como arreglos numpy (cacheados con el grafo)."""
+    import numpy as np
+
+    if _CACHE["grafo"] is G and _CACHE["coordenadas"] is not None:
+        return _CACHE["coordenadas"]
+    ids = list(G.nodes)
+    coordenadas = (
+        ids,
+        np.array([G.nodes[n]["lat"] for n in ids], dtype=float),
+        np.array([G.nodes[n]["lng"] for n in ids], dtype=float),
+    )
+    if _CACHE["grafo"] is G:
+        _CACHE["coordenadas"] = coordenadas
+    return coordenadas
+
+
+def nodos_mas_cercanos(G, posiciones, max_distancia_m=500):
+    """
+    [(nodo_id | None, distancia)] del nodo más cercano a cada (lat, lng) de
+    `posiciones`; mismo criterio que nodo_mas_cercano() pero vectorizado.
+    """
+    import numpy as np
+
+    ids, lats, lngs = _coordenadas(G)
+    if not ids:
+        return [(None, float("inf")) for _ in posiciones]
+    phi_nodos = np.radians(lats)
+    cos_nodos = np.cos(phi_nodos)
+    resultado = []
+    for lat, lng in posiciones:
+        phi = math.radians(lat)
+        a = np.sin((phi_nodos - phi) / 2) ** 2 + math.cos(phi) * cos_nodos * np.sin(np.radians(lngs - lng) / 2) ** 2
+        distancias = 6371000 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        i = int(distancias.argmin())
+        d = float(distancias[i])
+        resultado.append((ids[i], d) if d <= max_distancia_m else (None, d))
+    return resultado
+
+
+def tabla_siguiente_salto(G, puntos):
+    """
+    {nodo_id: (siguiente, metros, punto_id)} para los nodos de G que tienen camino a
+    algún punto de `puntos` (iterable de (id, lat, lng)). siguiente es None en el
+    nodo de llegada: desde ahí se camina directo al punto de encuentro. El punto y
+    el camino se eligen por peso; metros es la distancia real de ese camino.
+    """
+    if G.number_of_nodes() == 0:
+        return {}
+
+    grafo = G.copy()
+    grafo.add_node(_SUMIDERO)
+    punto_de_llegada = {}
+    for punto_id, lat, lng in puntos:
+        nodo, distancia = nodo_mas_cercano(G, lat, lng)
+        if nodo is None:
+            continue
+        actual = grafo.get_edge_data(_SUMIDERO, nodo)
+        if actual is None or distancia < actual["weight"]:
+            grafo.add_edge(_SUMIDERO, nodo, weight=distancia, metros=distancia)
+            punto_de_llegada[nodo] = punto_id
+
+    if not punto_de_llegada:
+        return {}
+
+    distancias, caminos = nx.single_source_dijkstra(grafo, _SUMIDERO, weight=peso_tramo)
+    metros = {_SUMIDERO: 0.0}
+    tabla = {}
+    # distancias está en el orden en que Dijkstra fijó cada nodo: el anterior ya tiene sus metros
+    for nodo in distancias:
+        if nodo == _SUMIDERO:
+            continue
+        # camino = [sumidero, nodo de llegada, ..., nodo]: el siguiente salto es el penúltimo
+        camino = caminos[nodo]
+        anterior = camino[-2]
+        metros[nodo] = metros[anterior] + grafo[anterior][nodo]["metros"]
+        siguiente = anterior if len(camino) > 2 else None
+        tabla[nodo] = (siguiente, round(metros[nodo], 1), punto_de_llegada[camino[1]])
+    return tabla
+
+
+def tabla_evacuacion():
+    """(G, tabla_siguiente_salto, {punto_id: punto}) del grafo cacheado, calculada una vez por revisión de pesos."""
+    from .models import PuntoEncuentro
+
+    G, _ = grafo_cacheado()
+    revision = _CACHE["revision"]
+    evacuacion = _CACHE["evacuacion"]
+    if evacuacion is None or evacuacion[0] is not G:
+        puntos = {
+            p["id"]: p for p in PuntoEncuentro.objects.filter(activo=True).values("id", "nombre", "latitud", "longitud")
+        }
+        tabla = tabla_siguiente_salto(G, [(p["id"], p["latitud"], p["longitud"]) for p in puntos.values()])
+        evacuacion = (G, tabla, puntos)
+        if _CACHE["grafo"] is G and _CACHE["revision"] == revision:
+            _CACHE["evacuacion"] = evacuacion
+    return evacuacion
+
+
+def rutas_en_lote(origenes):
+    """
+    Ruta de evacuación al punto de encuentro más cercano para cada origen
+    ({"lat", "lng", ...} o {"nodo_id", ...}) con una sola búsqueda de caminos.
+    Cada resultado conserva las claves del origen y agrega distancia_metros,
+    tiempo_minutos, encontrado y punto_encuentro (misma distancia que calcular_ruta_mas_corta).
+    """
+    G, tabla, puntos = tabla_evacuacion()
+
+    sin_nodo = [o for o in origenes if o.get("nodo_id") is None]
+    cercanos = iter(nodos_mas_cercanos(G, [(o["lat"], o["lng"]) for o in sin_nodo]))
+
+    resultados = []
+    for origen in origenes:
+        if origen.get("nodo_id") is not None:
+            nodo, distancia_inicio = origen["nodo_id"], 0.0
+        else:
+            nodo, distancia_inicio = next(cercanos)
+        salto = tabla.get(nodo)
+        fila = dict(origen)
+        if salto is None:
+            fila.update(distancia_metros=None, tiempo_minutos=None, encontrado=False, punto_encuentro=None)
+        else:
+            punto = puntos[salto[2]]
+            distancia = distancia_inicio + salto[1]
+            fila.update(
+                distancia_metros=round(distancia, 1),
+                tiempo_minutos=round(distancia / VELOCIDAD_METROS_POR_MINUTO, 1),
+                encontrado=True,
+                punto_encuentro={"id": punto["id"], "nombre": punto["nombre"]},
+            )
+        resultados.append(fila)
+    return resultados
+
+
+def origenes_entradas():
+    """Orígenes del lote "todas las entradas de edificio": nodos activos con edificio."""
+    from .models import NodoCamino
+
+    return [
+        {
+            "nodo_id": n["id"],
+            "etiqueta": n["nombre"] or n["edificio__nombre"],
+            "edificio_id": n["edificio_id"],
+            "edificio": n["edificio__nombre"],
+            "lat": n["latitud"],
+            "lng": n["longitud"],
+        }
+        for n in NodoCamino.objects.filter(activo=True, edificio__isnull=False)
+        .order_by("edificio__nombre", "id")
+        .values("id", "nombre", "edificio_id", "edificio__nombre", "latitud", "longitud")
+    ]
+
+
 def calcular_ruta(lat_usuario, lng_usuario, punto_encuentro_id):
     """
     Calcula la ruta peatonal más corta desde la posición del usuario
@@ -82,7 +334,13 @@ def calcular_ruta(lat_usuario, lng_usuario, punto_encuentro_id):
         - tiempo_minutos: float
         - encontrado: bool (False si no hay grafo o no hay camino)
         - mensaje: str descriptivo
+    El camino es el de menor peso (mapas/pesos.py); la distancia, la real en metros.
     """
+    return _calcular_ruta(lat_usuario, lng_usuario, punto_encuentro_id)[0]
+
+
+def _calcular_ruta(lat_usuario, lng_usuario, punto_encuentro_id):
+    """(resultado de calcular_ruta, costo por peso para comparar puntos de encuentro; inf sin ruta)."""
     from .models import PuntoEncuentro
 
     resultado_vacio = {
@@ -97,9 +355,9 @@ def calcular_ruta(lat_usuario, lng_usuario, punto_encuentro_id):
         punto = PuntoEncuentro.objects.get(id=punto_encuentro_id, activo=True)
     except PuntoEncuentro.DoesNotExist:
         resultado_vacio["mensaje"] = "Punto de encuentro no encontrado."
-        return resultado_vacio
+        return resultado_vacio, math.inf
 
-    G, _ = construir_grafo()
+    G, _ = grafo_cacheado()
 
     if G.number_of_nodes() == 0:
         # Sin grafo definido: devuelve línea directa como fallback
@@ -112,33 +370,34 @@ def calcular_ruta(lat_usuario, lng_usuario, punto_encuentro_id):
         dist = haversine(lat_usuario, lng_usuario, punto.latitud, punto.longitud)
         resultado_vacio["distancia_metros"] = round(dist, 1)
         resultado_vacio["tiempo_minutos"] = round(dist / VELOCIDAD_METROS_POR_MINUTO, 1)
-        return resultado_vacio
+        return resultado_vacio, dist
 
     # Nodo más cercano al usuario
     nodo_inicio_id, dist_al_inicio = nodo_mas_cercano(G, lat_usuario, lng_usuario)
     if nodo_inicio_id is None:
         resultado_vacio["mensaje"] = "No hay nodos de camino cercanos a tu ubicación."
         resultado_vacio["waypoints"] = [[lat_usuario, lng_usuario], [punto.latitud, punto.longitud]]
-        return resultado_vacio
+        return resultado_vacio, math.inf
 
     # Nodo más cercano al punto de encuentro
     nodo_fin_id, dist_al_fin = nodo_mas_cercano(G, punto.latitud, punto.longitud)
     if nodo_fin_id is None:
         resultado_vacio["mensaje"] = "No hay nodos de camino cercanos al punto de encuentro."
         resultado_vacio["waypoints"] = [[lat_usuario, lng_usuario], [punto.latitud, punto.longitud]]
-        return resultado_vacio
+        return resultado_vacio, math.inf
 
-    # Dijkstra
+    # Dijkstra por peso; la distancia se suma en metros sobre el camino elegido
     try:
-        path_ids = nx.dijkstra_path(G, nodo_inicio_id, nodo_fin_id, weight="weight")
-        distancia_grafo = nx.dijkstra_path_length(G, nodo_inicio_id, nodo_fin_id, weight="weight")
+        costo_grafo, path_ids = nx.single_source_dijkstra(G, nodo_inicio_id, nodo_fin_id, weight=peso_tramo)
     except nx.NetworkXNoPath:
         resultado_vacio["mensaje"] = "No existe camino entre los puntos. Revisa que el grafo esté conectado."
         resultado_vacio["waypoints"] = [[lat_usuario, lng_usuario], [punto.latitud, punto.longitud]]
-        return resultado_vacio
+        return resultado_vacio, math.inf
     except nx.NodeNotFound:
         resultado_vacio["mensaje"] = "Error en el grafo de caminos."
-        return resultado_vacio
+        return resultado_vacio, math.inf
+
+    distancia_grafo = sum(G[u][v]["metros"] for u, v in zip(path_ids, path_ids[1:]))
 
     # Construir lista de waypoints completa:
     # posición real del usuario → nodos del grafo → posición real del punto de encuentro
@@ -151,7 +410,7 @@ def calcular_ruta(lat_usuario, lng_usuario, punto_encuentro_id):
     # Distancia total = tramo usuario→nodo_inicio + grafo + nodo_fin→punto
     distancia_total = dist_al_inicio + distancia_grafo + dist_al_fin
 
-    return {
+    resultado = {
         "waypoints": waypoints,
         "distancia_metros": round(distancia_total, 1),
         "tiempo_minutos": round(distancia_total / VELOCIDAD_METROS_POR_MINUTO, 1),
@@ -164,11 +423,12 @@ def calcular_ruta(lat_usuario, lng_usuario, punto_encuentro_id):
             "lng": punto.longitud,
         },
     }
+    return resultado, dist_al_inicio + costo_grafo + dist_al_fin
 
 
 def calcular_ruta_mas_corta(lat_usuario, lng_usuario):
     """
-    Entre todos los puntos de encuentro activos, calcula la ruta más corta.
+    Entre todos los puntos de encuentro activos, calcula la ruta más corta (por peso).
     Retorna el mismo dict que calcular_ruta() para el punto de encuentro óptimo.
     """
     from .models import PuntoEncuentro
@@ -177,12 +437,12 @@ def calcular_ruta_mas_corta(lat_usuario, lng_usuario):
     if not puntos.exists():
         return {"encontrado": False, "mensaje": "No hay puntos de encuentro activos.", "waypoints": []}
 
-    mejor = None
+    mejor, mejor_costo = None, math.inf
     for punto in puntos:
-        resultado = calcular_ruta(lat_usuario, lng_usuario, punto.id)
+        resultado, costo = _calcular_ruta(lat_usuario, lng_usuario, punto.id)
         if resultado["distancia_metros"] > 0:
-            if mejor is None or resultado["distancia_metros"] < mejor["distancia_metros"]:
-                mejor = resultado
+            if mejor is None or costo < mejor_costo:
+                mejor, mejor_costo = resultado, costo
 
     return mejor or {"encontrado": False, "mensaje": "No se pudo calcular ninguna ruta.", "waypoints": []}
 
@@ -223,3 +483,28 @@ def grafo_como_json():
     )
 
     return {"nodos": nodos, "tramos": tramos}
+
+
+COLUMNAS_CSV_LOTE = [
+    ("etiqueta", "Origen"),
+    ("edificio", "Edificio"),
+    ("lat", "Latitud"),
+    ("lng", "Longitud"),
+    ("punto_encuentro", "Punto de encuentro"),
+    ("distancia_metros", "Distancia (m)"),
+    ("tiempo_minutos", "Tiempo (min)"),
+]
+
+
+def lote_a_csv(resultados):
+    """CSV (bytes, UTF-8 con BOM para Excel) de rutas_en_lote() para el informe del simulacro."""
+    import csv
+    import io
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([titulo for _, titulo in COLUMNAS_CSV_LOTE])
+    for fila in resultados:
+        valores = dict(fila, punto_encuentro=(fila["punto_encuentro"] or {}).get("nombre", "Sin ruta"))
+        writer.writerow(["" if valores.get(clave) is None else valores[clave] for clave, _ in COLUMNAS_CSV_LOTE])
+    return buffer.getvalue().encode("utf-8-sig")
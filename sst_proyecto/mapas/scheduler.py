@@ -1,8 +1,49 @@
+"""
+Tareas programadas del sistema SST.
+
+Todas las tareas se registran en TAREAS y las ejecuta un único proceso líder:
+
+    python manage.py ejecutar_scheduler
+
+Varios procesos pueden lanzar el comando (uno por servidor, por ejemplo); solo el
+que obtiene el candado de liderazgo (mapas/liderazgo.py) ejecuta las tareas, los
+demás esperan en reserva y toman el relevo si el líder cae. Los workers ASGI ya no
+arrancan su propio scheduler: con N workers cada tarea se disparaba N veces.
+
+Cada ejecución queda registrada con su duración en DjangoJobExecution (admin de
+django_apscheduler) y en el log "mapas.scheduler".
+"""
+
+import functools
+import logging
+import time
+
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from django_apscheduler.jobstores import DjangoJobStore
+from django_apscheduler.util import close_old_connections
+
+logger = logging.getLogger(__name__)
 
+ZONA_HORARIA = "America/Bogota"
 
+
+def tarea(funcion):
+    """Decora una tarea: conexiones de BD frescas y registro de su duración."""
+
+    @functools.wraps(funcion)
+    @close_old_connections
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            logger.info("Tarea %s terminada en %.2f s", funcion.__name__, time.perf_counter() - inicio)
+
+    return envoltura
+
+
+@tarea
 def verificar_revisiones_equipos():
     """Verifica equipos con revision pendiente y notifica a la Brigada."""
     from usuarios.services import NotificacionService
@@ -14,38 +55,211 @@ def verificar_revisiones_equipos():
         print("[Scheduler] Sin equipos pendientes de revision para hoy.")
 
 
+@tarea
 def desactivar_cuentas_visitantes():
     """Desactiva todas las cuentas de visitantes al finalizar el día."""
+    from usuarios.authentication import invalidar_tokens_de_usuarios
     from usuarios.models import Usuario
 
-    total = Usuario.objects.filter(rol="VISITANTE", activo=True).update(activo=False, is_active=False)
+    # update() no emite señales: los tokens cacheados se descartan a mano
+    ids = list(Usuario.objects.filter(rol="VISITANTE", activo=True).values_list("id", flat=True))
+    total = Usuario.objects.filter(id__in=ids).update(activo=False, is_active=False)
+    invalidar_tokens_de_usuarios(ids)
     if total:
         print(f"[Scheduler] {total} cuenta(s) de visitante desactivadas al finalizar el día.")
 
 
-def iniciar_scheduler():
-    scheduler = BackgroundScheduler(timezone="America/Bogota")
-    scheduler.add_jobstore(DjangoJobStore(), "default")
+@tarea
+def reconciliar_contadores_no_leidas():
+    """Recalcula desde la BD los contadores cacheados de notificaciones no leídas."""
+    from usuarios.utils import reconciliar_no_leidas
+
+    total = reconciliar_no_leidas()
+    print(f"[Scheduler] {total} contador(es) de notificaciones no leídas reconciliados.")
+
+
+@tarea
+def archivar_datos_vencidos():
+    """Archiva y elimina los datos fuera de su ventana de retención (RETENCION_DATOS)."""
+    from django.core.management import call_command
+
+    call_command("archivar_datos")
+
+
+@tarea
+def mantener_particiones_accesos():
+    """Crea las particiones mensuales futuras de RegistroAcceso si la tabla está particionada."""
+    from control_acceso.models import RegistroAcceso
+    from sst_proyecto import retencion
+
+    if retencion.es_particionada(RegistroAcceso._meta.db_table):
+        retencion.crear_particiones_futuras(RegistroAcceso)
+
+
+@tarea
+def verificar_visitantes_exceden_tiempo():
+    """Avisa a Vigilancia de los visitantes que superan el tiempo permitido."""
+    from usuarios.services import NotificacionService
+
+    total = NotificacionService.verificar_visitantes_exceden_tiempo()
+    if total:
+        print(f"[Scheduler] {total} visitante(s) exceden el tiempo permitido.")
+
 
-    scheduler.add_job(
+@tarea
+def notificar_equipos_proximos_vencer():
+    """Resumen semanal a la Brigada de los equipos con revisión en los próximos 7 días."""
+    from usuarios.services import NotificacionService
+
+    NotificacionService.notificar_equipos_proximos_vencer()
+
+
+@tarea
+def generar_reportes_programados():
+    """Genera los reportes configurados como activos según su frecuencia."""
+    from django.core.management import call_command
+
+    call_command("generar_reportes", "--todos", "--guardar", "--enviar-email")
+
+
+@tarea
+def depurar_eventos_ocupacion():
+    """Recorta el log de eventos del feed de ocupación (OCUPACION_EVENTOS_DIAS)."""
+    from control_acceso.utils import depurar_eventos_ocupacion as depurar
+
+    borrados = depurar()
+    if borrados:
+        print(f"[Scheduler] {borrados} evento(s) de ocupación depurados.")
+
+
+# id → (función, trigger, descripción)
+TAREAS = {
+    "verificar_revisiones_equipos": (
         verificar_revisiones_equipos,
-        trigger=CronTrigger(hour=7, minute=0),
-        id="verificar_revisiones_equipos",
-        name="Notificar revisiones de equipos a la Brigada",
-        jobstore="default",
-        replace_existing=True,
-    )
-
-    scheduler.add_job(
+        CronTrigger(hour=7, minute=0),
+        "Notificar revisiones de equipos a la Brigada",
+    ),
+    "notificar_equipos_proximos_vencer": (
+        notificar_equipos_proximos_vencer,
+        CronTrigger(day_of_week="mon", hour=7, minute=5),
+        "Resumen semanal de equipos próximos a revisión",
+    ),
+    "verificar_visitantes_exceden_tiempo": (
+        verificar_visitantes_exceden_tiempo,
+        CronTrigger(minute=0),
+        "Avisar visitantes que exceden el tiempo permitido",
+    ),
+    "generar_reportes_programados": (
+        generar_reportes_programados,
+        CronTrigger(hour=6, minute=0),
+        "Generar reportes programados (generar_reportes --todos)",
+    ),
+    "desactivar_cuentas_visitantes": (
         desactivar_cuentas_visitantes,
-        trigger=CronTrigger(hour=23, minute=59),
-        id="desactivar_cuentas_visitantes",
-        name="Desactivar cuentas de visitantes al finalizar el día",
-        jobstore="default",
-        replace_existing=True,
-    )
-
-    scheduler.start()
-    print(
-        "[Scheduler] Iniciado — revisiones de equipos a las 7:00 AM, cuentas de visitantes se desactivan a las 11:59 PM."
-    )
+        CronTrigger(hour=23, minute=59),
+        "Desactivar cuentas de visitantes al finalizar el día",
+    ),
+    "reconciliar_contadores_no_leidas": (
+        reconciliar_contadores_no_leidas,
+        CronTrigger(minute=15),
+        "Reconciliar contadores de notificaciones no leídas",
+    ),
+    "archivar_datos_vencidos": (
+        archivar_datos_vencidos,
+        CronTrigger(hour=2, minute=30),
+        "Archivar datos fuera de la ventana de retención",
+    ),
+    "depurar_eventos_ocupacion": (
+        depurar_eventos_ocupacion,
+        CronTrigger(hour=3, minute=0),
+        "Depurar el log de eventos del feed de ocupación",
+    ),
+    "mantener_particiones_accesos": (
+        mantener_particiones_accesos,
+        CronTrigger(day=1, hour=1, minute=0),
+        "Crear particiones mensuales futuras de registros de acceso",
+    ),
+}
+
+
+def crear_scheduler(jobstore=None):
+    """Scheduler con todas las TAREAS registradas (aún sin iniciar)."""
+    scheduler = BackgroundScheduler(timezone=ZONA_HORARIA)
+    scheduler.add_jobstore(jobstore or DjangoJobStore(), "default")
+    for id_tarea, (funcion, trigger, nombre) in TAREAS.items():
+        scheduler.add_job(
+            funcion,
+            trigger=trigger,
+            id=id_tarea,
+            name=nombre,
+            jobstore="default",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=600,
+        )
+    return scheduler
+
+
+class LiderScheduler:
+    """
+    Bucle de elección de líder: en reserva intenta tomar el candado cada
+    `intervalo` segundos; como líder arranca el scheduler y renueva el candado.
+    Si pierde el candado detiene el scheduler y vuelve a reserva.
+    """
+
+    def __init__(self, candado=None, intervalo=None, crear=crear_scheduler):
+        import threading
+
+        from django.conf import settings
+
+        from mapas.liderazgo import candado_lider
+
+        self.candado = candado or candado_lider()
+        self.intervalo = intervalo or max(getattr(settings, "SCHEDULER_CANDADO_TTL", 60) / 3, 1)
+        self.crear = crear
+        self.scheduler = None
+        self.detener = threading.Event()
+
+    @property
+    def es_lider(self):
+        return self.scheduler is not None
+
+    def paso(self):
+        """Una iteración del bucle; retorna True si este proceso es líder al terminar."""
+        if self.es_lider:
+            if not self.candado.renovar():
+                logger.warning("Liderazgo del scheduler perdido; deteniendo tareas.")
+                self._detener_scheduler()
+        elif self.candado.adquirir():
+            self.scheduler = self.crear()
+            self.scheduler.start()
+            logger.info("Liderazgo del scheduler adquirido (%s tareas).", len(TAREAS))
+            print(f"[Scheduler] Líder: {len(TAREAS)} tareas programadas.")
+        return self.es_lider
+
+    def ejecutar(self):
+        try:
+            while not self.detener.is_set():
+                self.paso()
+                self.detener.wait(self.intervalo)
+        finally:
+            self._detener_scheduler()
+            self.candado.liberar()
+
+    def _detener_scheduler(self):
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+
+
+def iniciar_scheduler():
+    """
+    Solo desarrollo (SCHEDULER_EN_PROCESO): corre el bucle de líder en un hilo
+    del propio runserver. En producción usar el comando ejecutar_scheduler.
+    """
+    import threading
+
+    lider = LiderScheduler()
+    threading.Thread(target=lider.ejecutar, name="scheduler-lider", daemon=True).start()
+    return lider
@@ -0,0 +1,64 @@
+"""
+Invalidación de cachés del mapa y publicación de cambios de estado de edificios.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .capas import marcar_cambio_capas
+from .estados import invalidar_estados
+from .models import EdificioBloque, EquipamientoSeguridad, EstadoEdificio, NodoCamino, PuntoEncuentro, TramoCamino
+
+MODELOS_CAPAS = (EdificioBloque, PuntoEncuentro, EquipamientoSeguridad, NodoCamino, TramoCamino)
+
+_lote = threading.local()
+
+
+@contextmanager
+def invalidacion_en_lote():
+    """Dentro del bloque las señales no invalidan las capas una por una: se invalidan una vez al confirmar."""
+    _lote.activo = True
+    try:
+        yield
+    finally:
+        _lote.activo = False
+    transaction.on_commit(marcar_cambio_capas)
+
+
+def invalidar_capas(sender, **kwargs):
+    """Cualquier alta, edición o borrado en un modelo del mapa invalida el paquete de capas al confirmarse."""
+    if not getattr(_lote, "activo", False):
+        transaction.on_commit(marcar_cambio_capas)
+
+
+for _modelo in MODELOS_CAPAS:
+    post_save.connect(invalidar_capas, sender=_modelo, dispatch_uid=f"capas_post_save_{_modelo.__name__}")
+    post_delete.connect(invalidar_capas, sender=_modelo, dispatch_uid=f"capas_post_delete_{_modelo.__name__}")
+
+
+@receiver(post_save, sender=EdificioBloque)
+@receiver(post_delete, sender=EdificioBloque)
+def invalidar_estados_al_cambiar_edificio(sender, **kwargs):
+    """Nombre, tipo y posición SVG forman parte de la respuesta de estados_edificios."""
+    transaction.on_commit(invalidar_estados)
+
+
+@receiver(post_save, sender=EstadoEdificio)
+@receiver(post_delete, sender=EstadoEdificio)
+def publicar_cambio_estado_edificio(sender, instance, **kwargs):
+    """
+    Invalida la lista de estados, actualiza los pesos del grafo de rutas y publica
+    el nuevo estado del edificio al tópico mapa_estados.
+    """
+    from usuarios.tiempo_real import publicar_estado_edificio
+
+    from .routing import actualizar_pesos
+
+    edificio_id = instance.edificio_id
+    transaction.on_commit(invalidar_estados)
+    transaction.on_commit(actualizar_pesos)
+    transaction.on_commit(lambda: publicar_estado_edificio(edificio_id))
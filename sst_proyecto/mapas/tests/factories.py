@@ -0,0 +1,53 @@
+import factory
+from factory.django import DjangoModelFactory
+
+
+class EdificioBloqueFactory(DjangoModelFactory):
+    class Meta:
+        model = "mapas.EdificioBloque"
+
+    nombre = factory.Sequence(lambda n: f"Bloque {n}")
+    tipo = "AULAS"
+    latitud = 5.7303
+    longitud = -72.8943
+    capacidad = 100
+
+
+class PuntoEncuentroFactory(DjangoModelFactory):
+    class Meta:
+        model = "mapas.PuntoEncuentro"
+
+    nombre = factory.Sequence(lambda n: f"Punto {n}")
+    latitud = 5.7300
+    longitud = -72.8942
+    capacidad = 200
+    prioridad = 1
+
+
+class EquipamientoSeguridadFactory(DjangoModelFactory):
+    class Meta:
+        model = "mapas.EquipamientoSeguridad"
+
+    nombre = factory.Sequence(lambda n: f"Equipo {n}")
+    codigo = factory.Sequence(lambda n: f"EXT-{n:03d}")
+    tipo = "EXTINTOR"
+    latitud = 5.7302
+    longitud = -72.8944
+
+
+class NodoCaminoFactory(DjangoModelFactory):
+    class Meta:
+        model = "mapas.NodoCamino"
+
+    nombre = factory.Sequence(lambda n: f"Nodo {n}")
+    latitud = 5.7303
+    longitud = -72.8943
+
+
+class TramoCaminoFactory(DjangoModelFactory):
+    class Meta:
+        model = "mapas.TramoCamino"
+
+    nodo_origen = factory.SubFactory(NodoCaminoFactory)
+    nodo_destino = factory.SubFactory(NodoCaminoFactory)
+    distancia_metros = 0  # se calcula al guardar
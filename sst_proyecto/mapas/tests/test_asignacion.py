@@ -0,0 +1,132 @@
+"""
+Tests de la asignación de edificios a puntos de encuentro por capacidad (mapas/asignacion.py).
+"""
+
+import pytest
+
+from mapas import asignacion
+from mapas.models import EstadoEdificio
+from mapas.tests.factories import EdificioBloqueFactory
+from mapas.tests.test_offline import _campus
+
+URL = "/api/mapas/api/asignacion/"
+
+
+def _escenario(capacidad_cancha=50, capacidad_parqueadero=500):
+    """Campus en T de test_offline con el edificio Aulas en a y Bodega en b."""
+    (a, b, c, d), (cancha, parqueadero) = _campus()
+    cancha.capacidad, parqueadero.capacidad = capacidad_cancha, capacidad_parqueadero
+    cancha.save()
+    parqueadero.save()
+    aulas = EdificioBloqueFactory(nombre="Aulas", capacidad=300)
+    bodega = EdificioBloqueFactory(nombre="Bodega", capacidad=100)
+    a.edificio, b.edificio = aulas, bodega
+    a.save()
+    b.save()
+    return aulas, bodega, cancha, parqueadero
+
+
+def _por_edificio(resultado):
+    return {e["nombre"]: e for e in resultado["edificios"]}
+
+
+def test_repartir_es_proporcional_y_exacto():
+    assert asignacion.repartir(10, {1: 1, 2: 1, 3: 1}) == {1: 4, 2: 3, 3: 3}
+    assert asignacion.repartir(100, {1: 300, 2: 100}) == {1: 75, 2: 25}
+    assert asignacion.repartir(5, {1: 0, 2: 0}) == {1: 3, 2: 2}
+    assert asignacion.repartir(0, {1: 5}) == {1: 0}
+
+
+@pytest.mark.django_db
+def test_respeta_la_capacidad_de_los_puntos():
+    aulas, bodega, cancha, parqueadero = _escenario(capacidad_cancha=50)
+
+    resultado = asignacion.calcular_asignacion({aulas.id: 60, bodega.id: 20})
+    assert resultado["personas"] == 80 and resultado["sin_cupo"] == 0
+    puntos = {p["nombre"]: p["asignadas"] for p in resultado["puntos"]}
+    assert puntos == {"Cancha": 50, "Parqueadero": 30}
+
+    edificios = _por_edificio(resultado)
+    assert sum(x["personas"] for x in edificios["Aulas"]["asignaciones"]) == 60
+    assert sum(x["personas"] for x in edificios["Bodega"]["asignaciones"]) == 20
+    distancias = {x["punto"]: x["distancia_metros"] for x in edificios["Aulas"]["asignaciones"]}
+    assert distancias.get("Cancha", 116.8) == pytest.approx(116.8, abs=0.1)  # a → b → c → cancha
+
+
+@pytest.mark.django_db
+def test_sin_cupo_suficiente_reporta_el_excedente():
+    aulas, bodega, _, _ = _escenario(capacidad_cancha=10, capacidad_parqueadero=20)
+    resultado = asignacion.calcular_asignacion({aulas.id: 40})
+    assert resultado["sin_cupo"] == 10
+    assert _por_edificio(resultado)["Aulas"]["sin_cupo"] == 10
+
+
+@pytest.mark.django_db
+def test_la_prioridad_penaliza_los_puntos_secundarios():
+    aulas, bodega, cancha, parqueadero = _escenario()
+
+    def destino():
+        resultado = asignacion.calcular_asignacion({aulas.id: 5})
+        return [x["punto"] for x in _por_edificio(resultado)["Aulas"]["asignaciones"]]
+
+    # Desde a: cancha ~111 m, parqueadero ~205 m
+    assert destino() == ["Cancha"]
+    cancha.prioridad = 3
+    cancha.save()
+    assert destino() == ["Parqueadero"]
+
+
+@pytest.mark.django_db
+def test_edificio_bloqueado_deja_de_ser_paso_y_recalcula_solo_lo_necesario(monkeypatch):
+    aulas, bodega, cancha, parqueadero = _escenario()
+    llamadas = []
+    original = asignacion._arbol
+    monkeypatch.setattr(asignacion, "_arbol", lambda *args: llamadas.append(args[2]["id"]) or original(*args))
+
+    asignacion.calcular_asignacion({aulas.id: 10, bodega.id: 10})
+    assert sorted(llamadas) == sorted([cancha.id, parqueadero.id])
+
+    # Aulas (nodo a) es una hoja de ambos árboles: bloquearla no obliga a recalcular
+    llamadas.clear()
+    EstadoEdificio.objects.create(edificio=aulas, estado="DANADO")
+    resultado = asignacion.calcular_asignacion({aulas.id: 10, bodega.id: 10})
+    assert llamadas == []
+    assert _por_edificio(resultado)["Aulas"]["bloqueado"] is True
+    assert _por_edificio(resultado)["Aulas"]["sin_cupo"] == 0  # sale por su vecino b
+
+    # Bodega (nodo b) es el cruce: todos los árboles pasan por ella y Aulas queda aislada
+    llamadas.clear()
+    EstadoEdificio.objects.create(edificio=bodega, estado="EN_EMERGENCIA")
+    resultado = asignacion.calcular_asignacion({aulas.id: 10, bodega.id: 10})
+    assert sorted(llamadas) == sorted([cancha.id, parqueadero.id])
+    edificios = _por_edificio(resultado)
+    assert edificios["Aulas"]["sin_cupo"] == 10
+    assert sum(x["personas"] for x in edificios["Bodega"]["asignaciones"]) == 10
+
+
+@pytest.mark.django_db
+def test_ocupacion_estimada_desde_el_aforo(monkeypatch):
+    aulas, bodega, _, _ = _escenario()
+    cerrado = EdificioBloqueFactory(nombre="Biblioteca", capacidad=1000)
+    EstadoEdificio.objects.create(edificio=cerrado, estado="CERRADO")
+    monkeypatch.setattr("control_acceso.utils.verificar_aforo_actual", lambda: {"personas_dentro": 140})
+
+    resultado = asignacion.calcular_asignacion()
+    assert resultado["ocupacion"] == "estimada" and resultado["personas"] == 140
+    edificios = _por_edificio(resultado)
+    assert edificios["Biblioteca"]["personas"] == 0
+    assert edificios["Aulas"]["personas"] == 3 * edificios["Bodega"]["personas"]
+
+
+@pytest.mark.django_db
+def test_endpoint_asignacion(client_brigada, client_aprendiz):
+    aulas, bodega, _, _ = _escenario()
+
+    response = client_brigada.post(URL, {"ocupacion": {str(aulas.id): 30}}, format="json")
+    assert response.status_code == 200
+    assert response.data["ocupacion"] == "indicada" and response.data["personas"] == 30
+
+    assert client_brigada.get(URL).status_code == 200
+    assert client_brigada.post(URL, {"ocupacion": {"x": 1}}, format="json").status_code == 400
+    assert client_brigada.post(URL, {}, format="json").status_code == 400
+    assert client_aprendiz.get(URL).status_code == 403
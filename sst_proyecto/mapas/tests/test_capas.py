@@ -0,0 +1,96 @@
+"""
+Tests del paquete GeoJSON de capas del mapa (mapas/capas.py) y su endpoint.
+"""
+
+import json
+
+import pytest
+
+from mapas import capas
+from mapas.tests.factories import (
+    EdificioBloqueFactory,
+    EquipamientoSeguridadFactory,
+    NodoCaminoFactory,
+    PuntoEncuentroFactory,
+    TramoCaminoFactory,
+)
+
+URL = "/api/mapas/api/capas/"
+
+
+@pytest.mark.django_db
+def test_paquete_tiene_una_coleccion_por_capa(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        EdificioBloqueFactory(nombre="Aulas", poligono=[[5.7301, -72.8941], [5.7302, -72.8941], [5.7302, -72.8942]])
+        EdificioBloqueFactory(nombre="Taller")
+        PuntoEncuentroFactory(nombre="Cancha")
+        EquipamientoSeguridadFactory(codigo="EXT-1")
+        EquipamientoSeguridadFactory(codigo="EXT-2", estado="MANTENIMIENTO")
+        a, b = NodoCaminoFactory(latitud=5.7301), NodoCaminoFactory(latitud=5.7305)
+        TramoCaminoFactory(nodo_origen=a, nodo_destino=b, tipo="RAMPA")
+
+    _, contenido = capas.paquete_actual()
+    paquete = json.loads(contenido)
+    assert set(paquete) == set(capas.CAPAS)
+    assert all(c["type"] == "FeatureCollection" for c in paquete.values())
+
+    geometrias = {f["properties"]["nombre"]: f["geometry"] for f in paquete["edificios"]["features"]}
+    assert geometrias["Aulas"]["type"] == "Polygon"
+    anillo = geometrias["Aulas"]["coordinates"][0]
+    assert anillo[0] == anillo[-1] == [-72.8941, 5.7301]  # [lng, lat] y anillo cerrado
+    assert geometrias["Taller"]["type"] == "Point"
+
+    assert [f["properties"]["codigo"] for f in paquete["equipamiento"]["features"]] == ["EXT-1"]
+    tramos = [f for f in paquete["grafo"]["features"] if f["geometry"]["type"] == "LineString"]
+    assert len(tramos) == 1 and tramos[0]["properties"]["tipo"] == "RAMPA"
+    assert tramos[0]["properties"]["distancia_metros"] > 0
+
+
+@pytest.mark.django_db
+def test_paquete_se_cachea_y_se_invalida_al_guardar(django_assert_num_queries, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        punto = PuntoEncuentroFactory(nombre="Cancha")
+    huella, _ = capas.paquete_actual()
+    with django_assert_num_queries(0):
+        assert capas.paquete_actual()[0] == huella
+
+    with django_capture_on_commit_callbacks(execute=True):
+        punto.nombre = "Zona verde"
+        punto.save()
+    nueva, contenido = capas.paquete_actual()
+    assert nueva != huella
+    assert "Zona verde" in contenido.decode()
+    assert capas.paquete_por_huella(huella) is not None  # las URL ya emitidas siguen sirviéndose
+
+
+@pytest.mark.django_db
+def test_endpoint_capas_etag_y_cache_control(client_aprendiz):
+    PuntoEncuentroFactory()
+    response = client_aprendiz.get(URL)
+    assert response.status_code == 200
+    assert "no-cache" in response["Cache-Control"]
+    etag = response["ETag"]
+    assert client_aprendiz.get(URL, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    versionada = client_aprendiz.get(f"{URL}{etag.strip(chr(34))}/")
+    assert versionada.status_code == 200
+    assert "immutable" in versionada["Cache-Control"] and "max-age=31536000" in versionada["Cache-Control"]
+    assert versionada.content == response.content
+
+    obsoleta = client_aprendiz.get(f"{URL}no-existe/")
+    assert obsoleta.status_code == 302
+    assert obsoleta["Location"].endswith(f"{etag.strip(chr(34))}/")
+
+
+@pytest.mark.django_db
+def test_mapa_interactivo_es_una_pagina_estatica(django_client_aprendiz):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    django_client_aprendiz.get("/mapas/")  # construye el paquete
+    with CaptureQueriesContext(connection) as consultas:
+        response = django_client_aprendiz.get("/mapas/")
+    assert response.status_code == 200
+    assert not [q for q in consultas.captured_queries if "mapas_" in q["sql"]]
+    assert response.context["capas_url"].startswith("/api/")
+    assert "puntos-encuentro-data" not in response.content.decode()
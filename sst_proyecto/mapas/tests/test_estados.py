@@ -0,0 +1,79 @@
+"""
+Tests del estado de edificios: lista cacheada, modo delta (since) y push al tópico mapa_estados.
+"""
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from mapas.estados import estados_completos
+from mapas.tests.factories import EdificioBloqueFactory
+from usuarios.tiempo_real import TOPICO_MAPA_ESTADOS, grupo_topico, puede_suscribirse
+
+ESTADOS_URL = "/api/mapas/api/edificios/estados/"
+
+
+def _cambiar(client, edificio, estado, motivo=""):
+    return client.post(
+        f"/api/mapas/api/edificios/{edificio.id}/cambiar-estado/", {"estado": estado, "motivo": motivo}, format="json"
+    )
+
+
+@pytest.mark.django_db
+def test_lista_completa_se_cachea_hasta_el_proximo_cambio(
+    client_aprendiz, client_brigada, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    edificio = EdificioBloqueFactory(nombre="Taller")
+    EdificioBloqueFactory(nombre="Aulas")
+
+    assert {e["estado"] for e in client_aprendiz.get(ESTADOS_URL).data} == {"NORMAL"}
+    with django_assert_num_queries(0):
+        estados_completos()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert _cambiar(client_brigada, edificio, "EVACUANDO").status_code == 200
+    estados = {e["nombre"]: e for e in client_aprendiz.get(ESTADOS_URL).data}
+    assert estados["Taller"]["estado"] == "EVACUANDO"
+    assert estados["Taller"]["actualizado_por"]
+
+
+@pytest.mark.django_db
+def test_modo_delta_solo_devuelve_edificios_cambiados(client_aprendiz, client_brigada):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from mapas.models import HistorialEstadoEdificio
+
+    taller, aulas = EdificioBloqueFactory(nombre="Taller"), EdificioBloqueFactory(nombre="Aulas")
+    _cambiar(client_brigada, aulas, "CERRADO")
+    HistorialEstadoEdificio.objects.update(fecha=timezone.now() - timedelta(minutes=10))
+
+    cursor = client_aprendiz.get(ESTADOS_URL, {"since": (timezone.now() - timedelta(minutes=1)).isoformat()}).data
+    assert cursor["edificios"] == []
+
+    _cambiar(client_brigada, taller, "DANADO", "Grieta en muro")
+    delta = client_aprendiz.get(ESTADOS_URL, {"since": cursor["hasta"]}).data
+    assert [(e["nombre"], e["estado"], e["motivo"]) for e in delta["edificios"]] == [
+        ("Taller", "DANADO", "Grieta en muro")
+    ]
+
+    assert client_aprendiz.get(ESTADOS_URL, {"since": "ayer"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_cambio_de_estado_se_publica_al_topico_mapa_estados(
+    client_brigada, aprendiz, django_capture_on_commit_callbacks
+):
+    edificio = EdificioBloqueFactory(nombre="Mina")
+    layer = get_channel_layer()
+    canal = async_to_sync(layer.new_channel)()
+    async_to_sync(layer.group_add)(grupo_topico(TOPICO_MAPA_ESTADOS), canal)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        _cambiar(client_brigada, edificio, "EN_EMERGENCIA")
+
+    mensaje = async_to_sync(layer.receive)(canal)
+    assert mensaje["topico"] == TOPICO_MAPA_ESTADOS
+    assert (mensaje["data"]["id"], mensaje["data"]["estado"]) == (edificio.id, "EN_EMERGENCIA")
+    assert puede_suscribirse(aprendiz, TOPICO_MAPA_ESTADOS)
@@ -0,0 +1,143 @@
+"""
+Tests de la edición del grafo en lote (mapas/grafo_lote.py) y de la importación/exportación GeoJSON.
+"""
+
+import pytest
+
+from mapas.models import NodoCamino, TramoCamino
+from mapas.routing import haversine
+from mapas.tests.factories import EdificioBloqueFactory
+from mapas.tests.test_offline import _campus
+
+URL = "/api/mapas/api/grafo/lote/"
+URL_GEOJSON = "/api/mapas/api/grafo/geojson/"
+
+
+def _contar_invalidaciones(monkeypatch):
+    llamadas = []
+    monkeypatch.setattr("mapas.signals.marcar_cambio_capas", lambda: llamadas.append(1))
+    return llamadas
+
+
+def _lote_en_cadena(n, desde):
+    """n nodos nuevos en línea hacia el este desde el nodo `desde`, cada uno unido al anterior."""
+    nodos = [{"ref": f"n{i}", "latitud": 5.7305, "longitud": -72.8930 + 0.0001 * (i + 1)} for i in range(n)]
+    tramos = [
+        {"origen": desde.id if i == 0 else f"n{i - 1}", "destino": f"n{i}", "tipo": "VIA_INTERNA"} for i in range(n)
+    ]
+    return {"nodos": {"guardar": nodos}, "tramos": {"guardar": tramos}}
+
+
+@pytest.mark.django_db
+def test_lote_crea_nodos_y_tramos_en_una_transaccion(
+    client_administrativo, django_capture_on_commit_callbacks, django_assert_max_num_queries, monkeypatch
+):
+    (a, b, c, d), _ = _campus()
+    invalidaciones = _contar_invalidaciones(monkeypatch)
+
+    with django_capture_on_commit_callbacks(execute=True), django_assert_max_num_queries(25):
+        response = client_administrativo.post(URL, _lote_en_cadena(200, d), format="json")
+    assert response.status_code == 200, response.data
+    assert response.data["nodos"]["creados"] == 200 and response.data["tramos"]["creados"] == 200
+    assert response.data["componentes"] == 1
+    assert invalidaciones == [1]
+
+    n0 = NodoCamino.objects.get(id=response.data["refs"]["n0"])
+    tramo = TramoCamino.objects.get(nodo_origen=d, nodo_destino=n0)
+    assert tramo.distancia_metros == pytest.approx(haversine(d.latitud, d.longitud, n0.latitud, n0.longitud), abs=0.01)
+
+
+@pytest.mark.django_db
+def test_lote_actualiza_mueve_y_elimina(client_coordinador):
+    (a, b, c, d), _ = _campus()
+    taller = EdificioBloqueFactory(nombre="Taller")
+    bc = TramoCamino.objects.get(nodo_origen=b, nodo_destino=c)
+    ab = TramoCamino.objects.get(nodo_origen=a, nodo_destino=b)
+    antes = ab.distancia_metros
+
+    lote = {
+        "nodos": {"guardar": [{"id": a.id, "latitud": 5.7312, "edificio_id": taller.id, "tipo": "ENTRADA"}]},
+        # Sin id: ya existe un tramo entre c y b (en el otro sentido), así que se actualiza
+        "tramos": {"guardar": [{"origen": c.id, "destino": b.id, "tipo": "ESCALERA"}]},
+    }
+    response = client_coordinador.post(URL, lote, format="json")
+    assert response.status_code == 200, response.data
+    assert response.data["tramos"] == {"creados": 0, "actualizados": 2, "eliminados": 0}
+
+    a.refresh_from_db()
+    ab.refresh_from_db()
+    bc.refresh_from_db()
+    assert (a.latitud, a.longitud, a.edificio_id, a.tipo) == (5.7312, -72.8943, taller.id, "ENTRADA")
+    assert ab.distancia_metros == pytest.approx(antes + 22.2, abs=0.1)
+    assert bc.tipo == "ESCALERA" and TramoCamino.objects.count() == 3
+
+    response = client_coordinador.post(URL, {"nodos": {"eliminar": [a.id]}}, format="json")
+    assert response.status_code == 200
+    assert response.data["nodos"]["eliminados"] == 1 and response.data["tramos"]["eliminados"] == 1
+
+
+@pytest.mark.django_db
+def test_lote_invalido_o_que_desconecta_no_cambia_nada(client_administrativo, client_brigada):
+    (a, b, c, d), _ = _campus()
+    bc = TramoCamino.objects.get(nodo_origen=b, nodo_destino=c)
+    nuevos = {"ref": "x", "latitud": 5.7301, "longitud": -72.8950}
+
+    casos = [
+        # El tramo b - c es el único camino hacia c
+        {"tramos": {"eliminar": [bc.id]}},
+        {"nodos": {"guardar": [nuevos]}, "tramos": {"guardar": [{"origen": "x", "destino": 999999}]}},
+        {"nodos": {"guardar": [nuevos, {"id": a.id, "latitud": 95}]}},
+        {"nodos": {"guardar": [dict(nuevos, tipo="PUENTE")]}},
+        {"tramos": {"guardar": [{"origen": a.id, "destino": a.id}]}},
+        {"nodos": {"guardar": [{"id": a.id, "nombre": "x"}], "eliminar": [a.id]}},
+        {"nodos": "todos"},
+    ]
+    for lote in casos:
+        response = client_administrativo.post(URL, lote, format="json")
+        assert response.status_code == 400, lote
+        assert response.data["error"]
+    assert NodoCamino.objects.count() == 4 and TramoCamino.objects.count() == 3
+
+    assert client_brigada.post(URL, {"nodos": {"guardar": [nuevos]}}, format="json").status_code == 403
+
+
+@pytest.mark.django_db
+def test_geojson_exportar_e_importar(client_administrativo, client_aprendiz):
+    (a, b, c, d), _ = _campus()
+
+    response = client_aprendiz.get(URL_GEOJSON)
+    assert response.status_code == 200
+    assert "attachment" in response["Content-Disposition"]
+    coleccion = response.data
+    assert len(coleccion["features"]) == 7
+
+    # Se quita el nodo d (y su tramo) y se agrega un nodo nuevo unido a c solo por coordenadas
+    coleccion["features"] = [
+        f
+        for f in coleccion["features"]
+        if f["properties"].get("nodo_id") != d.id and f["properties"].get("destino") != d.id
+    ]
+    coleccion["features"] += [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [-72.8950, 5.7300]},
+            "properties": {"nombre": "Portería"},
+        },
+        {
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": [[c.longitud, c.latitud], [-72.8950, 5.7300]]},
+            "properties": {"tipo": "RAMPA"},
+        },
+    ]
+    assert client_aprendiz.post(f"{URL_GEOJSON}?reemplazar=1", coleccion, format="json").status_code == 403
+
+    response = client_administrativo.post(f"{URL_GEOJSON}?reemplazar=1", coleccion, format="json")
+    assert response.status_code == 200, response.data
+    assert response.data["nodos"] == {"creados": 1, "actualizados": 3, "eliminados": 1}
+    assert response.data["tramos"]["creados"] == 1 and response.data["tramos"]["eliminados"] == 1
+    porteria = NodoCamino.objects.get(nombre="Portería")
+    assert TramoCamino.objects.get(nodo_origen=c, nodo_destino=porteria).tipo == "RAMPA"
+    assert not NodoCamino.objects.filter(id=d.id).exists()
+
+    invalido = {"type": "FeatureCollection", "features": [{"geometry": {"type": "Polygon", "coordinates": []}}]}
+    assert client_administrativo.post(URL_GEOJSON, invalido, format="json").status_code == 400
@@ -0,0 +1,101 @@
+"""
+Tests del paquete offline del mapa de evacuación (mapas/offline.py) y sus endpoints.
+"""
+
+import json
+
+import pytest
+
+from mapas import offline
+from mapas.routing import calcular_ruta_mas_corta, construir_grafo, nodo_mas_cercano, tabla_siguiente_salto
+from mapas.tests.factories import NodoCaminoFactory, PuntoEncuentroFactory, TramoCaminoFactory
+
+URL = "/api/mapas/api/offline/"
+
+
+def _campus():
+    """Grafo en T: a - b - c y b - d, con un punto de encuentro junto a c y otro junto a d."""
+    a = NodoCaminoFactory(latitud=5.7310, longitud=-72.8943)
+    b = NodoCaminoFactory(latitud=5.7305, longitud=-72.8943)
+    c = NodoCaminoFactory(latitud=5.7300, longitud=-72.8943)
+    d = NodoCaminoFactory(latitud=5.7305, longitud=-72.8930)
+    for origen, destino in ((a, b), (b, c), (b, d)):
+        TramoCaminoFactory(nodo_origen=origen, nodo_destino=destino)
+    cancha = PuntoEncuentroFactory(nombre="Cancha", latitud=5.72995, longitud=-72.8943)
+    parqueadero = PuntoEncuentroFactory(nombre="Parqueadero", latitud=5.7305, longitud=-72.89295)
+    return (a, b, c, d), (cancha, parqueadero)
+
+
+def _seguir(tabla, nodo_id):
+    camino = [nodo_id]
+    while tabla[camino[-1]][0] is not None:
+        camino.append(tabla[camino[-1]][0])
+    return camino
+
+
+@pytest.mark.django_db
+def test_tabla_de_siguiente_salto_coincide_con_la_ruta_del_servidor():
+    (a, b, c, d), (cancha, parqueadero) = _campus()
+    G, _ = construir_grafo()
+    tabla = tabla_siguiente_salto(G, [(p.id, p.latitud, p.longitud) for p in (cancha, parqueadero)])
+
+    assert set(tabla) == {n.id for n in (a, b, c, d)}
+    assert _seguir(tabla, a.id) == [a.id, b.id, c.id]
+    assert tabla[c.id][0] is None and tabla[c.id][2] == cancha.id
+    assert tabla[d.id][2] == parqueadero.id
+
+    for lat, lng in ((5.7311, -72.8943), (5.7306, -72.8931)):
+        servidor = calcular_ruta_mas_corta(lat, lng)
+        inicio, distancia_inicio = nodo_mas_cercano(G, lat, lng)
+        siguiente, metros, punto_id = tabla[inicio]
+        assert punto_id == servidor["punto_encuentro"]["id"]
+        assert distancia_inicio + metros == pytest.approx(servidor["distancia_metros"], abs=0.2)
+
+
+@pytest.mark.django_db
+def test_tabla_vacia_sin_grafo_o_sin_puntos():
+    G, _ = construir_grafo()
+    assert tabla_siguiente_salto(G, [(1, 5.73, -72.89)]) == {}
+    NodoCaminoFactory()
+    G, _ = construir_grafo()
+    assert tabla_siguiente_salto(G, []) == {}
+    # Punto de encuentro a más de 500 m de cualquier nodo: sin ruta por el grafo
+    assert tabla_siguiente_salto(G, [(1, 5.75, -72.89)]) == {}
+
+
+@pytest.mark.django_db
+def test_paquete_offline_y_version(client_aprendiz, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        (a, b, c, d), _ = _campus()
+
+    version = client_aprendiz.get(f"{URL}version/")
+    assert version.status_code == 200
+    assert version["Cache-Control"] == "no-cache"
+    huella = version.data["version"]
+    assert version.data["url"].endswith(f"/offline/{huella}/")
+
+    response = client_aprendiz.get(version.data["url"])
+    assert response.status_code == 200
+    assert response["ETag"] == f'"{huella}"' and "immutable" in response["Cache-Control"]
+    assert len(response.content) == version.data["bytes"]
+    paquete = json.loads(response.content)
+    assert paquete["formato"] == offline.FORMATO
+    assert {"edificios", "puntos_encuentro", "grafo", "siguiente_salto", "velocidad_m_min"} <= set(paquete)
+    assert str(a.id) in paquete["siguiente_salto"]
+
+    sin_version = client_aprendiz.get(URL, HTTP_IF_NONE_MATCH=f'"{huella}"')
+    assert sin_version.status_code == 304
+
+    # Un cambio en el grafo cambia la versión; la URL vieja redirige a la vigente
+    with django_capture_on_commit_callbacks(execute=True):
+        TramoCaminoFactory(nodo_origen=a, nodo_destino=d)
+    nueva = client_aprendiz.get(f"{URL}version/").data["version"]
+    assert nueva != huella
+    assert client_aprendiz.get(f"{URL}{nueva}/").status_code == 200
+    assert client_aprendiz.get(f"{URL}no-existe/")["Location"].endswith(f"/offline/{nueva}/")
+
+
+@pytest.mark.django_db
+def test_paquete_offline_requiere_sesion(api_client):
+    assert api_client.get(f"{URL}version/").status_code in (401, 403)
+    assert api_client.get(URL).status_code in (401, 403)
@@ -0,0 +1,113 @@
+"""
+Tests de los pesos dinámicos del grafo de rutas (mapas/pesos.py) y su aplicación sobre el grafo cacheado.
+"""
+
+import pytest
+
+from mapas import offline, routing
+from mapas.capas import marcar_cambio_capas
+from mapas.models import EstadoEdificio, TramoCamino
+from mapas.tests.factories import EdificioBloqueFactory, NodoCaminoFactory, PuntoEncuentroFactory, TramoCaminoFactory
+
+INICIO = (5.7311, -72.8943)
+
+
+def _rombo():
+    """Dos caminos de a a c: por b (oeste, ~141 m) y por d (este, ~156 m); laboratorio junto a b."""
+    a = NodoCaminoFactory(latitud=5.7310, longitud=-72.8943)
+    b = NodoCaminoFactory(latitud=5.7305, longitud=-72.8947)
+    c = NodoCaminoFactory(latitud=5.7300, longitud=-72.8943)
+    d = NodoCaminoFactory(latitud=5.7305, longitud=-72.8938)
+    for origen, destino in ((a, b), (b, c), (a, d), (d, c)):
+        TramoCaminoFactory(nodo_origen=origen, nodo_destino=destino)
+    PuntoEncuentroFactory(nombre="Cancha", latitud=5.72995, longitud=-72.8943)
+    laboratorio = EdificioBloqueFactory(nombre="Laboratorio", latitud=5.7305, longitud=-72.8949)
+    return (a, b, c, d), laboratorio
+
+
+def _por_donde(ruta, nodo):
+    return [nodo.latitud, nodo.longitud] in ruta["waypoints"]
+
+
+def _cambiar_estado(client, edificio, estado, capturar):
+    with capturar(execute=True):
+        response = client.post(
+            f"/api/mapas/api/edificios/{edificio.id}/cambiar-estado/", {"estado": estado}, format="json"
+        )
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_la_ruta_evita_el_edificio_en_emergencia_sin_reconstruir_el_grafo(
+    client_brigada, django_capture_on_commit_callbacks, monkeypatch
+):
+    (a, b, c, d), laboratorio = _rombo()
+    ruta = routing.calcular_ruta_mas_corta(*INICIO)
+    assert _por_donde(ruta, b)
+    G, _ = routing.grafo_cacheado()
+
+    construcciones = []
+    original = routing.construir_grafo
+    monkeypatch.setattr(routing, "construir_grafo", lambda: construcciones.append(1) or original())
+
+    _cambiar_estado(client_brigada, laboratorio, "EN_EMERGENCIA", django_capture_on_commit_callbacks)
+    ruta = routing.calcular_ruta_mas_corta(*INICIO)
+    assert _por_donde(ruta, d) and not _por_donde(ruta, b)
+    # La distancia informada es la real del camino, no el peso
+    assert ruta["distancia_metros"] == pytest.approx(
+        routing.haversine(*INICIO, a.latitud, a.longitud)
+        + G[a.id][d.id]["metros"]
+        + G[d.id][c.id]["metros"]
+        + routing.haversine(c.latitud, c.longitud, 5.72995, -72.8943),
+        abs=0.2,
+    )
+    nuevo, _ = routing.grafo_cacheado()
+    assert construcciones == []
+    assert nuevo[a.id][b.id]["weight"] == pytest.approx(10 * nuevo[a.id][b.id]["metros"])
+    assert nuevo[a.id][d.id]["weight"] == nuevo[a.id][d.id]["metros"]
+    # El grafo que ya tenía un lector no cambia: los pesos nuevos van en una copia
+    assert nuevo is not G
+    assert G[a.id][b.id]["weight"] == G[a.id][b.id]["metros"]
+
+    _cambiar_estado(client_brigada, laboratorio, "NORMAL", django_capture_on_commit_callbacks)
+    assert _por_donde(routing.calcular_ruta_mas_corta(*INICIO), b)
+    assert construcciones == []
+
+
+@pytest.mark.django_db
+def test_escaleras_y_tramos_retirados(settings):
+    (a, b, c, d), laboratorio = _rombo()
+    TramoCamino.objects.filter(nodo_origen=a, nodo_destino=b).update(tipo="ESCALERA")
+    # 70 m de escalera pesan 105: el camino por d queda más corto
+    assert _por_donde(routing.calcular_ruta_mas_corta(*INICIO), d)
+
+    # Un factor None retira el tramo: sin escaleras ni el paso junto al laboratorio no queda ruta
+    settings.RUTAS_FACTOR_TIPO_TRAMO = {"ESCALERA": None}
+    settings.RUTAS_FACTOR_ESTADO = {"EN_EMERGENCIA": None}
+    TramoCamino.objects.filter(nodo_origen=a, nodo_destino=d).update(tipo="ESCALERA")
+    EstadoEdificio.objects.create(edificio=laboratorio, estado="EN_EMERGENCIA")
+    marcar_cambio_capas()
+    G, _ = routing.grafo_cacheado()
+    assert G[a.id][b.id]["weight"] is None and G[b.id][c.id]["weight"] is None and G[a.id][d.id]["weight"] is None
+    assert G[d.id][c.id]["weight"] == G[d.id][c.id]["metros"]
+    assert routing.calcular_ruta_mas_corta(*INICIO)["encontrado"] is False
+
+
+@pytest.mark.django_db
+def test_cambios_de_pesos_y_cachés_derivadas(client_brigada, django_capture_on_commit_callbacks):
+    (a, b, c, d), laboratorio = _rombo()
+    _, tabla, _ = routing.tabla_evacuacion()
+    assert tabla[a.id][0] == b.id
+    huella, _ = offline.paquete_actual()
+    revision, _ = routing.cambios_de_pesos(0)
+
+    _cambiar_estado(client_brigada, laboratorio, "DANADO", django_capture_on_commit_callbacks)
+    nueva, encarecidos = routing.cambios_de_pesos(revision)
+    assert nueva == revision + 1 and encarecidos == {a.id, b.id, c.id}
+    _, tabla, _ = routing.tabla_evacuacion()
+    assert tabla[a.id][0] == d.id
+    assert offline.paquete_actual()[0] != huella
+
+    _cambiar_estado(client_brigada, laboratorio, "NORMAL", django_capture_on_commit_callbacks)
+    assert routing.cambios_de_pesos(revision) == (revision + 2, None)
+    assert routing.tabla_evacuacion()[1][a.id][0] == b.id
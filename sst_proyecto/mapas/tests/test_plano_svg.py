@@ -0,0 +1,120 @@
+"""
+Tests del plano SVG compilado del campus (mapas/plano_svg.py) y la vista campus_svg.
+"""
+
+import os
+
+import pytest
+
+from mapas import plano_svg
+from mapas.tests.factories import EdificioBloqueFactory, PuntoEncuentroFactory
+
+
+@pytest.fixture(autouse=True)
+def media_temporal(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def _archivo(url):
+    return os.path.join(plano_svg._directorio(), url.rsplit("/", 1)[1])
+
+
+def test_proyeccion_ida_y_vuelta():
+    assert plano_svg.gps_a_svg(plano_svg.CENTRO_LAT, plano_svg.CENTRO_LNG) == (0, 0)
+    x, y = plano_svg.gps_a_svg(5.7308266, -72.8944621)
+    assert x < 0 and y < 0  # al oeste y al norte del centro
+    lat, lng = plano_svg.svg_a_gps(x, y)
+    assert lat == pytest.approx(5.7308266, abs=1e-6)
+    assert lng == pytest.approx(-72.8944621, abs=1e-6)
+
+
+@pytest.mark.django_db
+def test_proyectar_edificios_centra_el_rectangulo():
+    edificio = EdificioBloqueFactory(latitud=5.7306, longitud=-72.8941, svg_ancho=40, svg_alto=20)
+    fijo = EdificioBloqueFactory(svg_x=1, svg_y=2)
+
+    assert plano_svg.proyectar_edificios() == 1
+    edificio.refresh_from_db()
+    x, y = plano_svg.gps_a_svg(5.7306, -72.8941)
+    assert (edificio.svg_x + 20, edificio.svg_y + 10) == pytest.approx((x, y), abs=0.1)
+    fijo.refresh_from_db()
+    assert (fijo.svg_x, fijo.svg_y) == (1, 2)
+
+    assert plano_svg.proyectar_edificios(recalcular=True) == 2
+
+
+@pytest.mark.django_db
+def test_proyectar_edificios_invalida_los_estados_cacheados():
+    from mapas.estados import estados_completos
+
+    edificio = EdificioBloqueFactory(latitud=5.7306, longitud=-72.8941)
+    assert estados_completos()[0]["svg_x"] is None
+
+    plano_svg.proyectar_edificios()
+    edificio.refresh_from_db()
+    assert edificio.svg_x is not None
+    assert estados_completos()[0]["svg_x"] == edificio.svg_x
+
+
+@pytest.mark.django_db
+def test_svg_tiene_un_grupo_por_edificio():
+    rect = EdificioBloqueFactory(nombre="Taller <A>")
+    poligono = EdificioBloqueFactory(poligono=[[5.7301, -72.8941], [5.7302, -72.8941], [5.7302, -72.8942]])
+    EdificioBloqueFactory(activo=False)
+    punto = PuntoEncuentroFactory()
+
+    svg = plano_svg.compilar_svg().decode()
+    assert svg.startswith("<svg ") and svg.endswith("</svg>")
+    assert f'id="edificio-{rect.id}"' in svg and "Taller &lt;A&gt;" in svg
+    assert f'id="edificio-{poligono.id}" data-id="{poligono.id}" data-tipo="AULAS"><polygon ' in svg
+    assert svg.count('class="edificio"') == 2
+    assert f'id="punto-{punto.id}"' in svg
+    assert "\n" not in svg
+
+
+@pytest.mark.django_db
+def test_url_plano_cambia_solo_con_la_geometria(django_capture_on_commit_callbacks, monkeypatch):
+    with django_capture_on_commit_callbacks(execute=True):
+        edificio = EdificioBloqueFactory()
+    url = plano_svg.url_plano()
+    assert url.startswith("/media/mapas/campus/campus.") and url.endswith(".svg")
+    assert os.path.exists(_archivo(url))
+    assert plano_svg.url_plano() == url
+
+    # Sin cambios en el mapa no se vuelve a compilar
+    monkeypatch.setattr(plano_svg, "compilar_svg", None)
+    assert plano_svg.url_plano() == url
+    monkeypatch.undo()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        edificio.nombre = "Renombrado"
+        edificio.save()
+    nueva = plano_svg.url_plano()
+    assert nueva != url
+    with open(_archivo(nueva)) as archivo:
+        assert "Renombrado" in archivo.read()
+
+
+@pytest.mark.django_db
+def test_url_plano_recompila_si_falta_el_archivo():
+    EdificioBloqueFactory()
+    url = plano_svg.url_plano()
+    os.remove(_archivo(url))
+    assert plano_svg.url_plano() == url
+    assert os.path.exists(_archivo(url))
+
+
+@pytest.mark.django_db
+def test_vista_campus_svg(django_client_brigada, django_client_aprendiz):
+    edificio = EdificioBloqueFactory()
+
+    response = django_client_brigada.get("/mapas/campus/")
+    assert response.status_code == 200
+    assert response.context["svg_url"] == plano_svg.url_plano()
+    assert response.context["es_brigada"] is True
+    assert b"modalEstado" in response.content
+    assert f"edificio-{edificio.id}".encode() not in response.content  # la geometría va en el SVG
+
+    response = django_client_aprendiz.get("/mapas/campus/")
+    assert response.status_code == 200
+    assert response.context["es_brigada"] is False
@@ -0,0 +1,103 @@
+"""
+Tests de las rutas de evacuación en lote (mapas/routing.py: rutas_en_lote) y del endpoint rutas_lote.
+"""
+
+import csv
+import io
+
+import pytest
+
+from mapas import routing
+from mapas.models import TramoCamino
+from mapas.tests.factories import EdificioBloqueFactory, NodoCaminoFactory, PuntoEncuentroFactory, TramoCaminoFactory
+from mapas.tests.test_offline import _campus
+
+URL = "/api/mapas/api/ruta/lote/"
+
+
+@pytest.mark.django_db
+def test_rutas_en_lote_coinciden_con_la_ruta_individual():
+    _campus()
+    origenes = [{"lat": 5.7311, "lng": -72.8943}, {"lat": 5.7306, "lng": -72.8931}, {"lat": 5.76, "lng": -72.89}]
+
+    resultados = routing.rutas_en_lote(origenes)
+    for origen, resultado in zip(origenes[:2], resultados):
+        individual = routing.calcular_ruta_mas_corta(origen["lat"], origen["lng"])
+        assert resultado["encontrado"] and resultado["lat"] == origen["lat"]
+        assert resultado["punto_encuentro"]["id"] == individual["punto_encuentro"]["id"]
+        assert resultado["distancia_metros"] == pytest.approx(individual["distancia_metros"], abs=0.2)
+        assert resultado["tiempo_minutos"] == pytest.approx(individual["tiempo_minutos"], abs=0.1)
+    assert resultados[2]["encontrado"] is False and resultados[2]["distancia_metros"] is None
+
+
+@pytest.mark.django_db
+def test_grafo_y_tabla_se_calculan_una_vez_por_version(django_assert_num_queries, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        (a, b, c, d), _ = _campus()
+    routing.rutas_en_lote([{"lat": 5.7311, "lng": -72.8943}])
+
+    with django_assert_num_queries(0):
+        routing.rutas_en_lote([{"lat": 5.7311, "lng": -72.8943}, {"nodo_id": d.id}])
+
+    # Cortar b - c deja la cancha sin camino desde a
+    tramo = TramoCamino.objects.get(nodo_origen=b, nodo_destino=c)
+    with django_capture_on_commit_callbacks(execute=True):
+        tramo.activo = False
+        tramo.save()
+    (resultado,) = routing.rutas_en_lote([{"nodo_id": a.id}])
+    assert resultado["punto_encuentro"]["nombre"] == "Parqueadero"
+
+
+@pytest.mark.django_db
+def test_endpoint_lote_desde_entradas_de_edificio(client_brigada):
+    (a, b, c, d), _ = _campus()
+    aulas = EdificioBloqueFactory(nombre="Aulas")
+    taller = EdificioBloqueFactory(nombre="Taller")
+    a.edificio = aulas
+    a.save()
+    d.edificio = taller
+    d.save()
+    aislado = NodoCaminoFactory(latitud=5.74, longitud=-72.89, edificio=taller, nombre="Entrada lejana")
+
+    response = client_brigada.get(URL)
+    assert response.status_code == 200
+    assert response.data["total"] == 3 and response.data["sin_ruta"] == 1
+    por_nodo = {r["nodo_id"]: r for r in response.data["resultados"]}
+    assert por_nodo[a.id]["edificio"] == "Aulas" and por_nodo[a.id]["punto_encuentro"]["nombre"] == "Cancha"
+    assert por_nodo[aislado.id]["encontrado"] is False
+    assert response.data["peor"]["nodo_id"] == a.id
+
+    response = client_brigada.get(URL, {"formato": "csv"})
+    assert response["Content-Type"].startswith("text/csv")
+    filas = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert filas[0][0] == "Origen" and len(filas) == 4
+    assert ["Entrada lejana", "Taller"] == filas[-1][:2] and filas[-1][4] == "Sin ruta"
+
+
+@pytest.mark.django_db
+def test_endpoint_lote_con_origenes(client_brigada, client_aprendiz):
+    _campus()
+    origenes = [{"lat": 5.7311, "lng": -72.8943, "etiqueta": "Aula 101"}, {"lat": "5.7306", "lng": -72.8931}]
+
+    response = client_brigada.post(URL, {"origenes": origenes}, format="json")
+    assert response.status_code == 200
+    assert [r["etiqueta"] for r in response.data["resultados"]] == ["Aula 101", "Origen 2"]
+    assert all(r["encontrado"] for r in response.data["resultados"])
+
+    assert client_brigada.post(URL, {"origenes": [{"lat": 1}]}, format="json").status_code == 400
+    assert client_brigada.post(URL, {}, format="json").status_code == 400
+    assert client_aprendiz.post(URL, {"origenes": origenes}, format="json").status_code == 403
+
+
+@pytest.mark.django_db
+def test_nodos_mas_cercanos_igual_que_la_busqueda_lineal():
+    for i in range(20):
+        NodoCaminoFactory(latitud=5.7290 + i * 0.0001, longitud=-72.8950 + (i % 5) * 0.0002)
+    TramoCaminoFactory()
+    G, _ = routing.construir_grafo()
+    posiciones = [(5.7301, -72.8946), (5.7288, -72.8951), (5.75, -72.89)]
+
+    for (nodo, distancia), (lat, lng) in zip(routing.nodos_mas_cercanos(G, posiciones), posiciones):
+        esperado, esperada = routing.nodo_mas_cercano(G, lat, lng)
+        assert nodo == esperado
+        assert distancia == pytest.approx(esperada, abs=1e-6)
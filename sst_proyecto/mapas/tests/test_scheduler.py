@@ -0,0 +1,111 @@
+"""
+Tests del scheduler de tareas programadas y su elección de líder.
+"""
+
+import logging
+
+import pytest
+from apscheduler.jobstores.memory import MemoryJobStore
+
+from mapas import scheduler
+from mapas.liderazgo import CandadoArchivo
+
+
+def test_candado_archivo_es_exclusivo(tmp_path):
+    ruta = str(tmp_path / "scheduler.lock")
+    primero, segundo = CandadoArchivo(ruta), CandadoArchivo(ruta)
+
+    assert primero.adquirir()
+    assert not segundo.adquirir()
+    assert primero.renovar()
+
+    primero.liberar()
+    assert not primero.renovar()
+    assert segundo.adquirir()
+    segundo.liberar()
+
+
+def test_crear_scheduler_registra_todas_las_tareas():
+    sched = scheduler.crear_scheduler(jobstore=MemoryJobStore())
+    sched.start(paused=True)
+    try:
+        ids = {job.id for job in sched.get_jobs()}
+    finally:
+        sched.shutdown(wait=False)
+
+    assert ids == set(scheduler.TAREAS)
+    assert {
+        "verificar_visitantes_exceden_tiempo",
+        "notificar_equipos_proximos_vencer",
+        "generar_reportes_programados",
+    } <= ids
+
+
+def test_solo_un_lider_ejecuta_el_scheduler(tmp_path):
+    ruta = str(tmp_path / "scheduler.lock")
+    crear = lambda: scheduler.crear_scheduler(jobstore=MemoryJobStore())  # noqa: E731
+    lider = scheduler.LiderScheduler(candado=CandadoArchivo(ruta), intervalo=1, crear=crear)
+    reserva = scheduler.LiderScheduler(candado=CandadoArchivo(ruta), intervalo=1, crear=crear)
+    try:
+        assert lider.paso() is True
+        assert reserva.paso() is False
+        assert lider.scheduler.running
+
+        # El líder cae: la reserva toma el relevo en su siguiente intento
+        lider._detener_scheduler()
+        lider.candado.liberar()
+        assert reserva.paso() is True
+    finally:
+        for proceso in (lider, reserva):
+            proceso._detener_scheduler()
+            proceso.candado.liberar()
+
+
+def test_lider_que_pierde_el_candado_detiene_las_tareas(tmp_path):
+    candado = CandadoArchivo(str(tmp_path / "scheduler.lock"))
+    lider = scheduler.LiderScheduler(
+        candado=candado, intervalo=1, crear=lambda: scheduler.crear_scheduler(jobstore=MemoryJobStore())
+    )
+    assert lider.paso()
+    candado.liberar()  # p. ej. la clave de Redis expiró
+    assert lider.paso() is False
+    assert lider.scheduler is None
+
+
+@pytest.mark.django_db
+def test_tarea_registra_su_duracion(caplog, vigilancia, visitante):
+    with caplog.at_level(logging.INFO, logger="mapas.scheduler"):
+        scheduler.verificar_visitantes_exceden_tiempo()
+
+    assert any("verificar_visitantes_exceden_tiempo terminada en" in r.getMessage() for r in caplog.records)
+
+
+@pytest.mark.django_db
+def test_visitante_que_excede_el_tiempo_se_avisa_una_vez_por_dia(vigilancia, instructor, monkeypatch):
+    from datetime import time, timedelta
+
+    from django.utils import timezone
+
+    from usuarios.models import Notificacion, Visitante
+    from usuarios.services import NotificacionService
+
+    # Límite de 0 h: cualquier visitante que ingresó hoy a medianoche ya lo excede
+    verificar = NotificacionService.verificar_visitantes_exceden_tiempo
+    monkeypatch.setattr(NotificacionService, "verificar_visitantes_exceden_tiempo", lambda: verificar(0))
+    hoy = timezone.localdate()
+    for dias in (0, 1):  # hoy y una visita de ayer que nunca registró salida
+        visitante = Visitante.objects.create(
+            nombre_completo=f"Visitante {dias}",
+            tipo_documento="CC",
+            numero_documento=f"90{dias}",
+            persona_a_visitar=instructor,
+            motivo_visita="Reunión",
+        )
+        Visitante.objects.filter(pk=visitante.pk).update(fecha_visita=hoy - timedelta(days=dias), hora_ingreso=time(0))
+
+    scheduler.verificar_visitantes_exceden_tiempo()
+    avisos = Notificacion.objects.filter(destinatario=vigilancia, titulo__contains="Visitante excede tiempo")
+    assert list(avisos.values_list("titulo", flat=True)) == ["⏰ Visitante excede tiempo: Visitante 0"]
+
+    scheduler.verificar_visitantes_exceden_tiempo()
+    assert avisos.count() == 1
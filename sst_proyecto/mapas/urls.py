@@ -15,6 +15,13 @@ router.register("equipamientos", EquipamientoSeguridadViewSet)
 urlpatterns = [
     # Vistas HTML
     path("", views.mapa_interactivo, name="mapa_interactivo"),
+    # Paquete GeoJSON de capas del mapa
+    path("api/capas/", views.capas_mapa, name="capas_mapa"),
+    path("api/capas/<str:huella>/", views.capas_mapa, name="capas_mapa_version"),
+    # Paquete offline del mapa de evacuación (service worker)
+    path("api/offline/", views.paquete_offline, name="paquete_offline"),
+    path("api/offline/version/", views.version_paquete_offline, name="version_paquete_offline"),
+    path("api/offline/<str:huella>/", views.paquete_offline, name="paquete_offline_version"),
     # APIs de estados de edificios
     path("api/edificios/estados/", views.estados_edificios, name="estados_edificios"),
     path("api/edificios/<int:pk>/cambiar-estado/", views.cambiar_estado_edificio, name="cambiar_estado_edificio"),
@@ -23,8 +30,12 @@ urlpatterns = [
     ),
     # API de ruteo peatonal
     path("api/ruta/", views.calcular_ruta_evacuacion, name="calcular_ruta_evacuacion"),
+    path("api/ruta/lote/", views.rutas_lote, name="rutas_lote"),
+    path("api/asignacion/", views.asignacion_puntos, name="asignacion_puntos"),
     # API del grafo de caminos
     path("api/grafo/", views.grafo_caminos, name="grafo_caminos"),
+    path("api/grafo/lote/", views.guardar_grafo_lote, name="guardar_grafo_lote"),
+    path("api/grafo/geojson/", views.grafo_geojson, name="grafo_geojson"),
     path("api/grafo/nodo/", views.guardar_nodo, name="guardar_nodo"),
     path("api/grafo/nodo/<int:nodo_id>/", views.eliminar_nodo, name="eliminar_nodo"),
     path("api/grafo/tramo/", views.guardar_tramo, name="guardar_tramo"),
@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 
@@ -33,14 +34,20 @@ def plano_centro(request):
 
 @login_required
 def campus_svg(request):
-    """Mapa SVG interactivo del campus con estados dinamicos y pathfinding"""
-    edificios = EdificioBloque.objects.filter(activo=True).select_related("estado_actual")
-    puntos = PuntoEncuentro.objects.filter(activo=True)
+    """
+    Mapa SVG del campus con el estado de cada edificio.
+    La capa base es un SVG estático compilado (plano_svg.url_plano()); la página
+    solo colorea los edificios con estados_edificios y el tópico "mapa_estados".
+    """
+    from usuarios.permissions import ROLES_BRIGADA_O_ADMINISTRATIVO, perfil_permisos
+
+    from .plano_svg import url_plano
 
+    perfil = perfil_permisos(request)
     context = {
-        "edificios": edificios,
-        "puntos_encuentro": puntos,
-        "es_brigada": request.user.rol in ("BRIGADA", "ADMINISTRATIVO"),
+        "svg_url": url_plano(),
+        "estados": [(valor, nombre, EstadoEdificio.COLOR_MAP[valor]) for valor, nombre in EstadoEdificio.ESTADOS],
+        "es_brigada": perfil.rol in ROLES_BRIGADA_O_ADMINISTRATIVO or perfil.es_brigada,
     }
     return render(request, "mapas/campus_svg.html", context)
 
@@ -48,32 +55,29 @@ def campus_svg(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def estados_edificios(request):
-    """Retorna el estado actual de todos los edificios para el mapa SVG"""
-    edificios = EdificioBloque.objects.filter(activo=True).select_related("estado_actual")
-    data = []
-    for e in edificios:
-        try:
-            estado_obj = e.estado_actual
-        except EstadoEdificio.DoesNotExist:
-            estado_obj = None
-
-        data.append(
-            {
-                "id": e.id,
-                "nombre": e.nombre,
-                "tipo": e.tipo,
-                "svg_x": e.svg_x,
-                "svg_y": e.svg_y,
-                "svg_ancho": e.svg_ancho,
-                "svg_alto": e.svg_alto,
-                "estado": estado_obj.estado if estado_obj else "NORMAL",
-                "color": estado_obj.color if estado_obj else "#4CAF50",
-                "motivo": estado_obj.motivo if estado_obj else "",
-                "actualizado_por": str(estado_obj.actualizado_por) if estado_obj and estado_obj.actualizado_por else "",
-                "fecha_actualizacion": estado_obj.fecha_actualizacion.isoformat() if estado_obj else None,
-            }
-        )
-    return Response(data)
+    """
+    Retorna el estado actual de todos los edificios para el mapa SVG.
+
+    GET /api/mapas/api/edificios/estados/                  lista completa (cacheada hasta el próximo cambio)
+    GET /api/mapas/api/edificios/estados/?since=<ISO 8601>  solo los que cambiaron desde entonces:
+        {"desde", "hasta", "edificios": [...]}; "hasta" es el since de la siguiente consulta.
+    Los cambios también llegan por el canal en tiempo real (tópico "mapa_estados").
+    """
+    from django.utils import timezone
+    from django.utils.dateparse import parse_datetime
+
+    from .estados import estados_completos, estados_desde
+
+    since = request.query_params.get("since")
+    if not since:
+        return Response(estados_completos())
+
+    desde = parse_datetime(since.replace(" ", "+"))
+    if desde is None:
+        return Response({"error": "since debe ser una fecha ISO 8601."}, status=400)
+    if timezone.is_naive(desde):
+        desde = timezone.make_aware(desde)
+    return Response(estados_desde(desde))
 
 
 @api_view(["POST"])
@@ -88,21 +92,25 @@ def cambiar_estado_edificio(request, pk):
     if nuevo_estado not in estados_validos:
         return Response({"error": "Estado no valido"}, status=400)
 
-    estado_obj, created = EstadoEdificio.objects.get_or_create(edificio=edificio, defaults={"estado": "NORMAL"})
-    estado_anterior = estado_obj.estado
-
-    HistorialEstadoEdificio.objects.create(
-        edificio=edificio,
-        estado_anterior=estado_anterior,
-        estado_nuevo=nuevo_estado,
-        motivo=motivo,
-        cambiado_por=request.user,
-    )
+    # Historial y estado en una sola transacción: el push a "mapa_estados" sale al confirmarla
+    with transaction.atomic():
+        estado_obj, created = EstadoEdificio.objects.select_for_update().get_or_create(
+            edificio=edificio, defaults={"estado": "NORMAL"}
+        )
+        estado_anterior = estado_obj.estado
+
+        HistorialEstadoEdificio.objects.create(
+            edificio=edificio,
+            estado_anterior=estado_anterior,
+            estado_nuevo=nuevo_estado,
+            motivo=motivo,
+            cambiado_por=request.user,
+        )
 
-    estado_obj.estado = nuevo_estado
-    estado_obj.motivo = motivo
-    estado_obj.actualizado_por = request.user
-    estado_obj.save()
+        estado_obj.estado = nuevo_estado
+        estado_obj.motivo = motivo
+        estado_obj.actualizado_por = request.user
+        estado_obj.save()
 
     return Response(
         {
@@ -114,299 +122,116 @@ def cambiar_estado_edificio(request, pk):
     )
 
 
+# Centro de la geocerca del Centro Nacional Minero SENA (radio en metros)
+GEOCERCA_CENTRO = {"lat": 5.7303596, "lng": -72.8943613, "radio": 400}
+
+
 @login_required
 def mapa_interactivo(request):
-    """Vista principal del mapa interactivo - Todos los roles"""
+    """
+    Vista principal del mapa interactivo - Todos los roles.
+    Solo entrega la página: las capas (edificios, puntos, equipamiento, grafo)
+    se cargan desde capas_mapa con la URL versionada por hash de contenido.
+    """
+    from django.urls import reverse
 
-    try:
-        # 1. EDIFICIOS/BLOQUES
-
-        edificios = EdificioBloque.objects.filter(activo=True).values(
-            "id",
-            "nombre",
-            "tipo",
-            "latitud",
-            "longitud",
-            "descripcion",
-            "piso_minimo",
-            "piso_maximo",
-            "capacidad",
-        )
+    from .capas import paquete_actual
 
-        edificios_data = []
-        for edificio in edificios:
-            edificios_data.append(
-                {
-                    "id": edificio["id"],
-                    "nombre": edificio["nombre"],
-                    "tipo": edificio["tipo"],
-                    "latitud": float(edificio["latitud"]),
-                    "longitud": float(edificio["longitud"]),
-                    "descripcion": edificio["descripcion"] or f"Edificio {edificio['tipo']}",
-                    "pisos": f"{edificio['piso_minimo']} - {edificio['piso_maximo']}"
-                    if edificio["piso_maximo"]
-                    else str(edificio["piso_minimo"] or 1),
-                    "capacidad": edificio["capacidad"] or 0,
-                }
-            )
+    huella, _ = paquete_actual()
+    context = {
+        "capas_url": reverse("capas_mapa_version", args=[huella]),
+        "centro_minero": {
+            "lat": GEOCERCA_CENTRO["lat"],
+            "lng": GEOCERCA_CENTRO["lng"],
+            "nombre": "Centro Nacional Minero SENA - Sogamoso, Vereda Morcá",
+        },
+        "geocerca": GEOCERCA_CENTRO,
+    }
+    return render(request, "mapas.html", context)
 
-        # 2. PUNTOS DE ENCUENTRO
 
-        puntos_encuentro = PuntoEncuentro.objects.filter(activo=True).values(
-            "id",
-            "nombre",
-            "latitud",
-            "longitud",
-            "descripcion",
-            "tipo_terreno",
-            "prioridad",
-        )
+def _respuesta_paquete(request, huella, contenido, inmutable):
+    """JSON pre-serializado con ETag = hash; inmutable para las URL versionadas, revalidable si no."""
+    from django.http import HttpResponse
+    from django.utils.cache import get_conditional_response, patch_cache_control
 
-        # Convertir a lista con formato correcto
-        puntos_data = []
-        for punto in puntos_encuentro:
-            puntos_data.append(
-                {
-                    "id": punto["id"],
-                    "nombre": punto["nombre"],
-                    "latitud": float(punto["latitud"]),
-                    "longitud": float(punto["longitud"]),
-                    "descripcion": punto["descripcion"]
-                    or f"Punto de encuentro {punto['tipo_terreno']} - Prioridad {punto['prioridad']}",
-                }
-            )
+    etag = f'"{huella}"'
+    respuesta = get_conditional_response(request, etag=etag) or HttpResponse(contenido, content_type="application/json")
+    respuesta["ETag"] = etag
+    if inmutable:
+        patch_cache_control(respuesta, private=True, max_age=365 * 86400, immutable=True)
+    else:
+        patch_cache_control(respuesta, private=True, no_cache=True)
+    return respuesta
 
-        # 3. EQUIPAMIENTO DE SEGURIDAD
-
-        equipamientos = (
-            EquipamientoSeguridad.objects.filter(estado="OPERATIVO")
-            .select_related("edificio")
-            .values(
-                "id",
-                "tipo",
-                "codigo",
-                "latitud",
-                "longitud",
-                "descripcion",  # Este campo viene del modelo base UbicacionBase
-                "ultima_revision",
-                "proxima_revision",
-                "estado",
-                "edificio__nombre",  # Relación con edificio
-            )
-        )
 
-        # Convertir a lista con formato correcto
-        equipamientos_data = []
-        for equipo in equipamientos:
-            # Formatear fecha de revisión
-            ultima_revision_str = ""
-            if equipo["ultima_revision"]:
-                from django.utils.dateformat import format
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def capas_mapa(request, huella=None):
+    """
+    Paquete GeoJSON de las capas del mapa (mapas/capas.py).
 
-                ultima_revision_str = format(equipo["ultima_revision"], "Y-m-d")
+    GET /api/mapas/capas/          paquete vigente; ETag + revalidación (If-None-Match → 304)
+    GET /api/mapas/capas/<hash>/   paquete inmutable, cacheable un año; si el hash ya no
+                                   existe redirige al vigente
+    """
+    from django.shortcuts import redirect
 
-            # Crear descripción más detallada
-            descripcion_completa = equipo["descripcion"] or ""
-            if equipo["edificio__nombre"]:
-                descripcion_completa += f" | Ubicado en: {equipo['edificio__nombre']}"
+    from .capas import paquete_actual, paquete_por_huella
 
-            equipamientos_data.append(
-                {
-                    "id": equipo["id"],
-                    "tipo": equipo["tipo"],
-                    "codigo": equipo["codigo"],
-                    "latitud": float(equipo["latitud"]),
-                    "longitud": float(equipo["longitud"]),
-                    "ultima_revision": ultima_revision_str,
-                    "proxima_revision": equipo["proxima_revision"].isoformat() if equipo["proxima_revision"] else None,
-                    "descripcion": descripcion_completa or f"Equipo {equipo['tipo']} - {equipo['codigo']}",
-                }
-            )
+    contenido = paquete_por_huella(huella) if huella else None
+    if huella and contenido is None:
+        actual, _ = paquete_actual()
+        return redirect("capas_mapa_version", actual)
+    if contenido is None:
+        huella, contenido = paquete_actual()
 
-        # 4. CREAR DATOS DE EJEMPLO SI NO HAY REALES
+    return _respuesta_paquete(request, huella, contenido, request.resolver_match.url_name == "capas_mapa_version")
 
-        if not edificios_data:
-            # Coordenadas reales del Centro Nacional Minero SENA - Sogamoso, Vereda Morcá
-            # Base: 5.7303596° N, -72.8943613° O
-            edificios_data = [
-                {
-                    "id": 1,
-                    "nombre": "Edificio Administrativo Principal",
-                    "tipo": "ADMINISTRATIVO",
-                    "latitud": 5.73036,
-                    "longitud": -72.89436,
-                    "descripcion": "Dirección y administración del Centro Nacional Minero",
-                    "pisos": "1 - 2",
-                    "capacidad": 100,
-                },
-                {
-                    "id": 2,
-                    "nombre": "Bloque de Aulas Teóricas",
-                    "tipo": "AULAS",
-                    "latitud": 5.73070,
-                    "longitud": -72.89460,
-                    "descripcion": "Aulas para formación teórica en minería",
-                    "pisos": "1 - 2",
-                    "capacidad": 300,
-                },
-                {
-                    "id": 3,
-                    "nombre": "Talleres de Minería",
-                    "tipo": "TALLER",
-                    "latitud": 5.73000,
-                    "longitud": -72.89410,
-                    "descripcion": "Talleres prácticos de maquinaria y equipos mineros",
-                    "pisos": "1",
-                    "capacidad": 150,
-                },
-                {
-                    "id": 4,
-                    "nombre": "Mina Didáctica Subterránea",
-                    "tipo": "TALLER",
-                    "latitud": 5.72970,
-                    "longitud": -72.89430,
-                    "descripcion": "Entrada a la mina didáctica para formación práctica",
-                    "pisos": "1",
-                    "capacidad": 50,
-                },
-                {
-                    "id": 5,
-                    "nombre": "Laboratorios de Geología y Topografía",
-                    "tipo": "LABORATORIO",
-                    "latitud": 5.73090,
-                    "longitud": -72.89420,
-                    "descripcion": "Laboratorios especializados en ciencias de la tierra",
-                    "pisos": "1",
-                    "capacidad": 80,
-                },
-                {
-                    "id": 6,
-                    "nombre": "Cafetería y Bienestar",
-                    "tipo": "CAFETERIA",
-                    "latitud": 5.73050,
-                    "longitud": -72.89480,
-                    "descripcion": "Zona de alimentación y descanso para aprendices",
-                    "pisos": "1",
-                    "capacidad": 200,
-                },
-                {
-                    "id": 7,
-                    "nombre": "Parqueadero Principal",
-                    "tipo": "PARQUEADERO",
-                    "latitud": 5.73120,
-                    "longitud": -72.89510,
-                    "descripcion": "Parqueadero de vehículos y motos",
-                    "pisos": "1",
-                    "capacidad": 100,
-                },
-            ]
-
-        if not puntos_data:
-            puntos_data = [
-                {
-                    "id": 1,
-                    "nombre": "Punto Principal - Cancha Deportiva",
-                    "latitud": 5.730056,
-                    "longitud": -72.894250,
-                    "descripcion": "PRIORIDAD 1: Cancha deportiva central - Espacio abierto amplio para evacuación masiva",
-                },
-                {
-                    "id": 2,
-                    "nombre": "Punto Secundario - Zona Verde",
-                    "latitud": 5.731083,
-                    "longitud": -72.895028,
-                    "descripcion": "PRIORIDAD 2: Zona verde del centro - Área despejada para evacuación",
-                },
-            ]
-
-        # sin equipos registrados → lista vacía
-
-        # 5. GEOCERCA - coordenadas del Centro Nacional Minero SENA
-        geocerca_config = {
-            "lat": 5.7303596,
-            "lng": -72.8943613,
-            "radio": 400,
-        }
 
-        # 6. PREPARAR CONTEXTO
-
-        context = {
-            "edificios": edificios_data,
-            "puntos_encuentro": puntos_data,
-            "equipamiento": equipamientos_data,
-            "centro_minero": {
-                "lat": geocerca_config["lat"],
-                "lng": geocerca_config["lng"],
-                "nombre": "Centro Nacional Minero SENA - Sogamoso, Vereda Morcá",
-            },
-            "geocerca": geocerca_config,
-        }
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def paquete_offline(request, huella=None):
+    """
+    Paquete offline del mapa de evacuación (mapas/offline.py), pre-cacheado por el service worker.
 
-    except Exception:
-        # Manejo de errores con datos de ejemplo
-        context = {
-            "edificios": [
-                {
-                    "id": 1,
-                    "nombre": "Edificio Administrativo Principal",
-                    "tipo": "ADMINISTRATIVO",
-                    "latitud": 5.73036,
-                    "longitud": -72.89436,
-                    "descripcion": "Dirección y administración del Centro Nacional Minero",
-                    "pisos": "1 - 2",
-                    "capacidad": 100,
-                },
-                {
-                    "id": 2,
-                    "nombre": "Bloque de Aulas Teóricas",
-                    "tipo": "AULAS",
-                    "latitud": 5.73070,
-                    "longitud": -72.89460,
-                    "descripcion": "Aulas para formación teórica en minería",
-                    "pisos": "1 - 2",
-                    "capacidad": 300,
-                },
-                {
-                    "id": 3,
-                    "nombre": "Mina Didáctica Subterránea",
-                    "tipo": "TALLER",
-                    "latitud": 5.72970,
-                    "longitud": -72.89430,
-                    "descripcion": "Entrada a la mina didáctica para formación práctica",
-                    "pisos": "1",
-                    "capacidad": 50,
-                },
-            ],
-            "puntos_encuentro": [
-                {
-                    "id": 1,
-                    "nombre": "Punto Principal - Cancha Deportiva",
-                    "latitud": 5.730056,
-                    "longitud": -72.894250,
-                    "descripcion": "PRIORIDAD 1: Cancha deportiva central - Espacio abierto amplio para evacuación masiva",
-                },
-                {
-                    "id": 2,
-                    "nombre": "Punto Secundario - Zona Verde",
-                    "latitud": 5.731083,
-                    "longitud": -72.895028,
-                    "descripcion": "PRIORIDAD 2: Zona verde del centro - Área despejada para evacuación",
-                },
-            ],
-            "equipamiento": [],
-            "centro_minero": {
-                "lat": 5.7303596,
-                "lng": -72.8943613,
-                "nombre": "Centro Nacional Minero SENA - Sogamoso, Vereda Morcá",
-            },
-            "geocerca": {
-                "lat": 5.7303596,
-                "lng": -72.8943613,
-                "radio": 400,
-            },
-        }
+    GET /api/mapas/api/offline/          paquete vigente (ETag + revalidación)
+    GET /api/mapas/api/offline/<hash>/   paquete inmutable; si el hash ya no existe redirige al vigente
+    """
+    from django.shortcuts import redirect
 
-    return render(request, "mapas.html", context)
+    from .offline import paquete_actual, paquete_por_huella
+
+    contenido = paquete_por_huella(huella) if huella else None
+    if huella and contenido is None:
+        actual, _ = paquete_actual()
+        return redirect("paquete_offline_version", actual)
+    if contenido is None:
+        huella, contenido = paquete_actual()
+
+    return _respuesta_paquete(request, huella, contenido, request.resolver_match.url_name == "paquete_offline_version")
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def version_paquete_offline(request):
+    """
+    Versión vigente del paquete offline, para que el service worker decida si
+    descargarlo de nuevo: {"version": <hash>, "url": <URL versionada>, "bytes": n}.
+    """
+    from django.urls import reverse
+
+    from .offline import paquete_actual
+
+    huella, contenido = paquete_actual()
+    return Response(
+        {
+            "version": huella,
+            "url": reverse("paquete_offline_version", args=[huella]),
+            "bytes": len(contenido),
+        },
+        headers={"Cache-Control": "no-cache"},
+    )
 
 
 class EdificioBloqueViewSet(viewsets.ModelViewSet):
@@ -670,6 +495,92 @@ def calcular_ruta_evacuacion(request):
     return Response(resultado)
 
 
+# Máximo de orígenes por petición en rutas_lote
+MAX_ORIGENES_LOTE = 2000
+
+
+@api_view(["GET", "POST"])
+@permission_classes([EsBrigadaOAdministrativo])
+def rutas_lote(request):
+    """
+    Rutas de evacuación en lote para planear simulacros - Solo BRIGADA y ADMINISTRATIVO.
+    Todas salen de una única búsqueda de caminos sobre el grafo cacheado.
+
+    GET  /api/mapas/api/ruta/lote/                 desde todas las entradas de edificio (NodoCamino con edificio)
+    POST /api/mapas/api/ruta/lote/  {"origenes": [{"lat", "lng", "etiqueta"}, ...]}
+    ?formato=csv                                   descarga CSV para el informe del simulacro
+
+    Respuesta: {"total", "sin_ruta", "peor", "resultados": [...]}; cada resultado trae
+    distancia_metros, tiempo_minutos y punto_encuentro, y "peor" es el más lejano.
+    """
+    from django.http import HttpResponse
+
+    from .routing import lote_a_csv, origenes_entradas, rutas_en_lote
+
+    if request.method == "GET":
+        origenes = origenes_entradas()
+    else:
+        crudos = request.data.get("origenes")
+        if not isinstance(crudos, list) or not crudos:
+            return Response({"error": "Se requiere la lista origenes."}, status=400)
+        if len(crudos) > MAX_ORIGENES_LOTE:
+            return Response({"error": f"Máximo {MAX_ORIGENES_LOTE} orígenes por petición."}, status=400)
+        origenes = []
+        for i, crudo in enumerate(crudos):
+            try:
+                origenes.append(
+                    {
+                        "etiqueta": str(crudo.get("etiqueta") or f"Origen {i + 1}"),
+                        "lat": float(crudo["lat"]),
+                        "lng": float(crudo["lng"]),
+                    }
+                )
+            except (AttributeError, KeyError, TypeError, ValueError):
+                return Response({"error": f"Origen {i + 1}: se requieren lat y lng numéricos."}, status=400)
+
+    resultados = rutas_en_lote(origenes)
+
+    if request.query_params.get("formato") == "csv":
+        respuesta = HttpResponse(lote_a_csv(resultados), content_type="text/csv; charset=utf-8")
+        respuesta["Content-Disposition"] = 'attachment; filename="rutas_evacuacion.csv"'
+        return respuesta
+
+    con_ruta = [r for r in resultados if r["encontrado"]]
+    return Response(
+        {
+            "total": len(resultados),
+            "sin_ruta": len(resultados) - len(con_ruta),
+            "peor": max(con_ruta, key=lambda r: r["distancia_metros"], default=None),
+            "resultados": resultados,
+        }
+    )
+
+
+@api_view(["GET", "POST"])
+@permission_classes([EsBrigadaOAdministrativo])
+def asignacion_puntos(request):
+    """
+    Reparto de la gente de cada edificio entre los puntos de encuentro según su
+    capacidad (flujo de costo mínimo, mapas/asignacion.py) - Solo BRIGADA y ADMINISTRATIVO.
+
+    GET  /api/mapas/api/asignacion/                                 con la ocupación estimada de hoy
+    POST /api/mapas/api/asignacion/  {"ocupacion": {"<edificio_id>": personas, ...}}   escenario de simulacro
+    """
+    from .asignacion import calcular_asignacion
+
+    ocupacion = None
+    if request.method == "POST":
+        crudo = request.data.get("ocupacion")
+        if not isinstance(crudo, dict):
+            return Response({"error": "Se requiere ocupacion: {edificio_id: personas}."}, status=400)
+        try:
+            ocupacion = {int(edificio): int(personas) for edificio, personas in crudo.items()}
+        except (TypeError, ValueError):
+            return Response({"error": "ocupacion debe tener ids y personas enteros."}, status=400)
+
+    return Response(calcular_asignacion(ocupacion))
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def grafo_caminos(request):
@@ -760,6 +671,52 @@ def eliminar_tramo(request, tramo_id):
     return Response({"ok": True})
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def guardar_grafo_lote(request):
+    """
+    Aplica un lote de cambios al grafo (altas, cambios y bajas de nodos y tramos)
+    en una sola transacción - Solo ADMINISTRATIVO y COORDINADOR_SST.
+    Formato del diff en mapas/grafo_lote.py.
+
+    POST /api/mapas/api/grafo/lote/  {"nodos": {"guardar": [...], "eliminar": [...]}, "tramos": {...}}
+    """
+    from .grafo_lote import aplicar_cambios
+
+    if request.user.rol not in ("ADMINISTRATIVO", "COORDINADOR_SST"):
+        return Response({"error": "Solo administradores pueden editar el grafo."}, status=403)
+    try:
+        return Response(aplicar_cambios(request.data))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def grafo_geojson(request):
+    """
+    Grafo completo como GeoJSON.
+
+    GET  /api/mapas/api/grafo/geojson/                 descarga (nodos = Point, tramos = LineString)
+    POST /api/mapas/api/grafo/geojson/?reemplazar=1    importa una FeatureCollection como un lote;
+                                                       con reemplazar elimina lo que no esté en el archivo
+    """
+    from .grafo_lote import aplicar_cambios, exportar_geojson, geojson_a_cambios
+
+    if request.method == "GET":
+        respuesta = Response(exportar_geojson(), content_type="application/geo+json")
+        respuesta["Content-Disposition"] = 'attachment; filename="grafo_caminos.geojson"'
+        return respuesta
+
+    if request.user.rol not in ("ADMINISTRATIVO", "COORDINADOR_SST"):
+        return Response({"error": "Solo administradores pueden editar el grafo."}, status=403)
+    reemplazar = request.query_params.get("reemplazar") in ("1", "true")
+    try:
+        return Response(aplicar_cambios(geojson_a_cambios(request.data, reemplazar=reemplazar)))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def guardar_poligono_edificio(request, edificio_id):
@@ -0,0 +1,276 @@
+"""
+Caché en disco de reportes renderizados (PDF / Excel / CSV).
+
+Cada archivo se guarda bajo una clave derivada de su contenido lógico:
+tipo de reporte, variante, formato, periodo, filtros y una "marca de datos"
+que resume las tablas fuente del periodo (conteos, últimos timestamps y, para
+los campos sin timestamp, sumas ponderadas por id).
+Mientras los datos de un periodo no cambien, la clave es la misma y el
+archivo se sirve desde disco sin volver a ejecutar el servicio ni el
+generador. La clave también es el ETag, así que una descarga repetida con
+If-None-Match responde 304 sin leer el archivo.
+
+El directorio (REPORTES_CACHE_DIR) queda fuera de MEDIA_ROOT: los archivos
+llevan datos personales y su nombre es el ETag, así que no deben servirse.
+Tiene un tope de tamaño (REPORTES_CACHE_MAX_BYTES); al superarlo se eliminan
+los archivos usados hace más tiempo (LRU por mtime).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.db.models import Case, Count, F, Max, Sum, Value, When
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .csv_generator import CSVReporteGenerator
+from .excel_generator import ExcelReporteGenerator
+from .pdf_generator import PDFReporteGenerator
+
+logger = logging.getLogger(__name__)
+
+# formato → (generador, extensión, content-type)
+FORMATOS_ARCHIVO = {
+    "pdf": (PDFReporteGenerator, "pdf", "application/pdf"),
+    "excel": (ExcelReporteGenerator, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": (CSVReporteGenerator, "csv", "text/csv; charset=utf-8"),
+}
+
+# Versión del formato de clave: subirla invalida todo lo cacheado (p. ej. al cambiar un generador)
+VERSION_CACHE = 1
+
+
+# ─── Marca de datos ──────────────────────────────────────────────────────────
+
+
+def _resumen(qs, *campos):
+    """
+    Resume un queryset en una sola consulta: total de filas y, por cada campo,
+    cuántas filas lo tienen informado y su valor máximo.
+    """
+    agregados = {"total": Count("pk")}
+    for i, campo in enumerate(campos):
+        agregados[f"n{i}"] = Count(campo)
+        agregados[f"max{i}"] = Max(campo)
+    fila = qs.aggregate(**agregados)
+    return [str(fila[k]) for k in sorted(fila)]
+
+
+def _resumen_emergencias(emergencias):
+    """
+    Conteos y timestamps de las emergencias, más los campos sin timestamp que
+    muestran los reportes (estado, tipo, evacuación, personas afectadas). Cada
+    uno entra como suma ponderada por id: editarlo en cualquier fila, o
+    intercambiar valores entre dos filas, cambia la suma.
+    """
+    from emergencias.models import Emergencia
+
+    ponderados = {
+        "tipos": Sum(F("pk") * F("tipo_id")),
+        "personas": Sum(F("pk") * F("personas_afectadas")),
+        "evacuacion": Sum(Case(When(requiere_evacuacion=True, then=F("pk")), default=Value(0))),
+    }
+    for estado, _ in Emergencia.ESTADO:
+        ponderados[f"estado_{estado}"] = Sum(Case(When(estado=estado, then=F("pk")), default=Value(0)))
+    fila = emergencias.aggregate(**ponderados)
+    return [
+        _resumen(
+            emergencias, "fecha_hora_reporte", "fecha_hora_atencion", "fecha_hora_resolucion", "fecha_hora_falsa_alarma"
+        ),
+        [str(fila[k]) for k in sorted(fila)],
+    ]
+
+
+def marca_datos(tipo, periodo_inicio, periodo_fin, ficha=None, variante=""):
+    """
+    Devuelve una huella de los datos fuente de un reporte en el periodo dado.
+    Cambia cuando se agregan, eliminan o modifican filas que alimentan el reporte.
+    """
+    from control_acceso.models import RegistroAcceso, ConfiguracionAforo
+    from emergencias.models import Emergencia
+    from mapas.models import EquipamientoSeguridad
+    from usuarios.models import Usuario, Visitante
+
+    rango = [periodo_inicio, periodo_fin]
+    partes = []
+
+    if tipo == "aforo":
+        registros = RegistroAcceso.objects.filter(fecha_hora_ingreso__range=rango)
+        partes.append(_resumen(registros, "fecha_hora_ingreso", "fecha_hora_egreso", "usuario__ultima_actualizacion"))
+        partes.append(_resumen(ConfiguracionAforo.objects.all(), "fecha_actualizacion"))
+
+    elif tipo == "incidentes":
+        partes += _resumen_emergencias(Emergencia.objects.filter(fecha_hora_reporte__range=rango))
+
+    elif tipo == "asistencia":
+        aprendices = Usuario.objects.filter(rol="APRENDIZ", ficha=ficha)
+        partes.append(_resumen(aprendices, "ultima_actualizacion"))
+        registros = RegistroAcceso.objects.filter(usuario__in=aprendices, fecha_hora_ingreso__range=rango)
+        partes.append(_resumen(registros, "fecha_hora_ingreso"))
+
+    elif tipo == "seguridad":
+        # El equipamiento no tiene timestamp de modificación: su "marca" son los propios conteos
+        partes.append(
+            list(
+                EquipamientoSeguridad.objects.values_list("tipo", "estado")
+                .annotate(total=Count("id"))
+                .order_by("tipo", "estado")
+            )
+        )
+        if variante == "vigilancia":
+            registros = RegistroAcceso.objects.filter(fecha_hora_ingreso__range=rango)
+            partes.append(_resumen(registros, "fecha_hora_ingreso", "fecha_hora_egreso"))
+            partes.append(_resumen(Visitante.objects.filter(fecha_visita__range=rango), "hora_salida"))
+            partes.append(_resumen(ConfiguracionAforo.objects.all(), "fecha_actualizacion"))
+        else:
+            partes += _resumen_emergencias(Emergencia.objects.filter(fecha_hora_reporte__range=rango))
+
+    return hashlib.sha256(json.dumps(partes, default=str).encode()).hexdigest()
+
+
+def clave_reporte(tipo, formato, periodo_inicio, periodo_fin, marca, filtros=None):
+    """Clave de caché (sha256 hex) de un artefacto de reporte."""
+    contenido = {
+        "v": VERSION_CACHE,
+        "tipo": tipo,
+        "formato": formato,
+        "inicio": str(periodo_inicio),
+        "fin": str(periodo_fin),
+        "filtros": filtros or {},
+        "marca": marca,
+    }
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ─── Almacenamiento en disco ─────────────────────────────────────────────────
+
+
+def _directorio_cache():
+    directorio = getattr(settings, "REPORTES_CACHE_DIR", os.path.join(settings.BASE_DIR, "cache_reportes"))
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+
+def _ruta(clave, extension):
+    return os.path.join(_directorio_cache(), f"{clave}.{extension}")
+
+
+def leer_artefacto(clave, extension):
+    """Devuelve los bytes cacheados o None. Un acierto renueva el mtime (orden LRU)."""
+    ruta = _ruta(clave, extension)
+    try:
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+    return contenido
+
+
+def guardar_artefacto(clave, extension, contenido):
+    """Escribe el artefacto de forma atómica y aplica el límite de tamaño del directorio."""
+    directorio = _directorio_cache()
+    fd, tmp = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        os.replace(tmp, _ruta(clave, extension))
+    except OSError:
+        logger.warning("No se pudo guardar el reporte %s en caché", clave, exc_info=True)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return
+    evictar_lru()
+
+
+def evictar_lru(max_bytes=None):
+    """Elimina los artefactos menos usados hasta dejar el directorio bajo el tope configurado."""
+    if max_bytes is None:
+        max_bytes = getattr(settings, "REPORTES_CACHE_MAX_BYTES", 200 * 1024 * 1024)
+
+    archivos = []
+    total = 0
+    with os.scandir(_directorio_cache()) as it:
+        for entrada in it:
+            if not entrada.is_file() or entrada.name.endswith(".tmp"):
+                continue
+            st = entrada.stat()
+            archivos.append((st.st_mtime, st.st_size, entrada.path))
+            total += st.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    eliminados = 0
+    for _, tamano, ruta in sorted(archivos):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
+        eliminados += 1
+    return eliminados
+
+
+# ─── Respuesta HTTP ──────────────────────────────────────────────────────────
+
+
+def responder_reporte(
+    request,
+    tipo,
+    formato,
+    periodo_inicio,
+    periodo_fin,
+    generar_datos,
+    nombre_archivo,
+    plantilla=None,
+    filtros=None,
+    ficha=None,
+    variante="",
+    disposicion="attachment",
+):
+    """
+    Sirve un reporte renderizado usando la caché de artefactos.
+
+    generar_datos: callable sin argumentos que ejecuta el servicio del reporte;
+    solo se invoca si el artefacto no está en caché.
+    plantilla: sufijo del método del generador (generar_reporte_<plantilla>); por defecto el tipo.
+    """
+    generador, extension, content_type = FORMATOS_ARCHIVO[formato]
+    filtros = dict(filtros or {}, variante=variante, plantilla=plantilla or tipo)
+    if ficha:
+        filtros["ficha"] = ficha
+
+    marca = marca_datos(tipo, periodo_inicio, periodo_fin, ficha=ficha, variante=variante)
+    clave = clave_reporte(tipo, formato, periodo_inicio, periodo_fin, marca, filtros)
+    etag = f'"{clave}"'
+
+    no_modificado = get_conditional_response(request, etag=etag)
+    if no_modificado is not None:
+        patch_cache_control(no_modificado, private=True, no_cache=True)
+        return no_modificado
+
+    contenido = leer_artefacto(clave, extension)
+    cache_estado = "HIT"
+    if contenido is None:
+        cache_estado = "MISS"
+        datos = generar_datos()
+        buffer = getattr(generador, f"generar_reporte_{plantilla or tipo}")(datos)
+        contenido = buffer.getvalue()
+        guardar_artefacto(clave, extension, contenido)
+
+    response = HttpResponse(contenido, content_type=content_type)
+    response["Content-Disposition"] = f'{disposicion}; filename="{nombre_archivo}.{extension}"'
+    response["ETag"] = etag
+    response["X-Reporte-Cache"] = cache_estado
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -5,6 +5,7 @@ Uso:
     python manage.py generar_reportes
     python manage.py generar_reportes --tipo aforo --formato pdf
     python manage.py generar_reportes --todos --enviar-email
+    python manage.py generar_reportes --todos --workers 4
 
 Este comando puede ser ejecutado mediante cron o Celery para automatizar
 la generación de reportes.
@@ -14,8 +15,12 @@ from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from django.core.mail import EmailMessage
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+import json
 import os
+import time
 
 from reportes.models import ConfiguracionReporte, ReporteGenerado
 from reportes.services import (
@@ -29,6 +34,42 @@ from reportes.excel_generator import ExcelReporteGenerator
 from reportes.csv_generator import CSVReporteGenerator
 from usuarios.models import Usuario
 
+# Mapeo ConfiguracionReporte.tipo_reporte → tipo de reporte del comando
+TIPO_MAP = {
+    "AFORO": "aforo",
+    "INCIDENTES": "incidentes",
+    "ASISTENCIA": "asistencia",
+    "SEGURIDAD": "seguridad",
+    "EQUIPAMIENTO": "seguridad",
+}
+
+# formato → (generador, extensión, content-type)
+FORMATOS = {
+    "pdf": (PDFReporteGenerator, "pdf", "application/pdf"),
+    "excel": (ExcelReporteGenerator, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": (CSVReporteGenerator, "csv", "text/csv"),
+}
+
+
+def _inicializar_worker():
+    """Prepara Django en los procesos del pool (necesario con el método de arranque 'spawn')."""
+    import django
+
+    django.setup()
+
+
+def _renderizar_archivo(tipo, formato, datos, filepath):
+    """
+    Renderiza un reporte y lo escribe en disco. Se ejecuta en un proceso del pool:
+    solo recibe datos ya calculados (sin acceso a BD). Retorna los segundos empleados.
+    """
+    inicio = time.perf_counter()
+    generador = FORMATOS[formato][0]
+    buffer = getattr(generador, f"generar_reporte_{tipo}")(datos)
+    with open(filepath, "wb") as f:
+        f.write(buffer.getvalue())
+    return time.perf_counter() - inicio
+
 
 class Command(BaseCommand):
     help = "Genera reportes programados según la configuración en ConfiguracionReporte"
@@ -61,6 +102,12 @@ class Command(BaseCommand):
             default="media/reportes/generados",
             help="Directorio donde guardar los archivos generados",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Con --todos: número de procesos para renderizar/enviar en paralelo (default: 1, secuencial)",
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(
@@ -92,7 +139,10 @@ class Command(BaseCommand):
 
         if options["todos"]:
             # Generar reportes según configuración activa
-            self._generar_reportes_programados(options, fecha_inicio, fecha_fin, output_dir)
+            if options["workers"] > 1:
+                self._generar_reportes_paralelo(options, fecha_inicio, fecha_fin, output_dir)
+            else:
+                self._generar_reportes_programados(options, fecha_inicio, fecha_fin, output_dir)
         elif options["tipo"]:
             # Generar reporte específico
             self._generar_reporte_individual(
@@ -127,15 +177,7 @@ class Command(BaseCommand):
                 continue
 
             # Mapear tipo de reporte
-            tipo_map = {
-                "AFORO": "aforo",
-                "INCIDENTES": "incidentes",
-                "ASISTENCIA": "asistencia",
-                "SEGURIDAD": "seguridad",
-                "EQUIPAMIENTO": "seguridad",
-            }
-
-            tipo = tipo_map.get(config.tipo_reporte)
+            tipo = TIPO_MAP.get(config.tipo_reporte)
             if not tipo:
                 self.stdout.write(self.style.WARNING(f"  - Tipo de reporte no soportado: {config.tipo_reporte}"))
                 continue
@@ -157,6 +199,137 @@ class Command(BaseCommand):
             config.ultima_generacion = timezone.now()
             config.save()
 
+    def _generar_reportes_paralelo(self, options, fecha_inicio, fecha_fin, output_dir):
+        """
+        Variante paralela de _generar_reportes_programados (--workers > 1).
+
+        1. Agrupa las configuraciones por tipo: el dataset de cada (tipo, periodo) se
+           calcula una sola vez, en este proceso, y se reparte a todas las configuraciones.
+        2. Cada dataset se renderiza una vez en un pool de procesos (el render es CPU).
+        3. Los emails de cada configuración se envían en paralelo en un pool de hilos (E/S).
+        Al final se imprime un resumen de tiempos por reporte.
+        """
+        workers = options["workers"]
+        formato = "pdf"
+        _, extension, content_type = FORMATOS[formato]
+
+        configuraciones = ConfiguracionReporte.objects.filter(activo=True).prefetch_related("destinatarios")
+        if not configuraciones.exists():
+            self.stdout.write(self.style.WARNING("No hay configuraciones de reportes activas"))
+            return
+
+        # Agrupar configuraciones por tipo de dataset
+        por_tipo = {}
+        for config in configuraciones:
+            if not self._debe_generar(config):
+                self.stdout.write(f"{config.nombre}: saltando (no es momento de generar)")
+                continue
+            tipo = TIPO_MAP.get(config.tipo_reporte)
+            if not tipo:
+                self.stdout.write(self.style.WARNING(f"{config.nombre}: tipo no soportado {config.tipo_reporte}"))
+                continue
+            if tipo == "asistencia":
+                self.stdout.write(self.style.WARNING(f"{config.nombre}: se requiere --ficha para asistencia"))
+                continue
+            por_tipo.setdefault(tipo, []).append(config)
+
+        if not por_tipo:
+            return
+
+        periodo_inicio = datetime.combine(fecha_inicio, datetime.min.time())
+        periodo_fin = datetime.combine(fecha_fin, datetime.max.time())
+
+        # 1. Un dataset por (tipo, periodo)
+        datasets = {}
+        for tipo, configs in por_tipo.items():
+            t0 = time.perf_counter()
+            try:
+                datos = self._calcular_datos(tipo, periodo_inicio, periodo_fin, None)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Error generando datos de {tipo}: {str(e)}"))
+                continue
+            datasets[tipo] = (datos, time.perf_counter() - t0)
+            self.stdout.write(f"Datos de {tipo} calculados para {len(configs)} configuración(es)")
+
+        # 2. Render en paralelo, una vez por dataset
+        archivos = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as pool:
+            futuros = {}
+            for tipo, (datos, _) in datasets.items():
+                filename = f"reporte_{tipo}_{fecha_inicio}_{fecha_fin}.{extension}"
+                filepath = os.path.join(output_dir, filename)
+                futuros[tipo] = (pool.submit(_renderizar_archivo, tipo, formato, datos, filepath), filepath, filename)
+            for tipo, (futuro, filepath, filename) in futuros.items():
+                try:
+                    archivos[tipo] = (filepath, filename, futuro.result())
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"Error generando archivo de {tipo}: {str(e)}"))
+                    continue
+                self.stdout.write(self.style.SUCCESS(f"  - Archivo guardado: {filepath}"))
+
+        # Guardar en BD y marcar la generación (secuencial: escrituras en la conexión principal)
+        tiempos = []
+        for tipo, (filepath, filename, t_render) in archivos.items():
+            datos, t_datos = datasets[tipo]
+            for config in por_tipo[tipo]:
+                t0 = time.perf_counter()
+                self._guardar_reporte_db(tipo, periodo_inicio, periodo_fin, datos, filepath, config)
+                config.ultima_generacion = timezone.now()
+                config.save(update_fields=["ultima_generacion"])
+                tiempos.append(
+                    {
+                        "config": config,
+                        "tipo": tipo,
+                        "filepath": filepath,
+                        "filename": filename,
+                        "datos": t_datos,
+                        "render": t_render,
+                        "guardar": time.perf_counter() - t0,
+                        "email": 0.0,
+                    }
+                )
+
+        # 3. Envío de emails en paralelo
+        if options["enviar_email"] and tiempos:
+
+            def enviar(fila):
+                t0 = time.perf_counter()
+                self._enviar_email(fila["config"], fila["filepath"], fila["filename"], content_type)
+                fila["email"] = time.perf_counter() - t0
+
+            with ThreadPoolExecutor(max_workers=workers) as hilos:
+                list(hilos.map(enviar, tiempos))
+
+        self._imprimir_resumen_tiempos(tiempos)
+
+    def _imprimir_resumen_tiempos(self, tiempos):
+        """Imprime el tiempo por reporte. Datos y render se comparten entre reportes del mismo tipo."""
+        if not tiempos:
+            return
+        self.stdout.write(self.style.HTTP_INFO("Resumen de tiempos (segundos):"))
+        self.stdout.write(
+            f"  {'Reporte':<40} {'Tipo':<12} {'Datos*':>8} {'Render*':>8} {'BD':>8} {'Email':>8} {'Total':>8}"
+        )
+        for fila in tiempos:
+            total = fila["datos"] + fila["render"] + fila["guardar"] + fila["email"]
+            self.stdout.write(
+                f"  {fila['config'].nombre[:40]:<40} {fila['tipo']:<12} {fila['datos']:>8.2f} "
+                f"{fila['render']:>8.2f} {fila['guardar']:>8.2f} {fila['email']:>8.2f} {total:>8.2f}"
+            )
+        self.stdout.write("  * calculado una vez por tipo y compartido entre sus configuraciones")
+
+    def _calcular_datos(self, tipo, periodo_inicio, periodo_fin, ficha):
+        """Ejecuta el servicio de datos correspondiente al tipo de reporte"""
+        if tipo == "aforo":
+            return ReporteAforoService.generar_reporte(periodo_inicio, periodo_fin)
+        elif tipo == "incidentes":
+            return ReporteIncidentesService.generar_reporte(periodo_inicio, periodo_fin)
+        elif tipo == "asistencia":
+            return ReporteAsistenciaService.generar_reporte(ficha, periodo_inicio, periodo_fin)
+        elif tipo == "seguridad":
+            return ReporteSeguridadService.generar_reporte(periodo_inicio, periodo_fin)
+        raise CommandError(f"Tipo de reporte no válido: {tipo}")
+
     def _debe_generar(self, config):
         """Verifica si es momento de generar el reporte según la frecuencia"""
         if not config.ultima_generacion:
@@ -184,43 +357,22 @@ class Command(BaseCommand):
         periodo_inicio = datetime.combine(fecha_inicio, datetime.min.time())
         periodo_fin = datetime.combine(fecha_fin, datetime.max.time())
 
+        if tipo == "asistencia" and not ficha:
+            self.stdout.write(self.style.WARNING("  - Se requiere --ficha para reportes de asistencia"))
+            return
+
         try:
-            if tipo == "aforo":
-                datos = ReporteAforoService.generar_reporte(periodo_inicio, periodo_fin)
-            elif tipo == "incidentes":
-                datos = ReporteIncidentesService.generar_reporte(periodo_inicio, periodo_fin)
-            elif tipo == "asistencia":
-                if not ficha:
-                    self.stdout.write(self.style.WARNING("  - Se requiere --ficha para reportes de asistencia"))
-                    return
-                datos = ReporteAsistenciaService.generar_reporte(ficha, periodo_inicio, periodo_fin)
-            elif tipo == "seguridad":
-                datos = ReporteSeguridadService.generar_reporte(periodo_inicio, periodo_fin)
-            else:
-                raise CommandError(f"Tipo de reporte no válido: {tipo}")
+            datos = self._calcular_datos(tipo, periodo_inicio, periodo_fin, ficha)
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"  - Error generando datos: {str(e)}"))
             return
 
         # Generar archivo según formato
+        if formato not in FORMATOS:
+            raise CommandError(f"Formato no válido: {formato}")
+        generador, extension, content_type = FORMATOS[formato]
         try:
-            if formato == "pdf":
-                generator_method = getattr(PDFReporteGenerator, f"generar_reporte_{tipo}")
-                buffer = generator_method(datos)
-                extension = "pdf"
-                content_type = "application/pdf"
-            elif formato == "excel":
-                generator_method = getattr(ExcelReporteGenerator, f"generar_reporte_{tipo}")
-                buffer = generator_method(datos)
-                extension = "xlsx"
-                content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            elif formato == "csv":
-                generator_method = getattr(CSVReporteGenerator, f"generar_reporte_{tipo}")
-                buffer = generator_method(datos)
-                extension = "csv"
-                content_type = "text/csv"
-            else:
-                raise CommandError(f"Formato no válido: {formato}")
+            buffer = getattr(generador, f"generar_reporte_{tipo}")(datos)
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"  - Error generando archivo: {str(e)}"))
             return
@@ -263,7 +415,7 @@ class Command(BaseCommand):
                     configuracion=config,
                     periodo_inicio=periodo_inicio,
                     periodo_fin=periodo_fin,
-                    datos_json=datos,
+                    datos_json=json.loads(json.dumps(datos, cls=DjangoJSONEncoder)),
                     generado_por=usuario,
                 )
                 self.stdout.write(f"  - Guardado en BD: ID {reporte.id}")
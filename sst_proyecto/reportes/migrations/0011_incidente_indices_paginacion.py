@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0010_add_personas_afectadas_json'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incidente',
+            index=models.Index(fields=['-fecha_reporte', '-id'], name='incidente_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidente',
+            index=models.Index(fields=['reportado_por', '-fecha_reporte', '-id'], name='incidente_reporta_fecha_idx'),
+        ),
+    ]
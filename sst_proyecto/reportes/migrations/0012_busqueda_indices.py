@@ -0,0 +1,69 @@
+"""
+Índices de búsqueda de incidentes (sst_proyecto/busqueda.py, índice "incidentes").
+"""
+
+from django.db import migrations
+
+from sst_proyecto.busqueda import RunSQLMotor
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0011_incidente_indices_paginacion'),
+    ]
+
+    operations = [
+        # PostgreSQL: las expresiones deben coincidir con las que genera busqueda.py
+        # (SearchVector ponderado; UPPER(campo::text) de icontains/istartswith)
+        RunSQLMotor(
+            vendor='postgresql',
+            sql=[
+                """
+                    CREATE INDEX IF NOT EXISTS reportes_incidente_busq_fts ON reportes_incidente USING gin ((
+                        ((setweight(to_tsvector('spanish'::regconfig, COALESCE(titulo, '')), 'A')
+                        || setweight(to_tsvector('spanish'::regconfig, COALESCE(persona_afectada, '')), 'B'))
+                        || setweight(to_tsvector('spanish'::regconfig, COALESCE(descripcion, '')), 'C'))
+                    ))
+                """,
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS reportes_incidente_busq_fts",
+            ],
+        ),
+        # SQLite: tabla FTS5 de contenido externo sincronizada con triggers
+        RunSQLMotor(
+            vendor='sqlite',
+            sql=[
+                """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_incidentes USING fts5(
+                        titulo, persona_afectada, descripcion,
+                        content='reportes_incidente', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                    )
+                """,
+                """
+                    CREATE TRIGGER IF NOT EXISTS busqueda_incidentes_ai AFTER INSERT ON reportes_incidente BEGIN
+                        INSERT INTO busqueda_incidentes(rowid, titulo, persona_afectada, descripcion) VALUES (new.id, new.titulo, new.persona_afectada, new.descripcion);
+                    END
+                """,
+                """
+                    CREATE TRIGGER IF NOT EXISTS busqueda_incidentes_ad AFTER DELETE ON reportes_incidente BEGIN
+                        INSERT INTO busqueda_incidentes(busqueda_incidentes, rowid, titulo, persona_afectada, descripcion) VALUES ('delete', old.id, old.titulo, old.persona_afectada, old.descripcion);
+                    END
+                """,
+                """
+                    CREATE TRIGGER IF NOT EXISTS busqueda_incidentes_au AFTER UPDATE OF titulo, persona_afectada, descripcion ON reportes_incidente BEGIN
+                        INSERT INTO busqueda_incidentes(busqueda_incidentes, rowid, titulo, persona_afectada, descripcion) VALUES ('delete', old.id, old.titulo, old.persona_afectada, old.descripcion);
+                        INSERT INTO busqueda_incidentes(rowid, titulo, persona_afectada, descripcion) VALUES (new.id, new.titulo, new.persona_afectada, new.descripcion);
+                    END
+                """,
+                "INSERT INTO busqueda_incidentes(busqueda_incidentes) VALUES ('rebuild')",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS busqueda_incidentes_ai",
+                "DROP TRIGGER IF EXISTS busqueda_incidentes_ad",
+                "DROP TRIGGER IF EXISTS busqueda_incidentes_au",
+                "DROP TABLE IF EXISTS busqueda_incidentes",
+            ],
+        ),
+    ]
@@ -212,6 +212,11 @@ class Incidente(models.Model):
         verbose_name = "Incidente"
         verbose_name_plural = "Incidentes"
         ordering = ["-fecha_reporte"]  # Más recientes primero
+        indexes = [
+            # Paginación keyset del listado (fecha_reporte, id), global y por reportante
+            models.Index(fields=["-fecha_reporte", "-id"], name="incidente_fecha_id_idx"),
+            models.Index(fields=["reportado_por", "-fecha_reporte", "-id"], name="incidente_reporta_fecha_idx"),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.titulo}"
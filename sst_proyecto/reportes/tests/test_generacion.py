@@ -56,6 +56,101 @@ def test_reporte_pdf_aforo_devuelve_pdf(client_administrativo):
     assert response["Content-Type"] == "application/pdf"
 
 
+# ---------------------------------------------------------------------------
+# Caché de artefactos renderizados + ETag
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_reporte_csv_se_sirve_desde_cache(client_administrativo):
+    inicio, fin = _rango_fechas()
+    url = f"/reportes/api/aforo/?fecha_inicio={inicio}&fecha_fin={fin}&formato=csv"
+    primera = client_administrativo.get(url)
+    segunda = client_administrativo.get(url)
+    assert primera["X-Reporte-Cache"] == "MISS"
+    assert segunda["X-Reporte-Cache"] == "HIT"
+    assert primera["ETag"] == segunda["ETag"]
+    assert primera.content == segunda.content
+
+
+@pytest.mark.django_db
+def test_reporte_if_none_match_devuelve_304(client_administrativo):
+    inicio, fin = _rango_fechas()
+    url = f"/reportes/api/aforo/?fecha_inicio={inicio}&fecha_fin={fin}&formato=pdf"
+    etag = client_administrativo.get(url)["ETag"]
+    response = client_administrativo.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert not response.content
+
+
+@pytest.mark.django_db
+def test_reporte_cambio_de_datos_invalida_etag(client_administrativo, tipo_emergencia):
+    from emergencias.tests.factories import EmergenciaFactory
+
+    hoy = timezone.now().date()
+    inicio, fin = hoy - timedelta(days=7), hoy + timedelta(days=1)
+    url = f"/reportes/api/incidentes/?fecha_inicio={inicio}&fecha_fin={fin}&formato=csv"
+    etag_antes = client_administrativo.get(url)["ETag"]
+    EmergenciaFactory(tipo=tipo_emergencia)
+    response = client_administrativo.get(url, HTTP_IF_NONE_MATCH=etag_antes)
+    assert response.status_code == 200
+    assert response["ETag"] != etag_antes
+    assert response["X-Reporte-Cache"] == "MISS"
+
+
+def test_cache_reportes_expulsa_lru_por_tamano(settings):
+    import os
+    from reportes.cache_reportes import guardar_artefacto, leer_artefacto
+
+    settings.REPORTES_CACHE_MAX_BYTES = 250
+    guardar_artefacto("a", "csv", b"x" * 100)
+    guardar_artefacto("b", "csv", b"x" * 100)
+    os.utime(os.path.join(settings.REPORTES_CACHE_DIR, "a.csv"), (1, 1))
+    os.utime(os.path.join(settings.REPORTES_CACHE_DIR, "b.csv"), (2, 2))
+    assert leer_artefacto("a", "csv") is not None  # "a" pasa a ser el más reciente
+    guardar_artefacto("c", "csv", b"x" * 100)
+    assert leer_artefacto("b", "csv") is None
+    assert leer_artefacto("a", "csv") is not None
+    assert leer_artefacto("c", "csv") is not None
+
+
+# ---------------------------------------------------------------------------
+# generar_reportes --todos en paralelo
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_generar_reportes_paralelo_calcula_cada_dataset_una_vez(administrativo, tmp_path, monkeypatch):
+    from io import StringIO
+    from django.core import mail
+    from django.core.management import call_command
+    from reportes.models import ConfiguracionReporte, ReporteGenerado
+    from reportes.services import ReporteAforoService
+
+    llamadas = []
+    original = ReporteAforoService.generar_reporte
+    monkeypatch.setattr(
+        ReporteAforoService, "generar_reporte", staticmethod(lambda *a: llamadas.append(a) or original(*a))
+    )
+
+    for nombre, tipo in [("Aforo A", "AFORO"), ("Aforo B", "AFORO"), ("Incidentes", "INCIDENTES")]:
+        config = ConfiguracionReporte.objects.create(
+            nombre=nombre, tipo_reporte=tipo, frecuencia="DIARIO", hora_generacion="06:00"
+        )
+        config.destinatarios.add(administrativo)
+
+    salida = StringIO()
+    call_command(
+        "generar_reportes", "--todos", "--workers", "2", "--enviar-email", "--output-dir", str(tmp_path), stdout=salida
+    )
+
+    assert len(llamadas) == 1
+    assert ReporteGenerado.objects.count() == 3
+    assert len(mail.outbox) == 3
+    assert not ConfiguracionReporte.objects.filter(ultima_generacion__isnull=True).exists()
+    assert "Resumen de tiempos" in salida.getvalue()
+
+
 # ---------------------------------------------------------------------------
 # Control de permisos en reportes
 # ---------------------------------------------------------------------------
@@ -126,3 +221,30 @@ def test_aforo_critico_genera_notificacion(client_vigilancia, vigilancia, admini
     assert response.status_code == 201
 
     assert Notificacion.objects.filter(tipo="SISTEMA").exists()
+
+
+@pytest.mark.django_db
+def test_reporte_incidentes_invalida_al_editar_campos_sin_timestamp(client_administrativo, tipo_emergencia):
+    from emergencias.models import Emergencia
+    from emergencias.tests.factories import EmergenciaFactory, TipoEmergenciaFactory
+
+    hoy = timezone.now().date()
+    url = f"/reportes/api/incidentes/?fecha_inicio={hoy - timedelta(days=7)}&fecha_fin={hoy + timedelta(days=1)}&formato=csv"
+    primera, segunda = EmergenciaFactory(tipo=tipo_emergencia), EmergenciaFactory(tipo=tipo_emergencia)
+    otro_tipo = TipoEmergenciaFactory()
+
+    etags = {client_administrativo.get(url)["ETag"]}
+    cambios = [
+        {"estado": "EN_ATENCION"},
+        {"tipo": otro_tipo},
+        {"requiere_evacuacion": True},
+        {"personas_afectadas": 4},
+    ]
+    for cambio in cambios:
+        Emergencia.objects.filter(pk=primera.pk).update(**cambio)
+        etags.add(client_administrativo.get(url)["ETag"])
+    # Intercambiar el estado entre dos filas tampoco deja la marca igual
+    Emergencia.objects.filter(pk=segunda.pk).update(estado="EN_ATENCION")
+    Emergencia.objects.filter(pk=primera.pk).update(estado="REPORTADA")
+    etags.add(client_administrativo.get(url)["ETag"])
+    assert len(etags) == len(cambios) + 2
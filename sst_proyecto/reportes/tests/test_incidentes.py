@@ -116,6 +116,69 @@ def test_listar_incidentes_requiere_login(client):
     assert response.status_code == 302  # redirige a login
 
 
+def _envejecer(incidente, horas):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    Incidente.objects.filter(pk=incidente.pk).update(fecha_reporte=timezone.now() - timedelta(hours=horas))
+
+
+@pytest.mark.django_db
+def test_listar_incidentes_sla_y_conteos_en_sql(django_client_administrativo, administrativo):
+    _envejecer(_crear_incidente(administrativo), 80)
+    _envejecer(_crear_incidente(administrativo), 30)
+    _envejecer(_crear_incidente(administrativo, estado="EN_PROCESO"), 10)
+    _envejecer(_crear_incidente(administrativo, estado="RESUELTO"), 100)
+    _crear_incidente(administrativo)
+
+    response = django_client_administrativo.get(LIST_URL)
+    ctx = response.context
+    assert (ctx["total"], ctx["reportados"], ctx["en_proceso"], ctx["resueltos"], ctx["criticos_sla"]) == (
+        5,
+        3,
+        1,
+        1,
+        1,
+    )
+    assert [i.sla_estado for i in ctx["incidentes"]] == ["ok", "proximo", "vencido", "critico", "ok"]
+
+
+@pytest.mark.django_db
+def test_listar_incidentes_pagina_por_cursor(django_client_administrativo, administrativo):
+    creados = [_crear_incidente(administrativo) for _ in range(20)]
+    esperados = [i.pk for i in sorted(creados, key=lambda i: (i.fecha_reporte, i.pk), reverse=True)]
+
+    primera = django_client_administrativo.get(LIST_URL).context["incidentes"]
+    assert [i.pk for i in primera] == esperados[:15]
+    assert not primera.has_previous()
+
+    segunda = django_client_administrativo.get(LIST_URL, {"despues": primera.cursor_siguiente}).context["incidentes"]
+    assert [i.pk for i in segunda] == esperados[15:]
+    assert not segunda.has_next()
+
+    de_vuelta = django_client_administrativo.get(LIST_URL, {"antes": segunda.cursor_anterior}).context["incidentes"]
+    assert [i.pk for i in de_vuelta] == esperados[:15]
+
+
+@pytest.mark.django_db
+def test_listar_incidentes_consultas_no_crecen_con_el_historial(django_client_administrativo, administrativo):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def consultas():
+        with CaptureQueriesContext(connection) as ctx:
+            assert django_client_administrativo.get(LIST_URL).status_code == 200
+        return len(ctx)
+
+    _crear_incidente(administrativo)
+    consultas()  # calienta cachés de la sesión (no leídas, etc.)
+    pocas = consultas()
+    for _ in range(40):
+        _crear_incidente(administrativo)
+    assert consultas() == pocas
+
+
 # ---------------------------------------------------------------------------
 # crear_incidente
 # ---------------------------------------------------------------------------
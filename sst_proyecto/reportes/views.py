@@ -18,9 +18,7 @@ from .services import (
     ReporteAsistenciaService,
     ReporteSeguridadService,
 )
-from .pdf_generator import PDFReporteGenerator
-from .excel_generator import ExcelReporteGenerator
-from .csv_generator import CSVReporteGenerator
+from .cache_reportes import FORMATOS_ARCHIVO, responder_reporte
 from control_acceso.models import RegistroAcceso, ConfiguracionAforo
 from emergencias.models import Emergencia
 
@@ -94,12 +92,26 @@ class ReporteViewSet(viewsets.ModelViewSet):
         except ValueError:
             return Response({"error": "Formato de fecha inválido. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
 
+        guardar = request.query_params.get("guardar") == "true"
+
+        # Los formatos de archivo se sirven desde la caché de artefactos (salvo si hay que guardar el reporte)
+        if formato in FORMATOS_ARCHIVO and not guardar:
+            return responder_reporte(
+                request,
+                "aforo",
+                formato,
+                periodo_inicio,
+                periodo_fin,
+                generar_datos=lambda: ReporteAforoService.generar_reporte(periodo_inicio, periodo_fin),
+                nombre_archivo=f"reporte_aforo_{fecha_inicio}_{fecha_fin}",
+            )
+
         try:
             # Generar reporte
             datos = ReporteAforoService.generar_reporte(periodo_inicio, periodo_fin)
 
             # Guardar en base de datos si se solicita
-            if request.query_params.get("guardar") == "true":
+            if guardar:
                 config, _ = ConfiguracionReporte.objects.get_or_create(
                     nombre=f"Reporte Aforo {fecha_inicio} a {fecha_fin}",
                     tipo_reporte="AFORO",
@@ -122,25 +134,13 @@ class ReporteViewSet(viewsets.ModelViewSet):
             )
 
         # Retornar en el formato solicitado
-        if formato == "pdf":
-            pdf_buffer = PDFReporteGenerator.generar_reporte_aforo(datos)
-            response = HttpResponse(pdf_buffer.getvalue(), content_type="application/pdf")
-            response["Content-Disposition"] = f'attachment; filename="reporte_aforo_{fecha_inicio}_{fecha_fin}.pdf"'
-            return response
-
-        elif formato == "excel":
-            excel_buffer = ExcelReporteGenerator.generar_reporte_aforo(datos)
-            response = HttpResponse(
-                excel_buffer.getvalue(),
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        if formato in FORMATOS_ARCHIVO:
+            generador, extension, content_type = FORMATOS_ARCHIVO[formato]
+            buffer = generador.generar_reporte_aforo(datos)
+            response = HttpResponse(buffer.getvalue(), content_type=content_type)
+            response["Content-Disposition"] = (
+                f'attachment; filename="reporte_aforo_{fecha_inicio}_{fecha_fin}.{extension}"'
             )
-            response["Content-Disposition"] = f'attachment; filename="reporte_aforo_{fecha_inicio}_{fecha_fin}.xlsx"'
-            return response
-
-        elif formato == "csv":
-            csv_buffer = CSVReporteGenerator.generar_reporte_aforo(datos)
-            response = HttpResponse(csv_buffer.getvalue(), content_type="text/csv; charset=utf-8")
-            response["Content-Disposition"] = f'attachment; filename="reporte_aforo_{fecha_inicio}_{fecha_fin}.csv"'
             return response
 
         return Response(datos)
@@ -168,38 +168,33 @@ class ReporteViewSet(viewsets.ModelViewSet):
 
         # Generar reporte
         if request.user.rol == "INSTRUCTOR":
-            datos = ReporteIncidentesService.generar_reporte_instruccion(periodo_inicio, periodo_fin, request.user)
+
+            def generar_datos():
+                return ReporteIncidentesService.generar_reporte_instruccion(periodo_inicio, periodo_fin, request.user)
+
+            # El reporte de instrucción depende del instructor que lo solicita
+            filtros = {"instructor": request.user.pk}
         else:
-            datos = ReporteIncidentesService.generar_reporte(periodo_inicio, periodo_fin)
 
-        # Retornar en el formato solicitado
-        if formato == "pdf":
-            pdf_buffer = PDFReporteGenerator.generar_reporte_incidentes(datos)
-            response = HttpResponse(pdf_buffer.getvalue(), content_type="application/pdf")
-            response["Content-Disposition"] = (
-                f'attachment; filename="reporte_incidentes_{fecha_inicio}_{fecha_fin}.pdf"'
-            )
-            return response
+            def generar_datos():
+                return ReporteIncidentesService.generar_reporte(periodo_inicio, periodo_fin)
 
-        elif formato == "excel":
-            excel_buffer = ExcelReporteGenerator.generar_reporte_incidentes(datos)
-            response = HttpResponse(
-                excel_buffer.getvalue(),
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-            response["Content-Disposition"] = (
-                f'attachment; filename="reporte_incidentes_{fecha_inicio}_{fecha_fin}.xlsx"'
-            )
-            return response
+            filtros = None
 
-        elif formato == "csv":
-            csv_buffer = CSVReporteGenerator.generar_reporte_incidentes(datos)
-            response = HttpResponse(csv_buffer.getvalue(), content_type="text/csv; charset=utf-8")
-            response["Content-Disposition"] = (
-                f'attachment; filename="reporte_incidentes_{fecha_inicio}_{fecha_fin}.csv"'
+        # Retornar en el formato solicitado
+        if formato in FORMATOS_ARCHIVO:
+            return responder_reporte(
+                request,
+                "incidentes",
+                formato,
+                periodo_inicio,
+                periodo_fin,
+                generar_datos=generar_datos,
+                nombre_archivo=f"reporte_incidentes_{fecha_inicio}_{fecha_fin}",
+                filtros=filtros,
             )
-            return response
 
+        datos = generar_datos()
         return Response(datos)
 
     @action(detail=False, methods=["get"])
@@ -226,36 +221,21 @@ class ReporteViewSet(viewsets.ModelViewSet):
         except ValueError:
             return Response({"error": "Formato de fecha inválido. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Generar reporte
-        datos = ReporteAsistenciaService.generar_reporte(ficha, periodo_inicio, periodo_fin)
-
         # Retornar en el formato solicitado
-        if formato == "pdf":
-            pdf_buffer = PDFReporteGenerator.generar_reporte_asistencia(datos)
-            response = HttpResponse(pdf_buffer.getvalue(), content_type="application/pdf")
-            response["Content-Disposition"] = (
-                f'attachment; filename="reporte_asistencia_ficha_{ficha}_{fecha_inicio}_{fecha_fin}.pdf"'
+        if formato in FORMATOS_ARCHIVO:
+            return responder_reporte(
+                request,
+                "asistencia",
+                formato,
+                periodo_inicio,
+                periodo_fin,
+                generar_datos=lambda: ReporteAsistenciaService.generar_reporte(ficha, periodo_inicio, periodo_fin),
+                nombre_archivo=f"reporte_asistencia_ficha_{ficha}_{fecha_inicio}_{fecha_fin}",
+                ficha=ficha,
             )
-            return response
-
-        elif formato == "excel":
-            excel_buffer = ExcelReporteGenerator.generar_reporte_asistencia(datos)
-            response = HttpResponse(
-                excel_buffer.getvalue(),
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-            response["Content-Disposition"] = (
-                f'attachment; filename="reporte_asistencia_ficha_{ficha}_{fecha_inicio}_{fecha_fin}.xlsx"'
-            )
-            return response
 
-        elif formato == "csv":
-            csv_buffer = CSVReporteGenerator.generar_reporte_asistencia(datos)
-            response = HttpResponse(csv_buffer.getvalue(), content_type="text/csv; charset=utf-8")
-            response["Content-Disposition"] = (
-                f'attachment; filename="reporte_asistencia_ficha_{ficha}_{fecha_inicio}_{fecha_fin}.csv"'
-            )
-            return response
+        # Generar reporte
+        datos = ReporteAsistenciaService.generar_reporte(ficha, periodo_inicio, periodo_fin)
 
         return Response(datos)
 
@@ -286,52 +266,38 @@ class ReporteViewSet(viewsets.ModelViewSet):
                 )
 
         # Generar reporte según rol
+        plantilla = "seguridad"
         if request.user.rol == "VIGILANCIA":
-            datos = ReporteSeguridadService.generar_reporte_vigilancia(periodo_inicio, periodo_fin)
+            variante = "vigilancia"
+            generar = ReporteSeguridadService.generar_reporte_vigilancia
         elif request.user.rol == "BRIGADA":
-            datos = ReporteSeguridadService.generar_reporte_emergencias(periodo_inicio, periodo_fin)
+            variante = "emergencias"
+            generar = ReporteSeguridadService.generar_reporte_emergencias
+            # Usar reporte de emergencias si es Brigada (el PDF mantiene la plantilla de seguridad)
+            if formato in ("excel", "csv"):
+                plantilla = "emergencias"
         else:
-            datos = ReporteSeguridadService.generar_reporte(periodo_inicio, periodo_fin)
+            variante = ""
+            generar = ReporteSeguridadService.generar_reporte
 
         fecha_inicio_str = fecha_inicio if isinstance(fecha_inicio, str) else fecha_inicio.strftime("%Y-%m-%d")
         fecha_fin_str = fecha_fin if isinstance(fecha_fin, str) else fecha_fin.strftime("%Y-%m-%d")
 
         # Retornar en el formato solicitado
-        if formato == "pdf":
-            pdf_buffer = PDFReporteGenerator.generar_reporte_seguridad(datos)
-            response = HttpResponse(pdf_buffer.getvalue(), content_type="application/pdf")
-            response["Content-Disposition"] = (
-                f'attachment; filename="reporte_seguridad_{fecha_inicio_str}_{fecha_fin_str}.pdf"'
+        if formato in FORMATOS_ARCHIVO:
+            return responder_reporte(
+                request,
+                "seguridad",
+                formato,
+                periodo_inicio,
+                periodo_fin,
+                generar_datos=lambda: generar(periodo_inicio, periodo_fin),
+                nombre_archivo=f"reporte_seguridad_{fecha_inicio_str}_{fecha_fin_str}",
+                plantilla=plantilla,
+                variante=variante,
             )
-            return response
-
-        elif formato == "excel":
-            # Usar reporte de emergencias si es Brigada
-            if request.user.rol == "BRIGADA":
-                excel_buffer = ExcelReporteGenerator.generar_reporte_emergencias(datos)
-            else:
-                excel_buffer = ExcelReporteGenerator.generar_reporte_seguridad(datos)
-            response = HttpResponse(
-                excel_buffer.getvalue(),
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-            response["Content-Disposition"] = (
-                f'attachment; filename="reporte_seguridad_{fecha_inicio_str}_{fecha_fin_str}.xlsx"'
-            )
-            return response
-
-        elif formato == "csv":
-            # Usar reporte de emergencias si es Brigada
-            if request.user.rol == "BRIGADA":
-                csv_buffer = CSVReporteGenerator.generar_reporte_emergencias(datos)
-            else:
-                csv_buffer = CSVReporteGenerator.generar_reporte_seguridad(datos)
-            response = HttpResponse(csv_buffer.getvalue(), content_type="text/csv; charset=utf-8")
-            response["Content-Disposition"] = (
-                f'attachment; filename="reporte_seguridad_{fecha_inicio_str}_{fecha_fin_str}.csv"'
-            )
-            return response
 
+        datos = generar(periodo_inicio, periodo_fin)
         return Response(datos)
 
     @action(detail=False, methods=["get"])
@@ -440,9 +406,13 @@ def generar_pdf_aforo(request):
     fecha_fin = timezone.now().date()
     fecha_inicio = fecha_fin - timedelta(days=30)
 
-    datos = ReporteAforoService.generar_reporte(fecha_inicio, fecha_fin)
-    pdf_buffer = PDFReporteGenerator.generar_reporte_aforo(datos)
-
-    response = HttpResponse(pdf_buffer.getvalue(), content_type="application/pdf")
-    response["Content-Disposition"] = f'inline; filename="reporte_aforo_{fecha_fin}.pdf"'
-    return response
+    return responder_reporte(
+        request,
+        "aforo",
+        "pdf",
+        fecha_inicio,
+        fecha_fin,
+        generar_datos=lambda: ReporteAforoService.generar_reporte(fecha_inicio, fecha_fin),
+        nombre_archivo=f"reporte_aforo_{fecha_fin}",
+        disposicion="inline",
+    )
@@ -2,32 +2,73 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.http import HttpResponse
 from django.utils import timezone
 from datetime import timedelta
 from .models import Incidente
 from .forms import IncidenteForm
+from sst_proyecto import busqueda
+from sst_proyecto.paginacion import PaginadorKeyset
 
 # Servicio centralizado de notificaciones
 from usuarios.services import NotificacionService
 from emergencias.utils import usuario_en_penalizacion
 
 
+ESTADOS_CERRADOS = ["RESUELTO", "CERRADO"]
+
+# Umbrales de SLA (horas sin resolver) → estado, del más grave al más leve
+UMBRALES_SLA = [(72, "critico"), (24, "vencido"), (8, "proximo")]
+
+INCIDENTES_POR_PAGINA = 15
+
+
 def _calcular_sla(incidente):
     """Devuelve el estado SLA de un incidente no resuelto."""
-    if incidente.estado in ["RESUELTO", "CERRADO"]:
+    if incidente.estado in ESTADOS_CERRADOS:
         return "ok"
     horas = (timezone.now() - incidente.fecha_reporte).total_seconds() / 3600
-    if horas > 72:
-        return "critico"
-    if horas > 24:
-        return "vencido"
-    if horas > 8:
-        return "proximo"
+    for limite, estado in UMBRALES_SLA:
+        if horas > limite:
+            return estado
     return "ok"
 
 
+def anotar_sla(incidentes, ahora=None):
+    """Anota `sla_estado` en el queryset con un CASE en SQL (mismas reglas que _calcular_sla)."""
+    from django.db.models import Case, CharField, Value, When
+
+    ahora = ahora or timezone.now()
+    return incidentes.annotate(
+        sla_estado=Case(
+            When(estado__in=ESTADOS_CERRADOS, then=Value("ok")),
+            *[
+                When(fecha_reporte__lt=ahora - timedelta(hours=limite), then=Value(estado))
+                for limite, estado in UMBRALES_SLA
+            ],
+            default=Value("ok"),
+            output_field=CharField(),
+        )
+    )
+
+
+def contar_por_estado(incidentes, ahora=None):
+    """Conteos de las tarjetas de estado en un único aggregate condicional."""
+    from django.db.models import Count, Q
+
+    ahora = ahora or timezone.now()
+    return incidentes.aggregate(
+        total=Count("id"),
+        reportados=Count("id", filter=Q(estado="REPORTADO")),
+        en_proceso=Count("id", filter=Q(estado__in=["EN_REVISION", "EN_PROCESO"])),
+        resueltos=Count("id", filter=Q(estado__in=ESTADOS_CERRADOS)),
+        criticos_sla=Count(
+            "id",
+            filter=~Q(estado__in=ESTADOS_CERRADOS) & Q(fecha_reporte__lte=ahora - timedelta(hours=72)),
+        ),
+    )
+
+
 # Vista SIMPLE: Listar todos los incidentes
 @login_required
 def listar_incidentes(request):
@@ -49,11 +90,7 @@ def listar_incidentes(request):
     fecha_hasta = request.GET.get("fecha_hasta", "")
 
     if q:
-        from django.db.models import Q
-
-        incidentes = incidentes.filter(
-            Q(titulo__icontains=q) | Q(descripcion__icontains=q) | Q(persona_afectada__icontains=q)
-        )
+        incidentes = busqueda.filtrar(incidentes, "incidentes", q)
     if estado:
         incidentes = incidentes.filter(estado=estado)
     if area:
@@ -75,25 +112,13 @@ def listar_incidentes(request):
         except ValueError:
             pass
 
-    # Contar por estado (sobre el queryset filtrado)
-    total = incidentes.count()
-    reportados = incidentes.filter(estado="REPORTADO").count()
-    en_proceso = incidentes.filter(estado__in=["EN_REVISION", "EN_PROCESO"]).count()
-    resueltos = incidentes.filter(estado__in=["RESUELTO", "CERRADO"]).count()
-    criticos_sla = (
-        incidentes.exclude(estado__in=["RESUELTO", "CERRADO"])
-        .filter(fecha_reporte__lte=timezone.now() - timedelta(hours=72))
-        .count()
-    )
-
-    # Anotar SLA en cada incidente para la tabla
-    incidentes_list = list(incidentes)
-    for inc in incidentes_list:
-        inc.sla_estado = _calcular_sla(inc)
+    # Costo fijo por página: un aggregate para las tarjetas y una consulta con
+    # LIMIT para la tabla (keyset sobre fecha_reporte, id), sin importar el historial.
+    ahora = timezone.now()
+    conteos = contar_por_estado(incidentes, ahora)
 
-    # Paginación: 15 incidentes por página
-    paginator = Paginator(incidentes_list, 15)
-    page_obj = paginator.get_page(request.GET.get("page"))
+    paginador = PaginadorKeyset(anotar_sla(incidentes, ahora), INCIDENTES_POR_PAGINA, campos=("fecha_reporte", "id"))
+    page_obj = paginador.pagina(despues=request.GET.get("despues"), antes=request.GET.get("antes"))
 
     # Choices para filtros en template
     filtros_activos = any([q, estado, area, gravedad, fecha_desde, fecha_hasta])
@@ -101,11 +126,7 @@ def listar_incidentes(request):
     context = {
         "incidentes": page_obj,
         "page_obj": page_obj,
-        "total": total,
-        "reportados": reportados,
-        "en_proceso": en_proceso,
-        "resueltos": resueltos,
-        "criticos_sla": criticos_sla,
+        **conteos,
         # Filtros aplicados
         "q": q,
         "estado_filtro": estado,
@@ -351,9 +372,7 @@ def exportar_incidentes_excel(request):
     fecha_hasta = request.GET.get("fecha_hasta", "")
 
     if q:
-        from django.db.models import Q
-
-        incidentes = incidentes.filter(Q(titulo__icontains=q) | Q(descripcion__icontains=q))
+        incidentes = busqueda.filtrar(incidentes, "incidentes", q, campos=["titulo", "descripcion"])
     if estado:
         incidentes = incidentes.filter(estado=estado)
     if area:
@@ -0,0 +1,313 @@
+"""
+Búsqueda de texto indexada (incidentes y personas).
+
+Reemplaza los filtros `icontains` (recorrido secuencial de la tabla) por índices
+de texto completo, con una API común para las vistas:
+
+    filtrar(queryset, "usuarios", texto, ruta="usuario")       # filtra, sin cambiar el orden
+    filtrar(queryset, "usuarios", ficha, ruta="usuario", campos=["ficha"])
+    buscar("usuarios", texto, limite=10)                        # ordenado por relevancia
+
+Los términos se buscan por prefijo ("escal" encuentra "escalera") y deben
+aparecer todos. Los identificadores (documento, ficha) se comparan por subcadena
+con icontains: "6789" encuentra "1023456789".
+
+Motores:
+  PostgreSQL  SearchVector ponderado (config "spanish") con índice GIN de expresión,
+              más índices GIN de trigramas (pg_trgm) que sirven el icontains/istartswith
+              de los campos cortos (documento, ficha, programa).
+  SQLite      Tabla virtual FTS5 de contenido externo por índice, sincronizada con
+              triggers; relevancia con bm25().
+  Otros       icontains (sin índice).
+
+Los índices se crean con migraciones RunSQLMotor (usuarios 0013, reportes 0012),
+que solo se aplican en su motor. En SQLite, una migración que rehace la tabla base
+(AlterField) borra los triggers: asegurar_indices() los reconstruye.
+"""
+
+import re
+
+from django.apps import apps
+from django.db import connections, migrations
+from django.db.models import Q
+
+# Peso → factor de bm25 en SQLite (en PostgreSQL los pesos A-D son nativos)
+_PESOS_BM25 = {"A": 10.0, "B": 5.0, "C": 2.0, "D": 1.0}
+_MAX_TERMINOS = 8
+
+
+class IndiceBusqueda:
+    """Campos buscables de un modelo, con su peso (A = más relevante)."""
+
+    def __init__(self, nombre, modelo, campos, trigramas=(), identificadores=()):
+        self.nombre = nombre
+        self.etiqueta_modelo = modelo
+        self.campos = list(campos)  # [(campo, peso)]
+        self.trigramas = list(trigramas)  # campos cortos con índice de trigramas (PostgreSQL)
+        self.identificadores = list(identificadores)  # se comparan por subcadena (icontains)
+
+    @property
+    def modelo(self):
+        return apps.get_model(self.etiqueta_modelo)
+
+    @property
+    def nombres_campos(self):
+        return [campo for campo, _ in self.campos]
+
+    @property
+    def tabla_fts(self):
+        return f"busqueda_{self.nombre}"
+
+
+INDICES = {
+    "incidentes": IndiceBusqueda(
+        "incidentes",
+        "reportes.Incidente",
+        [("titulo", "A"), ("persona_afectada", "B"), ("descripcion", "C")],
+    ),
+    "usuarios": IndiceBusqueda(
+        "usuarios",
+        "usuarios.Usuario",
+        [
+            ("numero_documento", "A"),
+            ("first_name", "B"),
+            ("last_name", "B"),
+            ("ficha", "C"),
+            ("programa_formacion", "D"),
+        ],
+        trigramas=["numero_documento", "ficha", "programa_formacion"],
+        identificadores=["numero_documento", "ficha"],
+    ),
+}
+
+
+def terminos(texto):
+    """Términos de búsqueda normalizados (palabras alfanuméricas, en minúscula)."""
+    return re.findall(r"\w+", (texto or "").lower())[:_MAX_TERMINOS]
+
+
+def _motor(using="default"):
+    vendor = connections[using].vendor
+    if vendor == "postgresql":
+        return "postgres"
+    if vendor == "sqlite" and _fts_disponible(using):
+        return "fts5"
+    return "icontains"
+
+
+_fts_verificado = {}
+
+
+def _fts_disponible(using):
+    if using not in _fts_verificado:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name LIKE 'busqueda\\_%' ESCAPE '\\'")
+            _fts_verificado[using] = cursor.fetchone() is not None
+    return _fts_verificado[using]
+
+
+# ─── Expresiones por motor ───────────────────────────────────────────────────
+
+
+def _vector(indice):
+    """SearchVector ponderado; la misma expresión define el índice GIN (debe coincidir)."""
+    from django.contrib.postgres.search import SearchVector
+
+    vector = None
+    for campo, peso in indice.campos:
+        parte = SearchVector(campo, weight=peso, config="spanish")
+        vector = parte if vector is None else vector + parte
+    return vector
+
+
+def _tsquery(palabras):
+    from django.contrib.postgres.search import SearchQuery
+
+    return SearchQuery(" & ".join(f"{p}:*" for p in palabras), search_type="raw", config="spanish")
+
+
+def _match_fts(indice, palabras, campos=None):
+    expresion = " AND ".join(f'"{p}"*' for p in palabras)
+    if campos:
+        expresion = "{%s} : (%s)" % (" ".join(campos), expresion)
+    return expresion
+
+
+def _q_icontains(campos, texto):
+    filtro = Q()
+    for campo in campos:
+        filtro |= Q(**{f"{campo}__icontains": texto})
+    return filtro
+
+
+def _coincidencias(indice, palabras, texto, campos=None, using="default"):
+    """
+    Subconsulta con los pk del modelo del índice que coinciden. Los identificadores
+    van siempre por icontains (subcadena); el resto, por el motor de texto.
+    """
+    from django.db.models.expressions import RawSQL
+
+    elegidos = campos or indice.nombres_campos
+    texto_libre = [c for c in elegidos if c not in indice.identificadores]
+    filtro = _q_icontains([c for c in elegidos if c in indice.identificadores], texto)
+    qs = indice.modelo._default_manager.all()
+    motor = _motor(using)
+    if texto_libre and motor == "postgres":
+        if campos:
+            # Restringido a campos cortos: subcadena servida por los índices de trigramas
+            filtro |= _q_icontains(texto_libre, texto)
+        else:
+            filtro |= Q(vector_busqueda=_tsquery(palabras))
+            for campo in indice.trigramas:
+                if campo not in indice.identificadores:
+                    filtro |= Q(**{f"{campo}__istartswith": texto})
+            qs = qs.alias(vector_busqueda=_vector(indice))
+    elif texto_libre and motor == "fts5":
+        tabla = indice.tabla_fts
+        expresion = _match_fts(indice, palabras, texto_libre if campos else None)
+        filtro |= Q(pk__in=RawSQL(f'SELECT rowid FROM "{tabla}" WHERE "{tabla}" MATCH %s', [expresion]))
+    elif texto_libre:
+        filtro |= _q_icontains(texto_libre, texto)
+    return qs.filter(filtro).values("pk")
+
+
+# ─── API pública ─────────────────────────────────────────────────────────────
+
+
+def filtrar(queryset, nombre_indice, texto, ruta=None, campos=None):
+    """
+    Filtra `queryset` a las filas cuyo objeto del índice coincide con `texto`.
+    `ruta` es el camino ORM desde el modelo del queryset hasta el modelo del
+    índice (p. ej. "usuario" para RegistroAcceso → Usuario); None si es el mismo.
+    `campos` restringe la búsqueda a esos campos del índice.
+    Sin términos de búsqueda retorna el queryset sin cambios.
+    """
+    palabras = terminos(texto)
+    if not palabras:
+        return queryset
+    indice = INDICES[nombre_indice]
+    subconsulta = _coincidencias(indice, palabras, texto.strip(), campos, queryset.db)
+    return queryset.filter(**{f"{ruta}__pk__in" if ruta else "pk__in": subconsulta})
+
+
+def buscar(nombre_indice, texto, queryset=None, limite=20):
+    """
+    Resultados ordenados por relevancia (anotados con `rango`, mayor = mejor).
+    En PostgreSQL un prefijo exacto en un campo de trigramas (p. ej. el
+    documento) puntúa por encima de cualquier coincidencia de texto.
+    """
+    from django.db.models import Case, FloatField, Value, When
+    from django.db.models.expressions import RawSQL
+    from django.db.models.functions import Coalesce
+
+    indice = INDICES[nombre_indice]
+    queryset = indice.modelo._default_manager.all() if queryset is None else queryset
+    palabras = terminos(texto)
+    if not palabras:
+        return queryset.none()
+    texto = texto.strip()
+    motor = _motor(queryset.db)
+
+    if motor == "postgres":
+        from django.contrib.postgres.search import SearchRank
+
+        prefijo = Case(
+            *[When(**{f"{campo}__istartswith": texto}, then=Value(1.0)) for campo in indice.trigramas],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        rango = SearchRank(_vector(indice), _tsquery(palabras)) + prefijo
+    elif motor == "fts5":
+        tabla = indice.tabla_fts
+        pesos = ", ".join(str(_PESOS_BM25[peso]) for _, peso in indice.campos)
+        # Las coincidencias solo por subcadena de un identificador no tienen bm25: rango 0
+        rango = Coalesce(
+            RawSQL(
+                f'SELECT -bm25("{tabla}", {pesos}) FROM "{tabla}" '
+                f'WHERE "{tabla}" MATCH %s AND "{tabla}".rowid = "{indice.modelo._meta.db_table}"."id"',
+                [_match_fts(indice, palabras)],
+                output_field=FloatField(),
+            ),
+            Value(0.0),
+        )
+    else:
+        rango = Value(0.0, output_field=FloatField())
+
+    return filtrar(queryset, nombre_indice, texto).annotate(rango=rango).order_by("-rango", "pk")[:limite]
+
+
+# ─── Creación de índices ─────────────────────────────────────────────────────
+
+
+class RunSQLMotor(migrations.RunSQL):
+    """RunSQL que solo se aplica si la BD es del motor `vendor` ("postgresql", "sqlite")."""
+
+    def __init__(self, vendor, sql, reverse_sql=None, **kwargs):
+        self.vendor = vendor
+        super().__init__(sql, reverse_sql, **kwargs)
+
+    def deconstruct(self):
+        nombre, args, kwargs = super().deconstruct()
+        kwargs["vendor"] = self.vendor
+        return nombre, args, kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return f"SQL en bruto ({self.vendor})"
+
+
+def _sql_fts5(indice):
+    tabla = indice.modelo._meta.db_table
+    fts = indice.tabla_fts
+    columnas = [indice.modelo._meta.get_field(c).column for c in indice.nombres_campos]
+    lista = ", ".join(f'"{c}"' for c in columnas)
+    nuevos = ", ".join(f'new."{c}"' for c in columnas)
+    viejos = ", ".join(f'old."{c}"' for c in columnas)
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5({lista}, content="{tabla}", '
+        f"content_rowid=\"id\", tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{tabla}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, {lista}) VALUES (new."id", {nuevos}); END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{tabla}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {lista}) VALUES (\'delete\', old."id", {viejos}); END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE OF {lista} ON "{tabla}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {lista}) VALUES (\'delete\', old."id", {viejos}); '
+        f'INSERT INTO "{fts}"(rowid, {lista}) VALUES (new."id", {nuevos}); END',
+    ]
+
+
+def _asegurar_sqlite(indice, connection):
+    fts = indice.tabla_fts
+    esperados = {fts, f"{fts}_ai", f"{fts}_ad", f"{fts}_au"}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s)" % ", ".join(["%s"] * len(esperados)), list(esperados)
+        )
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        if existentes == esperados:
+            return False
+        # Faltan la tabla o los triggers (p. ej. una migración recreó la tabla base): reconstruir
+        for sql in _sql_fts5(indice):
+            cursor.execute(sql)
+        cursor.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+    return True
+
+
+def asegurar_indices(using="default"):
+    """
+    Reconstruye en SQLite las tablas FTS5 y triggers que falten (los índices de
+    PostgreSQL no se pierden al alterar la tabla). Retorna los índices reconstruidos.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return []
+    creados = [indice.nombre for indice in INDICES.values() if _asegurar_sqlite(indice, connection)]
+    _fts_verificado.pop(using, None)
+    return creados
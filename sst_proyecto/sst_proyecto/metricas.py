@@ -0,0 +1,294 @@
+"""
+Instrumentación de rendimiento por vista (HTTP y WebSocket).
+
+Por cada request HTTP (MetricasMiddleware) y cada mensaje procesado por un
+consumer de Channels (MetricasConsumerMixin) se mide:
+  - número de consultas SQL y tiempo total en BD
+  - aciertos / fallos de caché (backends *Medido de este módulo)
+  - latencia total
+
+Las muestras se guardan en memoria, en una ventana móvil por vista
+(METRICAS_VENTANA últimas muestras), y se exponen en formato de texto de
+Prometheus en /metricas/ (solo staff o Coordinador SST).
+
+Presupuestos de consultas: METRICAS_PRESUPUESTOS_CONSULTAS = {view_name: máximo}.
+Si una vista lo supera se registra un warning; con METRICAS_PRESUPUESTO_ESTRICTO
+(activado en la suite de tests) se lanza PresupuestoConsultasExcedido.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+
+from usuarios.permissions import EsStaffOCoordinador
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de los buckets de cada histograma
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_medicion_actual = ContextVar("sst_medicion_actual", default=None)
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Una vista ejecutó más consultas SQL que las permitidas por su presupuesto."""
+
+
+class Medicion:
+    """Contadores de una unidad de trabajo (un request o un mensaje WebSocket)."""
+
+    __slots__ = ("vista", "inicio", "latencia", "consultas", "tiempo_bd", "cache_aciertos", "cache_fallos")
+
+    def __init__(self, vista):
+        self.vista = vista
+        self.inicio = time.perf_counter()
+        self.latencia = 0.0
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.cache_aciertos = 0
+        self.cache_fallos = 0
+
+
+# ─── Registro en memoria ─────────────────────────────────────────────────────
+
+
+class RegistroMetricas:
+    """Ventana móvil de muestras por vista + contadores acumulados. Seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._muestras = {}
+        self._totales = defaultdict(lambda: defaultdict(int))
+
+    def registrar(self, medicion, presupuesto_excedido=False):
+        ventana = getattr(settings, "METRICAS_VENTANA", 1000)
+        with self._lock:
+            muestras = self._muestras.get(medicion.vista)
+            if muestras is None or muestras.maxlen != ventana:
+                muestras = self._muestras[medicion.vista] = deque(muestras or (), maxlen=ventana)
+            muestras.append((medicion.latencia, medicion.consultas, medicion.tiempo_bd))
+            totales = self._totales[medicion.vista]
+            totales["peticiones"] += 1
+            totales["cache_aciertos"] += medicion.cache_aciertos
+            totales["cache_fallos"] += medicion.cache_fallos
+            totales["presupuesto_excedido"] += int(presupuesto_excedido)
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._totales.clear()
+
+    def instantanea(self):
+        """Copia de las muestras y totales actuales: {vista: (muestras, totales)}."""
+        with self._lock:
+            return {vista: (list(m), dict(self._totales[vista])) for vista, m in self._muestras.items()}
+
+    def como_prometheus(self):
+        datos = self.instantanea()
+        lineas = []
+
+        def histograma(nombre, ayuda, indice, buckets):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} histogram")
+            for vista, (muestras, _) in sorted(datos.items()):
+                etiqueta = _escapar(vista)
+                valores = [m[indice] for m in muestras]
+                for limite in buckets:
+                    n = sum(1 for v in valores if v <= limite)
+                    lineas.append(f'{nombre}_bucket{{vista="{etiqueta}",le="{limite}"}} {n}')
+                lineas.append(f'{nombre}_bucket{{vista="{etiqueta}",le="+Inf"}} {len(valores)}')
+                lineas.append(f'{nombre}_sum{{vista="{etiqueta}"}} {sum(valores):.6f}')
+                lineas.append(f'{nombre}_count{{vista="{etiqueta}"}} {len(valores)}')
+
+        def contador(nombre, ayuda, clave):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} counter")
+            for vista, (_, totales) in sorted(datos.items()):
+                lineas.append(f'{nombre}{{vista="{_escapar(vista)}"}} {totales.get(clave, 0)}')
+
+        histograma("sst_vista_latencia_segundos", "Latencia total por vista (ventana movil).", 0, BUCKETS_SEGUNDOS)
+        histograma("sst_vista_consultas", "Consultas SQL por peticion (ventana movil).", 1, BUCKETS_CONSULTAS)
+        histograma("sst_vista_bd_segundos", "Tiempo en BD por peticion (ventana movil).", 2, BUCKETS_SEGUNDOS)
+        contador("sst_vista_peticiones_total", "Peticiones procesadas por vista.", "peticiones")
+        contador("sst_vista_cache_aciertos_total", "Aciertos de cache por vista.", "cache_aciertos")
+        contador("sst_vista_cache_fallos_total", "Fallos de cache por vista.", "cache_fallos")
+        contador(
+            "sst_vista_presupuesto_excedido_total",
+            "Peticiones que superaron el presupuesto de consultas.",
+            "presupuesto_excedido",
+        )
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registro = RegistroMetricas()
+
+
+# ─── Medición de consultas SQL ───────────────────────────────────────────────
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    """execute_wrapper instalado en todas las conexiones; solo mide si hay una medición activa."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.consultas += 1
+        medicion.tiempo_bd += time.perf_counter() - inicio
+
+
+def _instalar_en_conexion(connection):
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+def _instalar_al_conectar(sender, connection, **kwargs):
+    _instalar_en_conexion(connection)
+
+
+# Conexiones nuevas (p. ej. hilos de database_sync_to_async en los consumers)
+connection_created.connect(_instalar_al_conectar, dispatch_uid="sst_metricas_execute_wrapper")
+
+
+def _instalar_en_hilo_actual():
+    # Conexiones que ya existían en este hilo antes de importar el módulo
+    for connection in connections.all(initialized_only=True):
+        _instalar_en_conexion(connection)
+
+
+# ─── Medición de caché ───────────────────────────────────────────────────────
+
+_NO_ENCONTRADO = object()
+
+
+class CacheMedidaMixin:
+    """
+    Cuenta aciertos y fallos de caché en la medición activa. El get_many genérico
+    de BaseCache delega en get, así que basta con medir get.
+    """
+
+    def get(self, key, default=None, version=None):
+        valor = super().get(key, _NO_ENCONTRADO, version=version)
+        medicion = _medicion_actual.get()
+        if valor is _NO_ENCONTRADO:
+            if medicion is not None:
+                medicion.cache_fallos += 1
+            return default
+        if medicion is not None:
+            medicion.cache_aciertos += 1
+        return valor
+
+
+class RedisCacheMedido(CacheMedidaMixin, RedisCache):
+    def get_many(self, keys, version=None):
+        # RedisCache resuelve get_many en una sola llamada (no pasa por get)
+        keys = list(keys)
+        valores = super().get_many(keys, version=version)
+        medicion = _medicion_actual.get()
+        if medicion is not None:
+            medicion.cache_aciertos += len(valores)
+            medicion.cache_fallos += len(keys) - len(valores)
+        return valores
+
+
+class LocMemCacheMedido(CacheMedidaMixin, LocMemCache):
+    pass
+
+
+# ─── Medición de una unidad de trabajo ───────────────────────────────────────
+
+
+def presupuesto_de(vista):
+    return getattr(settings, "METRICAS_PRESUPUESTOS_CONSULTAS", {}).get(vista)
+
+
+@contextmanager
+def medir(vista):
+    """
+    Mide el bloque como una petición de `vista`, la registra y verifica su presupuesto
+    de consultas al salir.
+    """
+    _instalar_en_hilo_actual()
+    medicion = Medicion(vista)
+    token = _medicion_actual.set(medicion)
+    try:
+        yield medicion
+    finally:
+        _medicion_actual.reset(token)
+        medicion.latencia = time.perf_counter() - medicion.inicio
+
+    # La vista puede haberse resuelto dentro del bloque (ver MetricasMiddleware)
+    presupuesto = presupuesto_de(medicion.vista)
+    excedido = presupuesto is not None and medicion.consultas > presupuesto
+    registro.registrar(medicion, presupuesto_excedido=excedido)
+    if excedido:
+        mensaje = f"{medicion.vista}: {medicion.consultas} consultas SQL (presupuesto {presupuesto})"
+        logger.warning("Presupuesto de consultas excedido — %s", mensaje)
+        if getattr(settings, "METRICAS_PRESUPUESTO_ESTRICTO", False):
+            raise PresupuestoConsultasExcedido(mensaje)
+
+
+def _nombre_vista(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<sin_ruta>"
+    return match.view_name or match._func_path
+
+
+class MetricasMiddleware:
+    """Middleware HTTP: mide cada request y lo agrupa por view_name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "METRICAS_HABILITADAS", True):
+            return self.get_response(request)
+
+        with medir("<pendiente>") as medicion:
+            response = self.get_response(request)
+            medicion.vista = _nombre_vista(request)
+        return response
+
+
+class MetricasConsumerMixin:
+    """
+    Mixin para consumers de Channels: mide cada mensaje despachado
+    (connect, disconnect, eventos del channel layer) como "ws:<Consumer>.<tipo>".
+    """
+
+    async def dispatch(self, message):
+        if not getattr(settings, "METRICAS_HABILITADAS", True):
+            return await super().dispatch(message)
+
+        vista = f"ws:{type(self).__name__}.{message.get('type', '')}"
+        with medir(vista):
+            return await super().dispatch(message)
+
+
+# ─── Endpoint ────────────────────────────────────────────────────────────────
+
+
+@api_view(["GET"])
+@permission_classes([EsStaffOCoordinador])
+def metricas_prometheus(request):
+    """Métricas por vista en formato de texto de Prometheus."""
+    return HttpResponse(registro.como_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
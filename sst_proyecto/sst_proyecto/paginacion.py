@@ -0,0 +1,126 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+Paginator de Django usa OFFSET y necesita un COUNT(*) del queryset completo: el
+costo de una página crece con el historial. PaginadorKeyset recorre el queryset
+por una clave de orden única (p. ej. (fecha_reporte, id)) y filtra con
+"clave < cursor", de modo que cada página es una consulta con LIMIT que usa el
+índice de esa clave, sin importar cuántas filas haya antes.
+
+El cursor viaja en la URL como texto opaco (base64 de los valores de la clave):
+
+    ?despues=<cursor>   página siguiente (más antiguos si el orden es descendente)
+    ?antes=<cursor>     página anterior
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def _codificar(valores):
+    crudo = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def _decodificar(cursor, n_campos):
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+        if not isinstance(valores, list) or len(valores) != n_campos:
+            return None
+        return [(parse_datetime(v) or v) if isinstance(v, str) else v for v in valores]
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+class PaginaKeyset:
+    """Página de resultados; expone una interfaz parecida a django.core.paginator.Page."""
+
+    def __init__(self, object_list, cursor_siguiente, cursor_anterior):
+        self.object_list = object_list
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+
+class PaginadorKeyset:
+    """
+    Pagina `queryset` ordenado por `campos` (el último debe ser único, normalmente "id").
+    Todos los campos se recorren en el mismo sentido (descendente por defecto).
+    """
+
+    def __init__(self, queryset, por_pagina, campos=("fecha_reporte", "id"), descendente=True):
+        self.queryset = queryset
+        self.por_pagina = por_pagina
+        self.campos = tuple(campos)
+        self.descendente = descendente
+
+    def _orden(self, invertido=False):
+        desc = self.descendente != invertido
+        return [f"-{c}" if desc else c for c in self.campos]
+
+    def _filtro(self, valores, invertido=False):
+        """(c1, c2, ...) estrictamente después de `valores` en el sentido del recorrido."""
+        op = "lt" if self.descendente != invertido else "gt"
+        filtro = Q()
+        for i, campo in enumerate(self.campos):
+            condicion = Q(**{f"{campo}__{op}": valores[i]})
+            for previo, valor in zip(self.campos[:i], valores[:i]):
+                condicion &= Q(**{previo: valor})
+            filtro |= condicion
+        return filtro
+
+    def _clave(self, obj):
+        if isinstance(obj, dict):
+            return [obj[c] for c in self.campos]
+        return [getattr(obj, c) for c in self.campos]
+
+    def pagina(self, despues=None, antes=None):
+        """
+        Página que sigue a `despues` o precede a `antes` (cursores de una página previa).
+        Sin cursor (o con uno inválido) retorna la primera página. Una sola consulta.
+        """
+        n = len(self.campos)
+        if antes and (valores := _decodificar(antes, n)):
+            filas = list(
+                self.queryset.filter(self._filtro(valores, True)).order_by(*self._orden(True))[: self.por_pagina + 1]
+            )
+            hay_mas = len(filas) > self.por_pagina
+            filas = filas[: self.por_pagina][::-1]
+            hay_anterior, hay_siguiente = hay_mas, True
+        else:
+            valores = _decodificar(despues, n) if despues else None
+            qs = self.queryset.filter(self._filtro(valores)) if valores else self.queryset
+            filas = list(qs.order_by(*self._orden())[: self.por_pagina + 1])
+            hay_siguiente = len(filas) > self.por_pagina
+            filas = filas[: self.por_pagina]
+            hay_anterior = valores is not None
+
+        if not filas:
+            return PaginaKeyset([], None, None)
+        return PaginaKeyset(
+            filas,
+            _codificar(self._clave(filas[-1])) if hay_siguiente else None,
+            _codificar(self._clave(filas[0])) if hay_anterior else None,
+        )
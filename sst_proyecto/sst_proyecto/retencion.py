@@ -0,0 +1,312 @@
+"""
+Ciclo de vida de los datos: retención, archivo y particionado.
+
+RETENCION_DATOS define, por modelo ("app_label.Modelo"), el campo de fecha y los
+días que las filas permanecen en la BD. Las filas más antiguas se archivan en
+ARCHIVO_DATOS_DIR como JSON Lines comprimido, agrupadas por mes:
+
+    <ARCHIVO_DATOS_DIR>/<app_label.modelo>/<AAAA-MM>/<pk_min>-<pk_max>.jsonl.gz
+
+y se eliminan en lotes pequeños (RETENCION_TAMANO_LOTE), cada uno en su propia
+transacción, para no sostener bloqueos largos. El archivo de un lote se escribe
+(y se sincroniza a disco) antes de borrar sus filas; si el proceso se interrumpe,
+la siguiente ejecución reescribe el mismo lote con el mismo nombre.
+
+Comandos: manage.py archivar_datos y manage.py particionar_accesos (PostgreSQL).
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from auditlog.context import disable_auditlog
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class PoliticaRetencion:
+    """Retención configurada para un modelo."""
+
+    def __init__(self, etiqueta, campo, dias):
+        self.etiqueta = etiqueta
+        self.campo = campo
+        self.dias = dias
+
+    @property
+    def modelo(self):
+        return apps.get_model(self.etiqueta)
+
+    def limite(self, ahora=None):
+        return (ahora or timezone.now()) - timedelta(days=self.dias)
+
+    def vencidas(self, ahora=None):
+        """Queryset de filas fuera de la ventana de retención."""
+        return self.modelo._default_manager.filter(**{f"{self.campo}__lt": self.limite(ahora)})
+
+
+def politicas(etiquetas=None):
+    """Políticas de RETENCION_DATOS, opcionalmente filtradas por etiqueta."""
+    configuradas = getattr(settings, "RETENCION_DATOS", {})
+    seleccion = etiquetas or list(configuradas)
+    resultado = []
+    for etiqueta in seleccion:
+        if etiqueta not in configuradas:
+            raise KeyError(f"{etiqueta} no tiene política de retención en RETENCION_DATOS")
+        conf = configuradas[etiqueta]
+        resultado.append(PoliticaRetencion(etiqueta, conf["campo"], conf["dias"]))
+    return resultado
+
+
+# ─── Archivo ─────────────────────────────────────────────────────────────────
+
+
+def _directorio_archivo():
+    return getattr(settings, "ARCHIVO_DATOS_DIR", os.path.join(settings.BASE_DIR, "archivo"))
+
+
+def _mes(valor):
+    if isinstance(valor, datetime):
+        valor = timezone.localtime(valor) if timezone.is_aware(valor) else valor
+    return valor.strftime("%Y-%m")
+
+
+def _fila(instancia):
+    """Serializa la fila con los valores crudos de sus columnas (FK como id)."""
+    datos = {campo.attname: campo.value_from_object(instancia) for campo in instancia._meta.concrete_fields}
+    return {"modelo": instancia._meta.label_lower, "pk": instancia.pk, "campos": datos}
+
+
+def _escribir_lote(politica, filas_por_mes):
+    """Escribe un .jsonl.gz por mes con escritura atómica (tmp + fsync + rename)."""
+    base = os.path.join(_directorio_archivo(), politica.etiqueta.lower())
+    rutas = []
+    for mes, filas in sorted(filas_por_mes.items()):
+        directorio = os.path.join(base, mes)
+        os.makedirs(directorio, exist_ok=True)
+        pks = [f["pk"] for f in filas]
+        ruta = os.path.join(directorio, f"{min(pks)}-{max(pks)}.jsonl.gz")
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "wb") as crudo:
+            with gzip.GzipFile(fileobj=crudo, mode="wb", mtime=0) as gz:
+                for fila in filas:
+                    gz.write(json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False).encode("utf-8"))
+                    gz.write(b"\n")
+            crudo.flush()
+            os.fsync(crudo.fileno())
+        os.replace(temporal, ruta)
+        rutas.append(ruta)
+    return rutas
+
+
+def archivar(politica, tamano_lote=None, pausa=0.0, simular=False, ahora=None):
+    """
+    Archiva y elimina, lote a lote, las filas vencidas de la política.
+    Retorna {"filas": n, "lotes": n, "archivos": [rutas]}.
+    Con simular=True solo cuenta las filas vencidas.
+    """
+    tamano_lote = tamano_lote or getattr(settings, "RETENCION_TAMANO_LOTE", 2000)
+    vencidas = politica.vencidas(ahora)
+    if simular:
+        return {"filas": vencidas.count(), "lotes": 0, "archivos": []}
+
+    modelo = politica.modelo
+    total, lotes, archivos = 0, 0, []
+    while True:
+        pks = list(vencidas.order_by(politica.campo, "pk").values_list("pk", flat=True)[:tamano_lote])
+        if not pks:
+            break
+
+        filas_por_mes = defaultdict(list)
+        for instancia in modelo._default_manager.filter(pk__in=pks).order_by("pk").iterator():
+            filas_por_mes[_mes(getattr(instancia, politica.campo))].append(_fila(instancia))
+        archivos.extend(_escribir_lote(politica, filas_por_mes))
+
+        # Sin auditlog: el borrado por retención no es un cambio de negocio y
+        # generaría una entrada de auditoría por cada fila archivada.
+        with transaction.atomic(), disable_auditlog():
+            modelo._default_manager.filter(pk__in=pks).delete()
+
+        total += len(pks)
+        lotes += 1
+        logger.info("Retención %s: lote %s archivado (%s filas)", politica.etiqueta, lotes, len(pks))
+        if pausa:
+            time.sleep(pausa)
+
+    return {"filas": total, "lotes": lotes, "archivos": archivos}
+
+
+def leer_archivo(ruta):
+    """Itera las filas de un archivo .jsonl.gz generado por archivar()."""
+    with gzip.open(ruta, "rt", encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+# ─── Particionado mensual de RegistroAcceso (solo PostgreSQL) ────────────────
+
+
+def _inicio_mes(d):
+    return date(d.year, d.month, 1)
+
+
+def _mes_siguiente(d):
+    return date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+
+
+def nombre_particion(tabla, mes):
+    return f"{tabla}_{mes:%Y%m}"
+
+
+def sql_crear_particion(tabla, mes):
+    """DDL de la partición mensual [mes, mes siguiente) de la tabla particionada."""
+    desde = _inicio_mes(mes)
+    hasta = _mes_siguiente(desde)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{nombre_particion(tabla, desde)}" PARTITION OF "{tabla}" '
+        f"FOR VALUES FROM ('{desde.isoformat()}') TO ('{hasta.isoformat()}')"
+    )
+
+
+def es_particionada(tabla):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [tabla],
+        )
+        return cursor.fetchone() is not None
+
+
+def claves_foraneas_entrantes(modelo):
+    """Campos de otros modelos con una FK de BD hacia `modelo` (impiden particionarlo)."""
+    return [
+        f"{rel.related_model._meta.label}.{rel.field.name}"
+        for rel in modelo._meta.related_objects
+        if rel.field.concrete and getattr(rel.field, "db_constraint", False) and not rel.field.many_to_many
+    ]
+
+
+def sql_convertir_a_particionada(modelo, campo, meses_futuros=3):
+    """
+    Sentencias que convierten la tabla del modelo en particionada por rango mensual
+    de `campo`: renombra la tabla actual, crea la particionada con la misma
+    estructura (la PK pasa a ser (id, campo), requisito de PostgreSQL), crea las
+    particiones desde el mes del registro más antiguo hasta `meses_futuros` meses
+    adelante más una partición DEFAULT, copia los datos, ajusta la identidad del id,
+    elimina la tabla vieja y recrea claves foráneas e índices del modelo.
+    Supone la columna id como IDENTITY (BigAutoField creado con Django >= 4.1).
+    """
+    tabla = modelo._meta.db_table
+    antigua = f"{tabla}_sin_particionar"
+    pk = modelo._meta.pk.column
+
+    # Una FK entrante seguiría a la tabla renombrada, impediría borrarla y no se
+    # puede recrear contra la PK compuesta de la particionada
+    entrantes = claves_foraneas_entrantes(modelo)
+    if entrantes:
+        raise ValueError(
+            f"{modelo._meta.label} tiene claves foráneas entrantes en la BD ({', '.join(entrantes)}); "
+            "decláralas con db_constraint=False antes de particionar."
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("{campo}") FROM "{tabla}"')
+        minimo = cursor.fetchone()[0]
+    hoy = timezone.localdate()
+    mes = _inicio_mes(timezone.localtime(minimo).date() if minimo else hoy)
+    ultimo = _inicio_mes(hoy)
+    for _ in range(meses_futuros):
+        ultimo = _mes_siguiente(ultimo)
+
+    sentencias = [
+        f'ALTER TABLE "{tabla}" RENAME TO "{antigua}"',
+        f'CREATE TABLE "{tabla}" (LIKE "{antigua}" INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING STORAGE) '
+        f'PARTITION BY RANGE ("{campo}")',
+        f'ALTER TABLE "{tabla}" ADD PRIMARY KEY ("{pk}", "{campo}")',
+    ]
+    while mes <= ultimo:
+        sentencias.append(sql_crear_particion(tabla, mes))
+        mes = _mes_siguiente(mes)
+    sentencias += [
+        f'CREATE TABLE IF NOT EXISTS "{tabla}_default" PARTITION OF "{tabla}" DEFAULT',
+        f'INSERT INTO "{tabla}" SELECT * FROM "{antigua}"',
+        f"SELECT setval(pg_get_serial_sequence('\"{tabla}\"', '{pk}'), "
+        f'COALESCE((SELECT MAX("{pk}") FROM "{tabla}"), 0) + 1, false)',
+        f'DROP TABLE "{antigua}"',
+    ]
+
+    with connection.schema_editor(collect_sql=True, atomic=False) as editor:
+        for campo_modelo in modelo._meta.local_concrete_fields:
+            if campo_modelo.remote_field and campo_modelo.db_constraint:
+                sentencias.append(str(editor._create_fk_sql(modelo, campo_modelo, "_fk_%(to_table)s_%(to_column)s")))
+        sentencias += [str(sql) for sql in editor._model_indexes_sql(modelo)]
+    return sentencias
+
+
+def convertir_a_particionada(modelo, campo, meses_futuros=3):
+    """Ejecuta sql_convertir_a_particionada en una sola transacción."""
+    if connection.vendor != "postgresql":
+        raise RuntimeError("El particionado nativo solo está disponible en PostgreSQL.")
+    if es_particionada(modelo._meta.db_table):
+        return []
+    sentencias = sql_convertir_a_particionada(modelo, campo, meses_futuros)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in sentencias:
+            cursor.execute(sql)
+    return sentencias
+
+
+def crear_particiones_futuras(modelo, meses_futuros=3):
+    """Crea (si faltan) las particiones del mes actual y los `meses_futuros` siguientes."""
+    tabla = modelo._meta.db_table
+    mes = _inicio_mes(timezone.localdate())
+    creadas = []
+    with connection.cursor() as cursor:
+        for _ in range(meses_futuros + 1):
+            cursor.execute(sql_crear_particion(tabla, mes))
+            creadas.append(nombre_particion(tabla, mes))
+            mes = _mes_siguiente(mes)
+    return creadas
+
+
+def eliminar_particiones_vacias(modelo, limite):
+    """
+    Elimina las particiones mensuales ya vaciadas por archivar() cuyo mes termina
+    antes de `limite`. Retorna los nombres eliminados.
+    """
+    tabla = modelo._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [tabla],
+        )
+        particiones = sorted(fila[0] for fila in cursor.fetchall())
+
+    eliminadas = []
+    for particion in particiones:
+        sufijo = particion[len(tabla) + 1 :]
+        if len(sufijo) != 6 or not sufijo.isdigit():
+            continue  # partición DEFAULT u otra ajena al esquema mensual
+        fin = _mes_siguiente(date(int(sufijo[:4]), int(sufijo[4:]), 1))
+        if fin > timezone.localtime(limite).date():
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{particion}")')
+            if cursor.fetchone()[0]:
+                continue
+            cursor.execute(f'DROP TABLE "{particion}"')
+        eliminadas.append(particion)
+    return eliminadas
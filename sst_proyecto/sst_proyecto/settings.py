@@ -63,6 +63,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "sst_proyecto.metricas.MetricasMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -186,7 +187,7 @@ REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "EXCEPTION_HANDLER": "sst_proyecto.exception_handler.sst_exception_handler",
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "usuarios.authentication.TokenAuthenticationCacheada",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
@@ -410,7 +411,7 @@ _REDIS_OK = _redis_disponible(REDIS_URL)
 if _REDIS_OK:
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "BACKEND": "sst_proyecto.metricas.RedisCacheMedido",
             "LOCATION": REDIS_URL,
             "OPTIONS": {
                 "socket_connect_timeout": 5,
@@ -425,7 +426,7 @@ else:
     _logging.getLogger(__name__).warning("Redis no disponible — usando caché en memoria (solo para desarrollo)")
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "BACKEND": "sst_proyecto.metricas.LocMemCacheMedido",
         }
     }
 
@@ -433,6 +434,69 @@ else:
 CACHE_TTL_AFORO = 30  # segundos — aforo cambia con cada acceso
 CACHE_TTL_ESTADISTICAS = 300  # 5 minutos — estadísticas del dashboard
 CACHE_TTL_CATALOGOS = 3600  # 1 hora — catálogos estáticos (tipos de emergencia)
+CACHE_TTL_NO_LEIDAS = 86400  # 24 h — contador de no leídas (se mantiene con incr/decr y se reconcilia)
+CACHE_TTL_CARNETS = 30 * 86400  # 30 días — PNG del carnet QR (la clave cambia si cambian sus datos)
+CACHE_TTL_CAPAS_MAPA = 7 * 86400  # 7 días — paquete GeoJSON del mapa (se invalida al guardar)
+CACHE_TTL_RESTRICCIONES = 600  # 10 min — usuario sin penalización por falsa alarma (se escribe al marcarla)
+CACHE_TTL_TOKEN_AUTH = 60  # 1 min — token de la API con su usuario (se invalida al cambiar el usuario o el token)
+
+# Vencimiento de los tokens de la API en horas desde su creación (0 = no vencen)
+TOKEN_EXPIRACION_HORAS = config("TOKEN_EXPIRACION_HORAS", default=0, cast=int)
+
+# Caché en disco de reportes renderizados (PDF/Excel/CSV), con expulsión LRU por tamaño.
+# Fuera de MEDIA_ROOT a propósito: contiene datos personales y el nombre del archivo es el ETag.
+REPORTES_CACHE_DIR = config("REPORTES_CACHE_DIR", default=str(BASE_DIR / "cache_reportes"))
+REPORTES_CACHE_MAX_BYTES = config("REPORTES_CACHE_MAX_MB", default=200, cast=int) * 1024 * 1024
+
+# ====================================================================
+# MÉTRICAS DE RENDIMIENTO — sst_proyecto/metricas.py, expuestas en /metricas/
+# ====================================================================
+METRICAS_HABILITADAS = config("METRICAS_HABILITADAS", default=True, cast=bool)
+METRICAS_VENTANA = 1000  # muestras por vista en el histograma móvil
+# Máximo de consultas SQL por request (view_name → consultas). Se registra un
+# warning al superarlo; en tests (METRICAS_PRESUPUESTO_ESTRICTO) falla el test.
+METRICAS_PRESUPUESTOS_CONSULTAS = {
+    "dashboard": 40,
+    "emergencia-evacuacion-stats": 15,
+    "estadisticas-asistencia-por-ficha": 25,
+    "listar_incidentes": 10,
+}
+METRICAS_PRESUPUESTO_ESTRICTO = False
+
+# ====================================================================
+# RETENCIÓN Y ARCHIVO DE DATOS — sst_proyecto/retencion.py
+# ====================================================================
+# Filas más antiguas que "dias" (según "campo") se archivan como JSON Lines
+# comprimido por mes en ARCHIVO_DATOS_DIR y se eliminan en lotes:
+#   python manage.py archivar_datos
+# Fuera de MEDIA_ROOT a propósito: contiene datos personales y no debe servirse.
+ARCHIVO_DATOS_DIR = config("ARCHIVO_DATOS_DIR", default=str(BASE_DIR / "archivo"))
+RETENCION_DATOS = {
+    "usuarios.Notificacion": {
+        "campo": "fecha_creacion",
+        "dias": config("RETENCION_NOTIFICACIONES_DIAS", default=180, cast=int),
+    },
+    "control_acceso.RegistroAcceso": {
+        "campo": "fecha_hora_ingreso",
+        "dias": config("RETENCION_ACCESOS_DIAS", default=400, cast=int),
+    },
+    "auditlog.LogEntry": {
+        "campo": "timestamp",
+        "dias": config("RETENCION_AUDITORIA_DIAS", default=730, cast=int),
+    },
+}
+RETENCION_TAMANO_LOTE = 2000  # filas por lote (una transacción corta por lote)
+
+# Feed de ocupación (personas_en_centro?since=<seq>): tamaño máximo de un delta
+# antes de pedir al cliente que resincronice, y días que se conserva el log.
+OCUPACION_DELTA_MAX_EVENTOS = 500
+OCUPACION_EVENTOS_DIAS = 2
+
+# registros_recientes sin ?fecha=: días hacia atrás (hoy incluido) en los que busca el último acceso
+ACCESOS_RECIENTES_DIAS = 7
+
+# Intervalo mínimo entre publicaciones del aforo por WebSocket (usuarios/tiempo_real.py)
+AFORO_PUBLICACION_SEGUNDOS = 2
 
 # ====================================================================
 # SENTRY — Monitoreo de errores en producción
@@ -472,6 +536,16 @@ else:
         }
     }
 
+# ====================================================================
+# SCHEDULER — tareas programadas (mapas/scheduler.py)
+# ====================================================================
+# Las ejecuta un único proceso líder: python manage.py ejecutar_scheduler.
+# Candado de liderazgo: "auto" (PostgreSQL → Redis → archivo), "postgres", "redis" o "archivo"
+SCHEDULER_CANDADO = config("SCHEDULER_CANDADO", default="auto")
+SCHEDULER_CANDADO_TTL = 60  # segundos — el líder lo renueva cada TTL/3
+# En desarrollo, runserver arranca el scheduler en su proceso (con el mismo candado)
+SCHEDULER_EN_PROCESO = config("SCHEDULER_EN_PROCESO", default=DEBUG, cast=bool)
+
 # ====================================================================
 # AUDITLOG — Trazabilidad de cambios en modelos críticos
 # ====================================================================
@@ -13,6 +13,7 @@ from django.views.generic import RedirectView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 from usuarios.permissions import rol_requerido, excluir_visitantes
 from usuarios.login_view import custom_login_view, visitante_login_view
+from sst_proyecto.metricas import metricas_prometheus
 
 
 # Páginas de error personalizadas
@@ -557,7 +558,9 @@ def mis_alertas_view(request):
     leidas = notificaciones.filter(leida=True).order_by("-fecha_creacion")[:50]
 
     # Contar totales reales
-    total_no_leidas = notificaciones.filter(leida=False).count()
+    from usuarios.utils import contar_no_leidas
+
+    total_no_leidas = contar_no_leidas(request.user.id)
     total_leidas = notificaciones.filter(leida=True).count()
     total_notificaciones = notificaciones.count()
 
@@ -575,20 +578,17 @@ def mis_alertas_view(request):
         from django.utils import timezone
         from datetime import timedelta
 
-        todos_incidentes = Incidente.objects.select_related("reportado_por", "asignado_a").order_by("-fecha_reporte")[
-            :100
-        ]
+        from reportes.views_incidentes import anotar_sla
+
+        todos_incidentes = anotar_sla(
+            Incidente.objects.select_related("reportado_por", "asignado_a").order_by("-fecha_reporte")
+        )[:100]
         incidentes_pendientes = Incidente.objects.exclude(estado__in=["RESUELTO", "CERRADO"]).count()
         incidentes_criticos_sla = (
             Incidente.objects.exclude(estado__in=["RESUELTO", "CERRADO"])
             .filter(fecha_reporte__lte=timezone.now() - timedelta(hours=72))
             .count()
         )
-        # Anotar SLA en cada incidente
-        from reportes.views_incidentes import _calcular_sla
-
-        for inc in todos_incidentes:
-            inc.sla_estado = _calcular_sla(inc)
         context["todos_incidentes"] = todos_incidentes
         context["incidentes_pendientes_brigada"] = incidentes_pendientes
         context["incidentes_criticos_sla_brigada"] = incidentes_criticos_sla
@@ -1393,7 +1393,7 @@ def control_acceso_view(request):
 
 
 # Importar las vistas de mapas
-from mapas.views import mapa_interactivo, plano_centro as plano_centro_view
+from mapas.views import mapa_interactivo, plano_centro as plano_centro_view, campus_svg as campus_svg_view
 
 
 @rol_requerido("ADMINISTRATIVO", "BRIGADA")
@@ -1580,13 +1580,9 @@ def historial_accesos_view(request):
     if rol_filtro:
         registros = registros.filter(usuario__rol=rol_filtro)
     if q:
-        from django.db.models import Q
+        from sst_proyecto import busqueda
 
-        registros = registros.filter(
-            Q(usuario__first_name__icontains=q)
-            | Q(usuario__last_name__icontains=q)
-            | Q(usuario__numero_documento__icontains=q)
-        )
+        registros = busqueda.filtrar(registros, "usuarios", q, ruta="usuario")
 
     total = registros.count()
     paginator = Paginator(registros, 25)
@@ -1623,6 +1619,8 @@ urlpatterns = [
     path("sw.js", sw_view, name="sw"),
     path("manifest.json", manifest_view, name="manifest"),
     path("admin/", admin.site.urls),
+    # Métricas de rendimiento por vista (Prometheus, solo administradores)
+    path("metricas/", metricas_prometheus, name="metricas"),
     # Autenticación - Rutas principales (con debugging temporal)
     path("accounts/login/", custom_login_view, name="login"),
     path("accounts/login/visitante/", visitante_login_view, name="visitante_login"),
@@ -1660,6 +1658,7 @@ urlpatterns = [
     path("acceso/", control_acceso_view, name="control_acceso"),
     path("mapas/", mapa_interactivo, name="mapas"),
     path("mapas/plano/", plano_centro_view, name="plano_centro"),
+    path("mapas/campus/", campus_svg_view, name="campus_svg"),
     path("emergencias/", emergencias_view, name="emergencias"),
     # ==============================================
     # URLs ESPECÍFICAS PARA APRENDIZ
@@ -0,0 +1,191 @@
+/**
+ * Ruta de evacuación sin conexión.
+ *
+ * Usa el paquete offline del mapa (/api/mapas/api/offline/, ver mapas/offline.py)
+ * que el service worker guarda en la caché "sst-mapa-offline". La tabla
+ * siguiente_salto ya trae, para cada nodo del grafo, el vecino hacia el punto de
+ * encuentro más cercano: la ruta es buscar el nodo más cercano al GPS y seguir
+ * la tabla. El resultado tiene la misma forma que /api/mapas/api/ruta/ más
+ * offline: true.
+ *
+ * Expone window.sstRutaOffline; no usa el DOM (el dibujo queda en cada página).
+ */
+(function (global) {
+    'use strict';
+
+    const CACHE_OFFLINE = 'sst-mapa-offline';
+    const URL_PAQUETE = '/api/mapas/api/offline/';
+    const URL_RUTA = '/api/mapas/api/ruta/';
+    const MAX_DISTANCIA_NODO_M = 500;
+    const TIEMPO_ESPERA_MS = 6000;
+
+    let paquete = null;
+
+    function haversine(lat1, lng1, lat2, lng2) {
+        const R = 6371000;
+        const rad = Math.PI / 180;
+        const dphi = (lat2 - lat1) * rad;
+        const dlambda = (lng2 - lng1) * rad;
+        const a = Math.sin(dphi / 2) ** 2
+            + Math.cos(lat1 * rad) * Math.cos(lat2 * rad) * Math.sin(dlambda / 2) ** 2;
+        return R * 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1 - a));
+    }
+
+    function redondear(valor) {
+        return Math.round(valor * 10) / 10;
+    }
+
+    /** Paquete desde la caché del service worker (o la red si no está). null si no hay ninguno. */
+    async function cargarPaquete() {
+        if (paquete) return paquete;
+        let respuesta = null;
+        if (global.caches) {
+            const cache = await global.caches.open(CACHE_OFFLINE);
+            respuesta = await cache.match(URL_PAQUETE);
+        }
+        if (!respuesta) {
+            try {
+                respuesta = await fetch(URL_PAQUETE, { credentials: 'same-origin' });
+            } catch (e) {
+                return null;
+            }
+        }
+        if (!respuesta || !respuesta.ok) return null;
+        try {
+            paquete = await respuesta.json();
+        } catch (e) {
+            return null;
+        }
+        return paquete.siguiente_salto ? paquete : (paquete = null);
+    }
+
+    /** Olvida el paquete en memoria (el service worker descargó uno nuevo). */
+    function olvidarPaquete() {
+        paquete = null;
+    }
+
+    function indexar(datos) {
+        const nodos = {};
+        const puntos = {};
+        datos.grafo.features.forEach((f) => {
+            if (f.properties.clase === 'nodo') {
+                nodos[f.properties.nodo_id] = [f.geometry.coordinates[1], f.geometry.coordinates[0]];
+            }
+        });
+        datos.puntos_encuentro.features.forEach((f) => {
+            puntos[f.id] = {
+                id: f.id,
+                nombre: f.properties.nombre,
+                lat: f.geometry.coordinates[1],
+                lng: f.geometry.coordinates[0],
+            };
+        });
+        return { nodos, puntos };
+    }
+
+    function rutaDirecta(lat, lng, puntos, velocidad, mensaje) {
+        let mejor = null;
+        let distancia = Infinity;
+        Object.values(puntos).forEach((p) => {
+            const d = haversine(lat, lng, p.lat, p.lng);
+            if (d < distancia) {
+                distancia = d;
+                mejor = p;
+            }
+        });
+        if (!mejor) {
+            return { encontrado: false, offline: true, waypoints: [], mensaje: 'Sin conexión y sin puntos de encuentro guardados.' };
+        }
+        return {
+            encontrado: false,
+            offline: true,
+            mensaje,
+            waypoints: [[lat, lng], [mejor.lat, mejor.lng]],
+            distancia_metros: redondear(distancia),
+            tiempo_minutos: redondear(distancia / velocidad),
+            punto_encuentro: mejor,
+        };
+    }
+
+    /** Ruta al punto de encuentro más cercano calculada con el paquete (sin red). */
+    function calcularLocal(datos, lat, lng) {
+        const { nodos, puntos } = indexar(datos);
+        const tabla = datos.siguiente_salto;
+        const velocidad = datos.velocidad_m_min;
+
+        let inicio = null;
+        let distanciaInicio = Infinity;
+        Object.keys(tabla).forEach((id) => {
+            const nodo = nodos[id];
+            if (!nodo) return;
+            const d = haversine(lat, lng, nodo[0], nodo[1]);
+            if (d < distanciaInicio) {
+                distanciaInicio = d;
+                inicio = id;
+            }
+        });
+        if (inicio === null || distanciaInicio > MAX_DISTANCIA_NODO_M) {
+            return rutaDirecta(lat, lng, puntos, velocidad, 'Sin conexión: no hay caminos cercanos, se muestra la dirección directa.');
+        }
+
+        const waypoints = [[lat, lng]];
+        let actual = inicio;
+        for (let pasos = 0; actual !== null && pasos <= Object.keys(tabla).length; pasos++) {
+            waypoints.push(nodos[actual]);
+            actual = tabla[actual][0] === null ? null : String(tabla[actual][0]);
+        }
+        const [, distanciaGrafo, puntoId] = tabla[inicio];
+        const punto = puntos[puntoId];
+        waypoints.push([punto.lat, punto.lng]);
+
+        const distancia = distanciaInicio + distanciaGrafo;
+        const minutos = redondear(distancia / velocidad);
+        return {
+            encontrado: true,
+            offline: true,
+            waypoints,
+            distancia_metros: redondear(distancia),
+            tiempo_minutos: minutos,
+            mensaje: `Sin conexión · ruta guardada hacia ${punto.nombre} (${Math.round(distancia)}m · ~${minutos} min)`,
+            punto_encuentro: punto,
+        };
+    }
+
+    /**
+     * Ruta de evacuación: primero el servidor; si no responde (o el service worker
+     * contesta "Sin conexion"), la ruta local con el paquete offline.
+     */
+    async function calcular(lat, lng, puntoId) {
+        const parametros = new URLSearchParams({ lat, lng });
+        if (puntoId) parametros.set('punto_id', puntoId);
+        try {
+            const control = new AbortController();
+            const temporizador = setTimeout(() => control.abort(), TIEMPO_ESPERA_MS);
+            const respuesta = await fetch(`${URL_RUTA}?${parametros}`, {
+                credentials: 'same-origin',
+                signal: control.signal,
+            });
+            clearTimeout(temporizador);
+            if (respuesta.ok) {
+                const datos = await respuesta.json();
+                if (datos && Array.isArray(datos.waypoints)) return datos;
+            }
+        } catch (e) {
+            // sin red o tiempo agotado: se calcula localmente
+        }
+        const datos = await cargarPaquete();
+        if (!datos) {
+            return { encontrado: false, offline: true, waypoints: [], mensaje: 'Sin conexión y sin mapa guardado.' };
+        }
+        return calcularLocal(datos, lat, lng);
+    }
+
+    global.sstRutaOffline = {
+        CACHE_OFFLINE,
+        URL_PAQUETE,
+        cargarPaquete,
+        olvidarPaquete,
+        calcularLocal,
+        calcular,
+    };
+})(self);
@@ -1,28 +1,63 @@
-const CACHE_NAME = 'sst-sena-v9';
+const CACHE_NAME = 'sst-sena-v10';
 const URLS_TO_CACHE = [
   '/accounts/login/',
   '/static/css/design-system.css',
+  '/static/js/ruta_offline.js',
   '/manifest.json',
   'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
   'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.0/font/bootstrap-icons.css',
   'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
 ];
 
-// Instalar: cachear recursos esenciales
+// Paquete offline del mapa de evacuación (mapas/offline.py): edificios, puntos de
+// encuentro, grafo y tabla de siguiente salto. Vive en su propia caché, que no se
+// borra al cambiar CACHE_NAME, y se guarda bajo la URL sin versión para que
+// static/js/ruta_offline.js lo encuentre sin red.
+const CACHE_OFFLINE = 'sst-mapa-offline';
+const URL_PAQUETE_OFFLINE = '/api/mapas/api/offline/';
+const URL_VERSION_OFFLINE = '/api/mapas/api/offline/version/';
+
+// Descarga el paquete solo si cambió su versión (el ETag del guardado es su hash).
+// Sin sesión la consulta de versión falla y no se hace nada.
+async function actualizarPaqueteOffline() {
+  const respuesta = await fetch(URL_VERSION_OFFLINE, { credentials: 'same-origin', cache: 'no-store' });
+  if (!respuesta.ok) return;
+  const { version, url } = await respuesta.json();
+
+  const cache = await caches.open(CACHE_OFFLINE);
+  const guardado = await cache.match(URL_PAQUETE_OFFLINE);
+  if (guardado && guardado.headers.get('ETag') === `"${version}"`) return;
+
+  const paquete = await fetch(url, { credentials: 'same-origin' });
+  if (!paquete.ok) return;
+  await cache.put(URL_PAQUETE_OFFLINE, paquete);
+  const clientes = await self.clients.matchAll({ type: 'window' });
+  clientes.forEach(cliente => cliente.postMessage({ tipo: 'paquete-offline', version }));
+}
+
+// Instalar: cachear recursos esenciales (y el paquete offline si hay sesión)
 self.addEventListener('install', event => {
   event.waitUntil(
     caches.open(CACHE_NAME)
       .then(cache => cache.addAll(URLS_TO_CACHE))
+      .then(() => actualizarPaqueteOffline().catch(() => {}))
       .then(() => self.skipWaiting())
   );
 });
 
+// Las páginas piden revisar la versión del paquete offline al cargar
+self.addEventListener('message', event => {
+  if (event.data && event.data.tipo === 'actualizar-offline') {
+    event.waitUntil(actualizarPaqueteOffline().catch(() => {}));
+  }
+});
+
 // Activar: limpiar caches viejas
 self.addEventListener('activate', event => {
   event.waitUntil(
     caches.keys().then(names =>
       Promise.all(
-        names.filter(name => name !== CACHE_NAME)
+        names.filter(name => name !== CACHE_NAME && name !== CACHE_OFFLINE)
           .map(name => caches.delete(name))
       )
     ).then(() => self.clients.claim())
@@ -36,6 +71,16 @@ self.addEventListener('fetch', event => {
   // Ignorar peticiones que no sean GET
   if (event.request.method !== 'GET') return;
 
+  // Paquete offline: red si hay, si no el guardado
+  if (url.pathname === URL_PAQUETE_OFFLINE) {
+    event.respondWith(
+      fetch(event.request).catch(() =>
+        caches.open(CACHE_OFFLINE).then(cache => cache.match(URL_PAQUETE_OFFLINE))
+      )
+    );
+    return;
+  }
+
   // APIs siempre van a la red
   if (url.pathname.startsWith('/api/')) {
     event.respondWith(
@@ -6,6 +6,7 @@ class UsuariosConfig(AppConfig):
     name = "usuarios"
 
     def ready(self):
+        import usuarios.signals  # noqa: F401
         from auditlog.registry import auditlog
         from .models import Usuario
 
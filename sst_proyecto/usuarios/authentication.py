@@ -0,0 +1,101 @@
+"""
+Autenticación por token de la API con caché
+Sistema SST - Centro Minero SENA
+
+TokenAuthentication de DRF consulta Token + Usuario en cada request. La app
+móvil (botón de pánico, escaneo QR, sondeo de notificaciones) autentica todas
+sus llamadas así, de modo que esa consulta se repite en cada una.
+
+TokenAuthenticationCacheada guarda el token con su usuario durante
+CACHE_TTL_TOKEN_AUTH segundos. La clave es un hash del token, nunca el token en
+claro. La entrada se borra:
+  - al borrar el token (logout), con la señal post_delete de Token;
+  - al guardar o borrar el usuario (desactivación, cambio de rol), con sus señales;
+  - en las actualizaciones masivas (QuerySet.update no emite señales), llamando
+    a invalidar_tokens_de_usuarios(), como hace desactivar_cuentas_visitantes.
+
+Con TOKEN_EXPIRACION_HORAS > 0 los tokens vencen esas horas después de
+creados: el token vencido se borra y el cliente debe iniciar sesión de nuevo.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+_PREFIJO = "auth:token:"
+
+
+def _clave(key):
+    return _PREFIJO + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _vigencia():
+    """Duración de un token en segundos; None si no vencen."""
+    horas = getattr(settings, "TOKEN_EXPIRACION_HORAS", 0)
+    return horas * 3600 if horas else None
+
+
+def segundos_restantes(token):
+    """Segundos hasta que vence `token` (<= 0 si ya venció); None si los tokens no vencen."""
+    vigencia = _vigencia()
+    if vigencia is None:
+        return None
+    return vigencia - (timezone.now() - token.created).total_seconds()
+
+
+def token_vigente(usuario):
+    """Token del usuario; si el actual venció lo reemplaza por uno nuevo."""
+    token, _ = Token.objects.get_or_create(user=usuario)
+    restantes = segundos_restantes(token)
+    if restantes is not None and restantes <= 0:
+        token.delete()
+        token = Token.objects.create(user=usuario)
+    return token
+
+
+def invalidar_token(key):
+    cache.delete(_clave(key))
+
+
+def invalidar_tokens_de_usuarios(usuario_ids):
+    """Borra de la caché los tokens de los usuarios indicados."""
+    keys = Token.objects.filter(user_id__in=usuario_ids).values_list("key", flat=True)
+    claves = [_clave(key) for key in keys]
+    if claves:
+        cache.delete_many(claves)
+
+
+class TokenAuthenticationCacheada(TokenAuthentication):
+    """TokenAuthentication de DRF con el token y su usuario en caché y vencimiento opcional."""
+
+    def authenticate_credentials(self, key):
+        clave = _clave(key)
+        token = cache.get(clave)
+        en_cache = token is not None
+        if not en_cache:
+            try:
+                token = Token.objects.select_related("user").get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed("Token inválido.")
+
+        restantes = segundos_restantes(token)
+        if restantes is not None and restantes <= 0:
+            cache.delete(clave)
+            Token.objects.filter(key=key).delete()
+            raise exceptions.AuthenticationFailed("El token expiró. Inicia sesión de nuevo.")
+
+        if not token.user.is_active:
+            cache.delete(clave)
+            raise exceptions.AuthenticationFailed("Usuario inactivo o eliminado.")
+
+        if not en_cache:
+            ttl = settings.CACHE_TTL_TOKEN_AUTH
+            if restantes is not None:
+                ttl = min(ttl, int(restantes) + 1)
+            cache.add(clave, token, ttl)
+        return token.user, token
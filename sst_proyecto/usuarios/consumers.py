@@ -1,13 +1,14 @@
 """
-WebSocket consumer para notificaciones en tiempo real.
+WebSocket consumer para notificaciones y estado en tiempo real.
 
-Cada usuario autenticado se une a dos grupos:
-  - notif_user_{id}  → mensajes personales
-  - notif_rol_{rol}  → mensajes a todo un rol (ej. BRIGADA, ADMINISTRATIVO)
+Cada usuario autenticado se une a tres grupos:
+  - notif_user_{id}    → mensajes personales
+  - notif_rol_{rol}    → mensajes a todo un rol (ej. BRIGADA, ADMINISTRATIVO)
+  - emergencia_masiva  → bandera de emergencia masiva y resumen de evacuación
 
-El frontend se conecta a /ws/notificaciones/ y recibe eventos JSON
-del tipo { tipo, titulo, mensaje, prioridad, url } cuando
-NotificacionService crea una notificación.
+y, si lo pide y su rol lo permite, a los grupos de tópicos opcionales
+(aforo, emergencias). Es un canal multiplexado: cada mensaje JSON lleva un
+campo "topico" (ver usuarios/tiempo_real.py).
 """
 
 import json
@@ -15,10 +16,15 @@ import logging
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from emergencias.utils import GRUPO_EMERGENCIA_MASIVA
+from sst_proyecto.metricas import MetricasConsumerMixin
+
+from .tiempo_real import TOPICO_NOTIFICACION, grupo_topico, grupo_usuario, puede_suscribirse
+
 logger = logging.getLogger(__name__)
 
 
-class NotificacionConsumer(AsyncWebsocketConsumer):
+class NotificacionConsumer(MetricasConsumerMixin, AsyncWebsocketConsumer):
     async def connect(self):
         user = self.scope.get("user")
 
@@ -26,11 +32,13 @@ class NotificacionConsumer(AsyncWebsocketConsumer):
             await self.close(code=4001)
             return
 
-        self.user_group = f"notif_user_{user.id}"
+        self.user_group = grupo_usuario(user.id)
+        self.topicos = set()
         self.rol_group = f"notif_rol_{user.rol}"
 
         await self.channel_layer.group_add(self.user_group, self.channel_name)
         await self.channel_layer.group_add(self.rol_group, self.channel_name)
+        await self.channel_layer.group_add(GRUPO_EMERGENCIA_MASIVA, self.channel_name)
         await self.accept()
 
         logger.debug("WS conectado: user=%s grupos=[%s, %s]", user.username, self.user_group, self.rol_group)
@@ -40,10 +48,36 @@ class NotificacionConsumer(AsyncWebsocketConsumer):
             await self.channel_layer.group_discard(self.user_group, self.channel_name)
         if hasattr(self, "rol_group"):
             await self.channel_layer.group_discard(self.rol_group, self.channel_name)
+            await self.channel_layer.group_discard(GRUPO_EMERGENCIA_MASIVA, self.channel_name)
+        for topico in getattr(self, "topicos", ()):
+            await self.channel_layer.group_discard(grupo_topico(topico), self.channel_name)
 
-    # El cliente no envía mensajes; ignoramos cualquier texto recibido.
     async def receive(self, text_data=None, bytes_data=None):
-        pass
+        """
+        Único mensaje aceptado del cliente:
+        { "accion": "suscribir" | "desuscribir", "topicos": ["aforo", ...] }
+        Los tópicos desconocidos o no permitidos para el rol se ignoran.
+        """
+        try:
+            mensaje = json.loads(text_data or "")
+            accion = mensaje.get("accion")
+            topicos = set(mensaje.get("topicos") or ())
+        except (ValueError, AttributeError, TypeError):
+            return
+
+        user = self.scope["user"]
+        if accion == "suscribir":
+            for topico in topicos - self.topicos:
+                if puede_suscribirse(user, topico):
+                    await self.channel_layer.group_add(grupo_topico(topico), self.channel_name)
+                    self.topicos.add(topico)
+        elif accion == "desuscribir":
+            for topico in topicos & self.topicos:
+                await self.channel_layer.group_discard(grupo_topico(topico), self.channel_name)
+                self.topicos.discard(topico)
+        else:
+            return
+        await self.send(text_data=json.dumps({"topico": "suscripciones", "topicos": sorted(self.topicos)}))
 
     # ------------------------------------------------------------------ #
     # Manejadores de eventos enviados desde el channel layer              #
@@ -54,4 +88,11 @@ class NotificacionConsumer(AsyncWebsocketConsumer):
         Recibe un evento del channel layer (enviado por NotificacionService)
         y lo reenvía al WebSocket del navegador.
         """
-        await self.send(text_data=json.dumps(event["data"]))
+        await self.send(text_data=json.dumps({"topico": TOPICO_NOTIFICACION, **event["data"]}))
+
+    async def tiempo_real(self, event):
+        """
+        Mensaje de un tópico publicado con usuarios.tiempo_real.publicar
+        (no leídas, emergencia masiva, evacuación, aforo, emergencias).
+        """
+        await self.send(text_data=json.dumps({"topico": event["topico"], **event["data"]}, default=str))
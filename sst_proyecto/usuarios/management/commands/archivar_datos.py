@@ -0,0 +1,56 @@
+"""
+Comando para archivar y eliminar los datos fuera de su ventana de retención
+(RETENCION_DATOS en settings). Pensado para ejecutarse de noche.
+
+Uso:
+    python manage.py archivar_datos                                  # todas las políticas
+    python manage.py archivar_datos --modelo control_acceso.RegistroAcceso
+    python manage.py archivar_datos --simular                         # solo cuenta filas vencidas
+    python manage.py archivar_datos --lote 500 --pausa 0.2            # lotes más suaves en hora pico
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Archiva en archivos comprimidos por mes y elimina en lotes los datos vencidos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--modelo", action="append", help="Etiqueta app.Modelo a procesar (repetible; por defecto todas)"
+        )
+        parser.add_argument("--lote", type=int, help="Filas por lote (default: RETENCION_TAMANO_LOTE)")
+        parser.add_argument("--pausa", type=float, default=0.0, help="Segundos de espera entre lotes")
+        parser.add_argument("--simular", action="store_true", help="No archiva ni borra; muestra cuántas filas vencen")
+
+    def handle(self, *args, **options):
+        from sst_proyecto import retencion
+
+        try:
+            politicas = retencion.politicas(options["modelo"])
+        except KeyError as e:
+            raise CommandError(str(e))
+
+        for politica in politicas:
+            inicio = time.perf_counter()
+            resultado = retencion.archivar(
+                politica, tamano_lote=options["lote"], pausa=options["pausa"], simular=options["simular"]
+            )
+            segundos = time.perf_counter() - inicio
+            if options["simular"]:
+                self.stdout.write(
+                    f"  {politica.etiqueta}: {resultado['filas']} fila(s) con más de {politica.dias} días"
+                )
+                continue
+
+            mensaje = (
+                f"  {politica.etiqueta}: {resultado['filas']} fila(s) archivadas en "
+                f"{resultado['lotes']} lote(s), {len(resultado['archivos'])} archivo(s) ({segundos:.1f} s)"
+            )
+            if retencion.es_particionada(politica.modelo._meta.db_table):
+                eliminadas = retencion.eliminar_particiones_vacias(politica.modelo, politica.limite())
+                if eliminadas:
+                    mensaje += f", particiones eliminadas: {', '.join(eliminadas)}"
+            self.stdout.write(self.style.SUCCESS(mensaje))
@@ -0,0 +1,52 @@
+"""
+Comando para poblar una BD de desarrollo con datos sintéticos a escala.
+Pensado para pruebas de carga y perfilado, NO para producción.
+
+Uso:
+    python manage.py generar_datos_sinteticos --escala pequena     # 1k usuarios, 20k accesos
+    python manage.py generar_datos_sinteticos --escala grande      # 50k usuarios, 1M accesos
+    python manage.py generar_datos_sinteticos --usuarios 5000 --registros 300000
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Genera usuarios, accesos, campus y emergencias sintéticos con inserciones masivas"
+
+    def add_arguments(self, parser):
+        from benchmarks.datos_sinteticos import ESCALAS
+
+        parser.add_argument("--escala", choices=sorted(ESCALAS), default="pequena", help="Volumen predefinido")
+        parser.add_argument("--usuarios", type=int, help="Número de usuarios (sobrescribe la escala)")
+        parser.add_argument("--registros", type=int, help="Número de RegistroAcceso (sobrescribe la escala)")
+        parser.add_argument("--dias", type=int, default=90, help="Días de histórico de accesos (default: 90)")
+        parser.add_argument("--semilla", type=int, default=1, help="Semilla aleatoria (default: 1)")
+        parser.add_argument("--forzar", action="store_true", help="Permite ejecutarlo con DEBUG=False")
+
+    def handle(self, *args, **options):
+        from benchmarks.datos_sinteticos import ESCALAS, PREFIJO, generar
+        from usuarios.models import Usuario
+
+        if not settings.DEBUG and not options["forzar"]:
+            raise CommandError("Con DEBUG=False se requiere --forzar (los datos sintéticos no son para producción).")
+        if Usuario.objects.filter(username__startswith=f"{PREFIJO}_").exists():
+            raise CommandError("La BD ya contiene datos sintéticos; use una BD limpia.")
+
+        usuarios, registros = ESCALAS[options["escala"]]
+        usuarios = options["usuarios"] or usuarios
+        registros = options["registros"] or registros
+
+        self.stdout.write(f"Generando {usuarios} usuarios y {registros} registros de acceso...")
+        inicio = time.perf_counter()
+        resumen = generar(
+            num_usuarios=usuarios, num_registros=registros, dias=options["dias"], semilla=options["semilla"]
+        )
+        segundos = time.perf_counter() - inicio
+
+        for clave in ("usuarios", "registros", "edificios", "nodos", "tramos", "emergencias"):
+            self.stdout.write(f"  - {clave}: {resumen[clave]}")
+        self.stdout.write(self.style.SUCCESS(f"Datos sintéticos generados en {segundos:.1f} s"))
@@ -0,0 +1,78 @@
+"""
+Índices de búsqueda de usuarios (sst_proyecto/busqueda.py, índice "usuarios").
+"""
+
+from django.db import migrations
+
+from sst_proyecto.busqueda import RunSQLMotor
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0012_visitante_usuario_fk'),
+    ]
+
+    operations = [
+        # PostgreSQL: las expresiones deben coincidir con las que genera busqueda.py
+        # (SearchVector ponderado; UPPER(campo::text) de icontains/istartswith)
+        RunSQLMotor(
+            vendor='postgresql',
+            sql=[
+                "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+                """
+                    CREATE INDEX IF NOT EXISTS usuarios_usuario_busq_fts ON usuarios_usuario USING gin ((
+                        ((((setweight(to_tsvector('spanish'::regconfig, COALESCE(numero_documento, '')), 'A')
+                        || setweight(to_tsvector('spanish'::regconfig, COALESCE(first_name, '')), 'B'))
+                        || setweight(to_tsvector('spanish'::regconfig, COALESCE(last_name, '')), 'B'))
+                        || setweight(to_tsvector('spanish'::regconfig, COALESCE(ficha, '')), 'C'))
+                        || setweight(to_tsvector('spanish'::regconfig, COALESCE(programa_formacion, '')), 'D'))
+                    ))
+                """,
+                "CREATE INDEX IF NOT EXISTS usuarios_usu_numero_docum_trgm ON usuarios_usuario USING gin ((UPPER(numero_documento::text)) gin_trgm_ops)",
+                "CREATE INDEX IF NOT EXISTS usuarios_usu_ficha_trgm ON usuarios_usuario USING gin ((UPPER(ficha::text)) gin_trgm_ops)",
+                "CREATE INDEX IF NOT EXISTS usuarios_usu_programa_for_trgm ON usuarios_usuario USING gin ((UPPER(programa_formacion::text)) gin_trgm_ops)",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS usuarios_usuario_busq_fts",
+                "DROP INDEX IF EXISTS usuarios_usu_numero_docum_trgm",
+                "DROP INDEX IF EXISTS usuarios_usu_ficha_trgm",
+                "DROP INDEX IF EXISTS usuarios_usu_programa_for_trgm",
+            ],
+        ),
+        # SQLite: tabla FTS5 de contenido externo sincronizada con triggers
+        RunSQLMotor(
+            vendor='sqlite',
+            sql=[
+                """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_usuarios USING fts5(
+                        numero_documento, first_name, last_name, ficha, programa_formacion,
+                        content='usuarios_usuario', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                    )
+                """,
+                """
+                    CREATE TRIGGER IF NOT EXISTS busqueda_usuarios_ai AFTER INSERT ON usuarios_usuario BEGIN
+                        INSERT INTO busqueda_usuarios(rowid, numero_documento, first_name, last_name, ficha, programa_formacion) VALUES (new.id, new.numero_documento, new.first_name, new.last_name, new.ficha, new.programa_formacion);
+                    END
+                """,
+                """
+                    CREATE TRIGGER IF NOT EXISTS busqueda_usuarios_ad AFTER DELETE ON usuarios_usuario BEGIN
+                        INSERT INTO busqueda_usuarios(busqueda_usuarios, rowid, numero_documento, first_name, last_name, ficha, programa_formacion) VALUES ('delete', old.id, old.numero_documento, old.first_name, old.last_name, old.ficha, old.programa_formacion);
+                    END
+                """,
+                """
+                    CREATE TRIGGER IF NOT EXISTS busqueda_usuarios_au AFTER UPDATE OF numero_documento, first_name, last_name, ficha, programa_formacion ON usuarios_usuario BEGIN
+                        INSERT INTO busqueda_usuarios(busqueda_usuarios, rowid, numero_documento, first_name, last_name, ficha, programa_formacion) VALUES ('delete', old.id, old.numero_documento, old.first_name, old.last_name, old.ficha, old.programa_formacion);
+                        INSERT INTO busqueda_usuarios(rowid, numero_documento, first_name, last_name, ficha, programa_formacion) VALUES (new.id, new.numero_documento, new.first_name, new.last_name, new.ficha, new.programa_formacion);
+                    END
+                """,
+                "INSERT INTO busqueda_usuarios(busqueda_usuarios) VALUES ('rebuild')",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS busqueda_usuarios_ai",
+                "DROP TRIGGER IF EXISTS busqueda_usuarios_ad",
+                "DROP TRIGGER IF EXISTS busqueda_usuarios_au",
+                "DROP TABLE IF EXISTS busqueda_usuarios",
+            ],
+        ),
+    ]
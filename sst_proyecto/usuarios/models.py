@@ -1,4 +1,7 @@
 # usuarios/models.py
+from collections import Counter
+from types import MappingProxyType
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
@@ -227,25 +230,44 @@ class RolePermissions:
         },
     }
 
+    # Tablas compiladas por compilar() a partir de PERMISSIONS_MAP:
+    #   TABLA   rol → frozenset de permisos concedidos (consulta O(1), sin copias)
+    #   VISTAS  rol → vista de solo lectura del mapa completo (para las plantillas)
+    TABLA = {}
+    VISTAS = {}
+
+    @classmethod
+    def compilar(cls):
+        """Precalcula TABLA y VISTAS. Se ejecuta al importar el módulo; repetir si cambia PERMISSIONS_MAP."""
+        cls.TABLA = {
+            rol: frozenset(permiso for permiso, concedido in permisos.items() if concedido)
+            for rol, permisos in cls.PERMISSIONS_MAP.items()
+        }
+        cls.VISTAS = {rol: MappingProxyType(dict(permisos)) for rol, permisos in cls.PERMISSIONS_MAP.items()}
+
+    @classmethod
+    def permisos_de_rol(cls, rol):
+        """frozenset con los permisos concedidos a `rol`."""
+        return cls.TABLA.get(rol, _SIN_PERMISOS)
+
     @classmethod
     def has_permission(cls, user, permission_name):
         """Verifica si un usuario tiene un permiso específico"""
         if not user.is_authenticated:
             return False
-
-        user_role = user.rol
-        role_permissions = cls.PERMISSIONS_MAP.get(user_role, {})
-
-        return role_permissions.get(permission_name, False)
+        return permission_name in cls.TABLA.get(user.rol, _SIN_PERMISOS)
 
     @classmethod
     def get_user_permissions(cls, user):
-        """Obtiene todos los permisos de un usuario"""
+        """Obtiene todos los permisos de un usuario (vista compartida de solo lectura, no una copia)"""
         if not user.is_authenticated:
-            return {}
+            return _MAPA_VACIO
+        return cls.VISTAS.get(user.rol, _MAPA_VACIO)
+
 
-        user_role = user.rol
-        return cls.PERMISSIONS_MAP.get(user_role, {}).copy()
+_SIN_PERMISOS = frozenset()
+_MAPA_VACIO = MappingProxyType({})
+RolePermissions.compilar()
 
 
 class Usuario(AbstractUser):
@@ -501,6 +523,29 @@ class Visitante(models.Model):
         return None
 
 
+class NotificacionQuerySet(models.QuerySet):
+    """
+    Mantiene el contador cacheado de no leídas (usuarios.utils) en las
+    operaciones masivas, que no pasan por Notificacion.save.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .utils import ajustar_no_leidas
+
+        objs = super().bulk_create(objs, *args, **kwargs)
+        ajustar_no_leidas(Counter(n.destinatario_id for n in objs if not n.leida))
+        return objs
+
+    def delete(self):
+        from .utils import ajustar_no_leidas
+
+        no_leidas = self.filter(leida=False).order_by().values_list("destinatario_id").annotate(n=models.Count("id"))
+        deltas = {destinatario_id: -n for destinatario_id, n in no_leidas}
+        resultado = super().delete()
+        ajustar_no_leidas(deltas)
+        return resultado
+
+
 class Notificacion(models.Model):
     """
     Sistema de notificaciones general para todos los usuarios
@@ -542,6 +587,8 @@ class Notificacion(models.Model):
     # Opcional: fecha de vencimiento (para recordatorios)
     fecha_vencimiento = models.DateTimeField(null=True, blank=True)
 
+    objects = NotificacionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Notificacion"
         verbose_name_plural = "Notificaciones"
@@ -554,14 +601,66 @@ class Notificacion(models.Model):
     def __str__(self):
         return f"{self.titulo} - {self.destinatario.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        if "leida" in field_names and "destinatario_id" in field_names:
+            instancia._cuenta_como = instancia._contribucion()
+        return instancia
+
+    def _contribucion(self):
+        """(destinatario_id, 1 si suma al contador de no leídas) según el estado en memoria."""
+        return self.destinatario_id, 0 if self.leida else 1
+
+    def _ajustar_contador(self, antes, despues):
+        from .utils import ajustar_no_leidas
+
+        deltas = Counter()
+        if antes:
+            deltas[antes[0]] -= antes[1]
+        if despues:
+            deltas[despues[0]] += despues[1]
+        deltas = {destinatario_id: n for destinatario_id, n in deltas.items() if n}
+        if deltas:
+            ajustar_no_leidas(deltas)
+
+    def save(self, *args, **kwargs):
+        # Mantiene el contador de no leídas al crear y en los cambios de `leida`
+        # (p. ej. PATCH {"leida": true}); comparando contra el estado leído de la BD
+        creando = self._state.adding
+        antes = None if creando else getattr(self, "_cuenta_como", None)
+        super().save(*args, **kwargs)
+        despues = self._contribucion()
+        if creando or antes is not None:
+            self._ajustar_contador(antes, despues)
+        self._cuenta_como = despues
+
+    def delete(self, *args, **kwargs):
+        # Model.delete no pasa por NotificacionQuerySet.delete
+        antes = getattr(self, "_cuenta_como", self._contribucion())
+        resultado = super().delete(*args, **kwargs)
+        self._ajustar_contador(antes, None)
+        self._cuenta_como = None
+        return resultado
+
     def marcar_leida(self):
-        """Marca la notificacion como leida"""
+        """Marca la notificacion como leida. Retorna True si estaba sin leer."""
         from django.utils import timezone
 
-        if not self.leida:
-            self.leida = True
-            self.fecha_lectura = timezone.now()
-            self.save()
+        from .utils import ajustar_no_leidas
+
+        if self.leida:
+            return False
+        self.leida = True
+        self.fecha_lectura = timezone.now()
+        # UPDATE condicional: dos lecturas concurrentes solo descuentan una vez
+        actualizada = Notificacion.objects.filter(pk=self.pk, leida=False).update(
+            leida=True, fecha_lectura=self.fecha_lectura
+        )
+        if actualizada:
+            ajustar_no_leidas({self.destinatario_id: -1})
+        self._cuenta_como = self._contribucion()
+        return bool(actualizada)
 
     @property
     def esta_vencida(self):
@@ -588,11 +687,18 @@ class Notificacion(models.Model):
         )
 
     @classmethod
-    def notificar_usuarios_por_rol(cls, rol, titulo, mensaje, tipo="INFO", prioridad="MEDIA"):
+    def notificar_usuarios_por_rol(cls, rol, titulo, mensaje, tipo="INFO", prioridad="MEDIA", url_relacionada=""):
         """Crea notificaciones masivas para todos los usuarios de un rol"""
         usuarios = Usuario.objects.filter(rol=rol, activo=True)
         notificaciones = [
-            cls(destinatario=u, titulo=titulo, mensaje=mensaje, tipo=tipo, prioridad=prioridad)
+            cls(
+                destinatario=u,
+                titulo=titulo,
+                mensaje=mensaje,
+                tipo=tipo,
+                prioridad=prioridad,
+                url_relacionada=url_relacionada,
+            )
             for u in usuarios
         ]
         return cls.objects.bulk_create(notificaciones)
@@ -8,6 +8,54 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from rest_framework.permissions import BasePermission
 
+from .models import RolePermissions
+
+ROLES_ADMINISTRATIVO_O_INSTRUCTOR = frozenset({"ADMINISTRATIVO", "INSTRUCTOR", "COORDINADOR_SST"})
+ROLES_VIGILANCIA_O_ADMINISTRATIVO = frozenset({"VIGILANCIA", "ADMINISTRATIVO", "COORDINADOR_SST"})
+ROLES_BRIGADA_O_ADMINISTRATIVO = frozenset({"BRIGADA", "ADMINISTRATIVO", "COORDINADOR_SST"})
+ROLES_GESTION_USUARIOS = frozenset({"ADMINISTRATIVO", "COORDINADOR_SST"})
+
+
+# ====================================================================
+# PERFIL DE PERMISOS POR REQUEST
+# ====================================================================
+
+
+class PerfilPermisos:
+    """
+    Rol y permisos del usuario de un request, resueltos una sola vez.
+    Los decoradores y las clases de permisos de DRF consultan este objeto en
+    lugar de repetir las comprobaciones sobre request.user en cada clase.
+    """
+
+    __slots__ = ("usuario", "autenticado", "rol", "es_staff", "es_brigada", "permisos")
+
+    def __init__(self, usuario):
+        self.usuario = usuario
+        self.autenticado = bool(usuario and usuario.is_authenticated)
+        self.rol = usuario.rol if self.autenticado else None
+        self.es_staff = self.autenticado and usuario.is_staff
+        self.es_brigada = self.autenticado and usuario.es_brigada
+        self.permisos = RolePermissions.permisos_de_rol(self.rol)
+
+    def puede(self, permiso):
+        return permiso in self.permisos
+
+
+def perfil_permisos(request):
+    """
+    PerfilPermisos del usuario de `request` (HttpRequest o Request de DRF).
+    Se memoriza en el HttpRequest subyacente, así que lo comparten el
+    middleware, los decoradores y DRF; se recalcula si cambia el usuario (login/logout).
+    """
+    base = getattr(request, "_request", request)
+    usuario = request.user
+    perfil = getattr(base, "_perfil_permisos", None)
+    if perfil is None or perfil.usuario is not usuario:
+        perfil = PerfilPermisos(usuario)
+        base._perfil_permisos = perfil
+    return perfil
+
 
 # ====================================================================
 # DECORADORES PARA VISTAS DE DJANGO (HTML)
@@ -24,16 +72,20 @@ def rol_requerido(*roles_permitidos):
             ...
     """
 
+    roles = frozenset(roles_permitidos)
+
     def decorador(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
+            perfil = perfil_permisos(request)
+
             # Verificar que el usuario esté autenticado
-            if not request.user.is_authenticated:
+            if not perfil.autenticado:
                 messages.warning(request, "Debes iniciar sesión para acceder.")
                 return redirect("login")
 
             # Verificar que el usuario tenga uno de los roles permitidos
-            if request.user.rol not in roles_permitidos:
+            if perfil.rol not in roles:
                 messages.error(
                     request,
                     f"No tienes permiso para acceder a esta sección. Se requiere rol: {', '.join(roles_permitidos)}",
@@ -54,11 +106,12 @@ def excluir_visitantes(view_func):
 
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        if not request.user.is_authenticated:
+        perfil = perfil_permisos(request)
+        if not perfil.autenticado:
             messages.warning(request, "Debes iniciar sesión para acceder.")
             return redirect("login")
 
-        if request.user.rol == "VISITANTE":
+        if perfil.rol == "VISITANTE":
             messages.error(request, "Los visitantes no tienen acceso a esta sección.")
             return redirect("dashboard")
 
@@ -80,7 +133,19 @@ class EsCoordinador(BasePermission):
     message = "Solo el Coordinador SST puede realizar esta acción."
 
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.rol == "COORDINADOR_SST"
+        return perfil_permisos(request).rol == "COORDINADOR_SST"
+
+
+class EsStaffOCoordinador(BasePermission):
+    """
+    Permiso: Administradores del sistema (staff de Django o Coordinador SST)
+    """
+
+    message = "Solo los administradores del sistema pueden realizar esta acción."
+
+    def has_permission(self, request, view):
+        perfil = perfil_permisos(request)
+        return perfil.es_staff or perfil.rol == "COORDINADOR_SST"
 
 
 class EsAdministrativo(BasePermission):
@@ -91,7 +156,7 @@ class EsAdministrativo(BasePermission):
     message = "Solo el personal administrativo puede realizar esta acción."
 
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.rol == "ADMINISTRATIVO"
+        return perfil_permisos(request).rol == "ADMINISTRATIVO"
 
 
 class EsAdministrativoOInstructor(BasePermission):
@@ -102,11 +167,7 @@ class EsAdministrativoOInstructor(BasePermission):
     message = "Se requiere ser administrativo o instructor."
 
     def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and request.user.rol in ["ADMINISTRATIVO", "INSTRUCTOR", "COORDINADOR_SST"]
-        )
+        return perfil_permisos(request).rol in ROLES_ADMINISTRATIVO_O_INSTRUCTOR
 
 
 class EsVigilanciaOAdministrativo(BasePermission):
@@ -117,11 +178,7 @@ class EsVigilanciaOAdministrativo(BasePermission):
     message = "Se requiere ser vigilancia o administrativo."
 
     def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and request.user.rol in ["VIGILANCIA", "ADMINISTRATIVO", "COORDINADOR_SST"]
-        )
+        return perfil_permisos(request).rol in ROLES_VIGILANCIA_O_ADMINISTRATIVO
 
 
 class EsBrigadaOAdministrativo(BasePermission):
@@ -133,9 +190,8 @@ class EsBrigadaOAdministrativo(BasePermission):
     message = "Se requiere ser miembro de brigada o administrativo."
 
     def has_permission(self, request, view):
-        if not (request.user and request.user.is_authenticated):
-            return False
-        return request.user.rol in ["BRIGADA", "ADMINISTRATIVO", "COORDINADOR_SST"] or request.user.es_brigada
+        perfil = perfil_permisos(request)
+        return perfil.rol in ROLES_BRIGADA_O_ADMINISTRATIVO or perfil.es_brigada
 
 
 class NoEsVisitante(BasePermission):
@@ -146,7 +202,8 @@ class NoEsVisitante(BasePermission):
     message = "Los visitantes no tienen acceso a esta funcionalidad."
 
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.rol != "VISITANTE"
+        perfil = perfil_permisos(request)
+        return perfil.autenticado and perfil.rol != "VISITANTE"
 
 
 class PuedeGestionarUsuarios(BasePermission):
@@ -157,9 +214,7 @@ class PuedeGestionarUsuarios(BasePermission):
     message = "Solo el personal administrativo puede gestionar usuarios."
 
     def has_permission(self, request, view):
+        perfil = perfil_permisos(request)
         if request.method == "GET":
-            return request.user and request.user.is_authenticated
-
-        return (
-            request.user and request.user.is_authenticated and request.user.rol in ["ADMINISTRATIVO", "COORDINADOR_SST"]
-        )
+            return perfil.autenticado
+        return perfil.rol in ROLES_GESTION_USUARIOS
@@ -15,6 +15,9 @@ from .models import Notificacion, Usuario, PushSubscripcion
 
 logger = logging.getLogger(__name__)
 
+# Prefijo de url_relacionada de los avisos de visitante que excede el tiempo (clave de deduplicación)
+URL_VISITANTE_EXCEDE = "/vigilancia/visitantes/?excede="
+
 
 class WebPushService:
     """
@@ -788,39 +791,60 @@ class NotificacionService:
         horas = int(tiempo_transcurrido.total_seconds() // 3600)
         minutos = int((tiempo_transcurrido.total_seconds() % 3600) // 60)
 
+        anfitrion = visitante.persona_a_visitar.get_full_name() if visitante.persona_a_visitar else "Sin registrar"
         titulo = f"⏰ Visitante excede tiempo: {visitante.nombre_completo}"
         mensaje = (
             f"El visitante lleva más de {tiempo_limite_horas} horas en el centro.\n"
             f"Nombre: {visitante.nombre_completo}\n"
             f"Documento: {visitante.numero_documento}\n"
             f"Tiempo en centro: {horas}h {minutos}m\n"
-            f"Visita a: {visitante.persona_a_visitar.get_full_name()}"
+            f"Visita a: {anfitrion}"
         )
 
         # Notificar a Vigilancia
         Notificacion.notificar_usuarios_por_rol(
-            rol="VIGILANCIA", titulo=titulo, mensaje=mensaje, tipo="RECORDATORIO", prioridad="MEDIA"
+            rol="VIGILANCIA",
+            titulo=titulo,
+            mensaje=mensaje,
+            tipo="RECORDATORIO",
+            prioridad="MEDIA",
+            url_relacionada=f"{URL_VISITANTE_EXCEDE}{visitante.id}",
         )
 
     @staticmethod
     def verificar_visitantes_exceden_tiempo(tiempo_limite_horas=4):
         """
-        Verifica todos los visitantes activos y notifica si exceden el tiempo.
-        Debe ejecutarse como tarea programada (cron/celery).
+        Verifica los visitantes de hoy aún en el centro y notifica si exceden el tiempo.
+        Se ejecuta cada hora (mapas/scheduler.py). Evita duplicados: un aviso por
+        visitante por día; las visitas de días anteriores sin salida no se avisan
+        (desactivar_cuentas_visitantes cierra el día).
         """
         from django.utils import timezone
         from datetime import datetime, timedelta
         from .models import Visitante
 
+        hoy = timezone.localdate()
         limite = timezone.now() - timedelta(hours=tiempo_limite_horas)
 
         visitantes_excedidos = Visitante.objects.filter(
+            fecha_visita=hoy,
             hora_salida__isnull=True,  # Aún en el centro
             activo=True,
+        ).select_related("persona_a_visitar")
+
+        # Visitantes ya avisados hoy (url_relacionada como clave de deduplicación)
+        urls_hoy = set(
+            Notificacion.objects.filter(
+                fecha_creacion__date=hoy,
+                url_relacionada__startswith=URL_VISITANTE_EXCEDE,
+            ).values_list("url_relacionada", flat=True)
         )
 
         count = 0
         for visitante in visitantes_excedidos:
+            if f"{URL_VISITANTE_EXCEDE}{visitante.id}" in urls_hoy:
+                continue  # Ya fue notificado hoy
+
             entrada = datetime.combine(visitante.fecha_visita, visitante.hora_ingreso)
             entrada = timezone.make_aware(entrada) if timezone.is_naive(entrada) else entrada
 
@@ -0,0 +1,26 @@
+"""
+Señales de usuarios: mantienen al día la caché de autenticación por token
+(usuarios/authentication.py).
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidar_token, invalidar_tokens_de_usuarios
+from .models import Usuario
+
+
+@receiver(post_save, sender=Usuario, dispatch_uid="usuarios_invalidar_token_guardado")
+@receiver(post_delete, sender=Usuario, dispatch_uid="usuarios_invalidar_token_borrado")
+def invalidar_token_de_usuario(sender, instance, **kwargs):
+    """Desactivar, cambiar de rol o borrar un usuario descarta su token cacheado."""
+    usuario_id = instance.pk
+    transaction.on_commit(lambda: invalidar_tokens_de_usuarios([usuario_id]))
+
+
+@receiver(post_delete, sender=Token, dispatch_uid="usuarios_invalidar_token")
+def invalidar_token_borrado(sender, instance, **kwargs):
+    """Logout o vencimiento: el token borrado deja de autenticar de inmediato."""
+    invalidar_token(instance.key)
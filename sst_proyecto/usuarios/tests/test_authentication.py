@@ -0,0 +1,77 @@
+"""
+Tests de la autenticación por token cacheada (usuarios/authentication.py).
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from usuarios.models import Usuario
+
+PERFIL_URL = "/api/auth/usuarios/perfil/"
+LOGIN_URL = "/api/auth/usuarios/login/"
+LOGOUT_URL = "/api/auth/usuarios/logout/"
+
+
+def _consultas(client):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(PERFIL_URL)
+    assert response.status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_el_token_cacheado_ahorra_una_consulta(client_aprendiz):
+    primera = _consultas(client_aprendiz)
+    assert _consultas(client_aprendiz) == primera - 1
+
+
+@pytest.mark.django_db
+def test_logout_y_desactivacion_invalidan_la_cache(
+    client_aprendiz, client_instructor, instructor, django_capture_on_commit_callbacks
+):
+    for client in (client_aprendiz, client_instructor):
+        assert client.get(PERFIL_URL).status_code == 200
+
+    assert client_aprendiz.post(LOGOUT_URL).status_code == 200
+    assert client_aprendiz.get(PERFIL_URL).status_code == 401
+
+    with django_capture_on_commit_callbacks(execute=True):
+        instructor.activo = False
+        instructor.save()
+    assert client_instructor.get(PERFIL_URL).status_code == 401
+
+
+@pytest.mark.django_db
+def test_el_scheduler_desactiva_visitantes_con_token_cacheado(client_visitante, visitante):
+    from mapas.scheduler import desactivar_cuentas_visitantes
+
+    assert client_visitante.get(PERFIL_URL).status_code == 200
+    desactivar_cuentas_visitantes()
+    assert not Usuario.objects.get(id=visitante.id).is_active
+    assert client_visitante.get(PERFIL_URL).status_code == 401
+
+
+@pytest.mark.django_db
+def test_token_vencido(client_aprendiz, aprendiz, api_client, settings, monkeypatch):
+    from django.utils import timezone
+
+    settings.TOKEN_EXPIRACION_HORAS = 12
+    assert client_aprendiz.get(PERFIL_URL).status_code == 200
+    key = Token.objects.get(user=aprendiz).key
+
+    # El token sigue en caché, pero vence igual al pasar el plazo
+    despues = timezone.now() + timedelta(hours=13)
+    monkeypatch.setattr("usuarios.authentication.timezone.now", lambda: despues)
+    response = client_aprendiz.get(PERFIL_URL)
+    assert response.status_code == 401
+    assert "expiró" in response.data["detail"]
+    assert not Token.objects.filter(user=aprendiz).exists()
+
+    # Un nuevo login entrega otro token
+    response = api_client.post(LOGIN_URL, {"username": aprendiz.email, "password": "testpass123"}, format="json")
+    assert response.status_code == 200
+    assert response.data["token"] != key
@@ -0,0 +1,147 @@
+"""
+Tests de la búsqueda indexada (sst_proyecto/busqueda.py) y de las vistas que la usan.
+En SQLite se ejercita el motor FTS5.
+"""
+
+import pytest
+from django.db import connection
+
+from reportes.models import Incidente
+from sst_proyecto import busqueda
+from usuarios.models import Usuario
+from usuarios.tests.factories import UsuarioFactory
+
+
+def _incidente(usuario, titulo, descripcion="desc", persona=""):
+    return Incidente.objects.create(
+        titulo=titulo,
+        descripcion=descripcion,
+        persona_afectada=persona,
+        tipo="OTRO",
+        gravedad="MEDIA",
+        area_incidente="OTRO",
+        reportado_por=usuario,
+    )
+
+
+@pytest.mark.django_db
+def test_motor_fts5_en_sqlite():
+    assert busqueda._motor() == "fts5"
+
+
+@pytest.mark.django_db
+def test_filtrar_por_prefijo_sin_tildes_y_todos_los_terminos(aprendiz):
+    caida = _incidente(aprendiz, "Caída en escalera", persona="Laura Gómez")
+    _incidente(aprendiz, "Fuego en taller")
+    _incidente(aprendiz, "Caída de objeto")
+
+    def ids(texto):
+        return set(busqueda.filtrar(Incidente.objects.all(), "incidentes", texto).values_list("id", flat=True))
+
+    assert ids("escal") == {caida.id}
+    assert ids("caida escalera") == {caida.id}
+    assert ids("gomez") == {caida.id}
+    assert len(ids("caída")) == 2
+    assert ids("") == set(Incidente.objects.values_list("id", flat=True))
+
+
+@pytest.mark.django_db
+def test_indice_se_mantiene_con_ediciones_y_borrados(aprendiz):
+    incidente = _incidente(aprendiz, "Derrame químico")
+    incidente.titulo = "Fuga de gas"
+    incidente.save()
+
+    qs = Incidente.objects.all()
+    assert not busqueda.filtrar(qs, "incidentes", "derrame").exists()
+    assert busqueda.filtrar(qs, "incidentes", "fuga").get() == incidente
+
+    incidente.delete()
+    assert not busqueda.filtrar(qs, "incidentes", "fuga").exists()
+
+
+@pytest.mark.django_db
+def test_buscar_ordena_por_relevancia():
+    por_documento = UsuarioFactory(numero_documento="1023456789", first_name="Ana", last_name="Ruiz")
+    por_programa = UsuarioFactory(numero_documento="555", first_name="Luis", programa_formacion="Curso 1023 de redes")
+
+    resultados = list(busqueda.buscar("usuarios", "1023"))
+    assert resultados[:2] == [por_documento, por_programa]
+    assert resultados[0].rango > resultados[1].rango
+
+
+@pytest.mark.django_db
+def test_filtrar_por_relacion_y_campos(aprendiz, instructor):
+    from control_acceso.models import RegistroAcceso
+
+    Usuario.objects.filter(pk=aprendiz.pk).update(ficha="2758391", programa_formacion="Análisis de software")
+    Usuario.objects.filter(pk=instructor.pk).update(ficha=None, programa_formacion="Ficha 2758391 auxiliar")
+    propio = RegistroAcceso.objects.create(usuario=aprendiz, tipo="INGRESO")
+    RegistroAcceso.objects.create(usuario=instructor, tipo="INGRESO")
+
+    qs = RegistroAcceso.objects.all()
+    assert list(busqueda.filtrar(qs, "usuarios", "2758", ruta="usuario", campos=["ficha"])) == [propio]
+    assert busqueda.filtrar(qs, "usuarios", "2758", ruta="usuario").count() == 2
+
+
+@pytest.mark.django_db
+def test_asegurar_indices_reconstruye_si_faltan_triggers(aprendiz):
+    incidente = _incidente(aprendiz, "Cortocircuito")
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TRIGGER "busqueda_incidentes_ai"')
+    _incidente(aprendiz, "Cortocircuito en bodega")  # no queda indexado
+
+    assert busqueda.asegurar_indices() == ["incidentes"]
+    assert busqueda.filtrar(Incidente.objects.all(), "incidentes", "bodega").exclude(pk=incidente.pk).exists()
+
+
+@pytest.mark.django_db
+def test_buscar_usuario_por_prefijo_y_sugerencias(client_vigilancia):
+    ana = UsuarioFactory(numero_documento="1023456789", first_name="Ana")
+    url = "/api/acceso/registros/buscar_usuario/"
+
+    response = client_vigilancia.get(url, {"q": "10234"})
+    assert response.status_code == 200
+    assert [u["id"] for u in response.data["resultados"]] == [ana.id]
+
+    response = client_vigilancia.get(url, {"documento": "102345"})
+    assert response.status_code == 404
+    assert [u["documento"] for u in response.data["sugerencias"]] == ["1023456789"]
+
+    # Los que empiezan por lo digitado van antes que los que solo lo contienen
+    UsuarioFactory(numero_documento="6789012")
+    response = client_vigilancia.get(url, {"documento": "6789"})
+    assert [u["documento"] for u in response.data["sugerencias"]] == ["6789012", "1023456789"]
+    assert [u["documento"] for u in client_vigilancia.get(url, {"q": "6789"}).data["resultados"]] == [
+        "6789012",
+        "1023456789",
+    ]
+
+    assert client_vigilancia.get(url, {"documento": "1023456789"}).data["id"] == ana.id
+
+
+@pytest.mark.django_db
+def test_historial_accesos_busca_por_nombre(django_client_vigilancia, aprendiz, instructor):
+    from control_acceso.models import RegistroAcceso
+
+    Usuario.objects.filter(pk=aprendiz.pk).update(first_name="Mariana", last_name="Peñaloza")
+    RegistroAcceso.objects.create(usuario=aprendiz, tipo="INGRESO")
+    RegistroAcceso.objects.create(usuario=instructor, tipo="INGRESO")
+
+    response = django_client_vigilancia.get("/acceso/historial/", {"q": "penaloza"})
+    assert response.status_code == 200
+    assert response.context["total"] == 1
+
+
+@pytest.mark.django_db
+def test_identificadores_se_buscan_por_subcadena(django_client_vigilancia, aprendiz, instructor):
+    from control_acceso.models import RegistroAcceso
+
+    Usuario.objects.filter(pk=aprendiz.pk).update(numero_documento="1023456789", ficha="2758391")
+    RegistroAcceso.objects.create(usuario=aprendiz, tipo="INGRESO")
+    RegistroAcceso.objects.create(usuario=instructor, tipo="INGRESO")
+
+    assert busqueda.filtrar(Usuario.objects.all(), "usuarios", "8391").get() == aprendiz
+    assert list(busqueda.buscar("usuarios", "6789")) == [aprendiz]
+
+    response = django_client_vigilancia.get("/acceso/historial/", {"q": "456789"})
+    assert response.context["total"] == 1
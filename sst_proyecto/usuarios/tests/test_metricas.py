@@ -0,0 +1,70 @@
+"""
+Tests de la instrumentación de rendimiento (sst_proyecto/metricas.py).
+"""
+
+import pytest
+from django.core.cache import cache
+
+from sst_proyecto.metricas import PresupuestoConsultasExcedido, medir, registro
+
+
+METRICAS_URL = "/metricas/"
+
+
+@pytest.fixture(autouse=True)
+def registro_limpio():
+    registro.limpiar()
+    yield
+    registro.limpiar()
+
+
+@pytest.mark.django_db
+def test_metricas_solo_administradores(client_aprendiz, client_administrativo):
+    assert client_aprendiz.get(METRICAS_URL).status_code == 403
+    assert client_administrativo.get(METRICAS_URL).status_code == 403
+
+
+@pytest.mark.django_db
+def test_metricas_formato_prometheus(django_client_aprendiz, client_coordinador):
+    django_client_aprendiz.get("/")
+    response = client_coordinador.get(METRICAS_URL)
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    texto = response.content.decode()
+    assert "# TYPE sst_vista_consultas histogram" in texto
+    assert 'sst_vista_latencia_segundos_count{vista="dashboard"} 1' in texto
+    assert 'sst_vista_peticiones_total{vista="dashboard"} 1' in texto
+
+
+@pytest.mark.django_db
+def test_medicion_cuenta_consultas_y_cache(aprendiz):
+    from usuarios.models import Usuario
+
+    with medir("prueba") as medicion:
+        Usuario.objects.count()
+        Usuario.objects.filter(pk=aprendiz.pk).exists()
+        cache.get("no-existe")
+        cache.set("existe", 1)
+        cache.get("existe")
+        cache.get_many(["existe", "tampoco"])
+
+    assert medicion.consultas == 2
+    assert medicion.tiempo_bd > 0
+    assert medicion.cache_aciertos == 2
+    assert medicion.cache_fallos == 2
+
+
+@pytest.mark.django_db
+def test_presupuesto_excedido_falla_en_tests(django_client_aprendiz, settings):
+    settings.METRICAS_PRESUPUESTOS_CONSULTAS = {"dashboard": 1}
+    with pytest.raises(PresupuestoConsultasExcedido):
+        django_client_aprendiz.get("/")
+
+
+@pytest.mark.django_db
+def test_presupuesto_excedido_solo_registra_fuera_de_tests(django_client_aprendiz, settings, caplog):
+    settings.METRICAS_PRESUPUESTOS_CONSULTAS = {"dashboard": 1}
+    settings.METRICAS_PRESUPUESTO_ESTRICTO = False
+    assert django_client_aprendiz.get("/").status_code == 200
+    assert "Presupuesto de consultas excedido" in caplog.text
+    assert 'sst_vista_presupuesto_excedido_total{vista="dashboard"} 1' in registro.como_prometheus()
@@ -133,3 +133,85 @@ def test_notificar_sistema_crea_notif(aprendiz, instructor):
     )
     assert count == 2
     assert Notificacion.objects.filter(tipo="SISTEMA").count() == 2
+
+
+# ---------------------------------------------------------------------------
+# Contador cacheado de no leídas (usuarios/utils.py)
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db
+def test_contador_no_leidas_sigue_creacion_y_lectura(aprendiz, instructor, django_capture_on_commit_callbacks):
+    from usuarios.services import NotificacionService
+    from usuarios.utils import contar_no_leidas
+
+    assert contar_no_leidas(aprendiz.id) == 0  # calienta la clave desde la BD
+    with django_capture_on_commit_callbacks(execute=True):
+        NotificacionService.notificar_sistema([aprendiz, instructor], "Aviso", "Mensaje")  # bulk_create
+        Notificacion.crear_notificacion(aprendiz, "Otro", "Mensaje")
+        Notificacion.notificar_usuarios_por_rol("APRENDIZ", "Rol", "Mensaje")
+        NotificacionFactory(destinatario=aprendiz, leida=True)
+    assert contar_no_leidas(aprendiz.id) == 3
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Notificacion.objects.filter(destinatario=aprendiz, titulo="Otro").get().marcar_leida()
+        Notificacion.objects.filter(destinatario=aprendiz, titulo="Rol").delete()
+    assert contar_no_leidas(aprendiz.id) == 1
+    assert contar_no_leidas(aprendiz.id) == Notificacion.objects.filter(destinatario=aprendiz, leida=False).count()
+
+
+@pytest.mark.django_db
+def test_contador_no_leidas_sigue_patch_y_delete_individual(
+    client_aprendiz, aprendiz, django_capture_on_commit_callbacks
+):
+    from usuarios.utils import contar_no_leidas
+
+    leer, borrar, _ = NotificacionFactory.create_batch(3, destinatario=aprendiz, leida=False)
+    assert contar_no_leidas(aprendiz.id) == 3
+
+    url = "/api/auth/notificaciones/{}/"
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client_aprendiz.patch(url.format(leer.id), {"leida": True}, format="json").status_code == 200
+        # Repetir el PATCH no descuenta dos veces
+        assert client_aprendiz.patch(url.format(leer.id), {"leida": True}, format="json").status_code == 200
+    assert contar_no_leidas(aprendiz.id) == 2
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client_aprendiz.delete(url.format(borrar.id)).status_code == 204
+        Notificacion.objects.get(id=leer.id).delete()  # leída: no cambia el contador
+    assert contar_no_leidas(aprendiz.id) == 1
+    assert contar_no_leidas(aprendiz.id) == Notificacion.objects.filter(destinatario=aprendiz, leida=False).count()
+
+
+@pytest.mark.django_db
+def test_badge_count_solo_lee_cache(client_aprendiz, aprendiz, django_assert_max_num_queries):
+    NotificacionFactory.create_batch(2, destinatario=aprendiz, leida=False)
+    client_aprendiz.get("/api/auth/notificaciones/count/")
+    # Autenticación por token (1 consulta); el conteo sale del caché
+    with django_assert_max_num_queries(1):
+        assert client_aprendiz.get("/api/auth/notificaciones/count/").json()["count"] == 2
+
+
+@pytest.mark.django_db
+def test_marcar_todas_leidas_deja_contador_en_cero(client_aprendiz, aprendiz, django_capture_on_commit_callbacks):
+    from usuarios.utils import contar_no_leidas
+
+    NotificacionFactory.create_batch(3, destinatario=aprendiz, leida=False)
+    assert contar_no_leidas(aprendiz.id) == 3
+    with django_capture_on_commit_callbacks(execute=True):
+        client_aprendiz.post("/api/auth/notificaciones/marcar_todas_leidas/")
+    assert client_aprendiz.get("/api/auth/notificaciones/count/").json()["count"] == 0
+
+
+@pytest.mark.django_db
+def test_reconciliar_no_leidas_corrige_deriva(aprendiz, instructor):
+    from django.core.cache import cache
+    from usuarios.utils import _clave_no_leidas, contar_no_leidas, reconciliar_no_leidas
+
+    NotificacionFactory.create_batch(2, destinatario=aprendiz, leida=False)
+    cache.set(_clave_no_leidas(aprendiz.id), 40)
+    cache.set(_clave_no_leidas(instructor.id), 7)
+
+    assert reconciliar_no_leidas() >= 2
+    assert contar_no_leidas(aprendiz.id) == 2
+    assert contar_no_leidas(instructor.id) == 0
@@ -145,3 +145,48 @@ def test_aprendiz_puede_ver_su_propio_perfil(client_aprendiz, aprendiz):
     response = client_aprendiz.get(url)
     assert response.status_code == 200
     assert response.json()["id"] == aprendiz.id
+
+
+# ---------------------------------------------------------------------------
+# Tabla compilada de permisos y perfil por request
+# ---------------------------------------------------------------------------
+
+
+def test_tabla_compilada_coincide_con_el_mapa():
+    from usuarios.models import RolePermissions
+
+    for rol, permisos in RolePermissions.PERMISSIONS_MAP.items():
+        assert RolePermissions.permisos_de_rol(rol) == {p for p, concedido in permisos.items() if concedido}
+        assert RolePermissions.VISTAS[rol] == permisos
+    assert RolePermissions.permisos_de_rol("DESCONOCIDO") == frozenset()
+
+
+@pytest.mark.django_db
+def test_get_permissions_no_copia_ni_se_puede_modificar(aprendiz):
+    permisos = aprendiz.get_permissions()
+    assert permisos is aprendiz.get_permissions()
+    with pytest.raises(TypeError):
+        permisos["can_manage_all_users"] = True
+    assert not aprendiz.has_perm("can_manage_all_users")
+
+
+@pytest.mark.django_db
+def test_perfil_permisos_se_memoriza_por_request_y_usuario(aprendiz, administrativo, rf):
+    from django.contrib.auth.models import AnonymousUser
+
+    from usuarios.permissions import EsAdministrativo, NoEsVisitante, perfil_permisos
+
+    request = rf.get("/")
+    request.user = aprendiz
+    perfil = perfil_permisos(request)
+    assert perfil is perfil_permisos(request)
+    assert perfil.rol == "APRENDIZ" and perfil.puede("can_report_emergency")
+    assert NoEsVisitante().has_permission(request, None)
+    assert not EsAdministrativo().has_permission(request, None)
+
+    request.user = administrativo  # p. ej. tras login(): el perfil se recalcula
+    assert EsAdministrativo().has_permission(request, None)
+
+    request.user = AnonymousUser()
+    assert not perfil_permisos(request).autenticado
+    assert not NoEsVisitante().has_permission(request, None)
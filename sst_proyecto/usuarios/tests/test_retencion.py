@@ -0,0 +1,107 @@
+"""
+Tests de retención y archivo de datos (sst_proyecto/retencion.py, comando archivar_datos).
+"""
+
+import os
+from datetime import date, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from sst_proyecto import retencion
+from usuarios.models import Notificacion
+from usuarios.tests.factories import NotificacionFactory
+
+
+@pytest.fixture(autouse=True)
+def archivo_temporal(settings, tmp_path):
+    settings.ARCHIVO_DATOS_DIR = str(tmp_path / "archivo")
+    settings.RETENCION_TAMANO_LOTE = 2
+    return tmp_path / "archivo"
+
+
+def _envejecer(modelo, campo, pks, dias):
+    modelo.objects.filter(pk__in=pks).update(**{campo: timezone.now() - timedelta(days=dias)})
+
+
+@pytest.mark.django_db
+def test_archivar_mueve_filas_vencidas_a_archivos_mensuales(aprendiz, archivo_temporal):
+    from auditlog.models import LogEntry
+    from control_acceso.models import RegistroAcceso
+
+    viejos = [RegistroAcceso.objects.create(usuario=aprendiz, tipo="INGRESO") for _ in range(5)]
+    reciente = RegistroAcceso.objects.create(usuario=aprendiz, tipo="INGRESO")
+    _envejecer(RegistroAcceso, "fecha_hora_ingreso", [r.pk for r in viejos], 500)
+
+    (politica,) = retencion.politicas(["control_acceso.RegistroAcceso"])
+    assert retencion.archivar(politica, simular=True)["filas"] == 5
+
+    resultado = retencion.archivar(politica)
+    assert resultado["filas"] == 5
+    assert resultado["lotes"] == 3  # lotes de 2 filas
+    assert list(RegistroAcceso.objects.values_list("pk", flat=True)) == [reciente.pk]
+    assert not LogEntry.objects.filter(action=LogEntry.Action.DELETE).exists()
+
+    archivadas = [fila for ruta in resultado["archivos"] for fila in retencion.leer_archivo(ruta)]
+    assert sorted(f["pk"] for f in archivadas) == sorted(r.pk for r in viejos)
+    assert archivadas[0]["campos"]["usuario_id"] == aprendiz.pk
+    mes = (timezone.localtime() - timedelta(days=500)).strftime("%Y-%m")
+    assert all(
+        os.path.dirname(ruta).endswith(os.path.join("control_acceso.registroacceso", mes))
+        for ruta in resultado["archivos"]
+    )
+
+
+@pytest.mark.django_db
+def test_archivar_notificaciones_descuenta_no_leidas(aprendiz, django_capture_on_commit_callbacks):
+    from usuarios.utils import contar_no_leidas
+
+    with django_capture_on_commit_callbacks(execute=True):
+        viejas = NotificacionFactory.create_batch(3, destinatario=aprendiz, leida=False)
+        NotificacionFactory(destinatario=aprendiz, leida=False)
+    _envejecer(Notificacion, "fecha_creacion", [n.pk for n in viejas], 365)
+    assert contar_no_leidas(aprendiz.id) == 4
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("archivar_datos", "--modelo", "usuarios.Notificacion")
+
+    assert Notificacion.objects.count() == 1
+    assert contar_no_leidas(aprendiz.id) == 1
+
+
+@pytest.mark.django_db
+def test_archivar_datos_incluye_auditoria(aprendiz, archivo_temporal):
+    from auditlog.models import LogEntry
+
+    assert LogEntry.objects.exists()  # el alta del usuario quedó auditada
+    LogEntry.objects.update(timestamp=timezone.now() - timedelta(days=1000))
+
+    call_command("archivar_datos", "--modelo", "auditlog.LogEntry")
+    assert not LogEntry.objects.exists()
+    assert (archivo_temporal / "auditlog.logentry").is_dir()
+
+
+def test_sql_particion_mensual():
+    assert retencion.sql_crear_particion("control_acceso_registroacceso", date(2025, 12, 17)) == (
+        'CREATE TABLE IF NOT EXISTS "control_acceso_registroacceso_202512" PARTITION OF '
+        "\"control_acceso_registroacceso\" FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')"
+    )
+
+
+@pytest.mark.django_db
+def test_registro_acceso_particionable_con_log_de_ocupacion(aprendiz, django_capture_on_commit_callbacks):
+    from control_acceso.models import EventoOcupacion, RegistroAcceso
+
+    # EventoOcupacion.registro no deja FK en la BD: --convertir puede renombrar y borrar la tabla vieja
+    assert retencion.claves_foraneas_entrantes(RegistroAcceso) == []
+    assert "usuarios.Notificacion.destinatario" in retencion.claves_foraneas_entrantes(type(aprendiz))
+    with pytest.raises(ValueError, match="claves foráneas entrantes"):
+        retencion.sql_convertir_a_particionada(type(aprendiz), "date_joined")
+
+    # El borrado en cascada de los eventos lo sigue haciendo el ORM
+    with django_capture_on_commit_callbacks(execute=True):
+        registro = RegistroAcceso.objects.create(usuario=aprendiz, tipo="INGRESO")
+    assert EventoOcupacion.objects.filter(registro=registro).exists()
+    registro.delete()
+    assert not EventoOcupacion.objects.exists()
@@ -0,0 +1,133 @@
+"""
+Tests del canal de push multiplexado (usuarios/tiempo_real.py y NotificacionConsumer).
+"""
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+
+from usuarios.consumers import NotificacionConsumer
+from usuarios.tests.factories import NotificacionFactory
+from usuarios.tiempo_real import TOPICO_AFORO, grupo_topico, grupo_usuario
+
+
+def _escuchar(grupo):
+    layer = get_channel_layer()
+    canal = async_to_sync(layer.new_channel)()
+    async_to_sync(layer.group_add)(grupo, canal)
+    return lambda: async_to_sync(layer.receive)(canal)
+
+
+def _conversacion(usuario, pasos):
+    """Conecta un NotificacionConsumer como `usuario` y ejecuta pasos(communicator) dentro del loop."""
+
+    async def ejecutar():
+        communicator = WebsocketCommunicator(NotificacionConsumer.as_asgi(), "/ws/notificaciones/")
+        communicator.scope["user"] = usuario
+        conectado, _ = await communicator.connect()
+        assert conectado
+        try:
+            return await pasos(communicator)
+        finally:
+            await communicator.disconnect()
+
+    return async_to_sync(ejecutar)()
+
+
+@pytest.mark.django_db
+def test_marcar_leida_publica_conteo_no_leidas(client_aprendiz, aprendiz, django_capture_on_commit_callbacks):
+    notif = NotificacionFactory(destinatario=aprendiz, leida=False)
+    NotificacionFactory(destinatario=aprendiz, leida=False)
+    recibir = _escuchar(grupo_usuario(aprendiz.id))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client_aprendiz.post(f"/api/auth/notificaciones/{notif.id}/marcar_leida/")
+    assert recibir() == {"type": "tiempo_real", "topico": "no_leidas", "data": {"count": 1}}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client_aprendiz.post("/api/auth/notificaciones/marcar_todas_leidas/")
+    assert recibir()["data"] == {"count": 0}
+
+
+@pytest.mark.django_db
+def test_suscripcion_a_topicos_respeta_el_rol(aprendiz, vigilancia):
+    async def suscribir(communicator):
+        await communicator.send_json_to({"accion": "suscribir", "topicos": [TOPICO_AFORO, "inexistente"]})
+        return await communicator.receive_json_from()
+
+    assert _conversacion(aprendiz, suscribir) == {"topico": "suscripciones", "topicos": []}
+    assert _conversacion(vigilancia, suscribir) == {"topico": "suscripciones", "topicos": [TOPICO_AFORO]}
+
+
+@pytest.mark.django_db
+def test_mensajes_llegan_etiquetados_con_su_topico(vigilancia):
+    async def pasos(communicator):
+        await communicator.send_json_to({"accion": "suscribir", "topicos": [TOPICO_AFORO]})
+        await communicator.receive_json_from()
+        layer = get_channel_layer()
+        await layer.group_send(
+            grupo_topico(TOPICO_AFORO),
+            {"type": "tiempo_real", "topico": TOPICO_AFORO, "data": {"personas_dentro": 7}},
+        )
+        aforo = await communicator.receive_json_from()
+        await layer.group_send(
+            grupo_usuario(vigilancia.id),
+            {"type": "notification", "data": {"tipo": "INFO", "titulo": "Hola"}},
+        )
+        return aforo, await communicator.receive_json_from()
+
+    aforo, notificacion = _conversacion(vigilancia, pasos)
+    assert aforo == {"topico": "aforo", "personas_dentro": 7}
+    assert notificacion == {"topico": "notificacion", "tipo": "INFO", "titulo": "Hola"}
+
+
+@pytest.mark.django_db
+def test_registro_de_acceso_publica_aforo(aprendiz, django_capture_on_commit_callbacks):
+    from control_acceso.models import RegistroAcceso
+
+    recibir = _escuchar(grupo_topico(TOPICO_AFORO))
+    with django_capture_on_commit_callbacks(execute=True):
+        RegistroAcceso.objects.create(usuario=aprendiz, tipo="INGRESO")
+
+    mensaje = recibir()
+    assert mensaje["topico"] == "aforo"
+    assert mensaje["data"]["personas_dentro"] == 1
+
+
+@pytest.mark.django_db
+def test_confirmar_evacuacion_publica_resumen_y_confirmacion_personal(client_brigada, aprendiz):
+    from control_acceso.models import RegistroAcceso
+    from emergencias.tests.factories import EmergenciaFactory, TipoEmergenciaFactory
+    from emergencias.utils import GRUPO_EMERGENCIA_MASIVA
+
+    em = EmergenciaFactory(tipo=TipoEmergenciaFactory(alerta_masiva=True), estado="EN_ATENCION")
+    RegistroAcceso.objects.create(usuario=aprendiz, tipo="INGRESO")
+    resumen = _escuchar(GRUPO_EMERGENCIA_MASIVA)
+    personal = _escuchar(grupo_usuario(aprendiz.id))
+
+    response = client_brigada.post(
+        "/api/emergencias/emergencias/evacuacion-confirmar/",
+        {"emergencia_id": em.id, "usuario_ids": [aprendiz.id]},
+        format="json",
+    )
+    assert response.status_code == 200
+
+    datos = resumen()["data"]
+    assert datos["activa"] is True
+    assert datos["emergencia_id"] == em.id
+    assert (datos["total"], datos["confirmados"], datos["faltantes"]) == (1, 1, 0)
+    assert personal()["data"] == {"emergencia_id": em.id, "yo_confirmado": True}
+
+
+@pytest.mark.django_db
+def test_rafaga_de_accesos_publica_el_aforo_una_vez(django_capture_on_commit_callbacks, monkeypatch):
+    from control_acceso.models import RegistroAcceso
+    from usuarios.tests.factories import UsuarioFactory
+
+    calculos = []
+    monkeypatch.setattr("control_acceso.utils.verificar_aforo_actual", lambda: calculos.append(1) or {})
+    with django_capture_on_commit_callbacks(execute=True):
+        for usuario in UsuarioFactory.create_batch(5):
+            RegistroAcceso.objects.create(usuario=usuario, tipo="INGRESO")
+    assert calculos == [1]
@@ -0,0 +1,150 @@
+"""
+Canal de push multiplexado sobre /ws/notificaciones/.
+
+Cada mensaje que recibe el navegador lleva un campo "topico" que indica su tipo:
+
+  notificacion       → nueva notificación { tipo, titulo, mensaje, prioridad, url }
+  no_leidas          → conteo de notificaciones no leídas del usuario { count }
+  emergencia_masiva  → bandera de emergencia masiva activa { activa }
+  evacuacion         → resumen de la evacuación en curso { activa, total, confirmados, ... }
+                       o confirmación personal { emergencia_id, yo_confirmado }
+  aforo              → aforo actual del centro (mismo formato que verificar_aforo_actual)
+  emergencias        → cambio en la lista de emergencias { id, estado, accion }
+  mapa_estados       → cambio de estado de un edificio (mismo formato que estados_edificios)
+
+Los cuatro primeros llegan a todo WebSocket autenticado. "aforo", "emergencias"
+y "mapa_estados" son opcionales: la página los pide enviando
+{"accion": "suscribir", "topicos": [...]}; "mapa_estados" lo puede pedir
+cualquier usuario autenticado y los demás solo los roles de TOPICOS_SUSCRIBIBLES.
+
+El servidor publica al ocurrir el cambio; el frontend solo consulta por HTTP
+(polling lento) mientras el socket está caído.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOPICO_NOTIFICACION = "notificacion"
+TOPICO_NO_LEIDAS = "no_leidas"
+TOPICO_EMERGENCIA_MASIVA = "emergencia_masiva"
+TOPICO_EVACUACION = "evacuacion"
+TOPICO_AFORO = "aforo"
+TOPICO_EMERGENCIAS = "emergencias"
+TOPICO_MAPA_ESTADOS = "mapa_estados"
+
+# Tópicos a los que una página se suscribe explícitamente → roles autorizados
+TOPICOS_SUSCRIBIBLES = {
+    TOPICO_AFORO: {"ADMINISTRATIVO", "VIGILANCIA", "COORDINADOR_SST"},
+    TOPICO_EMERGENCIAS: {"ADMINISTRATIVO", "BRIGADA", "VIGILANCIA", "COORDINADOR_SST"},
+}
+
+# Tópicos opcionales abiertos a cualquier usuario autenticado (en una evacuación todos deben verlos)
+TOPICOS_PUBLICOS = {TOPICO_MAPA_ESTADOS}
+
+
+def grupo_usuario(usuario_id):
+    return f"notif_user_{usuario_id}"
+
+
+def grupo_topico(topico):
+    return f"topico_{topico}"
+
+
+def puede_suscribirse(usuario, topico):
+    if topico in TOPICOS_PUBLICOS:
+        return True
+    roles = TOPICOS_SUSCRIBIBLES.get(topico)
+    if roles is None:
+        return False
+    return usuario.is_superuser or usuario.rol in roles
+
+
+def publicar(grupo, topico, datos):
+    """
+    Envía un mensaje del tópico al grupo del channel layer.
+    Si el channel layer no está disponible falla en silencio (como _ws_dispatch_*),
+    para no bloquear el flujo que originó el cambio.
+    """
+    try:
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        async_to_sync(channel_layer.group_send)(grupo, {"type": "tiempo_real", "topico": topico, "data": datos})
+    except Exception as e:
+        logger.warning("WS publicar %s error: %s", topico, e)
+
+
+# ─── Publicadores por tópico ─────────────────────────────────────────────────
+
+_CLAVE_AFORO_PUBLICADO = "tiempo_real:aforo:publicado"
+
+
+def publicar_no_leidas(usuario_id):
+    """Publica el conteo de no leídas al usuario (sincroniza badges entre pestañas)."""
+    from .utils import contar_no_leidas
+
+    publicar(grupo_usuario(usuario_id), TOPICO_NO_LEIDAS, {"count": contar_no_leidas(usuario_id)})
+
+
+def publicar_aforo():
+    """
+    Publica el aforo actual a las páginas suscritas (control de acceso).
+
+    Se llama tras cada ingreso/egreso, pero publica (y recalcula el aforo) a lo
+    sumo una vez cada AFORO_PUBLICACION_SEGUNDOS: en hora pico los escaneos de
+    una ráfaga comparten un solo cálculo. La página vuelve a pedir el aforo por
+    HTTP al terminar la ráfaga, así que no se queda con el último valor omitido.
+    """
+    from django.conf import settings
+    from django.core.cache import cache
+
+    from control_acceso.utils import verificar_aforo_actual
+
+    if not cache.add(_CLAVE_AFORO_PUBLICADO, 1, getattr(settings, "AFORO_PUBLICACION_SEGUNDOS", 2)):
+        return
+    publicar(grupo_topico(TOPICO_AFORO), TOPICO_AFORO, verificar_aforo_actual())
+
+
+def publicar_cambio_emergencia(emergencia_id, estado, accion):
+    """Avisa a las páginas suscritas que la lista de emergencias cambió."""
+    publicar(
+        grupo_topico(TOPICO_EMERGENCIAS),
+        TOPICO_EMERGENCIAS,
+        {"id": emergencia_id, "estado": estado, "accion": accion},
+    )
+
+
+def publicar_estado_edificio(edificio_id):
+    """Publica el estado actual de un edificio a las páginas con el mapa abierto."""
+    from mapas.estados import fila_estado
+    from mapas.models import EdificioBloque
+
+    edificio = (
+        EdificioBloque.objects.select_related("estado_actual", "estado_actual__actualizado_por")
+        .filter(pk=edificio_id)
+        .first()
+    )
+    if edificio is not None:
+        publicar(grupo_topico(TOPICO_MAPA_ESTADOS), TOPICO_MAPA_ESTADOS, fila_estado(edificio))
+
+
+def publicar_estado_evacuacion(usuarios_confirmados=()):
+    """
+    Publica el resumen de la evacuación en curso a todos los conectados y,
+    a cada usuario recién confirmado, su confirmación personal.
+    """
+    from emergencias.utils import GRUPO_EMERGENCIA_MASIVA, resumen_evacuacion
+
+    resumen = resumen_evacuacion()
+    publicar(GRUPO_EMERGENCIA_MASIVA, TOPICO_EVACUACION, resumen)
+    if resumen["activa"]:
+        for usuario_id in usuarios_confirmados:
+            publicar(
+                grupo_usuario(usuario_id),
+                TOPICO_EVACUACION,
+                {"emergencia_id": resumen["emergencia_id"], "yo_confirmado": True},
+            )
@@ -0,0 +1,91 @@
+"""
+Utilidades de la app usuarios.
+"""
+
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+# ── Contador cacheado de notificaciones no leídas ─────────────────────────────
+#
+# Una clave por usuario con el número de notificaciones no leídas. Se mantiene
+# con incr/decr atómicos del backend de caché (Redis) desde los caminos de
+# creación y lectura (ver NotificacionQuerySet y Notificacion.save), de modo
+# que el badge de la navbar cuesta una lectura de caché en lugar de un COUNT(*).
+# Si la clave no existe se recalcula desde la BD al leerla; la tarea periódica
+# reconciliar_no_leidas corrige cualquier deriva (carreras, cambios por admin).
+
+
+def _clave_no_leidas(usuario_id):
+    return f"notif:no_leidas:{usuario_id}"
+
+
+def _ttl_no_leidas():
+    return getattr(settings, "CACHE_TTL_NO_LEIDAS", 24 * 3600)
+
+
+def contar_no_leidas(usuario_id):
+    """Número de notificaciones no leídas del usuario (caché; BD solo si falta la clave)."""
+    from .models import Notificacion
+
+    count = cache.get(_clave_no_leidas(usuario_id))
+    if count is None:
+        count = Notificacion.objects.filter(destinatario_id=usuario_id, leida=False).count()
+        cache.add(_clave_no_leidas(usuario_id), count, _ttl_no_leidas())
+    return max(count, 0)
+
+
+def establecer_no_leidas(usuario_id, count):
+    """Fija el contador a un valor exacto conocido (p. ej. 0 tras marcar todas como leídas)."""
+    transaction.on_commit(lambda: cache.set(_clave_no_leidas(usuario_id), count, _ttl_no_leidas()))
+
+
+def ajustar_no_leidas(deltas):
+    """
+    Suma a cada contador su delta ({usuario_id: +n/-n}) al confirmarse la
+    transacción. Las claves inexistentes se dejan sin crear: se recalcularán
+    completas en la siguiente lectura.
+    """
+    deltas = {usuario_id: delta for usuario_id, delta in Counter(deltas).items() if delta}
+    if not deltas:
+        return
+
+    def aplicar():
+        for usuario_id, delta in deltas.items():
+            try:
+                cache.incr(_clave_no_leidas(usuario_id), delta)
+            except ValueError:
+                pass
+
+    transaction.on_commit(aplicar)
+
+
+def reconciliar_no_leidas(usuario_ids=None, tamano_lote=1000):
+    """
+    Recalcula los contadores desde la BD con una consulta agrupada por lote
+    de usuarios. Sin usuario_ids reconcilia a todos los usuarios activos.
+    Retorna el número de contadores escritos.
+    """
+    from django.db.models import Count
+
+    from .models import Notificacion, Usuario
+
+    if usuario_ids is None:
+        usuario_ids = Usuario.objects.filter(activo=True).values_list("id", flat=True).iterator()
+    usuario_ids = list(usuario_ids)
+
+    escritos = 0
+    for i in range(0, len(usuario_ids), tamano_lote):
+        lote = usuario_ids[i : i + tamano_lote]
+        conteos = dict(
+            Notificacion.objects.filter(destinatario_id__in=lote, leida=False)
+            .order_by()
+            .values_list("destinatario_id")
+            .annotate(n=Count("id"))
+        )
+        cache.set_many({_clave_no_leidas(uid): conteos.get(uid, 0) for uid in lote}, _ttl_no_leidas())
+        escritos += len(lote)
+    return escritos
@@ -1,15 +1,18 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django.db.models import Q
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from django.contrib.auth import login, logout
 from django_ratelimit.core import is_ratelimited
+from .authentication import token_vigente
 from .models import Usuario, Visitante
 from .serializers import UsuarioSerializer, LoginSerializer, VisitanteSerializer
 from .permissions import PuedeGestionarUsuarios
+from .tiempo_real import publicar_no_leidas
 
 
 class UsuarioViewSet(viewsets.ModelViewSet):
@@ -224,7 +227,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
 
         usuario = serializer.validated_data["usuario"]
         login(request, usuario)
-        token, created = Token.objects.get_or_create(user=usuario)
+        token = token_vigente(usuario)
 
         return Response({"token": token.key, "usuario": UsuarioSerializer(usuario).data, "mensaje": "Login exitoso."})
 
@@ -233,6 +236,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=["post"])
     def logout(self, request):
+        # Borrar el token lo saca también de la caché de autenticación (usuarios/signals.py)
         try:
             request.user.auth_token.delete()
         except Exception:
@@ -461,15 +465,21 @@ class NotificacionViewSet(viewsets.ModelViewSet):
 
         return Notificacion.objects.filter(destinatario=self.request.user)
 
+    def perform_update(self, serializer):
+        # Notificacion.save ajusta el contador si cambia `leida`
+        super().perform_update(serializer)
+        transaction.on_commit(lambda: publicar_no_leidas(self.request.user.id))
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        transaction.on_commit(lambda: publicar_no_leidas(self.request.user.id))
+
     @action(detail=True, methods=["post"])
     def marcar_leida(self, request, pk=None):
         """Marca una notificacion como leida"""
-        from django.utils import timezone
-
         notificacion = self.get_object()  # 404 si no pertenece al usuario
-        notificacion.leida = True
-        notificacion.fecha_lectura = timezone.now()
-        notificacion.save()
+        if notificacion.marcar_leida():
+            transaction.on_commit(lambda: publicar_no_leidas(request.user.id))
         return Response({"success": True, "message": "Notificacion marcada como leida"})
 
     @action(detail=False, methods=["post"])
@@ -477,11 +487,14 @@ class NotificacionViewSet(viewsets.ModelViewSet):
         """Marca todas las notificaciones del usuario como leidas"""
         from django.utils import timezone
         from .models import Notificacion
+        from .utils import establecer_no_leidas
 
         try:
             actualizadas = Notificacion.objects.filter(destinatario=request.user, leida=False).update(
                 leida=True, fecha_lectura=timezone.now()
             )
+            establecer_no_leidas(request.user.id, 0)
+            transaction.on_commit(lambda: publicar_no_leidas(request.user.id))
 
             return Response({"success": True, "message": f"{actualizadas} notificacion(es) marcadas como leidas"})
         except Exception as e:
@@ -492,6 +505,7 @@ class NotificacionViewSet(viewsets.ModelViewSet):
         """Elimina permanentemente todas las notificaciones leídas del usuario"""
         from .models import Notificacion
 
+        # Solo borra leídas: NotificacionQuerySet.delete no altera el contador de no leídas
         eliminadas, _ = Notificacion.objects.filter(destinatario=request.user, leida=True).delete()
         return Response({"success": True, "eliminadas": eliminadas})
 
@@ -500,9 +514,11 @@ class NotificacionViewSet(viewsets.ModelViewSet):
         """Retorna solo las notificaciones no leidas"""
         from .models import Notificacion
 
+        from .utils import contar_no_leidas
+
         qs = Notificacion.objects.filter(destinatario=request.user, leida=False).order_by("-fecha_creacion")
 
-        total = qs.count()
+        total = contar_no_leidas(request.user.id)
         notificaciones = qs[:10]
 
         return Response({"count": total, "notificaciones": self.get_serializer(notificaciones, many=True).data})
@@ -510,9 +526,9 @@ class NotificacionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def count(self, request):
         """Retorna el conteo de notificaciones no leidas (para badge en navbar)"""
-        from .models import Notificacion
+        from .utils import contar_no_leidas
 
-        count = Notificacion.objects.filter(destinatario=request.user, leida=False).count()
+        count = contar_no_leidas(request.user.id)
 
         return Response({"count": count})
 